@@ -0,0 +1,6 @@
+"""
+Benchmarks do pipeline RAG usando as perguntas do PubMedQA.
+
+Cada pergunta do ori_pqal.json tem um artigo de origem conhecido
+(article_id), o que fornece ground truth gratuito para medir recuperação.
+"""
@@ -0,0 +1,174 @@
+"""
+Benchmark da busca em dois níveis (coarse-to-fine) vs. busca direta.
+
+Grava os vetores dos chunks em um LocalVectorStore temporário, constrói os
+vetores de artigo com build_article_vectors (média dos chunks) e, para cada
+pergunta do PubMedQA, compara:
+
+- flat: busca em todos os chunks
+- coarse M: busca nos vetores de artigo (top-M) e depois só nos chunks desses
+  artigos (article_id $in, varredura do subconjunto no store local)
+
+Mede recall@k, MRR, recall da etapa coarse (artigo de origem entre os M),
+latência (p50/p95/p99) e chunks pontuados por query. Os embeddings são os do
+provider configurado, com cache em disco (como em dimension_recall).
+
+O modo 'question' (embedding da pergunta do artigo) não é avaliado aqui: as
+queries do benchmark são as próprias perguntas, então o resultado seria
+trivialmente perfeito.
+
+Uso (a partir de rag_medical/):
+    python -m benchmarks.coarse_to_fine --top-articles 5 10 20 50
+"""
+
+from typing import Any, Dict, List, Optional
+from collections import Counter
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+
+import numpy as np
+
+from config.settings import Settings
+from scripts.article_vectors import (
+    article_ids_from_matches,
+    article_namespace_for,
+    build_article_vectors,
+    narrow_filter,
+)
+from scripts.embeddings_manager import EmbeddingsManager
+from scripts.vector_store import LocalVectorStore, vector_id_for
+from .common import embed_cached, load_corpus, ranking_metrics, percentile, write_report
+
+
+_NAMESPACE = "coarse_benchmark"
+
+
+def _summarize(
+    rankings: List[List[str]],
+    expected: List[str],
+    latencies_ms: List[float],
+    scored: List[int],
+    top_k: int
+) -> Dict[str, Any]:
+    metrics = ranking_metrics(rankings, expected, ks=(1, 5, top_k))
+    metrics.update({
+        "latency_p50_ms": percentile(latencies_ms, 50),
+        "latency_p95_ms": percentile(latencies_ms, 95),
+        "latency_p99_ms": percentile(latencies_ms, 99),
+        "avg_chunks_scored": float(np.mean(scored)) if scored else 0.0,
+    })
+    return metrics
+
+
+def run_coarse_benchmark(
+    top_articles: List[int],
+    top_k: int = 10,
+    limit: Optional[int] = None,
+    provider: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Executa o benchmark coarse-to-fine vs. flat.
+    
+    Args:
+        top_articles: Valores de M (artigos selecionados na etapa coarse).
+        top_k: k máximo para recall@k (chunks retornados por query).
+        limit: Número máximo de artigos (None = todos).
+        provider: 'gemini' ou 'ollama'. Se None, detecta automaticamente.
+    
+    Returns:
+        Relatório com métricas da busca direta e de cada M.
+    """
+    settings = Settings()
+    chunks, questions = load_corpus(limit=limit)
+    expected = [q["article_id"] for q in questions]
+    
+    print(f"📊 Corpus: {len(chunks)} chunks, {len(questions)} perguntas")
+    
+    manager = EmbeddingsManager(provider=provider)
+    chunk_matrix = embed_cached(manager, [chunk["text"] for chunk in chunks], "chunks", settings.BATCH_SIZE)
+    question_matrix = embed_cached(manager, [q["question"] for q in questions], "questions", settings.BATCH_SIZE)
+    
+    with tempfile.TemporaryDirectory() as store_dir:
+        store = LocalVectorStore(store_dir, dimension=chunk_matrix.shape[1])
+        store.upsert([
+            {
+                "id": vector_id_for(chunk["article_id"], chunk["chunk_index"]),
+                "values": values,
+                "metadata": {"article_id": str(chunk["article_id"]), "chunk_index": chunk["chunk_index"]},
+            }
+            for chunk, values in zip(chunks, chunk_matrix.tolist())
+        ], namespace=_NAMESPACE)
+        
+        build_start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_stats = build_article_vectors(store, chunks, _NAMESPACE, mode="mean")
+        build_seconds = time.perf_counter() - build_start
+        
+        # Busca direta (linha de base)
+        rankings, latencies_ms = [], []
+        for query_vector in question_matrix:
+            start = time.perf_counter()
+            matches = store.query(query_vector, top_k, namespace=_NAMESPACE)["matches"]
+            latencies_ms.append((time.perf_counter() - start) * 1000)
+            rankings.append([match["metadata"]["article_id"] for match in matches])
+        results = {"flat": _summarize(rankings, expected, latencies_ms, [len(chunks)] * len(rankings), top_k)}
+        print(f"   flat: {results['flat']}")
+        
+        # Coarse-to-fine para cada M
+        article_namespace = article_namespace_for(_NAMESPACE)
+        chunk_counts = Counter(str(chunk["article_id"]) for chunk in chunks)
+        for m in top_articles:
+            rankings, latencies_ms, scored, coarse_hits = [], [], [], 0
+            for query_vector, article_id in zip(question_matrix, expected):
+                start = time.perf_counter()
+                selected = article_ids_from_matches(
+                    store.query(query_vector, m, namespace=article_namespace)["matches"]
+                )
+                matches = store.query(
+                    query_vector, top_k, filter=narrow_filter(None, selected), namespace=_NAMESPACE
+                )["matches"]
+                latencies_ms.append((time.perf_counter() - start) * 1000)
+                rankings.append([match["metadata"]["article_id"] for match in matches])
+                coarse_hits += article_id in selected
+                scored.append(build_stats["vectors_upserted"] + sum(chunk_counts[a] for a in selected))
+            metrics = _summarize(rankings, expected, latencies_ms, scored, top_k)
+            metrics["coarse_recall"] = coarse_hits / len(expected) if expected else 0.0
+            results[f"coarse_{m}"] = metrics
+            print(f"   coarse M={m}: {metrics}")
+    
+    return {
+        "benchmark": "coarse_to_fine",
+        "provider": manager.provider,
+        "model": manager.model_name,
+        "num_chunks": len(chunks),
+        "num_articles": build_stats["vectors_upserted"],
+        "num_questions": len(questions),
+        "top_k": top_k,
+        "article_vectors_build_seconds": build_seconds,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Busca coarse-to-fine vs. busca direta (PubMedQA)")
+    parser.add_argument("--top-articles", type=int, nargs="+", default=[5, 10, 20, 50])
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=None, help="Número máximo de artigos")
+    parser.add_argument("--provider", default=None, help="'gemini' ou 'ollama'")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída")
+    args = parser.parse_args()
+    
+    report = run_coarse_benchmark(
+        top_articles=args.top_articles,
+        top_k=args.top_k,
+        limit=args.limit,
+        provider=args.provider
+    )
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Funções compartilhadas pelos benchmarks.
+
+Carrega o corpus (chunks) e as perguntas do PubMedQA com o artigo de origem,
+e calcula métricas de recuperação a partir de rankings de article_id.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+
+from config.settings import Settings
+from scripts.data_loader import load_medical_dataset
+from scripts.data_processor import process_batch
+from scripts.embeddings_manager import EmbeddingsManager
+from scripts.text_splitter import MedicalTextSplitter
+
+
+def load_corpus(
+    limit: Optional[int] = None,
+    data_path: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+    """
+    Carrega chunks e perguntas do PubMedQA.
+    
+    Args:
+        limit: Número máximo de artigos (None = todos).
+        data_path: Caminho do ori_pqal.json. Se None, usa das configurações.
+        
+    Returns:
+        Tuple (chunks, questions), onde questions é uma lista de
+        {"article_id": str, "question": str}.
+    """
+    settings = Settings()
+    raw_data = load_medical_dataset(data_path or settings.MEDICAL_DATA_PATH)
+    
+    if limit:
+        raw_data = dict(list(raw_data.items())[:limit])
+    
+    processed = process_batch(raw_data, anonymize=True, show_progress=False)
+    splitter = MedicalTextSplitter(
+        chunk_size=settings.CHUNK_SIZE,
+        chunk_overlap=settings.CHUNK_OVERLAP
+    )
+    chunks = splitter.split_batch(processed, show_progress=False)
+    
+    questions = [
+        {"article_id": str(article_id), "question": entry.get("QUESTION", "").strip()}
+        for article_id, entry in raw_data.items()
+        if entry.get("QUESTION", "").strip()
+    ]
+    
+    return chunks, questions
+
+
+def ranking_metrics(
+    ranked_article_ids: List[List[str]],
+    expected_article_ids: List[str],
+    ks: Tuple[int, ...] = (1, 5, 10)
+) -> Dict[str, float]:
+    """
+    Calcula recall@k e MRR a partir de rankings de article_id.
+    
+    Um acerto é o artigo de origem da pergunta aparecer no ranking
+    (chunks repetidos do mesmo artigo contam uma vez).
+    
+    Args:
+        ranked_article_ids: Um ranking (lista de article_id) por pergunta.
+        expected_article_ids: Artigo de origem de cada pergunta.
+        ks: Valores de k para recall@k.
+        
+    Returns:
+        Dicionário {"recall@k": float, ..., "mrr": float}.
+    """
+    total = len(expected_article_ids)
+    if total == 0:
+        return {**{f"recall@{k}": 0.0 for k in ks}, "mrr": 0.0}
+    
+    hits = {k: 0 for k in ks}
+    reciprocal_rank_sum = 0.0
+    
+    for ranking, expected in zip(ranked_article_ids, expected_article_ids):
+        unique_ranking = list(dict.fromkeys(ranking))
+        if expected in unique_ranking:
+            rank = unique_ranking.index(expected) + 1
+            reciprocal_rank_sum += 1.0 / rank
+            for k in ks:
+                if rank <= k:
+                    hits[k] += 1
+    
+    metrics = {f"recall@{k}": hits[k] / total for k in ks}
+    metrics["mrr"] = reciprocal_rank_sum / total
+    return metrics
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Percentil por interpolação linear (pct entre 0 e 100).
+    
+    Args:
+        values: Amostras.
+        pct: Percentil desejado.
+        
+    Returns:
+        Valor do percentil (0.0 se não houver amostras).
+    """
+    if not values:
+        return 0.0
+    
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100.0
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    if lower == upper:
+        return ordered[lower]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def get_cache_dir() -> Path:
+    """Retorna (e cria) o diretório de cache dos benchmarks."""
+    settings = Settings()
+    cache_dir = Path(settings.MEDICAL_DATA_PATH).parent / "benchmarks_cache"
+    cache_dir.mkdir(exist_ok=True)
+    return cache_dir
+
+
+def embed_cached(
+    manager: EmbeddingsManager,
+    texts: List[str],
+    kind: str,
+    batch_size: int
+) -> np.ndarray:
+    """
+    Gera embeddings em lotes com cache em disco.
+    
+    O cache é chaveado por provider, modelo, dimensão de saída e conteúdo,
+    então trocar a dimensão nunca reaproveita vetores de outra dimensão.
+    """
+    digest = hashlib.sha1("\n".join(texts).encode("utf-8")).hexdigest()[:12]
+    model = manager.model_name.replace("/", "_").replace(":", "_")
+    dimension = manager.output_dimension or "native"
+    cache_path = get_cache_dir() / (
+        f"emb_{manager.provider}_{model}_{dimension}_{kind}_{len(texts)}_{digest}.npy"
+    )
+    
+    if cache_path.exists():
+        return np.load(cache_path)
+    
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(manager.embed_documents(texts[start:start + batch_size]))
+    
+    matrix = np.asarray(vectors, dtype=np.float32)
+    np.save(cache_path, matrix)
+    return matrix
+
+
+def write_report(report: Dict[str, Any], output_path: Optional[str]) -> None:
+    """
+    Imprime o relatório em JSON e, opcionalmente, grava em arquivo.
+    
+    Args:
+        report: Relatório do benchmark.
+        output_path: Caminho do arquivo JSON de saída (opcional).
+    """
+    serialized = json.dumps(report, indent=2, ensure_ascii=False)
+    print(serialized)
+    
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(serialized)
+        print(f"\n💾 Relatório salvo em: {output_path}")
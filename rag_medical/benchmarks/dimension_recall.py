@@ -0,0 +1,147 @@
+"""
+Benchmark de recall vs. dimensão dos embeddings nas perguntas do PubMedQA.
+
+Gera os embeddings dos chunks e das perguntas uma única vez na dimensão
+nativa, depois trunca + renormaliza (Matryoshka) para cada dimensão testada
+e mede recall@k, MRR e latência da busca exata por cosseno.
+
+Com --native, os embeddings são gerados pelo provider em cada dimensão
+(Gemini output_dimensionality) em vez de simulados por truncamento.
+
+Uso (a partir de rag_medical/):
+    python -m benchmarks.dimension_recall --dimensions 768 512 256 128 64
+"""
+
+from typing import Any, Dict, List, Optional
+import argparse
+import time
+
+import numpy as np
+
+from config.settings import Settings
+from scripts.embeddings_manager import EmbeddingsManager, truncate_and_normalize
+from .common import embed_cached, load_corpus, ranking_metrics, percentile, write_report
+
+
+def _evaluate(
+    chunk_matrix: np.ndarray,
+    question_matrix: np.ndarray,
+    chunk_article_ids: np.ndarray,
+    expected_article_ids: List[str],
+    top_k: int
+) -> Dict[str, Any]:
+    """Busca exata por cosseno (vetores já normalizados) e calcula métricas."""
+    rankings = []
+    latencies_ms = []
+    # Busca com mais candidatos que top_k para deduplicar por artigo
+    candidates = min(top_k * 4, len(chunk_matrix))
+    
+    for query_vector in question_matrix:
+        start = time.perf_counter()
+        scores = chunk_matrix @ query_vector
+        top = np.argpartition(-scores, candidates - 1)[:candidates]
+        top = top[np.argsort(-scores[top])]
+        latencies_ms.append((time.perf_counter() - start) * 1000)
+        rankings.append(list(chunk_article_ids[top]))
+    
+    metrics = ranking_metrics(rankings, expected_article_ids, ks=(1, 5, top_k))
+    metrics.update({
+        "latency_p50_ms": percentile(latencies_ms, 50),
+        "latency_p95_ms": percentile(latencies_ms, 95),
+        "index_bytes": int(chunk_matrix.nbytes),
+    })
+    return metrics
+
+
+def run_dimension_benchmark(
+    dimensions: List[int],
+    top_k: int = 10,
+    limit: Optional[int] = None,
+    native: bool = False,
+    provider: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Executa o benchmark de recall por dimensão.
+    
+    Args:
+        dimensions: Dimensões a avaliar.
+        top_k: k máximo para recall@k.
+        limit: Número máximo de artigos (None = todos).
+        native: Se True, gera embeddings no provider em cada dimensão.
+        provider: 'gemini' ou 'ollama'. Se None, detecta automaticamente.
+        
+    Returns:
+        Relatório com métricas por dimensão.
+    """
+    settings = Settings()
+    chunks, questions = load_corpus(limit=limit)
+    chunk_texts = [chunk["text"] for chunk in chunks]
+    chunk_article_ids = np.asarray([str(chunk["article_id"]) for chunk in chunks])
+    question_texts = [q["question"] for q in questions]
+    expected = [q["article_id"] for q in questions]
+    
+    print(f"📊 Corpus: {len(chunks)} chunks, {len(questions)} perguntas")
+    
+    results = {}
+    
+    if native:
+        for dimension in dimensions:
+            manager = EmbeddingsManager(provider=provider, output_dimension=dimension)
+            chunk_matrix = embed_cached(manager, chunk_texts, "chunks", settings.BATCH_SIZE)
+            question_matrix = embed_cached(manager, question_texts, "questions", settings.BATCH_SIZE)
+            results[str(dimension)] = _evaluate(
+                chunk_matrix, question_matrix, chunk_article_ids, expected, top_k
+            )
+            print(f"   dim={dimension}: {results[str(dimension)]}")
+    else:
+        manager = EmbeddingsManager(provider=provider)
+        full_chunks = embed_cached(manager, chunk_texts, "chunks", settings.BATCH_SIZE)
+        full_questions = embed_cached(manager, question_texts, "questions", settings.BATCH_SIZE)
+        
+        for dimension in dimensions:
+            if dimension > full_chunks.shape[1]:
+                print(f"⚠️  Dimensão {dimension} maior que a nativa ({full_chunks.shape[1]}). Ignorando...")
+                continue
+            results[str(dimension)] = _evaluate(
+                truncate_and_normalize(full_chunks, dimension),
+                truncate_and_normalize(full_questions, dimension),
+                chunk_article_ids,
+                expected,
+                top_k
+            )
+            print(f"   dim={dimension}: {results[str(dimension)]}")
+    
+    return {
+        "benchmark": "dimension_recall",
+        "provider": manager.provider,
+        "model": manager.model_name,
+        "mode": "native" if native else "truncation",
+        "num_chunks": len(chunks),
+        "num_questions": len(questions),
+        "top_k": top_k,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs. dimensão dos embeddings (PubMedQA)")
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[768, 512, 256, 128, 64])
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=None, help="Número máximo de artigos")
+    parser.add_argument("--native", action="store_true", help="Usa a redução nativa do provider")
+    parser.add_argument("--provider", default=None, help="'gemini' ou 'ollama'")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída")
+    args = parser.parse_args()
+    
+    report = run_dimension_benchmark(
+        dimensions=args.dimensions,
+        top_k=args.top_k,
+        limit=args.limit,
+        native=args.native,
+        provider=args.provider
+    )
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
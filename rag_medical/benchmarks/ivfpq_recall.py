@@ -0,0 +1,195 @@
+"""
+Benchmark do índice aproximado IVF-PQ vs. busca exata no store local.
+
+Grava os vetores dos chunks (e, opcionalmente, distratores sintéticos para
+simular um corpus maior) em um IVFPQVectorStore temporário, treina o índice e,
+para cada pergunta do PubMedQA e cada combinação de nprobe / rerank, mede:
+
+- recall contra a busca exata (fração do top-k exato recuperada)
+- recall@k e MRR do artigo de origem (como nos outros benchmarks)
+- latência (p50/p95/p99)
+
+O relatório inclui o tempo de treino e a memória do índice (códigos PQ +
+quantizadores) contra a matriz float32. Os distratores são vetores de chunks
+reais com ruído gaussiano, normalizados (sem article_id de pergunta), então
+só competem pelas posições do ranking. Os embeddings são os do provider
+configurado, com cache em disco (como em dimension_recall).
+
+Uso (a partir de rag_medical/):
+    python -m benchmarks.ivfpq_recall --nprobe 1 4 8 16 32 --rerank 0 4 --distractors 200000
+"""
+
+from typing import Any, Dict, List, Optional
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from config.settings import Settings
+from scripts.embeddings_manager import EmbeddingsManager
+from scripts.vector_store import IVFPQVectorStore, LocalVectorStore, vector_id_for
+from .common import embed_cached, load_corpus, ranking_metrics, percentile, write_report
+
+
+_NAMESPACE = "ivfpq_benchmark"
+
+
+def _distractors(chunk_matrix: np.ndarray, count: int, noise: float, seed: int) -> np.ndarray:
+    """Vetores de chunks sorteados com ruído gaussiano, normalizados."""
+    rng = np.random.default_rng(seed)
+    base = chunk_matrix[rng.integers(0, len(chunk_matrix), count)]
+    scale = noise / np.sqrt(chunk_matrix.shape[1])
+    vectors = base + rng.normal(0.0, scale, base.shape).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _run_queries(store, question_matrix: np.ndarray, top_k: int):
+    rankings, ids, latencies_ms = [], [], []
+    for query_vector in question_matrix:
+        start = time.perf_counter()
+        matches = store.query(query_vector, top_k, namespace=_NAMESPACE)["matches"]
+        latencies_ms.append((time.perf_counter() - start) * 1000)
+        rankings.append([match["metadata"].get("article_id", "") for match in matches])
+        ids.append([match["id"] for match in matches])
+    return rankings, ids, latencies_ms
+
+
+def _summarize(
+    rankings: List[List[str]],
+    expected: List[str],
+    latencies_ms: List[float],
+    top_k: int
+) -> Dict[str, Any]:
+    metrics = ranking_metrics(rankings, expected, ks=(1, 5, top_k))
+    metrics.update({
+        "latency_p50_ms": percentile(latencies_ms, 50),
+        "latency_p95_ms": percentile(latencies_ms, 95),
+        "latency_p99_ms": percentile(latencies_ms, 99),
+    })
+    return metrics
+
+
+def run_ivfpq_benchmark(
+    nprobes: List[int],
+    reranks: List[int],
+    top_k: int = 10,
+    limit: Optional[int] = None,
+    provider: Optional[str] = None,
+    distractors: int = 0,
+    noise: float = 0.5,
+    nlist: Optional[int] = None,
+    m: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Executa o benchmark IVF-PQ vs. busca exata.
+    
+    Args:
+        nprobes: Valores de nprobe (listas visitadas por query).
+        reranks: Fatores de re-ranking exato (0 = só scores do PQ).
+        top_k: k máximo para recall@k (chunks retornados por query).
+        limit: Número máximo de artigos (None = todos).
+        provider: 'gemini' ou 'ollama'. Se None, detecta automaticamente.
+        distractors: Vetores sintéticos adicionados ao corpus.
+        noise: Norma aproximada do ruído dos distratores.
+        nlist: Listas do IVF. Se None, usa IVFPQ_NLIST (0 = automático).
+        m: Subquantizadores do PQ. Se None, usa IVFPQ_M.
+    
+    Returns:
+        Relatório com métricas da busca exata e de cada (nprobe, rerank).
+    """
+    settings = Settings()
+    chunks, questions = load_corpus(limit=limit)
+    expected = [q["article_id"] for q in questions]
+    
+    print(f"📊 Corpus: {len(chunks)} chunks + {distractors} distratores, {len(questions)} perguntas")
+    
+    manager = EmbeddingsManager(provider=provider)
+    chunk_matrix = embed_cached(manager, [chunk["text"] for chunk in chunks], "chunks", settings.BATCH_SIZE)
+    question_matrix = embed_cached(manager, [q["question"] for q in questions], "questions", settings.BATCH_SIZE)
+    
+    with tempfile.TemporaryDirectory() as store_dir:
+        # min_vectors=1: train_pending sempre treina, mesmo em corpora pequenos
+        store = IVFPQVectorStore(store_dir, dimension=chunk_matrix.shape[1], nlist=nlist, m=m, min_vectors=1)
+        store.upsert([
+            {
+                "id": vector_id_for(chunk["article_id"], chunk["chunk_index"]),
+                "values": values,
+                "metadata": {"article_id": str(chunk["article_id"]), "chunk_index": chunk["chunk_index"]},
+            }
+            for chunk, values in zip(chunks, chunk_matrix.tolist())
+        ], namespace=_NAMESPACE)
+        if distractors:
+            synthetic = _distractors(chunk_matrix, distractors, noise, seed=0)
+            for start in range(0, distractors, 10000):
+                store.upsert([
+                    {"id": f"distractor_{start + i}", "values": values, "metadata": {}}
+                    for i, values in enumerate(synthetic[start:start + 10000].tolist())
+                ], namespace=_NAMESPACE)
+        
+        build_start = time.perf_counter()
+        store.train_pending(_NAMESPACE)
+        build_seconds = time.perf_counter() - build_start
+        index_stats = store.index_stats(_NAMESPACE)
+        print(f"   índice: {index_stats} ({build_seconds:.1f}s)")
+        
+        # Busca exata (mesmos vetores, sem o índice)
+        exact_store = LocalVectorStore(store_dir, dimension=chunk_matrix.shape[1])
+        rankings, exact_ids, latencies_ms = _run_queries(exact_store, question_matrix, top_k)
+        results = {"exact": _summarize(rankings, expected, latencies_ms, top_k)}
+        print(f"   exact: {results['exact']}")
+        
+        for rerank in reranks:
+            for nprobe in nprobes:
+                store.nprobe, store.rerank = nprobe, rerank
+                rankings, ids, latencies_ms = _run_queries(store, question_matrix, top_k)
+                metrics = _summarize(rankings, expected, latencies_ms, top_k)
+                overlap = [len(set(a) & set(b)) / len(b) for a, b in zip(ids, exact_ids) if b]
+                metrics["recall_vs_exact"] = float(np.mean(overlap)) if overlap else 0.0
+                results[f"nprobe_{nprobe}_rerank_{rerank}"] = metrics
+                print(f"   nprobe={nprobe} rerank={rerank}: {metrics}")
+    
+    return {
+        "benchmark": "ivfpq_recall",
+        "provider": manager.provider,
+        "model": manager.model_name,
+        "num_chunks": len(chunks),
+        "num_distractors": distractors,
+        "num_questions": len(questions),
+        "top_k": top_k,
+        "build_seconds": build_seconds,
+        "index": index_stats,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF-PQ vs. busca exata no store local (PubMedQA)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--rerank", type=int, nargs="+", default=[0, 4])
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=None, help="Número máximo de artigos")
+    parser.add_argument("--provider", default=None, help="'gemini' ou 'ollama'")
+    parser.add_argument("--distractors", type=int, default=0, help="Vetores sintéticos adicionais")
+    parser.add_argument("--noise", type=float, default=0.5, help="Norma do ruído dos distratores")
+    parser.add_argument("--nlist", type=int, default=None, help="Listas do IVF (0 = automático)")
+    parser.add_argument("--m", type=int, default=None, help="Subquantizadores do PQ")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída")
+    args = parser.parse_args()
+    
+    report = run_ivfpq_benchmark(
+        nprobes=args.nprobe,
+        reranks=args.rerank,
+        top_k=args.top_k,
+        limit=args.limit,
+        provider=args.provider,
+        distractors=args.distractors,
+        noise=args.noise,
+        nlist=args.nlist,
+        m=args.m
+    )
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
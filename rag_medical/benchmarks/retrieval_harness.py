@@ -0,0 +1,312 @@
+"""
+Harness de recuperação: recall e latência do caminho de query real (PubMedQA).
+
+Cada entrada do PubMedQA tem uma pergunta (QUESTION) e o artigo de origem,
+então o recall é medido sem anotação extra. Todas as perguntas passam pelo
+RAGQueryEngine (o mesmo caminho de query_medical_rag) no backend configurado
+e, para cada combinação de top_k, modo de cache e concorrência, o harness
+mede:
+
+- recall@k e MRR do artigo de origem
+- latência por query (p50/p95/p99) e throughput (queries/s) com N threads
+- chamadas de embedding por query (contadas no gerenciador de embeddings)
+- hits do cache de resultados
+
+Modos de cache:
+- none: sem cache de resultados
+- cold: cache vazio no início da passada (só repetições e perguntas
+  semanticamente próximas acertam)
+- warm: uma passada de aquecimento antes da medida
+
+Por padrão usa o índice já ingerido (VECTOR_STORE_BACKEND / PINECONE_* /
+LOCAL_VECTOR_STORE_PATH); --ingest ingere o corpus antes. Com --standin, sobe
+o stub de embeddings (e o stand-in do Pinecone, no backend pinecone) em
+processo e ingere o corpus em um diretório temporário, sem credenciais; o
+índice, o namespace, o vector store local e os checkpoints/ledger de ingestão
+ficam isolados (nunca toca o estado da ingestão real).
+
+Uso (a partir de rag_medical/):
+    python -m benchmarks.retrieval_harness --top-k 5 10 --cache none warm --concurrency 1 8
+    python -m benchmarks.retrieval_harness --standin --backend local --limit 500 --output run.json
+"""
+
+from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import contextlib
+import io
+import os
+from pathlib import Path
+import shutil
+import tempfile
+import threading
+import time
+
+from config.settings import Settings
+from scripts.embeddings_manager import EmbeddingsManager
+from scripts.pinecone_ingester import PineconeIngester
+from scripts.query_cache import QueryResultCache
+from scripts.rag_query import RAGQueryEngine
+from scripts.standin_servers import FaultInjector, start_embedding_standin, start_pinecone_standin
+from .common import load_corpus, ranking_metrics, percentile, write_report
+
+
+CACHE_MODES = ("none", "cold", "warm")
+
+# Índice/namespace dedicados do modo --standin
+_STANDIN_INDEX_NAME = "retrieval-harness-standin"
+_STANDIN_NAMESPACE = "retrieval_harness"
+
+
+class _CountingEmbeddings:
+    """
+    Repassa tudo ao EmbeddingsManager, contando as chamadas de embedding.
+    
+    Thread-safe: as queries concorrentes compartilham o mesmo contador.
+    """
+    
+    _COUNTED = ("embed_text", "aembed_text", "embed_documents")
+    
+    def __init__(self, manager: EmbeddingsManager):
+        self._manager = manager
+        self._lock = threading.Lock()
+        self.calls = 0
+    
+    def __getattr__(self, name: str):
+        attribute = getattr(self._manager, name)
+        if name not in self._COUNTED:
+            return attribute
+        
+        if name == "aembed_text":
+            async def counted_async(*args, **kwargs):
+                self._count()
+                return await attribute(*args, **kwargs)
+            return counted_async
+        
+        def counted(*args, **kwargs):
+            self._count()
+            return attribute(*args, **kwargs)
+        return counted
+    
+    def _count(self):
+        with self._lock:
+            self.calls += 1
+    
+    def reset(self) -> int:
+        """Zera o contador e retorna o valor anterior."""
+        with self._lock:
+            calls, self.calls = self.calls, 0
+        return calls
+
+
+def _run_pass(
+    engine: RAGQueryEngine,
+    questions: List[Dict[str, str]],
+    top_k: int,
+    concurrency: int
+):
+    """Executa todas as perguntas; retorna (rankings, latências em ms, segundos)."""
+    def run_one(question: str):
+        start = time.perf_counter()
+        results = engine.query(question, top_k=top_k)
+        return [str(result.get("article_id", "")) for result in results], (time.perf_counter() - start) * 1000
+    
+    texts = [q["question"] for q in questions]
+    start = time.perf_counter()
+    if concurrency <= 1:
+        outcomes = [run_one(text) for text in texts]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(run_one, texts))
+    elapsed = time.perf_counter() - start
+    
+    return [ranking for ranking, _ in outcomes], [latency for _, latency in outcomes], elapsed
+
+
+def _start_standins(backend: str, dimension: int, work_dir: str) -> List[Any]:
+    """Sobe os stand-ins e aponta as configurações para eles."""
+    servers = [start_embedding_standin(port=0, dimension=dimension, faults=FaultInjector(seed=0))]
+    Settings.GEMINI_API_KEY = ""
+    Settings.PINECONE_INDEX_NAME = _STANDIN_INDEX_NAME
+    Settings.OLLAMA_BASE_URL = "http://%s:%d" % servers[0].server_address[:2]
+    Settings.EMBEDDING_MODEL = "standin"
+    Settings.CHUNK_TEXT_STORE_PATH = None
+    Settings.INGESTION_EPOCH_PATH = os.path.join(work_dir, "ingestion_epochs.json")
+    Settings.LOCAL_VECTOR_STORE_PATH = os.path.join(work_dir, "vector_store")
+    
+    if backend == "pinecone":
+        servers.append(start_pinecone_standin(port=0, dimension=dimension, faults=FaultInjector(seed=0)))
+        Settings.PINECONE_HOST = "http://%s:%d" % servers[1].server_address[:2]
+        Settings.PINECONE_API_KEY = Settings.PINECONE_API_KEY or "standin"
+    return servers
+
+
+def run_retrieval_harness(
+    top_ks: List[int],
+    cache_modes: List[str],
+    concurrency_levels: List[int],
+    limit: Optional[int] = None,
+    backend: Optional[str] = None,
+    namespace: Optional[str] = None,
+    provider: Optional[str] = None,
+    mode: Optional[str] = None,
+    ingest: bool = False,
+    standin: bool = False,
+    dimension: int = 256
+) -> Dict[str, Any]:
+    """
+    Executa o harness de recuperação.
+    
+    Args:
+        top_ks: Valores de top_k (resultados por query).
+        cache_modes: Modos de cache ('none', 'cold', 'warm').
+        concurrency_levels: Threads simultâneas (1 = sequencial).
+        limit: Número máximo de artigos (None = todos).
+        backend: 'pinecone', 'local' ou 'ivfpq'. Se None, usa VECTOR_STORE_BACKEND.
+        namespace: Namespace das queries. Se None, usa das configurações.
+        provider: 'gemini' ou 'ollama'. Se None, detecta automaticamente.
+        mode: Modo de busca ('dense', 'lexical', 'hybrid'). Se None, usa RETRIEVAL_MODE.
+        ingest: Ingere o corpus antes das queries.
+        standin: Usa os stand-ins locais (implica ingest e provider 'ollama').
+        dimension: Dimensão dos embeddings do stand-in.
+    
+    Returns:
+        Relatório com uma entrada por (top_k, cache, concorrência).
+    """
+    for cache_mode in cache_modes:
+        if cache_mode not in CACHE_MODES:
+            raise ValueError(f"Modo de cache inválido: {cache_mode}. Use 'none', 'cold' ou 'warm'.")
+    
+    backend = (backend or Settings.VECTOR_STORE_BACKEND).lower()
+    work_dir = tempfile.mkdtemp(prefix="retrieval_harness_") if standin else None
+    servers = _start_standins(backend, dimension, work_dir) if standin else []
+    if standin:
+        provider, ingest = "ollama", True
+        namespace = namespace or _STANDIN_NAMESPACE
+    
+    chunks, questions = load_corpus(limit=limit)
+    expected = [q["article_id"] for q in questions]
+    print(f"📊 Corpus: {len(chunks)} chunks, {len(questions)} perguntas (backend: {backend})")
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = EmbeddingsManager(provider=provider)
+    
+    ingestion = None
+    if ingest:
+        with contextlib.redirect_stdout(io.StringIO()):
+            ingester = PineconeIngester(embeddings_manager=manager, namespace=namespace, backend=backend)
+            if work_dir:
+                # Checkpoint e ledger no diretório temporário, não em checkpoints/
+                ingester.checkpoint_dir = Path(work_dir) / "checkpoints"
+                ingester.checkpoint_dir.mkdir(exist_ok=True)
+            stats = ingester.ingest_chunks(chunks, show_progress=False, resume_from_checkpoint=False)
+        ingestion = {
+            "elapsed_seconds": stats["elapsed_seconds"],
+            "total_vectors": stats["total_vectors"],
+            "errors": len(stats["errors"]),
+        }
+        print(f"   ingestão: {ingestion}")
+    
+    counter = _CountingEmbeddings(manager)
+    settings = Settings()
+    runs = []
+    for cache_mode in cache_modes:
+        cache = None
+        if cache_mode != "none":
+            cache = QueryResultCache(
+                max_entries=max(settings.QUERY_CACHE_MAX_ENTRIES, len(questions)),
+                semantic_threshold=settings.QUERY_CACHE_SEMANTIC_THRESHOLD,
+                semantic_max_entries=max(settings.QUERY_CACHE_MAX_ENTRIES, len(questions))
+            )
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine = RAGQueryEngine(
+                embeddings_manager=counter, namespace=namespace, backend=backend,
+                mode=mode, cache=cache
+            )
+        
+        for top_k in top_ks:
+            for concurrency in concurrency_levels:
+                if cache is not None:
+                    cache.clear()
+                    if cache_mode == "warm":
+                        _run_pass(engine, questions, top_k, concurrency)
+                counter.reset()
+                cache_before = cache.stats() if cache is not None else {}
+                
+                rankings, latencies_ms, elapsed = _run_pass(engine, questions, top_k, concurrency)
+                
+                run = {"top_k": top_k, "cache": cache_mode, "concurrency": concurrency}
+                run.update(ranking_metrics(rankings, expected, ks=tuple(sorted({1, 5, top_k}))))
+                run.update({
+                    "latency_p50_ms": percentile(latencies_ms, 50),
+                    "latency_p95_ms": percentile(latencies_ms, 95),
+                    "latency_p99_ms": percentile(latencies_ms, 99),
+                    "queries_per_second": len(latencies_ms) / elapsed if elapsed > 0 else 0.0,
+                    "embedding_calls_per_query": counter.reset() / len(questions) if questions else 0.0,
+                })
+                if cache is not None:
+                    cache_after = cache.stats()
+                    run["cache_hits"] = {
+                        key: cache_after[key] - cache_before.get(key, 0)
+                        for key in cache_after
+                        if key.endswith("hits") and isinstance(cache_after[key], int)
+                    }
+                runs.append(run)
+                print(f"   top_k={top_k} cache={cache_mode} concurrency={concurrency}: "
+                      f"recall@{top_k}={run[f'recall@{top_k}']:.3f} p50={run['latency_p50_ms']:.1f}ms "
+                      f"qps={run['queries_per_second']:.1f}")
+    
+    for server in servers:
+        server.shutdown()
+    if work_dir:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    return {
+        "benchmark": "retrieval_harness",
+        "backend": backend,
+        "namespace": namespace or settings.PINECONE_NAMESPACE,
+        "retrieval_mode": mode or settings.RETRIEVAL_MODE,
+        "provider": manager.provider,
+        "model": manager.model_name,
+        "standin": standin,
+        "num_chunks": len(chunks),
+        "num_questions": len(questions),
+        "ingestion": ingestion,
+        "runs": runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall e latência do caminho de query (PubMedQA)")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[5, 10])
+    parser.add_argument("--cache", nargs="+", default=["none", "warm"], choices=CACHE_MODES)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--limit", type=int, default=None, help="Número máximo de artigos")
+    parser.add_argument("--backend", default=None, help="'pinecone', 'local' ou 'ivfpq'")
+    parser.add_argument("--namespace", default=None)
+    parser.add_argument("--provider", default=None, help="'gemini' ou 'ollama'")
+    parser.add_argument("--mode", default=None, help="'dense', 'lexical' ou 'hybrid'")
+    parser.add_argument("--ingest", action="store_true", help="Ingere o corpus antes das queries")
+    parser.add_argument("--standin", action="store_true", help="Usa stand-ins locais (sem credenciais)")
+    parser.add_argument("--dimension", type=int, default=256, help="Dimensão do stand-in de embeddings")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída")
+    args = parser.parse_args()
+    
+    report = run_retrieval_harness(
+        top_ks=args.top_k,
+        cache_modes=args.cache,
+        concurrency_levels=args.concurrency,
+        limit=args.limit,
+        backend=args.backend,
+        namespace=args.namespace,
+        provider=args.provider,
+        mode=args.mode,
+        ingest=args.ingest,
+        standin=args.standin,
+        dimension=args.dimension
+    )
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
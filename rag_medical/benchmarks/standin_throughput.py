@@ -0,0 +1,162 @@
+"""
+Benchmark de throughput de ingestão e query contra os stand-ins locais.
+
+Sobe o stand-in do Pinecone e o stub de embeddings (Ollama) em processo,
+com latência e erros configuráveis, ingere o corpus do PubMedQA nos modos
+sequencial e pipelined e mede a vazão de queries. Roda em qualquer máquina
+Linux, sem credenciais, e produz JSON comparável entre execuções.
+
+Uso (a partir de rag_medical/):
+    python -m benchmarks.standin_throughput --limit 200 --pinecone-latency-ms 30
+"""
+
+from typing import Any, Dict, Optional
+import argparse
+import contextlib
+import io
+import json
+import time
+import urllib.request
+
+from config.settings import Settings
+from scripts.embeddings_manager import EmbeddingsManager
+from scripts.pinecone_ingester import PineconeIngester
+from scripts.rag_query import query_medical_rag
+from scripts.standin_servers import FaultInjector, start_embedding_standin, start_pinecone_standin
+from .common import load_corpus, percentile, write_report
+
+
+def _server_stats(server) -> Dict[str, int]:
+    host, port = server.server_address[:2]
+    with urllib.request.urlopen(f"http://{host}:{port}/_standin/stats") as response:
+        return json.load(response)["requests"]
+
+
+def run_standin_benchmark(
+    limit: Optional[int] = 200,
+    dimension: int = 256,
+    pinecone_latency_ms: float = 20.0,
+    embedding_latency_ms: float = 20.0,
+    error_rate: float = 0.0,
+    rate_limit_rate: float = 0.0,
+    num_queries: int = 100,
+    max_workers: int = 4
+) -> Dict[str, Any]:
+    """
+    Executa ingestão (sequencial e pipelined) e queries contra os stand-ins.
+    
+    Returns:
+        Relatório com throughput e latências por modo.
+    """
+    chunks, questions = load_corpus(limit=limit)
+    report: Dict[str, Any] = {
+        "benchmark": "standin_throughput",
+        "num_chunks": len(chunks),
+        "dimension": dimension,
+        "pinecone_latency_ms": pinecone_latency_ms,
+        "embedding_latency_ms": embedding_latency_ms,
+        "error_rate": error_rate,
+        "rate_limit_rate": rate_limit_rate,
+        "ingestion": {},
+    }
+    
+    embedding_server = start_embedding_standin(
+        port=0, dimension=dimension,
+        faults=FaultInjector(latency_ms=embedding_latency_ms, seed=0)
+    )
+    Settings.GEMINI_API_KEY = ""
+    Settings.OLLAMA_BASE_URL = "http://%s:%d" % embedding_server.server_address[:2]
+    Settings.EMBEDDING_MODEL = "standin"
+    Settings.VECTOR_STORE_BACKEND = "pinecone"
+    Settings.PINECONE_API_KEY = Settings.PINECONE_API_KEY or "standin"
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        embeddings_manager = EmbeddingsManager(provider="ollama")
+    
+    for pipelined in (False, True):
+        pinecone_server = start_pinecone_standin(
+            port=0, dimension=dimension,
+            faults=FaultInjector(
+                latency_ms=pinecone_latency_ms, error_rate=error_rate,
+                rate_limit_rate=rate_limit_rate, seed=0
+            )
+        )
+        Settings.PINECONE_HOST = "http://%s:%d" % pinecone_server.server_address[:2]
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            ingester = PineconeIngester(
+                embeddings_manager=embeddings_manager,
+                namespace=f"standin_{'pipelined' if pipelined else 'sequential'}"
+            )
+            stats = ingester.ingest_chunks(
+                chunks, show_progress=False, resume_from_checkpoint=False,
+                pipelined=pipelined, max_workers=max_workers
+            )
+        
+        mode = "pipelined" if pipelined else "sequential"
+        report["ingestion"][mode] = {
+            "elapsed_seconds": stats["elapsed_seconds"],
+            "vectors_per_second": stats["vectors_per_second"],
+            "total_vectors": stats["total_vectors"],
+            "errors": len(stats["errors"]),
+            "upsert_requests": stats["upsert_requests"],
+            "bytes_sent": stats["bytes_sent"],
+            "server_requests": _server_stats(pinecone_server),
+        }
+        
+        if pipelined:
+            latencies_ms = []
+            start = time.perf_counter()
+            for question in questions[:num_queries]:
+                query_start = time.perf_counter()
+                query_medical_rag(
+                    question["question"],
+                    embeddings_manager=embeddings_manager,
+                    namespace=ingester.namespace,
+                    top_k=5,
+                )
+                latencies_ms.append((time.perf_counter() - query_start) * 1000)
+            elapsed = time.perf_counter() - start
+            report["query"] = {
+                "num_queries": len(latencies_ms),
+                "queries_per_second": len(latencies_ms) / elapsed if elapsed > 0 else 0.0,
+                "latency_p50_ms": percentile(latencies_ms, 50),
+                "latency_p95_ms": percentile(latencies_ms, 95),
+                "latency_p99_ms": percentile(latencies_ms, 99),
+            }
+        
+        pinecone_server.shutdown()
+    
+    report["embedding_server_requests"] = _server_stats(embedding_server)
+    embedding_server.shutdown()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput de ingestão/query contra stand-ins locais")
+    parser.add_argument("--limit", type=int, default=200, help="Número máximo de artigos")
+    parser.add_argument("--dimension", type=int, default=256)
+    parser.add_argument("--pinecone-latency-ms", type=float, default=20.0)
+    parser.add_argument("--embedding-latency-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--num-queries", type=int, default=100)
+    parser.add_argument("--max-workers", type=int, default=4)
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída")
+    args = parser.parse_args()
+    
+    report = run_standin_benchmark(
+        limit=args.limit,
+        dimension=args.dimension,
+        pinecone_latency_ms=args.pinecone_latency_ms,
+        embedding_latency_ms=args.embedding_latency_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        num_queries=args.num_queries,
+        max_workers=args.max_workers,
+    )
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -36,6 +36,25 @@ class Settings:
     PINECONE_API_KEY: str = os.getenv('PINECONE_API_KEY', '')
     PINECONE_INDEX_NAME: str = os.getenv('PINECONE_INDEX_NAME', 'biobyia')
     PINECONE_NAMESPACE: Optional[str] = os.getenv('PINECONE_NAMESPACE') or None
+    # Host do data plane (opcional). Ex: http://localhost:5080 para o stand-in local
+    PINECONE_HOST: Optional[str] = os.getenv('PINECONE_HOST') or None
+    
+    # Backend do vector store: 'pinecone' (padrão), 'local' (NumPy em processo, busca
+    # exata) ou 'ivfpq' (store local com índice aproximado IVF-PQ)
+    VECTOR_STORE_BACKEND: str = os.getenv('VECTOR_STORE_BACKEND', 'pinecone').lower()
+    LOCAL_VECTOR_STORE_PATH: str = os.getenv(
+        'LOCAL_VECTOR_STORE_PATH',
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vector_store')
+    )
+    # IVF-PQ: listas (0 = 4 * sqrt(n)), bytes por vetor (subquantizadores), listas
+    # visitadas por query, fator de re-ranking exato (0 = só PQ), tamanho mínimo do
+    # namespace para usar o índice e vetores amostrados no treino do k-means
+    IVFPQ_NLIST: int = int(os.getenv('IVFPQ_NLIST', '0'))
+    IVFPQ_M: int = int(os.getenv('IVFPQ_M', '16'))
+    IVFPQ_NPROBE: int = int(os.getenv('IVFPQ_NPROBE', '8'))
+    IVFPQ_RERANK: int = int(os.getenv('IVFPQ_RERANK', '4'))
+    IVFPQ_MIN_VECTORS: int = int(os.getenv('IVFPQ_MIN_VECTORS', '10000'))
+    IVFPQ_TRAIN_SAMPLE: int = int(os.getenv('IVFPQ_TRAIN_SAMPLE', '65536'))
     
     # ========================================================================
     # CONFIGURAÇÕES DE EMBEDDINGS
@@ -46,6 +65,17 @@ class Settings:
     # O código tentará ambos os formatos automaticamente se necessário
     EMBEDDING_MODEL: str = os.getenv('EMBEDDING_MODEL', 'text-embedding-004')
     
+    # Dimensão de saída dos embeddings (opcional)
+    # Se definida, usa a opção nativa do provider (Gemini: output_dimensionality)
+    # ou truncamento Matryoshka + renormalização L2 (Ollama).
+    # Vazio = dimensão nativa do modelo.
+    EMBEDDING_DIMENSION: Optional[int] = (
+        int(os.getenv('EMBEDDING_DIMENSION')) if os.getenv('EMBEDDING_DIMENSION') else None
+    )
+    
+    # Endpoint alternativo da API Gemini (opcional, ex: stand-in local)
+    GEMINI_API_ENDPOINT: Optional[str] = os.getenv('GEMINI_API_ENDPOINT') or None
+    
     # Configuração Ollama (opcional)
     OLLAMA_BASE_URL: str = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
     
@@ -94,6 +124,65 @@ class Settings:
     # ========================================================================
     BATCH_SIZE: int = int(os.getenv('BATCH_SIZE', '100'))
     TOP_K_RESULTS: int = int(os.getenv('TOP_K_RESULTS', '5'))
+    # Orçamento de tokens do contexto enviado ao LLM (0 = sem limite)
+    CONTEXT_MAX_TOKENS: int = int(os.getenv('CONTEXT_MAX_TOKENS', '3000'))
+    # Store externo de textos (SQLite). Se definido, o texto dos chunks sai
+    # dos metadados do Pinecone e é hidratado localmente nas queries.
+    CHUNK_TEXT_STORE_PATH: Optional[str] = os.getenv('CHUNK_TEXT_STORE_PATH') or None
+    # Limites por requisição de upsert (Pinecone: 2 MB e 1000 vetores)
+    UPSERT_MAX_BYTES: int = int(os.getenv('UPSERT_MAX_BYTES', str(2 * 1024 * 1024 - 64 * 1024)))
+    UPSERT_MAX_VECTORS: int = int(os.getenv('UPSERT_MAX_VECTORS', '1000'))
+    # Upserts simultâneos no modo pipelined de ingestão
+    UPSERT_WORKERS: int = int(os.getenv('UPSERT_WORKERS', '4'))
+    # Processos da ingestão multiprocesso (ingest_chunks_sharded)
+    INGEST_PROCESSES: int = int(os.getenv('INGEST_PROCESSES', '4'))
+    # Modo de busca padrão: dense, lexical (BM25 local) ou hybrid (RRF)
+    RETRIEVAL_MODE: str = os.getenv('RETRIEVAL_MODE', 'dense').lower()
+    LEXICAL_INDEX_PATH: str = os.getenv('LEXICAL_INDEX_PATH', os.path.join(_project_root, 'lexical_index'))
+    RRF_K: int = int(os.getenv('RRF_K', '60'))
+    # Conexões do pool do índice no RAGQueryEngine (queries concorrentes)
+    QUERY_POOL_THREADS: int = int(os.getenv('QUERY_POOL_THREADS', '8'))
+    # Queries por requisição de embedding em query_medical_rag_batch
+    QUERY_EMBED_BATCH_SIZE: int = int(os.getenv('QUERY_EMBED_BATCH_SIZE', '100'))
+    # Queries assíncronas: timeout por chamada (s) e conexões HTTP simultâneas
+    QUERY_TIMEOUT_SECONDS: float = float(os.getenv('QUERY_TIMEOUT_SECONDS', '30'))
+    ASYNC_MAX_CONNECTIONS: int = int(os.getenv('ASYNC_MAX_CONNECTIONS', '100'))
+    # Prazo total padrão de uma query em segundos (0 = sem prazo); ao estourar,
+    # a resposta é degradada (cache, busca lexical ou vazia)
+    QUERY_DEADLINE_SECONDS: float = float(os.getenv('QUERY_DEADLINE_SECONDS', '0'))
+    # Chamadas bloqueantes abandonadas no prazo (ainda em andamento) toleradas;
+    # acima disso, novas chamadas com prazo falham na hora
+    QUERY_MAX_ABANDONED_CALLS: int = int(os.getenv('QUERY_MAX_ABANDONED_CALLS', '32'))
+    # Cache de resultados (exato + semântico), invalidado pela época de ingestão
+    QUERY_CACHE_ENABLED: bool = os.getenv('QUERY_CACHE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    QUERY_CACHE_MAX_ENTRIES: int = int(os.getenv('QUERY_CACHE_MAX_ENTRIES', '1024'))
+    # Similaridade de cosseno mínima do nível semântico (0 = desligado)
+    QUERY_CACHE_SEMANTIC_THRESHOLD: float = float(os.getenv('QUERY_CACHE_SEMANTIC_THRESHOLD', '0.95'))
+    # Ingestão particionada: campo de metadados que define o namespace de cada
+    # vetor (vazio = sem partições) e largura das faixas numéricas (0 = valor exato)
+    PARTITION_FIELD: str = os.getenv('PARTITION_FIELD', '')
+    PARTITION_BUCKET_SIZE: int = int(os.getenv('PARTITION_BUCKET_SIZE', '0'))
+    # Busca em dois níveis: vetor por artigo gravado na ingestão (none, mean =
+    # média dos chunks, question = embedding da pergunta) e artigos selecionados
+    # antes da busca nos chunks (0 = busca direta em todos os chunks)
+    ARTICLE_VECTORS: str = os.getenv('ARTICLE_VECTORS', 'none').lower()
+    COARSE_TOP_ARTICLES: int = int(os.getenv('COARSE_TOP_ARTICLES', '0'))
+    # Épocas de ingestão por índice/namespace (compartilhado entre ingestão e queries)
+    INGESTION_EPOCH_PATH: str = os.getenv(
+        'INGESTION_EPOCH_PATH', os.path.join(_project_root, 'checkpoints', 'ingestion_epochs.json')
+    )
+    # Tracing das queries (spans por etapa): none, histogram (percentis em memória),
+    # jsonl (um span por linha em QUERY_TRACE_PATH) ou combinação ('histogram,jsonl')
+    QUERY_TRACE_SINK: str = os.getenv('QUERY_TRACE_SINK', 'none').lower()
+    QUERY_TRACE_PATH: str = os.getenv(
+        'QUERY_TRACE_PATH', os.path.join(_project_root, 'checkpoints', 'query_traces.jsonl')
+    )
+    # Telemetria da ingestão: arquivo de métricas (vazio = não exporta) e formato
+    INGEST_METRICS_PATH: Optional[str] = os.getenv('INGEST_METRICS_PATH') or None
+    INGEST_METRICS_FORMAT: str = os.getenv('INGEST_METRICS_FORMAT', 'jsonl').lower()
+    # Exportação Parquet para bulk import (export_for_bulk_import)
+    BULK_EXPORT_DIR: str = os.getenv('BULK_EXPORT_DIR', os.path.join(_project_root, 'bulk_export'))
+    BULK_EXPORT_SHARD_SIZE: int = int(os.getenv('BULK_EXPORT_SHARD_SIZE', '100000'))
     
     @classmethod
     def validate(cls, strict: bool = False) -> tuple[bool, list[str]]:
@@ -117,8 +206,8 @@ class Settings:
         
         # Validações adicionais apenas se strict=True
         if strict:
-            # Valida Pinecone
-            if not cls.PINECONE_API_KEY:
+            # Valida Pinecone (apenas se for o backend em uso)
+            if cls.VECTOR_STORE_BACKEND == 'pinecone' and not cls.PINECONE_API_KEY:
                 errors.append('PINECONE_API_KEY não configurada')
             
             # Valida Embeddings (pelo menos um provider deve estar configurado)
@@ -153,16 +242,41 @@ class Settings:
         print("=" * 80)
         print("⚙️  CONFIGURAÇÃO DO PIPELINE RAG")
         print("=" * 80)
+        print(f"Vector Store Backend: {cls.VECTOR_STORE_BACKEND}")
+        if cls.VECTOR_STORE_BACKEND in ('local', 'ivfpq'):
+            print(f"Local Vector Store: {cls.LOCAL_VECTOR_STORE_PATH}")
+        if cls.VECTOR_STORE_BACKEND == 'ivfpq':
+            print(f"IVF-PQ: nlist={cls.IVFPQ_NLIST or 'auto'} m={cls.IVFPQ_M} nprobe={cls.IVFPQ_NPROBE} rerank={cls.IVFPQ_RERANK}")
         print(f"Pinecone Index: {cls.PINECONE_INDEX_NAME}")
         print(f"Pinecone Namespace: {cls.PINECONE_NAMESPACE or '(padrão)'}")
         provider = cls.get_embedding_provider()
         print(f"Embedding Provider: {provider or '(não configurado)'}")
         print(f"Embedding Model: {cls.EMBEDDING_MODEL}")
+        print(f"Embedding Dimension: {cls.EMBEDDING_DIMENSION or '(nativa do modelo)'}")
         print(f"Data Path: {cls.MEDICAL_DATA_PATH}")
         print(f"Chunk Size: {cls.CHUNK_SIZE}")
         print(f"Chunk Overlap: {cls.CHUNK_OVERLAP}")
         print(f"Batch Size: {cls.BATCH_SIZE}")
+        print(f"Upsert Workers: {cls.UPSERT_WORKERS}")
+        print(f"Ingest Processes: {cls.INGEST_PROCESSES}")
+        print(f"Upsert Limits: {cls.UPSERT_MAX_BYTES} bytes / {cls.UPSERT_MAX_VECTORS} vetores")
+        print(f"Ingest Metrics: {cls.INGEST_METRICS_PATH or '(não exporta)'} ({cls.INGEST_METRICS_FORMAT})")
+        print(f"Bulk Export: {cls.BULK_EXPORT_DIR} ({cls.BULK_EXPORT_SHARD_SIZE} vetores/shard)")
+        print(f"Chunk Text Store: {cls.CHUNK_TEXT_STORE_PATH or '(texto nos metadados)'}")
         print(f"Top K Results: {cls.TOP_K_RESULTS}")
+        print(f"Context Max Tokens: {cls.CONTEXT_MAX_TOKENS or '(sem limite)'}")
+        print(f"Retrieval Mode: {cls.RETRIEVAL_MODE}")
+        print(f"Query Deadline: {f'{cls.QUERY_DEADLINE_SECONDS}s' if cls.QUERY_DEADLINE_SECONDS else '(sem prazo)'}")
+        if cls.QUERY_CACHE_ENABLED:
+            print(f"Query Cache: {cls.QUERY_CACHE_MAX_ENTRIES} entradas (semântico >= {cls.QUERY_CACHE_SEMANTIC_THRESHOLD})")
+        if cls.QUERY_TRACE_SINK != 'none':
+            print(f"Query Tracing: {cls.QUERY_TRACE_SINK} ({cls.QUERY_TRACE_PATH})")
+        if cls.PARTITION_FIELD:
+            print(f"Partitions: {cls.PARTITION_FIELD} (faixa: {cls.PARTITION_BUCKET_SIZE or 'valor exato'})")
+        if cls.ARTICLE_VECTORS != 'none' or cls.COARSE_TOP_ARTICLES:
+            print(f"Article Vectors: {cls.ARTICLE_VECTORS} (coarse top-M: {cls.COARSE_TOP_ARTICLES or 'desligado'})")
+        if cls.RETRIEVAL_MODE != 'dense':
+            print(f"Lexical Index: {cls.LEXICAL_INDEX_PATH} (RRF k={cls.RRF_K})")
         print("=" * 80)
 
 
@@ -6,7 +6,7 @@ Este pacote contém módulos reutilizáveis para:
 - Processamento e limpeza de texto
 - Divisão de textos em chunks
 - Gerenciamento de embeddings
-- Ingestão no Pinecone
+- Ingestão no Pinecone (ou vector store local)
 - Queries RAG
 """
 
@@ -31,9 +31,40 @@ except ImportError:
     PineconeIngester = None
 
 try:
-    from .rag_query import query_medical_rag
+    from .sharded_ingestion import ingest_chunks_sharded
+except ImportError:
+    ingest_chunks_sharded = None
+
+try:
+    from .rag_query import query_medical_rag, query_medical_rag_batch, aquery_medical_rag, RAGQueryEngine
 except ImportError:
     query_medical_rag = None
+    query_medical_rag_batch = None
+    aquery_medical_rag = None
+    RAGQueryEngine = None
+
+try:
+    from .vector_store import VectorStore, LocalVectorStore, create_vector_store
+except ImportError:
+    VectorStore = None
+    LocalVectorStore = None
+    create_vector_store = None
+
+try:
+    from .query_cache import QueryResultCache
+except ImportError:
+    QueryResultCache = None
+
+try:
+    from .partitioning import PartitionScheme
+except ImportError:
+    PartitionScheme = None
+
+try:
+    from .lexical_index import BM25Index, build_lexical_index
+except ImportError:
+    BM25Index = None
+    build_lexical_index = None
 
 __all__ = [
     'load_medical_dataset',
@@ -41,6 +72,17 @@ __all__ = [
     'MedicalTextSplitter',
     'EmbeddingsManager',
     'PineconeIngester',
+    'ingest_chunks_sharded',
     'query_medical_rag',
+    'query_medical_rag_batch',
+    'aquery_medical_rag',
+    'QueryResultCache',
+    'PartitionScheme',
+    'RAGQueryEngine',
+    'VectorStore',
+    'LocalVectorStore',
+    'create_vector_store',
+    'BM25Index',
+    'build_lexical_index',
 ]
 
@@ -0,0 +1,201 @@
+"""
+Módulo de vetores por artigo (busca em dois níveis, coarse-to-fine).
+
+Além dos vetores de chunk, a ingestão pode gravar um vetor por article_id em
+um namespace próprio (<namespace>__articles):
+
+- mean: média normalizada dos vetores dos chunks do artigo (lidos do índice,
+  sem novas chamadas de embedding)
+- question: embedding da pergunta (QUESTION) do artigo
+
+Na query, a busca nos vetores de artigo (poucos, um por artigo) seleciona os
+top-M artigos, e a busca nos chunks é restrita a eles com article_id $in.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import time
+
+import numpy as np
+
+from .chunk_store import EXTERNAL_FIELDS
+from .vector_store import VectorStore, vector_id_for
+
+
+ARTICLE_NAMESPACE_SUFFIX = "__articles"
+ARTICLE_VECTOR_MODES = ("mean", "question")
+
+# IDs por requisição de fetch (o fetch do Pinecone vai na URL)
+_FETCH_BATCH_SIZE = 200
+
+
+def article_namespace_for(namespace: Optional[str]) -> str:
+    """Namespace dos vetores de artigo de um namespace de chunks."""
+    return f"{namespace or 'default'}{ARTICLE_NAMESPACE_SUFFIX}"
+
+
+def article_vector_id(article_id: Any) -> str:
+    """ID do vetor de um artigo: article_{article_id}."""
+    return f"article_{article_id}"
+
+
+def mean_pool(vectors: Sequence[Sequence[float]]) -> List[float]:
+    """
+    Média dos vetores, normalizada (norma L2 = 1).
+    
+    Args:
+        vectors: Vetores dos chunks de um artigo.
+    
+    Returns:
+        Vetor do artigo.
+    """
+    mean = np.asarray(vectors, dtype=np.float32).mean(axis=0)
+    norm = np.linalg.norm(mean)
+    if norm > 0:
+        mean = mean / norm
+    return mean.tolist()
+
+
+def article_metadata(chunk_metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Metadados de um vetor de artigo: os campos filtráveis do artigo.
+    
+    Texto, pergunta e MeSH ficam de fora (o vetor de artigo só seleciona
+    artigos; o conteúdo vem dos chunks), assim como chunk_index.
+    """
+    return {
+        key: value for key, value in chunk_metadata.items()
+        if key not in EXTERNAL_FIELDS and key != "chunk_index"
+    }
+
+
+def build_article_vectors(
+    vector_store: VectorStore,
+    chunks: List[Dict[str, Any]],
+    namespace: Optional[str],
+    mode: str = "mean",
+    prepare_metadata: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    embed_documents: Optional[Callable[[List[str]], List[List[float]]]] = None,
+    chunk_namespace_for: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None,
+    batch_size: int = 1000
+) -> Dict[str, Any]:
+    """
+    Grava um vetor por artigo no namespace de artigos.
+    
+    Args:
+        vector_store: Vector store com os chunks já ingeridos.
+        chunks: Chunks ingeridos (definem os artigos e seus chunk_index).
+        namespace: Namespace dos chunks (o de artigos é derivado dele).
+        mode: 'mean' (média dos vetores dos chunks) ou 'question'
+            (embedding da pergunta do artigo).
+        prepare_metadata: Converte os metadados do chunk para o formato do
+            índice. Se None, usa os metadados como estão.
+        embed_documents: Função de embedding em lote (obrigatória em 'question').
+        chunk_namespace_for: Namespace onde está o vetor de um chunk (ingestão
+            particionada). Se None, todos estão em `namespace`.
+        batch_size: Vetores de artigo por upsert.
+    
+    Returns:
+        Dicionário com articles, vectors_upserted, missing_chunks, namespace
+        e elapsed_seconds.
+    """
+    if mode not in ARTICLE_VECTOR_MODES:
+        raise ValueError(f"mode inválido: {mode}. Use 'mean' ou 'question'.")
+    if mode == "question" and embed_documents is None:
+        raise ValueError("embed_documents é obrigatório no modo 'question'")
+    
+    start = time.perf_counter()
+    prepare_metadata = prepare_metadata or dict
+    
+    # Agrupa chunks por artigo (ordem de primeira aparição)
+    articles: Dict[str, List[Dict[str, Any]]] = {}
+    for chunk in chunks:
+        articles.setdefault(str(chunk["article_id"]), []).append(chunk)
+    
+    article_ids = list(articles)
+    values: Dict[str, List[float]] = {}
+    missing_chunks = 0
+    
+    if mode == "mean":
+        # Vetores dos chunks lidos do índice, em lotes, por namespace de origem
+        by_namespace: Dict[Optional[str], List[str]] = {}
+        owner: Dict[str, str] = {}
+        for article_id, article_chunks in articles.items():
+            for chunk in article_chunks:
+                vector_id = vector_id_for(article_id, chunk["chunk_index"])
+                source = chunk_namespace_for(chunk) if chunk_namespace_for else namespace
+                by_namespace.setdefault(source, []).append(vector_id)
+                owner[vector_id] = article_id
+        
+        pooled: Dict[str, List[List[float]]] = {}
+        for source, vector_ids in by_namespace.items():
+            for i in range(0, len(vector_ids), _FETCH_BATCH_SIZE):
+                batch = vector_ids[i:i + _FETCH_BATCH_SIZE]
+                fetched = vector_store.fetch(batch, namespace=source)["vectors"]
+                missing_chunks += len(batch) - len(fetched)
+                for vector_id, vector in fetched.items():
+                    pooled.setdefault(owner[vector_id], []).append(vector["values"])
+        
+        values = {article_id: mean_pool(vectors) for article_id, vectors in pooled.items()}
+    else:
+        questions = {
+            article_id: str((article_chunks[0].get("metadata") or {}).get("question", "")).strip()
+            for article_id, article_chunks in articles.items()
+        }
+        with_question = [article_id for article_id in article_ids if questions[article_id]]
+        for i in range(0, len(with_question), batch_size):
+            batch = with_question[i:i + batch_size]
+            embeddings = embed_documents([questions[article_id] for article_id in batch])
+            values.update(zip(batch, embeddings))
+    
+    # Upsert dos vetores de artigo
+    target_namespace = article_namespace_for(namespace)
+    vectors = [
+        {
+            "id": article_vector_id(article_id),
+            "values": values[article_id],
+            "metadata": article_metadata(prepare_metadata(articles[article_id][0].get("metadata", {}))),
+        }
+        for article_id in article_ids if article_id in values
+    ]
+    for i in range(0, len(vectors), batch_size):
+        vector_store.upsert(vectors[i:i + batch_size], namespace=target_namespace)
+    vector_store.flush()
+    
+    return {
+        "articles": len(article_ids),
+        "vectors_upserted": len(vectors),
+        "missing_chunks": missing_chunks,
+        "namespace": target_namespace,
+        "mode": mode,
+        "elapsed_seconds": time.perf_counter() - start,
+    }
+
+
+def narrow_filter(
+    pinecone_filter: Optional[Dict[str, Any]],
+    article_ids: List[str]
+) -> Dict[str, Any]:
+    """
+    Restringe um filtro aos artigos selecionados na busca de artigos.
+    
+    Os artigos já satisfazem o filtro original (a busca de artigos usa os
+    mesmos campos), então uma condição anterior em article_id é substituída.
+    
+    Args:
+        pinecone_filter: Filtro da query (None = sem filtro).
+        article_ids: Artigos selecionados.
+    
+    Returns:
+        Filtro com article_id $in article_ids.
+    """
+    narrowed = dict(pinecone_filter or {})
+    narrowed["article_id"] = {"$in": list(article_ids)}
+    return narrowed
+
+
+def article_ids_from_matches(matches: List[Dict[str, Any]]) -> List[str]:
+    """article_id dos matches da busca de artigos, na ordem do ranking."""
+    return [
+        str((match.get("metadata") or {}).get("article_id") or match["id"][len("article_"):])
+        for match in matches
+    ]
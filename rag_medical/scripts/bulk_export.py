@@ -0,0 +1,208 @@
+"""
+Módulo de exportação de vetores para bulk import do Pinecone.
+
+Grava {id, values, metadata} em shards Parquet no layout esperado pelo
+bulk import do Pinecone (um diretório por namespace, arquivos .parquet com
+colunas id/values/metadata, metadados como JSON) e um manifest.json com a
+lista de shards. Os shards são enviados a um bucket (S3/GCS/Azure) e
+carregados em uma única operação de import, em vez de milhares de upserts.
+"""
+
+from typing import Any, Dict, List, Optional
+import json
+import os
+import time
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+# Nome do diretório do namespace padrão no layout do bulk import
+DEFAULT_NAMESPACE_DIR = "__default__"
+
+MANIFEST_NAME = "manifest.json"
+
+
+class ParquetShardWriter:
+    """
+    Escreve vetores em shards Parquet de tamanho limitado.
+    
+    Cada chamada a write() vira um row group do shard atual; ao atingir
+    shard_size vetores o shard é fechado e o próximo é aberto, então a
+    memória usada é limitada ao lote corrente.
+    """
+    
+    def __init__(
+        self,
+        output_dir: str,
+        namespace: Optional[str] = None,
+        shard_size: int = 100000,
+        dimension: Optional[int] = None,
+        compression: str = "zstd"
+    ):
+        """
+        Args:
+            output_dir: Diretório raiz da exportação (prefixo do bucket).
+            namespace: Namespace de destino. Se None/vazio, usa __default__.
+            shard_size: Número máximo de vetores por arquivo Parquet.
+            dimension: Dimensão esperada dos vetores (validada em write()).
+            compression: Codec de compressão do Parquet.
+        """
+        if pa is None:
+            raise ImportError(
+                "pyarrow não está instalado. "
+                "Instale com: pip install pyarrow"
+            )
+        if shard_size <= 0:
+            raise ValueError(f"shard_size deve ser positivo: {shard_size}")
+        
+        self.output_dir = Path(output_dir)
+        self.namespace = namespace or ""
+        self.namespace_dir = self.output_dir / (namespace or DEFAULT_NAMESPACE_DIR)
+        self.shard_size = shard_size
+        self.dimension = dimension
+        self.compression = compression
+        
+        self.schema = pa.schema([
+            ("id", pa.string()),
+            ("values", pa.list_(pa.float32())),
+            ("metadata", pa.string()),
+        ])
+        
+        self.shards: List[Dict[str, Any]] = []
+        self._writer = None
+        self._shard_rows = 0
+        self._shard_path: Optional[Path] = None
+        
+        self.namespace_dir.mkdir(parents=True, exist_ok=True)
+    
+    def _open_shard(self):
+        """Abre o próximo arquivo de shard (gravado como .tmp até fechar)."""
+        self._shard_path = self.namespace_dir / f"part-{len(self.shards):05d}.parquet"
+        self._writer = pq.ParquetWriter(
+            str(self._shard_path) + ".tmp",
+            self.schema,
+            compression=self.compression
+        )
+        self._shard_rows = 0
+    
+    def _close_shard(self):
+        """Fecha o shard atual e o registra no manifest."""
+        if self._writer is None:
+            return
+        
+        self._writer.close()
+        os.replace(str(self._shard_path) + ".tmp", self._shard_path)
+        
+        self.shards.append({
+            "path": str(self._shard_path.relative_to(self.output_dir)),
+            "num_vectors": self._shard_rows,
+            "bytes": self._shard_path.stat().st_size,
+        })
+        self._writer = None
+        self._shard_path = None
+        self._shard_rows = 0
+    
+    def write(self, vectors: List[Dict[str, Any]]):
+        """
+        Adiciona vetores no formato Pinecone ({id, values, metadata}).
+        
+        Args:
+            vectors: Lista de vetores a exportar.
+        """
+        offset = 0
+        while offset < len(vectors):
+            if self._writer is None:
+                self._open_shard()
+            
+            take = min(self.shard_size - self._shard_rows, len(vectors) - offset)
+            part = vectors[offset:offset + take]
+            
+            ids = [vector["id"] for vector in part]
+            values = [list(map(float, vector["values"])) for vector in part]
+            if self.dimension is not None:
+                for vector_id, vector_values in zip(ids, values):
+                    if len(vector_values) != self.dimension:
+                        raise ValueError(
+                            f"Vetor {vector_id} tem dimensão {len(vector_values)}, "
+                            f"esperado {self.dimension}"
+                        )
+            metadata = [
+                json.dumps(vector.get("metadata") or {}, ensure_ascii=False)
+                for vector in part
+            ]
+            
+            self._writer.write_table(
+                pa.table({"id": ids, "values": values, "metadata": metadata}, schema=self.schema)
+            )
+            self._shard_rows += take
+            offset += take
+            
+            if self._shard_rows >= self.shard_size:
+                self._close_shard()
+    
+    def close(self, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Fecha o último shard e grava o manifest.json (atomicamente).
+        
+        Args:
+            extra: Campos adicionais para o manifest (ex: índice, modelo).
+        
+        Returns:
+            Entrada do namespace no manifest.
+        """
+        self._close_shard()
+        
+        entry = {
+            "namespace": self.namespace,
+            "dimension": self.dimension,
+            "shard_size": self.shard_size,
+            "total_vectors": sum(shard["num_vectors"] for shard in self.shards),
+            "total_bytes": sum(shard["bytes"] for shard in self.shards),
+            "shards": self.shards,
+        }
+        if extra:
+            entry.update(extra)
+        
+        # Um manifest por exportação; cada namespace exportado é uma entrada
+        manifest_path = self.output_dir / MANIFEST_NAME
+        manifest = {"format": "pinecone-bulk-import-parquet", "namespaces": {}}
+        if manifest_path.exists():
+            manifest = load_manifest(str(self.output_dir))
+        manifest["created_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        manifest["namespaces"][self.namespace_dir.name] = entry
+        
+        tmp_path = manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, manifest_path)
+        
+        return entry
+    
+    def abort(self):
+        """Descarta o shard em andamento (shards já fechados são mantidos)."""
+        if self._writer is not None:
+            self._writer.close()
+            Path(str(self._shard_path) + ".tmp").unlink(missing_ok=True)
+            self._writer = None
+            self._shard_path = None
+            self._shard_rows = 0
+
+
+def load_manifest(output_dir: str) -> Dict[str, Any]:
+    """
+    Lê o manifest de uma exportação.
+    
+    Args:
+        output_dir: Diretório raiz da exportação.
+    
+    Returns:
+        Conteúdo do manifest.json.
+    """
+    with open(Path(output_dir) / MANIFEST_NAME, "r", encoding="utf-8") as f:
+        return json.load(f)
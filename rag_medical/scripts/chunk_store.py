@@ -0,0 +1,162 @@
+"""
+Módulo de armazenamento externo do texto dos chunks.
+
+Por padrão o texto completo de cada chunk (e campos repetidos como a
+pergunta e os termos MeSH) vai em metadata["text"] no Pinecone, o que
+aumenta payloads de upsert, armazenamento do índice e respostas de query.
+
+Com o ChunkTextStore esses campos ficam em um SQLite local chaveado pelo
+ID do vetor; o índice guarda só campos filtráveis e a query hidrata os
+textos em uma única consulta local em lote.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+
+# Campos movidos para o store externo (não usados em filtros)
+EXTERNAL_FIELDS = ("text", "question", "meshes")
+
+# Limite seguro de parâmetros por query no SQLite
+_SQLITE_BATCH = 500
+
+# Espera por locks de escrita (workers da ingestão multiprocesso compartilham o arquivo)
+_SQLITE_BUSY_TIMEOUT = 60.0
+
+
+def split_metadata(metadata: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Separa metadados em (campos filtráveis, campos externos).
+    
+    Args:
+        metadata: Metadados completos do chunk.
+        
+    Returns:
+        Tuple (slim_metadata, external_fields).
+    """
+    slim = {k: v for k, v in metadata.items() if k not in EXTERNAL_FIELDS}
+    external = {k: v for k, v in metadata.items() if k in EXTERNAL_FIELDS}
+    return slim, external
+
+
+class ChunkTextStore:
+    """
+    Store chave-valor (SQLite) de textos de chunks, chaveado por vector_id.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Abre (ou cria) o store.
+        
+        Args:
+            path: Caminho do arquivo SQLite.
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=_SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "vector_id TEXT PRIMARY KEY, payload TEXT NOT NULL)"
+        )
+        self._conn.commit()
+    
+    def put_many(self, items: Iterable[Tuple[str, Dict[str, Any]]]):
+        """
+        Grava (ou substitui) os campos externos de vários vetores.
+        
+        Args:
+            items: Tuplas (vector_id, campos_externos).
+        """
+        rows = [
+            (vector_id, json.dumps(fields, ensure_ascii=False, separators=(",", ":")))
+            for vector_id, fields in items
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (vector_id, payload) VALUES (?, ?)",
+                rows,
+            )
+            self._conn.commit()
+    
+    def get_many(self, vector_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Busca os campos externos de vários vetores em lote.
+        
+        Args:
+            vector_ids: IDs dos vetores.
+            
+        Returns:
+            Dicionário {vector_id: campos_externos} (IDs ausentes são omitidos).
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        vector_ids = list(vector_ids)
+        with self._lock:
+            for start in range(0, len(vector_ids), _SQLITE_BATCH):
+                batch = vector_ids[start:start + _SQLITE_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT vector_id, payload FROM chunks WHERE vector_id IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for vector_id, payload in rows:
+                    found[vector_id] = json.loads(payload)
+        return found
+    
+    def delete(self, vector_ids: Sequence[str]):
+        """Remove vetores do store."""
+        vector_ids = list(vector_ids)
+        with self._lock:
+            for start in range(0, len(vector_ids), _SQLITE_BATCH):
+                batch = vector_ids[start:start + _SQLITE_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                self._conn.execute(
+                    f"DELETE FROM chunks WHERE vector_id IN ({placeholders})", batch
+                )
+            self._conn.commit()
+    
+    def close(self):
+        """Fecha a conexão com o banco."""
+        with self._lock:
+            self._conn.close()
+
+
+def hydrate_matches(
+    matches: List[Dict[str, Any]],
+    store: Optional[ChunkTextStore]
+) -> List[Dict[str, Any]]:
+    """
+    Completa os metadados de matches sem texto usando o store externo.
+    
+    Faz uma única consulta em lote para todos os matches sem metadata["text"].
+    
+    Args:
+        matches: Matches retornados pelo índice ({"id", "score", "metadata"}).
+        store: Store externo (None = nada a hidratar).
+        
+    Returns:
+        A mesma lista, com metadados completados in-place.
+    """
+    if store is None:
+        return matches
+    
+    missing = [
+        match.get("id") for match in matches
+        if match.get("id") and "text" not in (match.get("metadata") or {})
+    ]
+    if not missing:
+        return matches
+    
+    external = store.get_many(missing)
+    for match in matches:
+        fields = external.get(match.get("id"))
+        if fields:
+            metadata = dict(match.get("metadata") or {})
+            metadata.update(fields)
+            match["metadata"] = metadata
+    
+    return matches
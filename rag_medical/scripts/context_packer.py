@@ -0,0 +1,213 @@
+"""
+Módulo de empacotamento de contexto para o LLM.
+
+Os resultados de uma query costumam trazer chunks vizinhos do mesmo artigo
+(que repetem o overlap do MedicalTextSplitter) e chunks duplicados. O
+empacotador:
+
+1. Deduplica chunks (mesmo artigo/chunk_index ou mesmo texto)
+2. Junta chunks adjacentes do mesmo artigo (chunk_index consecutivos) em um
+   único trecho, removendo o texto sobreposto
+3. Preenche um orçamento de tokens com os trechos de maior score
+
+e devolve o contexto pronto para o prompt junto com as referências das fontes.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import Settings
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+# Tamanho mínimo de sobreposição considerada (evita cortes por coincidência)
+_MIN_OVERLAP_CHARS = 8
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Conta tokens de um texto (tiktoken cl100k_base; sem tiktoken, ~4 caracteres/token).
+    
+    Args:
+        text: Texto a contar.
+    
+    Returns:
+        Número de tokens.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # tiktoken ausente ou sem o arquivo do encoding (offline)
+            _encoding = False
+    if not _encoding:
+        return (len(text) + 3) // 4
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def strip_overlap(previous: str, current: str, max_overlap: int) -> str:
+    """
+    Remove do início de `current` o texto que repete o final de `previous`.
+    
+    Args:
+        previous: Texto do chunk anterior.
+        current: Texto do chunk seguinte.
+        max_overlap: Tamanho máximo da sobreposição, em caracteres.
+    
+    Returns:
+        `current` sem o prefixo sobreposto.
+    """
+    longest = min(len(previous), len(current), max_overlap)
+    for size in range(longest, _MIN_OVERLAP_CHARS - 1, -1):
+        if current.startswith(previous[-size:]):
+            return current[size:].lstrip()
+    return current
+
+
+def _new_segment(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Cria um trecho a partir de um resultado."""
+    return {
+        "article_id": result.get("article_id", ""),
+        "source": result.get("metadata", {}).get("source", "N/A"),
+        "chunk_indexes": [result["_chunk_index"]],
+        "score": result.get("score", 0.0),
+        "text": result["text"],
+        "_last_text": result["text"],
+    }
+
+
+def _merge_article_chunks(
+    chunks: List[Dict[str, Any]],
+    max_overlap: int
+) -> List[Dict[str, Any]]:
+    """Junta chunks de um artigo com chunk_index consecutivos em trechos."""
+    chunks = sorted(chunks, key=lambda result: result["_chunk_index"])
+    segments: List[Dict[str, Any]] = []
+    
+    for result in chunks:
+        segment = segments[-1] if segments else None
+        if segment is not None and result["_chunk_index"] == segment["chunk_indexes"][-1] + 1:
+            segment["text"] += " " + strip_overlap(segment["_last_text"], result["text"], max_overlap)
+            segment["_last_text"] = result["text"]
+            segment["chunk_indexes"].append(result["_chunk_index"])
+            segment["score"] = max(segment["score"], result.get("score", 0.0))
+        else:
+            segments.append(_new_segment(result))
+    return segments
+
+
+def _header(position: int, segment: Dict[str, Any]) -> str:
+    chunk_indexes = segment["chunk_indexes"]
+    chunks = (
+        str(chunk_indexes[0]) if len(chunk_indexes) == 1
+        else f"{chunk_indexes[0]}-{chunk_indexes[-1]}"
+    )
+    return (
+        f"[Contexto {position}] (Fonte: {segment['source']}, Artigo: {segment['article_id']}, "
+        f"Chunks: {chunks}, Score: {segment['score']:.3f})\n"
+    )
+
+
+def pack_context(
+    results: List[Dict[str, Any]],
+    max_tokens: Optional[int] = None,
+    merge_adjacent: bool = True,
+    max_overlap: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Empacota resultados de busca em um contexto dentro do orçamento de tokens.
+    
+    Args:
+        results: Lista de resultados de query_medical_rag.
+        max_tokens: Orçamento de tokens do contexto. Se None, usa
+            CONTEXT_MAX_TOKENS (0 = sem limite).
+        merge_adjacent: Se True, junta chunks consecutivos do mesmo artigo.
+        max_overlap: Sobreposição máxima entre chunks vizinhos, em
+            caracteres. Se None, usa 2 * CHUNK_OVERLAP.
+    
+    Returns:
+        Dicionário com:
+            - context: Texto formatado para o prompt
+            - sources: Referências na ordem do contexto
+              ({"ref", "article_id", "source", "chunk_indexes", "score", "tokens"})
+            - tokens: Tokens do contexto
+            - input_chunks: Resultados recebidos
+            - duplicates_removed: Chunks descartados por duplicidade
+            - dropped: Trechos que não couberam no orçamento
+    """
+    settings = Settings()
+    if max_tokens is None:
+        max_tokens = settings.CONTEXT_MAX_TOKENS
+    if max_overlap is None:
+        max_overlap = 2 * settings.CHUNK_OVERLAP
+    
+    # Deduplicação: mesmo (artigo, chunk) ou mesmo texto; mantém o maior score
+    unique: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+    seen_texts: Dict[str, Tuple[str, Any]] = {}
+    duplicates = 0
+    for result in sorted(results, key=lambda r: r.get("score", 0.0), reverse=True):
+        text = (result.get("text") or "").strip()
+        if not text:
+            continue
+        chunk_index = result.get("chunk_index", 0)
+        try:
+            chunk_index = int(chunk_index)
+        except (TypeError, ValueError):
+            pass
+        key = (str(result.get("article_id", "")), chunk_index)
+        normalized = " ".join(text.split()).lower()
+        if key in unique or normalized in seen_texts:
+            duplicates += 1
+            continue
+        unique[key] = dict(result, text=text, _chunk_index=chunk_index)
+        seen_texts[normalized] = key
+    
+    # Trechos: chunks consecutivos do mesmo artigo viram um só
+    by_article: Dict[str, List[Dict[str, Any]]] = {}
+    for (article_id, _), result in unique.items():
+        by_article.setdefault(article_id, []).append(result)
+    
+    segments: List[Dict[str, Any]] = []
+    for article_chunks in by_article.values():
+        if merge_adjacent and all(isinstance(r["_chunk_index"], int) for r in article_chunks):
+            segments.extend(_merge_article_chunks(article_chunks, max_overlap))
+        else:
+            segments.extend(_new_segment(result) for result in article_chunks)
+    segments.sort(key=lambda segment: segment["score"], reverse=True)
+    
+    # Preenche o orçamento por score (trechos que não cabem são pulados)
+    parts: List[str] = []
+    sources: List[Dict[str, Any]] = []
+    used_tokens = 0
+    dropped = 0
+    for segment in segments:
+        part = _header(len(parts) + 1, segment) + segment["text"] + "\n"
+        part_tokens = count_tokens(part)
+        if max_tokens and used_tokens + part_tokens > max_tokens:
+            dropped += 1
+            continue
+        parts.append(part)
+        used_tokens += part_tokens
+        sources.append({
+            "ref": len(parts),
+            "article_id": segment["article_id"],
+            "source": segment["source"],
+            "chunk_indexes": segment["chunk_indexes"],
+            "score": segment["score"],
+            "tokens": part_tokens,
+        })
+    
+    return {
+        "context": "\n".join(parts),
+        "sources": sources,
+        "tokens": used_tokens,
+        "input_chunks": len(results),
+        "duplicates_removed": duplicates,
+        "dropped": dropped,
+    }
@@ -0,0 +1,146 @@
+"""
+Módulo de prazos (deadlines) das queries.
+
+Um prazo é um instante absoluto de time.monotonic(). As camadas de embedding
+e busca recebem o mesmo prazo, então retries e esperas de backoff consomem o
+orçamento restante da query em vez de reiniciá-lo a cada chamada. Chamadas
+bloqueantes (SDKs síncronos) rodam cada uma em sua thread e são abandonadas
+quando o prazo vence: a thread termina a requisição em segundo plano, mas a
+query retorna a tempo. Threads abandonadas não ocupam capacidade das queries
+seguintes; com QUERY_MAX_ABANDONED_CALLS delas ainda em andamento (backend
+travado), novas chamadas falham na hora com DeadlineExceeded em vez de
+acumular threads.
+"""
+
+from typing import Any, Callable, Optional, Tuple
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import threading
+import time
+
+from config.settings import Settings
+
+
+class DeadlineExceeded(TimeoutError):
+    """O prazo da query venceu antes de a etapa terminar."""
+
+
+# Chamadas abandonadas no prazo que ainda não terminaram
+_abandoned = 0
+_abandoned_lock = threading.Lock()
+
+
+def deadline_after(seconds: Optional[float]) -> Optional[float]:
+    """
+    Converte um orçamento em segundos no prazo absoluto.
+    
+    Args:
+        seconds: Orçamento (None ou 0 = sem prazo).
+    
+    Returns:
+        Instante de time.monotonic() do prazo, ou None.
+    """
+    if not seconds:
+        return None
+    return time.monotonic() + seconds
+
+
+def remaining(deadline_at: float, stage: str) -> float:
+    """
+    Tempo restante até o prazo.
+    
+    Args:
+        deadline_at: Prazo (time.monotonic()).
+        stage: Etapa, para a mensagem de erro.
+    
+    Returns:
+        Segundos restantes (> 0).
+    
+    Raises:
+        DeadlineExceeded: Se o prazo já venceu.
+    """
+    left = deadline_at - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded(f"prazo esgotado antes de {stage}")
+    return left
+
+
+def bounded_timeout(timeout: float, deadline_at: Optional[float], stage: str) -> Tuple[float, bool]:
+    """
+    Timeout de uma chamada limitado pelo prazo.
+    
+    Args:
+        timeout: Timeout próprio da chamada, em segundos.
+        deadline_at: Prazo (None = sem prazo).
+        stage: Etapa, para a mensagem de erro.
+    
+    Returns:
+        (timeout efetivo, True se o limite é o prazo da query).
+    """
+    if deadline_at is None:
+        return timeout, False
+    left = remaining(deadline_at, stage)
+    return (left, True) if left < timeout else (timeout, False)
+
+
+def abandoned_calls() -> int:
+    """Número de chamadas abandonadas no prazo que ainda estão em andamento."""
+    with _abandoned_lock:
+        return _abandoned
+
+
+def _release_abandoned(_future: Future):
+    global _abandoned
+    with _abandoned_lock:
+        _abandoned -= 1
+
+
+def call_with_deadline(fn: Callable[..., Any], *args, deadline_at: float, stage: str, **kwargs) -> Any:
+    """
+    Executa uma chamada bloqueante, desistindo dela quando o prazo vence.
+    
+    Args:
+        fn: Função a chamar.
+        *args: Argumentos posicionais de fn.
+        deadline_at: Prazo (time.monotonic()).
+        stage: Etapa, para a mensagem de erro.
+        **kwargs: Argumentos nomeados de fn.
+    
+    Returns:
+        Retorno de fn.
+    
+    Raises:
+        DeadlineExceeded: Se fn não terminou até o prazo, ou se já há
+            QUERY_MAX_ABANDONED_CALLS chamadas abandonadas em andamento.
+    """
+    global _abandoned
+    left = remaining(deadline_at, stage)
+    limit = Settings().QUERY_MAX_ABANDONED_CALLS
+    with _abandoned_lock:
+        abandoned = _abandoned
+    if abandoned >= limit:
+        raise DeadlineExceeded(f"{stage} não iniciada: {abandoned} chamadas abandonadas ainda em andamento")
+    
+    future: Future = Future()
+    
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+    
+    threading.Thread(target=run, name="rag-deadline", daemon=True).start()
+    try:
+        return future.result(timeout=left)
+    except FutureTimeoutError:
+        if future.done():
+            # Timeout levantado pela própria fn
+            raise
+        with _abandoned_lock:
+            _abandoned += 1
+        # Chamado na hora se fn terminou nesse meio-tempo
+        future.add_done_callback(_release_abandoned)
+        raise DeadlineExceeded(f"{stage} não terminou em {left:.2f}s")
@@ -0,0 +1,452 @@
+"""
+Módulo de snapshots de embeddings.
+
+Migrar para outro índice, namespace ou tipo de pod não deveria exigir gerar
+todos os embeddings de novo. Um snapshot é um diretório com:
+
+- vectors.f32: matriz float32 (n, d) contígua, lida via memory mapping
+- records.jsonl: uma linha {"id", "metadata"} por linha da matriz
+- snapshot.json: versão, dimensão, número de vetores e origem
+
+O snapshot é gravado durante ingest_chunks (snapshot_path=...) ou exportado
+de um índice existente por fetch em lote, e carregado em qualquer vector
+store (Pinecone ou local) por upserts paralelos, sem chamadas de embedding.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+import numpy as np
+from tenacity import retry, stop_after_attempt, wait_exponential
+
+from .chunk_store import ChunkTextStore, split_metadata
+from .upsert_batcher import UpsertBatcher
+from .vector_store import VectorStore
+
+
+SNAPSHOT_VERSION = 1
+
+VECTORS_FILE = "vectors.f32"
+RECORDS_FILE = "records.jsonl"
+INFO_FILE = "snapshot.json"
+
+
+def _write_info(path: Path, info: Dict[str, Any]):
+    """Grava snapshot.json atomicamente."""
+    tmp_path = path / (INFO_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path / INFO_FILE)
+
+
+class EmbeddingSnapshotWriter:
+    """
+    Grava vetores em um snapshot por anexação (thread-safe).
+    
+    Ao reabrir um snapshot existente (append=True), arquivos parcialmente
+    escritos por uma execução interrompida são truncados para o último
+    vetor completo em ambos os arquivos.
+    """
+    
+    def __init__(
+        self,
+        path: str,
+        dimension: int,
+        append: bool = True,
+        info: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Args:
+            path: Diretório do snapshot.
+            dimension: Dimensão dos vetores.
+            append: Se True, continua um snapshot existente; senão recria.
+            info: Campos adicionais para snapshot.json (ex: modelo, origem).
+        """
+        self.path = Path(path)
+        self.dimension = dimension
+        self.info = dict(info or {})
+        self._lock = threading.Lock()
+        self.path.mkdir(parents=True, exist_ok=True)
+        
+        vectors_path = self.path / VECTORS_FILE
+        records_path = self.path / RECORDS_FILE
+        
+        self.count = 0
+        if append and vectors_path.exists() and records_path.exists():
+            existing = load_snapshot_info(str(self.path)) if (self.path / INFO_FILE).exists() else {}
+            if existing.get("dimension", dimension) != dimension:
+                raise ValueError(
+                    f"Snapshot em {self.path} tem dimensão {existing['dimension']}, "
+                    f"esperado {dimension}"
+                )
+            self.count = self._repair(vectors_path, records_path)
+        else:
+            vectors_path.unlink(missing_ok=True)
+            records_path.unlink(missing_ok=True)
+        
+        self._vectors_file = open(vectors_path, "ab")
+        self._records_file = open(records_path, "ab")
+        self._write_info(complete=False)
+    
+    def _repair(self, vectors_path: Path, records_path: Path) -> int:
+        """Trunca os arquivos para o maior prefixo consistente; retorna o número de vetores."""
+        row_bytes = self.dimension * 4
+        rows = vectors_path.stat().st_size // row_bytes
+        
+        # Offsets das linhas completas de records.jsonl
+        offsets = [0]
+        with open(records_path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offsets.append(offsets[-1] + len(line))
+        
+        count = min(rows, len(offsets) - 1)
+        with open(vectors_path, "r+b") as f:
+            f.truncate(count * row_bytes)
+        with open(records_path, "r+b") as f:
+            f.truncate(offsets[count])
+        return count
+    
+    def _write_info(self, complete: bool):
+        info = dict(self.info)
+        info.update({
+            "version": SNAPSHOT_VERSION,
+            "dimension": self.dimension,
+            "count": self.count,
+            "dtype": "float32",
+            "complete": complete,
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        })
+        _write_info(self.path, info)
+    
+    def append(
+        self,
+        ids: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+        metadatas: Sequence[Dict[str, Any]]
+    ):
+        """
+        Anexa vetores ao snapshot.
+        
+        Args:
+            ids: IDs dos vetores.
+            embeddings: Vetores (mesma ordem dos IDs).
+            metadatas: Metadados completos de cada vetor.
+        """
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[1] != self.dimension:
+            raise ValueError(
+                f"Embeddings com formato {matrix.shape}, esperado (n, {self.dimension})"
+            )
+        lines = b"".join(
+            json.dumps({"id": vector_id, "metadata": metadata}, ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+            for vector_id, metadata in zip(ids, metadatas)
+        )
+        
+        with self._lock:
+            # Vetores primeiro: em caso de falha, o reparo descarta o excedente
+            self._vectors_file.write(np.ascontiguousarray(matrix).tobytes())
+            self._vectors_file.flush()
+            self._records_file.write(lines)
+            self._records_file.flush()
+            self.count += len(ids)
+    
+    def close(self, complete: bool = True):
+        """
+        Fecha os arquivos e atualiza snapshot.json.
+        
+        Args:
+            complete: Marca o snapshot como completo.
+        """
+        with self._lock:
+            if self._vectors_file.closed:
+                return
+            for f in (self._vectors_file, self._records_file):
+                f.flush()
+                os.fsync(f.fileno())
+                f.close()
+            self._write_info(complete=complete)
+
+
+def load_snapshot_info(path: str) -> Dict[str, Any]:
+    """Lê snapshot.json."""
+    with open(Path(path) / INFO_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class EmbeddingSnapshot:
+    """Leitura de um snapshot: matriz via mmap + tabela de IDs e metadados."""
+    
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Diretório do snapshot.
+        """
+        self.path = Path(path)
+        self.info = load_snapshot_info(path)
+        if self.info.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Versão de snapshot incompatível: {self.info.get('version')}")
+        
+        self.dimension = int(self.info["dimension"])
+        rows = (self.path / VECTORS_FILE).stat().st_size // (self.dimension * 4)
+        
+        self.ids: List[str] = []
+        self.metadata: List[Dict[str, Any]] = []
+        with open(self.path / RECORDS_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                if len(self.ids) >= rows or not line.endswith("\n"):
+                    break
+                record = json.loads(line)
+                self.ids.append(record["id"])
+                self.metadata.append(record.get("metadata") or {})
+        
+        count = len(self.ids)
+        self.matrix = (
+            np.memmap(self.path / VECTORS_FILE, dtype=np.float32, mode="r", shape=(count, self.dimension))
+            if count else np.empty((0, self.dimension), dtype=np.float32)
+        )
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def unique_rows(self) -> List[int]:
+        """Linhas efetivas: para IDs repetidos (reexecuções), vale a última."""
+        last_row: Dict[str, int] = {}
+        for row, vector_id in enumerate(self.ids):
+            last_row[vector_id] = row
+        return sorted(last_row.values())
+    
+    def iter_vectors(self, rows: Optional[Sequence[int]] = None) -> Iterator[Dict[str, Any]]:
+        """Itera vetores no formato {"id", "values", "metadata"}."""
+        for row in (self.unique_rows() if rows is None else rows):
+            yield {
+                "id": self.ids[row],
+                "values": self.matrix[row].tolist(),
+                "metadata": dict(self.metadata[row]),
+            }
+
+
+def export_snapshot_from_index(
+    vector_store: VectorStore,
+    path: str,
+    namespace: Optional[str] = None,
+    prefix: str = "",
+    fetch_batch_size: int = 100,
+    max_workers: int = 4,
+    dimension: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Exporta um snapshot de um índice existente (list + fetch em lote).
+    
+    Os metadados exportados são os gravados no índice: se a ingestão usou o
+    store externo de textos, o texto continua nele, não no snapshot.
+    
+    Args:
+        vector_store: Store de origem.
+        path: Diretório do snapshot (recriado).
+        namespace: Namespace de origem.
+        prefix: Prefixo dos IDs a exportar.
+        fetch_batch_size: IDs por chamada de fetch.
+        max_workers: Fetches simultâneos.
+        dimension: Dimensão dos vetores. Se None, usa describe_index_stats().
+    
+    Returns:
+        Dicionário com count, fetch_requests, missing e elapsed_seconds.
+    """
+    dimension = dimension or vector_store.describe_index_stats().get("dimension")
+    if not dimension:
+        raise ValueError("Não foi possível determinar a dimensão do índice; informe dimension=")
+    
+    writer = EmbeddingSnapshotWriter(
+        path, int(dimension), append=False,
+        info={"source": "index", "namespace": namespace or ""}
+    )
+    
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
+    def fetch_batch(ids: List[str]) -> Tuple[int, int]:
+        vectors = vector_store.fetch(ids, namespace=namespace)["vectors"]
+        found = [vectors[vector_id] for vector_id in ids if vector_id in vectors]
+        if found:
+            writer.append(
+                [vector["id"] for vector in found],
+                [vector["values"] for vector in found],
+                [vector["metadata"] for vector in found],
+            )
+        return len(found), len(ids) - len(found)
+    
+    print(f"\n📤 Exportando snapshot do índice (namespace: {namespace or '(padrão)'})...")
+    start_time = time.time()
+    fetch_requests = 0
+    missing = 0
+    max_in_flight = max(1, max_workers * 2)
+    completed = True
+    
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="snapshot-fetch") as executor:
+            in_flight = set()
+            buffer: List[str] = []
+            
+            def submit(ids: List[str]):
+                nonlocal missing
+                in_flight.add(executor.submit(fetch_batch, ids))
+                while len(in_flight) >= max_in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        in_flight.discard(future)
+                        missing += future.result()[1]
+            
+            for page in vector_store.list(prefix=prefix, namespace=namespace):
+                buffer.extend(page)
+                while len(buffer) >= fetch_batch_size:
+                    submit(buffer[:fetch_batch_size])
+                    buffer = buffer[fetch_batch_size:]
+                    fetch_requests += 1
+            if buffer:
+                submit(buffer)
+                fetch_requests += 1
+            
+            for future in in_flight:
+                missing += future.result()[1]
+    except BaseException:
+        completed = False
+        raise
+    finally:
+        writer.close(complete=completed)
+    
+    elapsed = time.time() - start_time
+    print(f"✅ Snapshot exportado: {writer.count} vetores em {elapsed:.1f}s")
+    print(f"   Caminho: {path}")
+    
+    return {
+        "count": writer.count,
+        "fetch_requests": fetch_requests,
+        "missing": missing,
+        "elapsed_seconds": elapsed,
+    }
+
+
+def load_snapshot_into_store(
+    path: str,
+    vector_store: VectorStore,
+    namespace: Optional[str] = None,
+    max_workers: int = 4,
+    max_bytes: int = 2 * 1024 * 1024 - 64 * 1024,
+    max_vectors: int = 1000,
+    chunk_text_store: Optional[ChunkTextStore] = None,
+    show_progress: bool = True
+) -> Dict[str, Any]:
+    """
+    Carrega um snapshot em um vector store por upserts paralelos.
+    
+    Nenhum embedding é gerado: os vetores vêm da matriz do snapshot. IDs
+    repetidos no snapshot são enviados uma vez (vale a última versão).
+    
+    Args:
+        path: Diretório do snapshot.
+        vector_store: Store de destino (Pinecone ou local).
+        namespace: Namespace de destino.
+        max_workers: Upserts simultâneos.
+        max_bytes: Tamanho máximo de cada requisição de upsert.
+        max_vectors: Vetores por requisição de upsert.
+        chunk_text_store: Se definido, texto e campos repetidos vão para o
+            store externo e o índice recebe só metadados filtráveis.
+        show_progress: Se True, exibe barra de progresso.
+    
+    Returns:
+        Dicionário com total_vectors, upsert_requests, bytes_sent, errors,
+        elapsed_seconds e vectors_per_second.
+    """
+    snapshot = EmbeddingSnapshot(path)
+    rows = snapshot.unique_rows()
+    batcher = UpsertBatcher(max_bytes=max_bytes, max_vectors=max_vectors)
+    
+    print(f"\n📥 Carregando snapshot: {len(rows)} vetores (dimensão {snapshot.dimension})")
+    print(f"   Namespace de destino: {namespace or '(padrão)'}")
+    
+    progress = None
+    if show_progress:
+        try:
+            from tqdm import tqdm
+            progress = tqdm(desc="Carregando snapshot", total=len(rows))
+        except ImportError:
+            progress = None
+    
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
+    def upsert(vectors: List[Dict[str, Any]]) -> int:
+        vector_store.upsert(vectors=vectors, namespace=namespace)
+        return len(vectors)
+    
+    total_vectors = 0
+    upsert_requests = 0
+    bytes_sent = 0
+    errors: List[str] = []
+    max_in_flight = max(1, max_workers * 2)
+    start_time = time.time()
+    
+    def collect(futures, in_flight):
+        nonlocal total_vectors, upsert_requests, bytes_sent
+        for future in futures:
+            request = in_flight.pop(future)
+            try:
+                total_vectors += future.result()
+                upsert_requests += 1
+                bytes_sent += request.num_bytes
+                if progress is not None:
+                    progress.update(len(request.vectors))
+            except Exception as e:
+                error_msg = f"Erro no upsert ({len(request.vectors)} vetores): {e}"
+                errors.append(error_msg)
+                print(f"⚠️  {error_msg}")
+    
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="snapshot-upsert") as executor:
+            in_flight = {}
+            
+            def submit(requests):
+                for request in requests:
+                    in_flight[executor.submit(upsert, request.vectors)] = request
+                    while len(in_flight) >= max_in_flight:
+                        done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                        collect(done, in_flight)
+            
+            for start in range(0, len(rows), max_vectors):
+                vectors = list(snapshot.iter_vectors(rows[start:start + max_vectors]))
+                if chunk_text_store is not None:
+                    external_fields = []
+                    for vector in vectors:
+                        vector["metadata"], external = split_metadata(vector["metadata"])
+                        if external:
+                            external_fields.append((vector["id"], external))
+                    if external_fields:
+                        chunk_text_store.put_many(external_fields)
+                submit(batcher.add(vectors, list(range(start, start + len(vectors)))))
+            submit(batcher.flush())
+            
+            while in_flight:
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                collect(done, in_flight)
+    finally:
+        if progress is not None:
+            progress.close()
+    
+    vector_store.flush()
+    elapsed = time.time() - start_time
+    
+    print(f"✅ Snapshot carregado: {total_vectors}/{len(rows)} vetores em {elapsed:.1f}s")
+    if errors:
+        print(f"   Erros: {len(errors)}")
+    
+    return {
+        "total_vectors": total_vectors,
+        "upsert_requests": upsert_requests,
+        "bytes_sent": bytes_sent,
+        "errors": errors,
+        "elapsed_seconds": elapsed,
+        "vectors_per_second": total_vectors / elapsed if elapsed > 0 else 0.0,
+    }
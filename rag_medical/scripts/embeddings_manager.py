@@ -5,10 +5,55 @@ Este módulo gerencia diferentes providers de embeddings (Gemini, Ollama)
 e fornece interface unificada para gerar embeddings de textos.
 """
 
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
+import asyncio
 import time
 import numpy as np
 from config.settings import Settings
+from .deadline import DeadlineExceeded, bounded_timeout, call_with_deadline
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+def truncate_and_normalize(
+    embeddings: Union[List[float], List[List[float]], np.ndarray],
+    dimension: int
+) -> np.ndarray:
+    """
+    Reduz embeddings para `dimension` componentes e renormaliza (L2).
+    
+    Modelos treinados com Matryoshka Representation Learning concentram a
+    informação nas primeiras componentes, então truncar e renormalizar
+    preserva a similaridade de cosseno com perda pequena de qualidade.
+    
+    Args:
+        embeddings: Um vetor ou matriz (um vetor por linha).
+        dimension: Dimensão de saída desejada.
+        
+    Returns:
+        Array float32 com shape (dimension,) ou (n, dimension).
+    """
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    
+    if matrix.shape[-1] < dimension:
+        raise ValueError(
+            f"Dimensão solicitada ({dimension}) maior que a dimensão "
+            f"do embedding ({matrix.shape[-1]})"
+        )
+    
+    matrix = matrix[..., :dimension]
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    
+    return matrix / norms
+
+
+def _is_transport_error(error: Exception) -> bool:
+    """True para falhas de rede do httpx (conexão recusada/resetada), que são temporárias."""
+    return httpx is not None and isinstance(error, httpx.TransportError)
 
 
 class EmbeddingsManager:
@@ -25,7 +70,8 @@ class EmbeddingsManager:
         provider: Optional[str] = None,
         model_name: Optional[str] = None,
         api_key: Optional[str] = None,
-        base_url: Optional[str] = None
+        base_url: Optional[str] = None,
+        output_dimension: Optional[int] = None
     ):
         """
         Inicializa o gerenciador de embeddings.
@@ -35,9 +81,29 @@ class EmbeddingsManager:
             model_name: Nome do modelo de embedding.
             api_key: API key (necessária para Gemini).
             base_url: URL base (necessária para Ollama).
+            output_dimension: Dimensão de saída dos embeddings. Se None, usa
+                EMBEDDING_DIMENSION das configurações (ou a dimensão nativa).
         """
         self.settings = Settings()
         
+        # Dimensão de saída (None = dimensão nativa do modelo)
+        self.output_dimension = output_dimension or self.settings.EMBEDDING_DIMENSION
+        if self.output_dimension is not None and self.output_dimension <= 0:
+            raise ValueError(
+                f"output_dimension deve ser positivo, recebeu: {self.output_dimension}"
+            )
+        
+        # Gemini suporta redução nativa (output_dimensionality);
+        # Ollama usa truncamento + renormalização
+        self._native_dimension = False
+        
+        # Cache de dimensões descobertas: (provider, modelo, dimensão de saída) → dimensão
+        self._dimension_cache: Dict[Tuple[str, str, Optional[int]], int] = {}
+        
+        # Cliente HTTP assíncrono do Ollama (criado no event loop que o usa)
+        self._async_http = None
+        self._async_http_loop = None
+        
         # Determina provider
         if provider is None:
             provider = self.settings.get_embedding_provider()
@@ -106,6 +172,7 @@ class EmbeddingsManager:
                     self.embeddings = GoogleGenerativeAIEmbeddings(
                         model=model_format,
                         google_api_key=self.api_key,
+                        **self._gemini_endpoint_kwargs(GoogleGenerativeAIEmbeddings),
                     )
                     # Testa se funciona fazendo uma chamada de teste
                     # Se falhar com erro 500 (temporário), aceita o modelo mesmo assim
@@ -114,6 +181,10 @@ class EmbeddingsManager:
                         if test_result and len(test_result) > 0:
                             print(f"✅ Embeddings Gemini inicializados: {model_format}")
                             self._gemini_model_format = model_format
+                            self._native_dimension = self.output_dimension is not None
+                            self._dimension_cache.setdefault(
+                                (self.provider, self.model_name, None), len(test_result)
+                            )
                             return  # Sucesso, sai da função
                     except Exception as test_err:
                         error_str = str(test_err).lower()
@@ -128,6 +199,7 @@ class EmbeddingsManager:
                             print(f"   Se persistir, aguarde alguns minutos e tente novamente")
                             print(f"✅ Embeddings Gemini inicializados: {model_format}")
                             self._gemini_model_format = model_format
+                            self._native_dimension = self.output_dimension is not None
                             return
                         # Para outros erros, tenta próximo formato
                         else:
@@ -207,6 +279,22 @@ class EmbeddingsManager:
         except Exception as e:
             raise RuntimeError(f"Erro ao inicializar Gemini embeddings: {e}")
     
+    def _gemini_endpoint_kwargs(self, embeddings_class) -> dict:
+        """
+        Argumentos para apontar o cliente Gemini para GEMINI_API_ENDPOINT.
+        
+        Versões recentes de langchain_google_genai aceitam base_url; as
+        anteriores usam client_options + transport REST.
+        """
+        endpoint = self.settings.GEMINI_API_ENDPOINT
+        if not endpoint:
+            return {}
+        
+        fields = getattr(embeddings_class, "model_fields", None) or getattr(embeddings_class, "__fields__", {})
+        if "base_url" in fields:
+            return {"base_url": endpoint}
+        return {"client_options": {"api_endpoint": endpoint}, "transport": "rest"}
+    
     def _init_ollama(self):
         """Inicializa embeddings do Ollama."""
         try:
@@ -219,6 +307,8 @@ class EmbeddingsManager:
             
             print(f"✅ Embeddings Ollama inicializados: {self.model_name}")
             print(f"   Base URL: {self.base_url}")
+            if self.output_dimension:
+                print(f"   Dimensão de saída: {self.output_dimension} (truncamento + L2)")
             
         except ImportError:
             raise ImportError(
@@ -228,6 +318,68 @@ class EmbeddingsManager:
         except Exception as e:
             raise RuntimeError(f"Erro ao inicializar Ollama embeddings: {e}")
     
+    def _call_embed_query(self, text: str) -> List[float]:
+        """
+        Chama o provider para um texto, aplicando a dimensão de saída.
+        
+        Args:
+            text: Texto para gerar embedding.
+            
+        Returns:
+            Embedding já reduzido e normalizado (se output_dimension definido).
+        """
+        if not self.output_dimension:
+            return self.embeddings.embed_query(text)
+        
+        if self._native_dimension:
+            try:
+                result = self.embeddings.embed_query(
+                    text, output_dimensionality=self.output_dimension
+                )
+            except TypeError:
+                # Versão antiga da biblioteca sem output_dimensionality
+                self._native_dimension = False
+                result = self.embeddings.embed_query(text)
+        else:
+            result = self.embeddings.embed_query(text)
+        
+        return truncate_and_normalize(result, self.output_dimension).tolist()
+    
+    def _call_embed_documents(
+        self,
+        texts: List[str],
+        task_type: Optional[str] = None
+    ) -> List[List[float]]:
+        """
+        Chama o provider para vários textos, aplicando a dimensão de saída.
+        
+        Args:
+            texts: Textos para gerar embeddings.
+            task_type: Tipo de tarefa do Gemini (ex: 'RETRIEVAL_QUERY').
+                Ignorado pelo Ollama.
+            
+        Returns:
+            Embeddings já reduzidos e normalizados (se output_dimension definido).
+        """
+        kwargs = {"task_type": task_type} if task_type and self.provider == 'gemini' else {}
+        
+        if not self.output_dimension:
+            return self.embeddings.embed_documents(texts, **kwargs)
+        
+        if self._native_dimension:
+            try:
+                results = self.embeddings.embed_documents(
+                    texts, output_dimensionality=self.output_dimension, **kwargs
+                )
+            except TypeError:
+                # Versão antiga da biblioteca sem output_dimensionality
+                self._native_dimension = False
+                results = self.embeddings.embed_documents(texts, **kwargs)
+        else:
+            results = self.embeddings.embed_documents(texts, **kwargs)
+        
+        return truncate_and_normalize(results, self.output_dimension).tolist()
+    
     def _is_retryable_error(self, error: Exception) -> bool:
         """
         Verifica se um erro é retryable (erro temporário do servidor).
@@ -262,16 +414,27 @@ class EmbeddingsManager:
         
         return is_retryable
     
-    def embed_text(self, text: str, max_retries: int = 5) -> List[float]:
+    def embed_text(
+        self,
+        text: str,
+        max_retries: int = 5,
+        deadline_at: Optional[float] = None
+    ) -> List[float]:
         """
         Gera embedding para um único texto com retry automático para erros temporários.
         
         Args:
             text: Texto para gerar embedding.
             max_retries: Número máximo de tentativas (padrão: 5).
+            deadline_at: Prazo da query (time.monotonic()). Cada tentativa é
+                abandonada no prazo, e um backoff que passaria do prazo não é
+                esperado.
             
         Returns:
             Lista de floats representando o vetor de embedding.
+            
+        Raises:
+            DeadlineExceeded: Se o prazo venceu antes de obter o embedding.
         """
         if not text or not text.strip():
             raise ValueError("Texto não pode ser vazio")
@@ -279,9 +442,14 @@ class EmbeddingsManager:
         last_error = None
         for attempt in range(max_retries):
             try:
-                result = self.embeddings.embed_query(text)
+                if deadline_at is None:
+                    result = self._call_embed_query(text)
+                else:
+                    result = call_with_deadline(
+                        self._call_embed_query, text, deadline_at=deadline_at, stage="embedding da query"
+                    )
                 return result
-            except KeyboardInterrupt:
+            except (KeyboardInterrupt, DeadlineExceeded):
                 # Re-raise KeyboardInterrupt para permitir tratamento no nível superior
                 raise
             except Exception as e:
@@ -299,6 +467,10 @@ class EmbeddingsManager:
                 if attempt < max_retries - 1:
                     # Backoff exponencial com tempo mínimo maior: 3s, 6s, 12s, 24s, 48s
                     wait_time = min(3 * (2 ** attempt), 60)  # Máximo de 60 segundos
+                    if deadline_at is not None and time.monotonic() + wait_time >= deadline_at:
+                        raise DeadlineExceeded(
+                            f"prazo esgotado antes da tentativa {attempt + 2} de embedding: {str(e)[:100]}"
+                        )
                     print(f"\n   ⚠️  Erro temporário do servidor (tentativa {attempt + 1}/{max_retries})")
                     print(f"   Tipo de erro: {type(e).__name__}")
                     print(f"   Mensagem: {str(e)[:100]}...")
@@ -317,13 +489,19 @@ class EmbeddingsManager:
         # Não deveria chegar aqui, mas por segurança
         raise RuntimeError(f"Erro ao gerar embedding: {last_error}")
     
-    def embed_documents(self, texts: List[str], max_retries: int = 5) -> List[List[float]]:
+    def embed_documents(
+        self,
+        texts: List[str],
+        max_retries: int = 5,
+        task_type: Optional[str] = None
+    ) -> List[List[float]]:
         """
         Gera embeddings para múltiplos textos com retry automático para erros temporários.
         
         Args:
             texts: Lista de textos para gerar embeddings.
             max_retries: Número máximo de tentativas (padrão: 5).
+            task_type: Tipo de tarefa do Gemini (padrão da biblioteca: documentos).
             
         Returns:
             Lista de listas de floats (um embedding por texto).
@@ -340,7 +518,7 @@ class EmbeddingsManager:
         last_error = None
         for attempt in range(max_retries):
             try:
-                results = self.embeddings.embed_documents(valid_texts)
+                results = self._call_embed_documents(valid_texts, task_type=task_type)
                 return results
             except KeyboardInterrupt:
                 # Re-raise KeyboardInterrupt para permitir tratamento no nível superior
@@ -372,30 +550,237 @@ class EmbeddingsManager:
         # Não deveria chegar aqui, mas por segurança
         raise RuntimeError(f"Erro ao gerar embeddings em lote: {last_error}")
     
+    def embed_queries(self, queries: List[str], max_retries: int = 5) -> List[List[float]]:
+        """
+        Gera embeddings de várias queries em uma chamada em lote.
+        
+        Equivale a embed_text para cada query. No Gemini usa uma única
+        requisição em lote (com o task type de query, não o de documento); no
+        Ollama, que não tem endpoint em lote nem o mesmo prefixo de query em
+        embed_documents, gera um embedding por query.
+        
+        Args:
+            queries: Lista de queries (não vazias).
+            max_retries: Número máximo de tentativas (padrão: 5).
+            
+        Returns:
+            Lista de embeddings, na mesma ordem das queries.
+        """
+        if any(not query or not query.strip() for query in queries):
+            raise ValueError("Texto não pode ser vazio")
+        
+        if not self.supports_batch_queries:
+            return [self.embed_text(query, max_retries=max_retries) for query in queries]
+        
+        return self.embed_documents(queries, max_retries=max_retries, task_type="RETRIEVAL_QUERY")
+    
+    @property
+    def supports_batch_queries(self) -> bool:
+        """True se o provider gera embeddings de várias queries em uma requisição."""
+        return self.provider == 'gemini'
+    
+    # ------------------------------------------------------------------
+    # API assíncrona (queries servidas por um event loop)
+    # ------------------------------------------------------------------
+    
+    async def aembed_text(
+        self,
+        text: str,
+        max_retries: int = 5,
+        timeout: Optional[float] = None,
+        deadline_at: Optional[float] = None
+    ) -> List[float]:
+        """
+        Versão assíncrona de embed_text (não bloqueia o event loop).
+        
+        Usa o cliente assíncrono do Gemini ou HTTP assíncrono (httpx) para o
+        Ollama. Cada tentativa tem timeout próprio; erros temporários e
+        timeouts são repetidos com backoff via asyncio.sleep. Cancelar a task
+        interrompe a requisição em andamento.
+        
+        Args:
+            text: Texto para gerar embedding.
+            max_retries: Número máximo de tentativas (padrão: 5).
+            timeout: Timeout de cada tentativa, em segundos. Se None, usa
+                QUERY_TIMEOUT_SECONDS.
+            deadline_at: Prazo da query (time.monotonic()); limita o timeout
+                de cada tentativa e as esperas de backoff.
+            
+        Returns:
+            Lista de floats representando o vetor de embedding.
+            
+        Raises:
+            DeadlineExceeded: Se o prazo venceu antes de obter o embedding.
+        """
+        if not text or not text.strip():
+            raise ValueError("Texto não pode ser vazio")
+        
+        timeout = timeout or self.settings.QUERY_TIMEOUT_SECONDS
+        
+        last_error = None
+        for attempt in range(max_retries):
+            attempt_timeout, limited = bounded_timeout(timeout, deadline_at, "embedding da query")
+            try:
+                return await asyncio.wait_for(self._acall_embed_query(text), attempt_timeout)
+            except asyncio.TimeoutError:
+                if limited:
+                    raise DeadlineExceeded(f"embedding da query não terminou em {attempt_timeout:.2f}s")
+                last_error = TimeoutError(f"timeout de {timeout}s ao gerar embedding")
+            except Exception as e:
+                if not (self._is_retryable_error(e) or _is_transport_error(e)):
+                    raise RuntimeError(f"Erro ao gerar embedding: {e}")
+                last_error = e
+            
+            if attempt < max_retries - 1:
+                wait_time = min(3 * (2 ** attempt), 60)
+                if deadline_at is not None and time.monotonic() + wait_time >= deadline_at:
+                    raise DeadlineExceeded(
+                        f"prazo esgotado antes da tentativa {attempt + 2} de embedding: {str(last_error)[:100]}"
+                    )
+                print(f"   ⚠️  Erro temporário no embedding (tentativa {attempt + 1}/{max_retries}): "
+                      f"{str(last_error)[:100]} — aguardando {wait_time}s")
+                await asyncio.sleep(wait_time)
+        
+        raise RuntimeError(f"Erro ao gerar embedding após {max_retries} tentativas: {last_error}")
+    
+    async def aembed_queries(
+        self,
+        queries: List[str],
+        max_retries: int = 5,
+        timeout: Optional[float] = None
+    ) -> List[List[float]]:
+        """
+        Versão assíncrona de embed_queries (embeddings concorrentes no Ollama).
+        
+        Args:
+            queries: Lista de queries (não vazias).
+            max_retries: Número máximo de tentativas por query.
+            timeout: Timeout de cada tentativa, em segundos.
+            
+        Returns:
+            Lista de embeddings, na mesma ordem das queries.
+        """
+        if not self.supports_batch_queries:
+            return list(await asyncio.gather(*(
+                self.aembed_text(query, max_retries=max_retries, timeout=timeout)
+                for query in queries
+            )))
+        
+        if any(not query or not query.strip() for query in queries):
+            raise ValueError("Texto não pode ser vazio")
+        
+        timeout = timeout or self.settings.QUERY_TIMEOUT_SECONDS
+        last_error = None
+        for attempt in range(max_retries):
+            try:
+                return await asyncio.wait_for(
+                    self._acall_gemini("aembed_documents", queries, task_type="RETRIEVAL_QUERY"),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                last_error = TimeoutError(f"timeout de {timeout}s ao gerar embeddings")
+            except Exception as e:
+                if not self._is_retryable_error(e):
+                    raise RuntimeError(f"Erro ao gerar embeddings: {e}")
+                last_error = e
+            
+            if attempt < max_retries - 1:
+                await asyncio.sleep(min(3 * (2 ** attempt), 60))
+        
+        raise RuntimeError(f"Erro ao gerar embeddings após {max_retries} tentativas: {last_error}")
+    
+    async def _acall_embed_query(self, text: str) -> List[float]:
+        """Chama o provider de forma assíncrona, aplicando a dimensão de saída."""
+        if self.provider == 'gemini':
+            return await self._acall_gemini("aembed_query", text)
+        
+        # Mesmo prefixo de query que OllamaEmbeddings.embed_query
+        prompt = f"{getattr(self.embeddings, 'query_instruction', '') or ''}{text}"
+        response = await self._get_async_http().post(
+            f"{self.base_url.rstrip('/')}/api/embeddings",
+            json={"model": self.model_name, "prompt": prompt}
+        )
+        if response.status_code != 200:
+            raise ValueError(
+                f"Error raised by inference API HTTP code: {response.status_code}, {response.text}"
+            )
+        result = response.json()["embedding"]
+        
+        if self.output_dimension:
+            return truncate_and_normalize(result, self.output_dimension).tolist()
+        return result
+    
+    async def _acall_gemini(self, method: str, texts, **kwargs):
+        """Chama aembed_query/aembed_documents do Gemini com a dimensão de saída."""
+        call = getattr(self.embeddings, method)
+        if not self.output_dimension:
+            return await call(texts, **kwargs)
+        
+        if self._native_dimension:
+            try:
+                result = await call(texts, output_dimensionality=self.output_dimension, **kwargs)
+            except TypeError:
+                self._native_dimension = False
+                result = await call(texts, **kwargs)
+        else:
+            result = await call(texts, **kwargs)
+        
+        return truncate_and_normalize(result, self.output_dimension).tolist()
+    
+    def _get_async_http(self):
+        """Cliente httpx do event loop atual (recriado se o loop mudou)."""
+        if httpx is None:
+            raise ImportError(
+                "httpx não instalado (necessário para embeddings assíncronos do Ollama). "
+                "Instale com: pip install httpx"
+            )
+        loop = asyncio.get_running_loop()
+        if self._async_http is None or self._async_http_loop is not loop:
+            self._async_http = httpx.AsyncClient(
+                timeout=None,
+                limits=httpx.Limits(max_connections=self.settings.ASYNC_MAX_CONNECTIONS)
+            )
+            self._async_http_loop = loop
+        return self._async_http
+    
+    async def aclose(self):
+        """Fecha o cliente HTTP assíncrono (se criado neste event loop)."""
+        if self._async_http is not None and self._async_http_loop is asyncio.get_running_loop():
+            await self._async_http.aclose()
+        self._async_http = None
+        self._async_http_loop = None
+    
     def get_embedding_dimension(self) -> int:
         """
         Retorna a dimensão dos embeddings gerados.
         
+        Se output_dimension estiver definido, retorna esse valor. Caso contrário
+        descobre a dimensão nativa. O resultado fica em cache por (provider,
+        modelo, output_dimension), então trocar o modelo ou a dimensão de
+        saída do gerenciador nunca devolve a dimensão antiga.
+        
         Returns:
             Número de dimensões do vetor de embedding.
         """
+        key = (self.provider, self.model_name, self.output_dimension)
+        if key in self._dimension_cache:
+            return self._dimension_cache[key]
+        
         # Para Gemini text-embedding-004: 768 dimensões
         # Para Ollama (depende do modelo): geralmente 1024 ou 768
         
-        if self.provider == 'gemini':
-            if 'text-embedding-004' in self.model_name:
-                return 768
-            else:
-                # Testa com um texto pequeno para descobrir a dimensão
-                test_embedding = self.embed_text("test")
-                return len(test_embedding)
-        
-        elif self.provider == 'ollama':
+        if self.output_dimension:
+            dimension = self.output_dimension
+        elif self.provider == 'gemini' and 'text-embedding-004' in self.model_name:
+            dimension = 768
+        elif self.provider in ('gemini', 'ollama'):
             # Testa com um texto pequeno para descobrir a dimensão
-            test_embedding = self.embed_text("test")
-            return len(test_embedding)
+            dimension = len(self.embed_text("test"))
+        else:
+            dimension = 768  # Padrão
         
-        return 768  # Padrão
+        self._dimension_cache[key] = dimension
+        return dimension
     
     def validate_index_compatibility(self, index_dimension: int) -> bool:
         """
@@ -424,16 +809,35 @@ class EmbeddingsManager:
 
 
 def create_embeddings_manager(
-    provider: Optional[str] = None
+    provider: Optional[str] = None,
+    output_dimension: Optional[int] = None
 ) -> EmbeddingsManager:
     """
     Função auxiliar para criar um gerenciador de embeddings.
     
     Args:
         provider: 'gemini' ou 'ollama'. Se None, detecta automaticamente.
+        output_dimension: Dimensão de saída. Se None, usa das configurações.
         
     Returns:
         Instância de EmbeddingsManager configurada.
     """
-    return EmbeddingsManager(provider=provider)
+    return EmbeddingsManager(provider=provider, output_dimension=output_dimension)
+
+
+def embedding_signature(manager: EmbeddingsManager) -> str:
+    """
+    Identifica provider, modelo e dimensão dos embeddings.
+    
+    Args:
+        manager: Gerenciador de embeddings.
+        
+    Returns:
+        '<provider>:<modelo>:<dimensão>'.
+    """
+    return (
+        f"{getattr(manager, 'provider', '')}:"
+        f"{getattr(manager, 'model_name', '')}:"
+        f"{manager.get_embedding_dimension()}"
+    )
 
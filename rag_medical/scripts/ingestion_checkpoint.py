@@ -0,0 +1,281 @@
+"""
+Módulo de checkpoint compacto e atômico para a ingestão.
+
+O progresso é chaveado pelos IDs dos vetores (article_{id}_chunk_{n}) em vez
+de posições na lista de chunks, então o resume tolera chunks inseridos,
+removidos ou reordenados. O estado fica em dois arquivos:
+
+- Snapshot (.json): índices de chunk concluídos por artigo, em intervalos
+  (run-length), gravado atomicamente via arquivo temporário + rename.
+- Log (.log): uma linha JSON por lote confirmado (append-only), de modo que
+  salvar progresso custa O(tamanho do lote), não O(total de chunks).
+
+O log é incorporado ao snapshot (compactação) quando cresce demais e ao
+final/interrupção da ingestão.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Set
+import json
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+
+
+_VECTOR_ID_PATTERN = re.compile(r"^article_(.+)_chunk_(\d+)$")
+
+CHECKPOINT_VERSION = 2
+
+
+def _to_ranges(values: Iterable[int]) -> List[List[int]]:
+    """
+    Converte inteiros em intervalos fechados ordenados.
+    
+    Examples:
+        >>> _to_ranges([0, 1, 2, 5, 7, 8])
+        [[0, 2], [5, 5], [7, 8]]
+    """
+    ranges: List[List[int]] = []
+    for value in sorted(set(values)):
+        if ranges and value == ranges[-1][1] + 1:
+            ranges[-1][1] = value
+        else:
+            ranges.append([value, value])
+    return ranges
+
+
+def _from_ranges(ranges: Iterable[Iterable[int]]) -> Set[int]:
+    """Expande intervalos fechados em um conjunto de inteiros."""
+    values: Set[int] = set()
+    for start, end in ranges:
+        values.update(range(start, end + 1))
+    return values
+
+
+class IngestionCheckpoint:
+    """
+    Checkpoint de ingestão chaveado por ID de vetor.
+    
+    Armazena em memória {article_id: {chunk_index, ...}} e, para IDs fora do
+    padrão article_{id}_chunk_{n}, um conjunto de IDs avulsos.
+    """
+    
+    # Número de linhas no log antes de compactar no snapshot
+    COMPACT_AFTER_LINES = 1000
+    
+    def __init__(
+        self,
+        base_path: Path,
+        index_name: str,
+        namespace: Optional[str],
+        embedding_dimension: Optional[int],
+        store: Optional[str] = None
+    ):
+        """
+        Inicializa o checkpoint.
+        
+        Args:
+            base_path: Caminho base (sem extensão) dos arquivos de checkpoint.
+            index_name: Nome do índice (deve coincidir para retomar).
+            namespace: Namespace (deve coincidir para retomar).
+            embedding_dimension: Dimensão dos embeddings (deve coincidir).
+            store: Backend e local do índice, ex. 'local:/caminho' ou
+                'pinecone:<host>' (deve coincidir).
+        """
+        self.snapshot_path = Path(str(base_path) + ".json")
+        self.log_path = Path(str(base_path) + ".log")
+        self.header = {
+            "version": CHECKPOINT_VERSION,
+            "index_name": index_name,
+            "namespace": namespace,
+            "embedding_dimension": embedding_dimension,
+            "store": store,
+        }
+        
+        self._chunks: Dict[str, Set[int]] = {}
+        self._other_ids: Set[str] = set()
+        self._pending: List[str] = []
+        self._log_lines = 0
+    
+    # ------------------------------------------------------------------
+    # Estado em memória
+    # ------------------------------------------------------------------
+    
+    def _add(self, vector_id: str):
+        match = _VECTOR_ID_PATTERN.match(vector_id)
+        if match:
+            self._chunks.setdefault(match.group(1), set()).add(int(match.group(2)))
+        else:
+            self._other_ids.add(vector_id)
+    
+    def _merge(self, entry: Dict[str, Any]):
+        for article_id, ranges in entry.get("articles", {}).items():
+            self._chunks.setdefault(article_id, set()).update(_from_ranges(ranges))
+        self._other_ids.update(entry.get("ids", []))
+    
+    @staticmethod
+    def _encode(vector_ids: Iterable[str]) -> Dict[str, Any]:
+        """Codifica IDs de forma compacta (intervalos por artigo)."""
+        articles: Dict[str, List[int]] = {}
+        others: List[str] = []
+        for vector_id in vector_ids:
+            match = _VECTOR_ID_PATTERN.match(vector_id)
+            if match:
+                articles.setdefault(match.group(1), []).append(int(match.group(2)))
+            else:
+                others.append(vector_id)
+        
+        entry: Dict[str, Any] = {
+            "articles": {a: _to_ranges(indices) for a, indices in articles.items()}
+        }
+        if others:
+            entry["ids"] = others
+        return entry
+    
+    def is_done(self, vector_id: str) -> bool:
+        """Retorna True se o vetor já foi confirmado."""
+        match = _VECTOR_ID_PATTERN.match(vector_id)
+        if match:
+            return int(match.group(2)) in self._chunks.get(match.group(1), ())
+        return vector_id in self._other_ids
+    
+    def __len__(self) -> int:
+        return sum(len(indices) for indices in self._chunks.values()) + len(self._other_ids)
+    
+    # ------------------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------------------
+    
+    def mark_done(self, vector_ids: Iterable[str]):
+        """
+        Marca vetores como confirmados (em memória).
+        
+        Os IDs ficam pendentes até o próximo flush().
+        """
+        for vector_id in vector_ids:
+            self._add(vector_id)
+            self._pending.append(vector_id)
+    
+    def flush(self):
+        """Anexa os IDs pendentes ao log (uma linha JSON por chamada)."""
+        if not self._pending:
+            return
+        
+        line = json.dumps(self._encode(self._pending), separators=(",", ":"))
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        
+        self._pending = []
+        self._log_lines += 1
+        
+        if self._log_lines >= self.COMPACT_AFTER_LINES:
+            self.compact()
+    
+    def compact(self):
+        """Grava o snapshot completo atomicamente e esvazia o log."""
+        # IDs pendentes já estão em memória e entram no snapshot
+        self._pending = []
+        
+        data = dict(self.header)
+        data["timestamp"] = time.time()
+        data["articles"] = {a: _to_ranges(indices) for a, indices in self._chunks.items()}
+        data["ids"] = sorted(self._other_ids)
+        
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=self.snapshot_path.name + ".", suffix=".tmp",
+            dir=str(self.snapshot_path.parent)
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        
+        # O snapshot já contém tudo o que estava no log
+        if self.log_path.exists():
+            self.log_path.unlink()
+        self._log_lines = 0
+    
+    def load(self) -> bool:
+        """
+        Carrega snapshot + log do disco.
+        
+        Returns:
+            True se havia checkpoint compatível, False caso contrário
+            (checkpoints incompatíveis são removidos).
+        """
+        self._chunks = {}
+        self._other_ids = set()
+        self._pending = []
+        self._log_lines = 0
+        
+        if not self.snapshot_path.exists() and not self.log_path.exists():
+            return False
+        
+        if self.snapshot_path.exists():
+            try:
+                with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception as e:
+                print(f"⚠️  Erro ao carregar checkpoint: {e}")
+                return False
+            
+            if any(data.get(key) != value for key, value in self.header.items()):
+                print("⚠️  Checkpoint incompatível (diferente store/índice/namespace/dimensão). Ignorando...")
+                self.clear()
+                return False
+            
+            self._merge(data)
+        
+        # Sem compactação ainda, a primeira linha do log é o cabeçalho
+        if self.log_path.exists():
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Última linha truncada por interrupção: ignora
+                        continue
+                    if "version" in entry:
+                        if any(entry.get(key) != value for key, value in self.header.items()):
+                            print("⚠️  Checkpoint incompatível (diferente store/índice/namespace/dimensão). Ignorando...")
+                            self.clear()
+                            return False
+                        continue
+                    self._merge(entry)
+                    self._log_lines += 1
+        
+        return len(self) > 0
+    
+    def start(self):
+        """Garante que o log comece com o cabeçalho de compatibilidade."""
+        if not self.log_path.exists() and not self.snapshot_path.exists():
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(self.header, separators=(",", ":")) + "\n")
+    
+    def clear(self):
+        """Remove snapshot e log do disco e limpa o estado em memória."""
+        for path in (self.snapshot_path, self.log_path):
+            if path.exists():
+                path.unlink()
+        self._chunks = {}
+        self._other_ids = set()
+        self._pending = []
+        self._log_lines = 0
+    
+    def exists(self) -> bool:
+        """Retorna True se há arquivos de checkpoint no disco."""
+        return self.snapshot_path.exists() or self.log_path.exists()
@@ -0,0 +1,184 @@
+"""
+Módulo de ledger de ingestão (vector_id → hash do conteúdo).
+
+O ledger é um banco SQLite local que registra, por namespace, o hash do
+conteúdo de cada vetor confirmado no índice. Com ele a ingestão incremental:
+
+- Pula chunks cujo texto, metadados e modelo de embedding não mudaram
+  (zero embeddings e zero upserts para um corpus inalterado)
+- Detecta vetores que sumiram do corpus (ex: artigo que agora gera menos
+  chunks) e os remove do índice em lotes
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+
+# Limite seguro de parâmetros por query no SQLite
+_SQLITE_BATCH = 500
+
+# Espera por locks de escrita (workers da ingestão multiprocesso compartilham o arquivo)
+_SQLITE_BUSY_TIMEOUT = 60.0
+
+
+class IngestionLedger:
+    """
+    Ledger SQLite de vetores ingeridos.
+    
+    Tabela `vectors`: (namespace, vector_id) → content_hash, article_id.
+    """
+    
+    def __init__(self, path: Path):
+        """
+        Abre (ou cria) o ledger.
+        
+        Args:
+            path: Caminho do arquivo SQLite.
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=_SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS vectors (
+                namespace TEXT NOT NULL,
+                vector_id TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                article_id TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (namespace, vector_id)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_vectors_article ON vectors (namespace, article_id)"
+        )
+        self._conn.commit()
+    
+    @staticmethod
+    def content_hash(text: str, metadata: Dict[str, Any], embedding_signature: str) -> str:
+        """
+        Calcula o hash do conteúdo de um vetor.
+        
+        Args:
+            text: Texto do chunk.
+            metadata: Metadados já preparados para o índice.
+            embedding_signature: Identifica provider/modelo/dimensão, para que
+                trocar o modelo force novo embedding.
+            
+        Returns:
+            Hash SHA-256 em hexadecimal.
+        """
+        payload = json.dumps(
+            {"text": text, "metadata": metadata, "embedding": embedding_signature},
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def _ns(namespace: Optional[str]) -> str:
+        return namespace or ""
+    
+    def get_hashes(self, namespace: Optional[str], vector_ids: Sequence[str]) -> Dict[str, str]:
+        """
+        Retorna {vector_id: content_hash} para os IDs presentes no ledger.
+        """
+        hashes: Dict[str, str] = {}
+        ns = self._ns(namespace)
+        for start in range(0, len(vector_ids), _SQLITE_BATCH):
+            batch = list(vector_ids[start:start + _SQLITE_BATCH])
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT vector_id, content_hash FROM vectors "
+                f"WHERE namespace = ? AND vector_id IN ({placeholders})",
+                [ns, *batch],
+            )
+            hashes.update(rows)
+        return hashes
+    
+    def record(
+        self,
+        namespace: Optional[str],
+        entries: Iterable[Tuple[str, str, Optional[str]]]
+    ):
+        """
+        Registra vetores confirmados no índice.
+        
+        Args:
+            namespace: Namespace dos vetores.
+            entries: Tuplas (vector_id, content_hash, article_id).
+        """
+        ns = self._ns(namespace)
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO vectors "
+            "(namespace, vector_id, content_hash, article_id, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(ns, vector_id, content_hash, article_id, now)
+             for vector_id, content_hash, article_id in entries],
+        )
+        self._conn.commit()
+    
+    def remove(self, namespace: Optional[str], vector_ids: Sequence[str]):
+        """Remove IDs do ledger."""
+        ns = self._ns(namespace)
+        for start in range(0, len(vector_ids), _SQLITE_BATCH):
+            batch = list(vector_ids[start:start + _SQLITE_BATCH])
+            placeholders = ",".join("?" * len(batch))
+            self._conn.execute(
+                f"DELETE FROM vectors WHERE namespace = ? AND vector_id IN ({placeholders})",
+                [ns, *batch],
+            )
+        self._conn.commit()
+    
+    def ids_for_articles(self, namespace: Optional[str], article_ids: Sequence[str]) -> Set[str]:
+        """Retorna os IDs registrados para os artigos informados."""
+        ids: Set[str] = set()
+        ns = self._ns(namespace)
+        article_ids = list(article_ids)
+        for start in range(0, len(article_ids), _SQLITE_BATCH):
+            batch = article_ids[start:start + _SQLITE_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT vector_id FROM vectors "
+                f"WHERE namespace = ? AND article_id IN ({placeholders})",
+                [ns, *batch],
+            )
+            ids.update(row[0] for row in rows)
+        return ids
+    
+    def all_ids(self, namespace: Optional[str]) -> Set[str]:
+        """Retorna todos os IDs registrados no namespace."""
+        rows = self._conn.execute(
+            "SELECT vector_id FROM vectors WHERE namespace = ?",
+            [self._ns(namespace)],
+        )
+        return {row[0] for row in rows}
+    
+    def clear(self, namespace: Optional[str]) -> int:
+        """Remove todos os IDs do namespace; retorna quantos foram removidos."""
+        cursor = self._conn.execute(
+            "DELETE FROM vectors WHERE namespace = ?",
+            [self._ns(namespace)],
+        )
+        self._conn.commit()
+        return cursor.rowcount
+    
+    def count(self, namespace: Optional[str]) -> int:
+        """Número de vetores registrados no namespace."""
+        row = self._conn.execute(
+            "SELECT COUNT(*) FROM vectors WHERE namespace = ?",
+            [self._ns(namespace)],
+        ).fetchone()
+        return row[0]
+    
+    def close(self):
+        """Fecha a conexão com o banco."""
+        self._conn.close()
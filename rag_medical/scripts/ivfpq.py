@@ -0,0 +1,244 @@
+"""
+Módulo de índice aproximado IVF-PQ (inverted file + product quantization).
+
+Usado pelo IVFPQVectorStore (VECTOR_STORE_BACKEND=ivfpq) para buscas em
+corpora grandes sem Pinecone:
+
+- IVF: k-means divide os vetores em nlist listas; a query visita só as
+  nprobe listas de centroides mais próximos
+- PQ: o resíduo (vetor - centroide da lista) é dividido em m subvetores, cada
+  um codificado pelo índice (uint8) do centroide mais próximo entre 256 do seu
+  subespaço, então cada vetor ocupa m bytes em vez de 4 * d
+- ADC: o score aproximado é <q, centroide> + soma das tabelas <q_j, codebook_j>
+  (uma tabela m x 256 por query, sem decodificar os vetores)
+
+O k-means é vetorizado em NumPy (atribuição por produto de matrizes em lotes,
+médias por np.add.reduceat).
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+
+# Centroides por subespaço do PQ (códigos uint8)
+PQ_CENTROIDS = 256
+
+# Amostra máxima do treino de cada codebook (64 vetores por centroide bastam)
+_PQ_TRAIN_MAX = 64 * PQ_CENTROIDS
+
+# Linhas por lote na atribuição aos centroides (limita a matriz de distâncias)
+_ASSIGN_BATCH = 16384
+
+# O k-means para quando menos que esta fração das atribuições muda
+_KMEANS_TOLERANCE = 1e-3
+
+
+def assign(data: np.ndarray, centroids: np.ndarray, batch_size: int = _ASSIGN_BATCH) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Atribui cada vetor ao centroide mais próximo (distância euclidiana).
+    
+    Args:
+        data: Vetores (n, d).
+        centroids: Centroides (k, d).
+        batch_size: Linhas por lote.
+    
+    Returns:
+        Tuple (labels int32 (n,), distâncias ao quadrado float32 (n,)).
+    """
+    centroid_norms = np.einsum("kd,kd->k", centroids, centroids)
+    scaled = -2.0 * centroids.T
+    labels = np.empty(len(data), dtype=np.int32)
+    distances = np.empty(len(data), dtype=np.float32)
+    for start in range(0, len(data), batch_size):
+        batch = np.asarray(data[start:start + batch_size], dtype=np.float32)
+        # ||x - c||^2 = ||x||^2 - 2 x.c + ||c||^2 (||x||^2 não muda o argmin)
+        partial = batch @ scaled
+        partial += centroid_norms
+        best = np.argmin(partial, axis=1)
+        labels[start:start + len(batch)] = best
+        distances[start:start + len(batch)] = np.maximum(
+            partial[np.arange(len(batch)), best] + np.einsum("nd,nd->n", batch, batch), 0.0
+        )
+    return labels, distances
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """
+    Treina k centroides (k-means de Lloyd, vetorizado).
+    
+    Clusters vazios são reiniciados com os vetores mais distantes dos seus
+    centroides atuais.
+    
+    Args:
+        data: Vetores de treino (n, d), n >= k.
+        k: Número de centroides.
+        iterations: Máximo de iterações (para antes se quase nenhuma
+            atribuição muda).
+        seed: Semente da inicialização.
+    
+    Returns:
+        Centroides float32 (k, d).
+    """
+    data = np.ascontiguousarray(data, dtype=np.float32)
+    n = len(data)
+    if n < k:
+        raise ValueError(f"k-means precisa de pelo menos k={k} vetores (recebeu {n})")
+    
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(n, k, replace=False)].copy()
+    labels = None
+    
+    for _ in range(iterations):
+        new_labels, distances = assign(data, centroids)
+        if labels is not None and np.count_nonzero(new_labels != labels) <= _KMEANS_TOLERANCE * n:
+            break
+        labels = new_labels
+        
+        # Soma por cluster: ordena por label e soma os segmentos contíguos
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=k)
+        present = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[present]
+        centroids[present] = np.add.reduceat(data[order], starts, axis=0) / counts[present, None]
+        
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            farthest = np.argsort(-distances)[:empty.size]
+            centroids[empty] = data[farthest]
+    
+    return centroids
+
+
+class IVFPQIndex:
+    """
+    Quantizadores treinados do IVF-PQ (centroides das listas + codebooks).
+    
+    Os códigos e as listas de cada vetor ficam com quem guarda os vetores
+    (arrays alinhados às linhas); este objeto codifica e pontua.
+    """
+    
+    def __init__(self, centroids: np.ndarray, codebooks: np.ndarray):
+        """
+        Args:
+            centroids: Centroides das listas (nlist, d).
+            codebooks: Codebooks do PQ (m, ksub, d / m).
+        """
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.codebooks = np.ascontiguousarray(codebooks, dtype=np.float32)
+        self.nlist, self.dimension = self.centroids.shape
+        self.m, self.ksub, self.dsub = self.codebooks.shape
+    
+    @classmethod
+    def train(
+        cls,
+        vectors: np.ndarray,
+        nlist: int,
+        m: int,
+        iterations: int = 20,
+        seed: int = 0
+    ) -> "IVFPQIndex":
+        """
+        Treina IVF e PQ em uma amostra de vetores.
+        
+        Args:
+            vectors: Amostra de treino (n, d), normalizada.
+            nlist: Número de listas (limitado a n).
+            m: Subquantizadores (deve dividir d).
+            iterations: Iterações do k-means.
+            seed: Semente.
+        
+        Returns:
+            Índice treinado.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        n, dimension = vectors.shape
+        if dimension % m:
+            raise ValueError(f"m={m} deve dividir a dimensão {dimension}")
+        
+        centroids = kmeans(vectors, min(nlist, n), iterations, seed)
+        labels, _ = assign(vectors, centroids)
+        residuals = vectors - centroids[labels]
+        if n > _PQ_TRAIN_MAX:
+            residuals = residuals[np.random.default_rng(seed).choice(n, _PQ_TRAIN_MAX, replace=False)]
+        
+        dsub = dimension // m
+        ksub = min(PQ_CENTROIDS, len(residuals))
+        codebooks = np.stack([
+            kmeans(residuals[:, j * dsub:(j + 1) * dsub], ksub, iterations, seed + 1 + j)
+            for j in range(m)
+        ])
+        return cls(centroids, codebooks)
+    
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Codifica vetores.
+        
+        Args:
+            vectors: Vetores (n, d), normalizados.
+        
+        Returns:
+            Tuple (lista de cada vetor int32 (n,), códigos uint8 (n, m)).
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+        lists, _ = assign(vectors, self.centroids)
+        residuals = vectors - self.centroids[lists]
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j], _ = assign(residuals[:, j * self.dsub:(j + 1) * self.dsub], self.codebooks[j])
+        return lists, codes
+    
+    def probe(self, query: np.ndarray, nprobe: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Listas a visitar para a query.
+        
+        Returns:
+            Tuple (listas em ordem de proximidade, <q, centroide> de todas as listas).
+        """
+        coarse = self.centroids @ query
+        nprobe = min(max(nprobe, 1), self.nlist)
+        probe = np.argpartition(-coarse, nprobe - 1)[:nprobe]
+        return probe[np.argsort(-coarse[probe])], coarse
+    
+    def score(
+        self,
+        query: np.ndarray,
+        coarse: np.ndarray,
+        lists: np.ndarray,
+        codes: np.ndarray
+    ) -> np.ndarray:
+        """
+        Scores aproximados (produto interno) por ADC.
+        
+        Args:
+            query: Query normalizada (d,).
+            coarse: <q, centroide> de cada lista (de probe).
+            lists: Lista de cada candidato (n,).
+            codes: Códigos dos candidatos (n, m).
+        
+        Returns:
+            Scores float32 (n,).
+        """
+        table = np.einsum("jcd,jd->jc", self.codebooks, query.reshape(self.m, self.dsub))
+        offsets = np.arange(self.m, dtype=np.intp) * self.ksub
+        return coarse[lists] + table.ravel()[codes.astype(np.intp) + offsets].sum(axis=1)
+    
+    @staticmethod
+    def inverted_lists(lists: np.ndarray, nlist: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Monta as listas invertidas (linhas agrupadas por lista).
+        
+        Args:
+            lists: Lista de cada linha (n,).
+            nlist: Número de listas.
+        
+        Returns:
+            Tuple (linhas ordenadas por lista int64, offsets (nlist + 1,)).
+        """
+        order = np.argsort(lists, kind="stable").astype(np.int64)
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(lists, minlength=nlist)))).astype(np.int64)
+        return order, offsets
+    
+    def nbytes(self) -> int:
+        """Memória dos quantizadores (sem os códigos)."""
+        return int(self.centroids.nbytes + self.codebooks.nbytes)
@@ -0,0 +1,491 @@
+"""
+Módulo de índice lexical (BM25) local.
+
+Queries clínicas costumam ser nomes exatos de fármacos, símbolos de genes
+ou termos MeSH, casos em que a busca densa erra com facilidade e sempre
+exige uma chamada ao provider de embeddings. O BM25Index é um índice
+invertido compacto construído a partir dos chunks do MedicalTextSplitter:
+
+- Postings em arrays NumPy contíguos (offsets int64, doc ids int32 e pesos
+  BM25 float32 pré-calculados), carregados via memory mapping
+- Metadados dos chunks em JSON lines mapeado em memória ao carregar, lidos
+  sob demanda (apenas top-k)
+- Query = soma dos pesos das postings dos termos da query, sem embeddings
+
+A fusão com a busca densa (modo hybrid) usa reciprocal rank fusion.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import json
+import math
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from .vector_store import matches_filter
+
+
+INDEX_VERSION = 1
+
+# Índices carregados, por caminho: (assinatura de index.json, índice)
+_lexical_indexes: Dict[str, Tuple[Tuple[int, int], "BM25Index"]] = {}
+_lexical_indexes_lock = threading.Lock()
+
+# Tokens alfanuméricos, preservando hífens/pontos internos (ex: "il-6", "covid-19")
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-.][a-z0-9]+)*")
+
+# Stopwords em inglês (o corpus PubMedQA é em inglês)
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been
+before being below between both but by can did do does doing down during each
+few for from further had has have having he her here hers herself him himself
+his how i if in into is it its itself just me more most my myself no nor not
+now of off on once only or other our ours ourselves out over own same she
+should so some such than that the their theirs them themselves then there
+these they this those through to too under until up very was we were what
+when where which while who whom why will with you your yours yourself
+yourselves
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Tokeniza texto para o índice lexical.
+    
+    Args:
+        text: Texto livre (chunk ou query).
+    
+    Returns:
+        Tokens em minúsculas, sem stopwords. Tokens compostos (ex: "il-6")
+        também geram suas partes ("il", "6") para casar grafias sem hífen.
+    """
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if "-" in token or "." in token:
+            tokens.extend(
+                part for part in re.split(r"[-.]", token)
+                if part and part not in STOPWORDS
+            )
+    return tokens
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]],
+    k: int = 60,
+    weights: Optional[Sequence[float]] = None
+) -> List[Tuple[str, float]]:
+    """
+    Combina rankings com reciprocal rank fusion: score(d) = Σ w / (k + rank).
+    
+    Args:
+        rankings: Listas de IDs ordenadas da melhor para a pior.
+        k: Constante de suavização do RRF.
+        weights: Peso de cada ranking (padrão 1.0).
+    
+    Returns:
+        Lista (id, score) ordenada por score decrescente.
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """
+    Índice invertido BM25 com postings em arrays (carregáveis via mmap).
+    
+    Layout em disco (diretório):
+    - index.json: versão, build_id, k1, b, número de documentos, avgdl
+    - vocab.json: {termo: term_id}
+    - postings_offsets.npy: int64 (V+1), início das postings de cada termo
+    - postings_docs.npy: int32, doc ids ordenados dentro de cada termo
+    - postings_weights.npy: float32, peso BM25 (idf * tf normalizado)
+    - doc_ids.json: IDs dos vetores (article_{id}_chunk_{i})
+    - docs.jsonl + doc_offsets.npy: metadados por documento (lidos sob demanda)
+    
+    Todos os arquivos de um índice carregado são abertos/mapeados em load():
+    uma reconstrução no mesmo caminho (troca do diretório) não afeta o índice
+    já carregado, que continua lendo a versão dele.
+    """
+    
+    def __init__(
+        self,
+        vocab: Dict[str, int],
+        offsets: np.ndarray,
+        docs: np.ndarray,
+        weights: np.ndarray,
+        doc_ids: List[str],
+        k1: float,
+        b: float,
+        avgdl: float,
+        path: Optional[Path] = None,
+        documents: Optional[List[Dict[str, Any]]] = None,
+        build_id: Optional[str] = None
+    ):
+        self.vocab = vocab
+        self.offsets = offsets
+        self.docs = docs
+        self.weights = weights
+        self.doc_ids = doc_ids
+        self.k1 = k1
+        self.b = b
+        self.avgdl = avgdl
+        self.path = path
+        # Identifica a versão gravada (None = em memória, não salvo)
+        self.build_id = build_id
+        
+        # Metadados: em memória (recém-construído) ou em docs.jsonl (carregado)
+        self._documents = documents
+        self._doc_offsets: Optional[np.ndarray] = None
+        self._docs_map = None
+        if documents is None and path is not None:
+            self._doc_offsets = np.load(path / "doc_offsets.npy", mmap_mode="r")
+            with open(path / "docs.jsonl", "rb") as f:
+                # mmap não aceita arquivo vazio (índice sem documentos)
+                if os.fstat(f.fileno()).st_size:
+                    self._docs_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+    
+    @property
+    def num_terms(self) -> int:
+        return len(self.vocab)
+    
+    # ------------------------------------------------------------------
+    # Construção
+    # ------------------------------------------------------------------
+    
+    @classmethod
+    def build(
+        cls,
+        chunks: Iterable[Dict[str, Any]],
+        k1: float = 1.2,
+        b: float = 0.75
+    ) -> "BM25Index":
+        """
+        Constrói o índice a partir de chunks do MedicalTextSplitter.
+        
+        Args:
+            chunks: Chunks com campos "text", "article_id", "chunk_index", "metadata".
+            k1: Saturação de frequência de termo do BM25.
+            b: Normalização por tamanho do documento do BM25.
+        
+        Returns:
+            Índice em memória (use save() para persistir).
+        """
+        vocab: Dict[str, int] = {}
+        term_docs: List[List[int]] = []
+        term_tfs: List[List[int]] = []
+        doc_lengths: List[int] = []
+        doc_ids: List[str] = []
+        documents: List[Dict[str, Any]] = []
+        
+        for doc_num, chunk in enumerate(chunks):
+            doc_ids.append(f"article_{chunk['article_id']}_chunk_{chunk['chunk_index']}")
+            
+            metadata = dict(chunk.get("metadata", {}))
+            metadata.setdefault("article_id", chunk["article_id"])
+            metadata.setdefault("chunk_index", chunk["chunk_index"])
+            metadata["text"] = chunk["text"]
+            documents.append(metadata)
+            
+            tokens = tokenize(chunk["text"])
+            doc_lengths.append(len(tokens))
+            
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            
+            for token, tf in counts.items():
+                term_id = vocab.get(token)
+                if term_id is None:
+                    term_id = vocab[token] = len(vocab)
+                    term_docs.append([])
+                    term_tfs.append([])
+                term_docs[term_id].append(doc_num)
+                term_tfs[term_id].append(tf)
+        
+        num_docs = len(doc_ids)
+        lengths = np.asarray(doc_lengths, dtype=np.float32)
+        avgdl = float(lengths.mean()) if num_docs else 0.0
+        # Fator de normalização por documento: k1 * (1 - b + b * dl / avgdl)
+        norm = k1 * (1 - b + b * lengths / avgdl) if avgdl > 0 else np.full(num_docs, k1, dtype=np.float32)
+        
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(docs) for docs in term_docs])
+        docs = np.empty(int(offsets[-1]), dtype=np.int32)
+        weights = np.empty(int(offsets[-1]), dtype=np.float32)
+        
+        for term_id, (postings, tfs) in enumerate(zip(term_docs, term_tfs)):
+            start, end = offsets[term_id], offsets[term_id + 1]
+            postings_array = np.asarray(postings, dtype=np.int32)
+            tf = np.asarray(tfs, dtype=np.float32)
+            df = len(postings)
+            idf = math.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+            docs[start:end] = postings_array
+            weights[start:end] = idf * tf * (k1 + 1) / (tf + norm[postings_array])
+        
+        return cls(
+            vocab=vocab, offsets=offsets, docs=docs, weights=weights,
+            doc_ids=doc_ids, k1=k1, b=b, avgdl=avgdl, documents=documents
+        )
+    
+    def save(self, path: str):
+        """
+        Grava o índice em disco (substituição atômica do diretório).
+        
+        Args:
+            path: Diretório de destino.
+        """
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(prefix=f".{target.name}.", dir=str(target.parent)))
+        
+        try:
+            with open(tmp_dir / "index.json", "w", encoding="utf-8") as f:
+                json.dump({
+                    "version": INDEX_VERSION,
+                    "build_id": uuid.uuid4().hex,
+                    "k1": self.k1,
+                    "b": self.b,
+                    "num_docs": len(self.doc_ids),
+                    "num_terms": self.num_terms,
+                    "avgdl": self.avgdl,
+                }, f)
+            with open(tmp_dir / "vocab.json", "w", encoding="utf-8") as f:
+                json.dump(self.vocab, f, ensure_ascii=False)
+            with open(tmp_dir / "doc_ids.json", "w", encoding="utf-8") as f:
+                json.dump(self.doc_ids, f)
+            np.save(tmp_dir / "postings_offsets.npy", np.ascontiguousarray(self.offsets))
+            np.save(tmp_dir / "postings_docs.npy", np.ascontiguousarray(self.docs))
+            np.save(tmp_dir / "postings_weights.npy", np.ascontiguousarray(self.weights))
+            
+            doc_offsets = np.zeros(len(self.doc_ids) + 1, dtype=np.int64)
+            with open(tmp_dir / "docs.jsonl", "wb") as f:
+                for doc_num in range(len(self.doc_ids)):
+                    line = json.dumps(self.get_document(doc_num), ensure_ascii=False, default=str)
+                    f.write(line.encode("utf-8") + b"\n")
+                    doc_offsets[doc_num + 1] = f.tell()
+            np.save(tmp_dir / "doc_offsets.npy", doc_offsets)
+            
+            old_dir = None
+            if target.exists():
+                old_dir = target.parent / f".{target.name}.old"
+                if old_dir.exists():
+                    shutil.rmtree(old_dir)
+                os.replace(target, old_dir)
+            os.replace(tmp_dir, target)
+            if old_dir is not None:
+                shutil.rmtree(old_dir)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+    
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """
+        Carrega um índice salvo (postings via memory mapping).
+        
+        Args:
+            path: Diretório do índice.
+        
+        Returns:
+            Índice pronto para busca.
+        """
+        path = Path(path)
+        with open(path / "index.json", "r", encoding="utf-8") as f:
+            info = json.load(f)
+        if info.get("version") != INDEX_VERSION:
+            raise ValueError(f"Versão de índice lexical incompatível: {info.get('version')}")
+        with open(path / "vocab.json", "r", encoding="utf-8") as f:
+            vocab = json.load(f)
+        with open(path / "doc_ids.json", "r", encoding="utf-8") as f:
+            doc_ids = json.load(f)
+        
+        return cls(
+            vocab=vocab,
+            offsets=np.load(path / "postings_offsets.npy", mmap_mode="r"),
+            docs=np.load(path / "postings_docs.npy", mmap_mode="r"),
+            weights=np.load(path / "postings_weights.npy", mmap_mode="r"),
+            doc_ids=doc_ids,
+            k1=info["k1"],
+            b=info["b"],
+            avgdl=info["avgdl"],
+            path=path,
+            build_id=info.get("build_id"),
+        )
+    
+    # ------------------------------------------------------------------
+    # Busca
+    # ------------------------------------------------------------------
+    
+    def get_document(self, doc_num: int) -> Dict[str, Any]:
+        """Retorna os metadados (com texto) do documento."""
+        if self._documents is not None:
+            return self._documents[doc_num]
+        
+        start, end = int(self._doc_offsets[doc_num]), int(self._doc_offsets[doc_num + 1])
+        return json.loads(self._docs_map[start:end])
+    
+    def score(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calcula scores BM25 dos documentos que contêm algum termo da query.
+        
+        Args:
+            query: Texto da query.
+        
+        Returns:
+            Tuple (doc_nums, scores) apenas dos documentos candidatos.
+        """
+        term_ids = sorted({self.vocab[token] for token in tokenize(query) if token in self.vocab})
+        if not term_ids:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        
+        if len(term_ids) == 1:
+            start, end = self.offsets[term_ids[0]], self.offsets[term_ids[0] + 1]
+            return np.asarray(self.docs[start:end]), np.asarray(self.weights[start:end])
+        
+        docs = np.concatenate([self.docs[self.offsets[t]:self.offsets[t + 1]] for t in term_ids])
+        weights = np.concatenate([self.weights[self.offsets[t]:self.offsets[t + 1]] for t in term_ids])
+        doc_nums, inverse = np.unique(docs, return_inverse=True)
+        return doc_nums, np.bincount(inverse, weights=weights).astype(np.float32)
+    
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Busca os documentos mais relevantes para a query (BM25).
+        
+        Args:
+            query: Texto da query.
+            top_k: Número de resultados.
+            filter: Filtro de metadados no formato do Pinecone.
+        
+        Returns:
+            Matches no formato do VectorStore: {"id", "score", "metadata"}.
+        """
+        doc_nums, scores = self.score(query)
+        if len(doc_nums) == 0 or top_k <= 0:
+            return []
+        
+        if filter:
+            # Avalia o filtro em ordem de score até completar top_k
+            order = np.argsort(-scores, kind="stable")
+        elif len(doc_nums) > top_k:
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+            order = top[np.argsort(-scores[top], kind="stable")]
+        else:
+            order = np.argsort(-scores, kind="stable")
+        
+        matches = []
+        for position in order:
+            doc_num = int(doc_nums[position])
+            metadata = self.get_document(doc_num)
+            if filter and not matches_filter(metadata, filter):
+                continue
+            matches.append({
+                "id": self.doc_ids[doc_num],
+                "score": float(scores[position]),
+                "metadata": dict(metadata),
+            })
+            if len(matches) >= top_k:
+                break
+        return matches
+    
+    def close(self):
+        """Fecha o mapeamento dos metadados (se aberto)."""
+        if self._docs_map is not None:
+            self._docs_map.close()
+            self._docs_map = None
+
+
+def get_lexical_index(path: str) -> BM25Index:
+    """
+    Retorna o índice BM25 do caminho (carregado uma vez, via mmap).
+    
+    Faz um stat de index.json por chamada: se o índice foi reconstruído (por
+    este ou por outro processo), carrega a nova versão. Buscas em andamento
+    na versão anterior continuam nos arquivos mapeados dela.
+    
+    Args:
+        path: Diretório do índice.
+    
+    Returns:
+        Índice carregado.
+    
+    Raises:
+        FileNotFoundError: Se não há índice no caminho.
+    """
+    key = os.path.abspath(path)
+    signature = _index_signature(key)
+    
+    entry = _lexical_indexes.get(key)
+    if entry is None or entry[0] != signature:
+        with _lexical_indexes_lock:
+            entry = _lexical_indexes.get(key)
+            while entry is None or entry[0] != signature:
+                index = BM25Index.load(key)
+                # Reconstruído durante o load (arquivos de versões diferentes): recarrega
+                loaded, signature = signature, _index_signature(key)
+                if loaded == signature:
+                    entry = _lexical_indexes[key] = (signature, index)
+    return entry[1]
+
+
+def _index_signature(path: str) -> Tuple[int, int]:
+    """(inode, mtime) de index.json: muda a cada save() no caminho."""
+    try:
+        info = os.stat(os.path.join(path, "index.json"))
+    except FileNotFoundError:
+        raise FileNotFoundError(
+            f"Índice lexical não encontrado em {path}. "
+            f"Construa com build_lexical_index(chunks, path)."
+        )
+    return info.st_ino, info.st_mtime_ns
+
+
+def build_lexical_index(
+    chunks: Iterable[Dict[str, Any]],
+    path: str,
+    k1: float = 1.2,
+    b: float = 0.75
+) -> BM25Index:
+    """
+    Constrói e grava o índice BM25 dos chunks.
+    
+    Args:
+        chunks: Chunks do MedicalTextSplitter.
+        path: Diretório de destino (ex: LEXICAL_INDEX_PATH).
+        k1: Parâmetro k1 do BM25.
+        b: Parâmetro b do BM25.
+    
+    Returns:
+        Índice carregado do disco (postings via mmap).
+    """
+    index = BM25Index.build(chunks, k1=k1, b=b)
+    index.save(path)
+    print(f"✅ Índice lexical (BM25) gravado: {len(index)} chunks, {index.num_terms} termos")
+    print(f"   Caminho: {path}")
+    
+    # Descarta a versão anterior carregada neste processo; motores passam a
+    # usar a nova, e o build_id novo invalida resultados lexicais cacheados
+    with _lexical_indexes_lock:
+        _lexical_indexes.pop(os.path.abspath(path), None)
+    return get_lexical_index(path)
@@ -0,0 +1,256 @@
+"""
+Módulo de particionamento de namespaces por metadado.
+
+Na ingestão particionada cada vetor vai para um namespace derivado de um
+campo de metadados (ex: faixa de anos de 5 em 5, ou o valor exato de
+final_decision): <base>__<campo>__<partição>. Na query, o roteador envia uma
+busca filtrada por esse campo só às partições que podem conter resultados;
+buscas sem filtro no campo vão a todas as partições em paralelo e os top_k
+são combinados por score.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import re
+import threading
+import time
+
+from config.settings import Settings
+
+
+# Partição de vetores sem o campo (ou com valor não numérico em faixas)
+UNKNOWN_PARTITION = "unknown"
+
+# Intervalo de redescoberta das partições existentes no índice
+_REFRESH_SECONDS = 60.0
+
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9_-]+")
+
+
+def _sanitize(value: Any) -> str:
+    """Converte um valor de metadado em um nome seguro de partição."""
+    return _UNSAFE_CHARS.sub("_", str(value).strip()).strip("_") or UNKNOWN_PARTITION
+
+
+def _as_number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class PartitionScheme:
+    """
+    Regra de particionamento: campo de metadados e tamanho da faixa.
+    
+    Com bucket_size > 0 o campo é tratado como numérico e agrupado em faixas
+    (year=2011, bucket_size=5 → partição '2010-2014'); com bucket_size = 0
+    cada valor exato vira uma partição.
+    """
+    
+    def __init__(self, field: str, bucket_size: int = 0):
+        """
+        Args:
+            field: Campo de metadados usado no particionamento (ex: 'year').
+            bucket_size: Largura das faixas numéricas (0 = valores exatos).
+        """
+        if not field:
+            raise ValueError("field não pode ser vazio")
+        if bucket_size < 0:
+            raise ValueError(f"bucket_size deve ser >= 0: {bucket_size}")
+        
+        self.field = field
+        self.bucket_size = bucket_size
+    
+    @classmethod
+    def from_settings(cls) -> Optional["PartitionScheme"]:
+        """Esquema de PARTITION_FIELD/PARTITION_BUCKET_SIZE (None se desligado)."""
+        settings = Settings()
+        if not settings.PARTITION_FIELD:
+            return None
+        return cls(settings.PARTITION_FIELD, settings.PARTITION_BUCKET_SIZE)
+    
+    def partition_for(self, metadata: Dict[str, Any]) -> str:
+        """
+        Retorna a partição de um vetor a partir dos seus metadados.
+        
+        Args:
+            metadata: Metadados do chunk.
+        
+        Returns:
+            Nome da partição.
+        """
+        value = metadata.get(self.field)
+        if value is None or value == "":
+            return UNKNOWN_PARTITION
+        if not self.bucket_size:
+            return _sanitize(value)
+        
+        number = _as_number(value)
+        if number is None:
+            return UNKNOWN_PARTITION
+        start = int(number // self.bucket_size) * self.bucket_size
+        return f"{start}-{start + self.bucket_size - 1}"
+    
+    def namespace_prefix(self, base_namespace: Optional[str]) -> str:
+        """Prefixo comum dos namespaces das partições."""
+        return f"{base_namespace or 'default'}__{_sanitize(self.field)}__"
+    
+    def namespace_for(self, base_namespace: Optional[str], partition: str) -> str:
+        """Namespace de uma partição."""
+        return self.namespace_prefix(base_namespace) + partition
+    
+    def _range(self, partition: str) -> Optional[Tuple[float, float]]:
+        if partition == UNKNOWN_PARTITION:
+            return None
+        start, _, end = partition.partition("-")
+        low, high = _as_number(start), _as_number(end)
+        if low is None or high is None:
+            return None
+        return low, high + 1
+    
+    def _may_match(self, partition: str, operator: str, operand: Any) -> bool:
+        """True se a partição pode conter valores que satisfazem a condição."""
+        if operator in ("$ne", "$nin", "$exists"):
+            # Só exclui partições de valor exato inteiramente iguais ao operando
+            if operator == "$exists" or self.bucket_size:
+                return True
+            excluded = operand if operator == "$nin" else [operand]
+            return partition not in {_sanitize(value) for value in excluded}
+        
+        if partition == UNKNOWN_PARTITION:
+            return False
+        
+        if not self.bucket_size:
+            if operator == "$eq":
+                return partition == _sanitize(operand)
+            if operator == "$in":
+                return partition in {_sanitize(value) for value in operand}
+            return True
+        
+        bounds = self._range(partition)
+        if bounds is None:
+            return True
+        low, high = bounds
+        if operator == "$in":
+            return any(self._may_match(partition, "$eq", value) for value in operand)
+        number = _as_number(operand)
+        if number is None:
+            return True
+        if operator == "$eq":
+            return low <= number < high
+        if operator in ("$gt", "$gte"):
+            # Conservador: a faixa [low, high) pode conter valores > number
+            return high > number
+        if operator == "$lt":
+            return low < number
+        if operator == "$lte":
+            return low <= number
+        return True
+    
+    def select(self, partitions: List[str], pinecone_filter: Optional[Dict[str, Any]]) -> List[str]:
+        """
+        Seleciona as partições que podem satisfazer o filtro.
+        
+        Args:
+            partitions: Partições existentes.
+            pinecone_filter: Filtro no formato Pinecone (ver _prepare_pinecone_filter).
+        
+        Returns:
+            Partições a consultar (todas, se o filtro não restringe o campo).
+        """
+        condition = (pinecone_filter or {}).get(self.field)
+        if condition is None:
+            return list(partitions)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        
+        return [
+            partition for partition in partitions
+            if all(self._may_match(partition, operator, operand) for operator, operand in condition.items())
+        ]
+
+
+class PartitionRouter:
+    """
+    Roteia queries para os namespaces das partições.
+    
+    As partições existentes são descobertas em describe_index_stats (pelo
+    prefixo do namespace base) e redescobertas periodicamente.
+    """
+    
+    def __init__(self, scheme: PartitionScheme, vector_store):
+        """
+        Args:
+            scheme: Esquema de particionamento usado na ingestão.
+            vector_store: Vector store consultado.
+        """
+        self.scheme = scheme
+        self.vector_store = vector_store
+        self._lock = threading.Lock()
+        self._partitions: Dict[str, Tuple[float, List[str]]] = {}
+    
+    def partitions(self, base_namespace: Optional[str], refresh: bool = False) -> List[str]:
+        """
+        Lista as partições do namespace base existentes no índice.
+        
+        Args:
+            base_namespace: Namespace base da ingestão particionada.
+            refresh: Se True, ignora a lista em cache.
+        
+        Returns:
+            Nomes das partições (vazio se o namespace não é particionado).
+        """
+        key = base_namespace or ""
+        cached = self._partitions.get(key)
+        if cached is not None and not refresh and time.monotonic() - cached[0] < _REFRESH_SECONDS:
+            return cached[1]
+        
+        with self._lock:
+            prefix = self.scheme.namespace_prefix(base_namespace)
+            namespaces = self.vector_store.describe_index_stats().get("namespaces", {})
+            partitions = sorted(
+                name[len(prefix):] for name, stats in namespaces.items()
+                if name.startswith(prefix) and (stats or {}).get("vector_count", 1)
+            )
+            self._partitions[key] = (time.monotonic(), partitions)
+        return partitions
+    
+    def route(
+        self,
+        base_namespace: Optional[str],
+        pinecone_filter: Optional[Dict[str, Any]]
+    ) -> Optional[List[str]]:
+        """
+        Retorna os namespaces a consultar para o filtro.
+        
+        Args:
+            base_namespace: Namespace base da query.
+            pinecone_filter: Filtro no formato Pinecone.
+        
+        Returns:
+            Lista de namespaces das partições selecionadas (pode ser vazia se
+            o filtro exclui todas), ou None se o namespace não é particionado.
+        """
+        partitions = self.partitions(base_namespace)
+        if not partitions:
+            return None
+        return [
+            self.scheme.namespace_for(base_namespace, partition)
+            for partition in self.scheme.select(partitions, pinecone_filter)
+        ]
+
+
+def merge_matches(match_lists: List[List[Dict[str, Any]]], top_k: int) -> List[Dict[str, Any]]:
+    """
+    Combina os matches de várias partições nos top_k de maior score.
+    
+    Args:
+        match_lists: Matches de cada namespace consultado.
+        top_k: Número de resultados.
+    
+    Returns:
+        Matches ordenados por score (decrescente).
+    """
+    merged = [match for matches in match_lists for match in matches]
+    merged.sort(key=lambda match: match.get("score", 0.0), reverse=True)
+    return merged[:top_k]
@@ -5,15 +5,29 @@ Este módulo gerencia a conexão com Pinecone e a ingestão de documentos
 com embeddings e metadados estruturados.
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
+import hashlib
 import time
-import json
 import os
 from pathlib import Path
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from config.settings import Settings
-from .embeddings_manager import EmbeddingsManager
+from .embeddings_manager import EmbeddingsManager, embedding_signature
+from .ingestion_checkpoint import IngestionCheckpoint
+from .ingestion_ledger import IngestionLedger
+from .chunk_store import ChunkTextStore, split_metadata
+from .upsert_batcher import UpsertBatcher, UpsertRequest
+from .vector_store import create_vector_store, store_identity, vector_id_for
+from .telemetry import IngestionTelemetry, record_tenacity_retry
+from .query_cache import IngestionEpochs
+from .partitioning import PartitionScheme
+from .article_vectors import ARTICLE_VECTOR_MODES, article_vector_id, build_article_vectors
+from .embedding_snapshot import (
+    EmbeddingSnapshotWriter,
+    export_snapshot_from_index,
+    load_snapshot_into_store,
+)
 
 
 class PineconeIngester:
@@ -32,7 +46,10 @@ class PineconeIngester:
         embeddings_manager: Optional[EmbeddingsManager] = None,
         index_name: Optional[str] = None,
         namespace: Optional[str] = None,
-        api_key: Optional[str] = None
+        api_key: Optional[str] = None,
+        chunk_text_store_path: Optional[str] = None,
+        backend: Optional[str] = None,
+        checkpoint_suffix: Optional[str] = None
     ):
         """
         Inicializa o ingester do Pinecone.
@@ -42,6 +59,11 @@ class PineconeIngester:
             index_name: Nome do índice Pinecone. Se None, usa das configurações.
             namespace: Namespace do Pinecone. Se None, usa das configurações.
             api_key: API key do Pinecone. Se None, usa das configurações.
+            chunk_text_store_path: SQLite para textos dos chunks. Se definido
+                (ou CHUNK_TEXT_STORE_PATH), o índice recebe só metadados filtráveis.
+            backend: 'pinecone', 'local' ou 'ivfpq'. Se None, usa VECTOR_STORE_BACKEND.
+            checkpoint_suffix: Sufixo do arquivo de checkpoint (ex: 'shard0of4'),
+                para processos que ingerem partições do mesmo índice/namespace.
         """
         self.settings = Settings()
         
@@ -49,8 +71,12 @@ class PineconeIngester:
         self.index_name = index_name or self.settings.PINECONE_INDEX_NAME
         self.namespace = namespace or self.settings.PINECONE_NAMESPACE
         self.api_key = api_key or self.settings.PINECONE_API_KEY
+        self.backend = (backend or self.settings.VECTOR_STORE_BACKEND).lower()
+        self.checkpoint_suffix = checkpoint_suffix
+        # Namespaces cujas épocas avançam junto com a do namespace em ingestão
+        self._epoch_namespaces: List[Optional[str]] = []
         
-        if not self.api_key:
+        if self.backend == 'pinecone' and not self.api_key:
             raise ValueError(
                 "PINECONE_API_KEY não configurada. "
                 "Configure no arquivo .env ou passe como parâmetro."
@@ -62,7 +88,7 @@ class PineconeIngester:
         else:
             self.embeddings_manager = embeddings_manager
         
-        # Inicializa cliente Pinecone
+        # Inicializa vector store (Pinecone ou local)
         self._init_pinecone()
         
         # Valida compatibilidade de dimensões
@@ -78,24 +104,38 @@ class PineconeIngester:
         
         self.checkpoint_dir = checkpoint_base / "checkpoints"
         self.checkpoint_dir.mkdir(exist_ok=True)
+        
+        # Store externo de textos (opcional)
+        text_store_path = chunk_text_store_path or self.settings.CHUNK_TEXT_STORE_PATH
+        self.chunk_text_store = ChunkTextStore(text_store_path) if text_store_path else None
+        
+        # Telemetria por etapa (reiniciada a cada ingest_chunks)
+        self.telemetry = IngestionTelemetry()
+        
+        # Snapshot de embeddings gravado durante ingest_chunks (opcional)
+        self._snapshot_writer: Optional[EmbeddingSnapshotWriter] = None
     
     def _init_pinecone(self):
-        """Inicializa cliente Pinecone."""
+        """Inicializa o vector store do backend configurado (Pinecone ou local)."""
         try:
-            from pinecone import Pinecone
-            
-            self.pinecone_client = Pinecone(api_key=self.api_key)
-            self.index = self.pinecone_client.Index(self.index_name)
+            # pool_threads dimensiona o pool de conexões para upserts paralelos
+            self.index = create_vector_store(
+                backend=self.backend,
+                index_name=self.index_name,
+                api_key=self.api_key,
+                dimension=self.embeddings_manager.get_embedding_dimension(),
+                pool_threads=self.settings.UPSERT_WORKERS
+            )
             
-            print(f"✅ Pinecone inicializado: índice '{self.index_name}'")
+            if self.backend in ('local', 'ivfpq'):
+                print(f"✅ Vector store local inicializado: {self.index.path}")
+            else:
+                print(f"✅ Pinecone inicializado: índice '{self.index_name}'")
             if self.namespace:
                 print(f"   Namespace: {self.namespace}")
             
-        except ImportError:
-            raise ImportError(
-                "pinecone não instalado. "
-                "Instale com: pip install pinecone"
-            )
+        except (ImportError, ValueError):
+            raise
         except Exception as e:
             raise RuntimeError(f"Erro ao inicializar Pinecone: {e}")
     
@@ -129,9 +169,11 @@ class PineconeIngester:
                     pass
             
             print(f"   Dimensão dos embeddings: {embedding_dim}")
+            if self.embeddings_manager.output_dimension:
+                print("   (dimensão reduzida via EMBEDDING_DIMENSION)")
             
             # Se conseguiu obter a dimensão do índice, valida compatibilidade
-            if index_dimension is not None:
+            if index_dimension:
                 print(f"   Dimensão do índice Pinecone: {index_dimension}")
                 
                 if embedding_dim != index_dimension:
@@ -147,6 +189,8 @@ class PineconeIngester:
                         print("      - Ou recrie o índice Pinecone com 768 dimensões")
                     elif index_dimension == 768:
                         print("      - O modelo atual (Gemini text-embedding-004) está correto")
+                    if index_dimension < embedding_dim:
+                        print(f"      - Ou reduza a dimensão dos embeddings: EMBEDDING_DIMENSION={index_dimension}")
                     print("\n   2. Se o índice foi criado com 'llama-text-embed-v2' (1024 dims):")
                     print("      - Use Ollama com modelo compatível (ex: mxbai-embed-large)")
                     print("      - Ou recrie o índice com 768 dimensões para usar Gemini")
@@ -174,17 +218,19 @@ class PineconeIngester:
         Returns:
             ID único no formato: article_{article_id}_chunk_{chunk_index}
         """
-        return f"article_{article_id}_chunk_{chunk_index}"
+        return vector_id_for(article_id, chunk_index)
     
     def _prepare_vectors(
         self,
-        chunks: List[Dict[str, Any]]
+        chunks: List[Dict[str, Any]],
+        quiet: bool = False
     ) -> List[Dict[str, Any]]:
         """
         Prepara vetores para ingestão no Pinecone.
         
         Args:
             chunks: Lista de chunks com campos "text", "article_id", "metadata".
+            quiet: Se True, não imprime a mensagem por lote.
             
         Returns:
             Lista de dicionários no formato Pinecone:
@@ -198,11 +244,18 @@ class PineconeIngester:
         texts = [chunk["text"] for chunk in chunks]
         
         # Gera embeddings em lote
-        print(f"   Gerando embeddings para {len(texts)} chunks...")
-        embeddings = self.embeddings_manager.embed_documents(texts)
+        if not quiet:
+            print(f"   Gerando embeddings para {len(texts)} chunks...")
+        with self.telemetry.stage("embedding"):
+            embeddings = self.embeddings_manager.embed_documents(texts)
+        self.telemetry.incr("embedding_calls")
+        self.telemetry.incr("chunks_embedded", len(texts))
         
         # Prepara vetores
         vectors = []
+        external_fields = []
+        full_metadatas = []
+        metadata_start = time.perf_counter()
         
         for chunk, embedding in zip(chunks, embeddings):
             vector_id = self._create_vector_id(
@@ -210,11 +263,13 @@ class PineconeIngester:
                 chunk["chunk_index"]
             )
             
-            # Prepara metadados (Pinecone requer valores primitivos)
-            metadata = self._prepare_metadata(chunk.get("metadata", {}))
+            metadata = self._build_metadata(chunk)
+            full_metadatas.append(metadata)
             
-            # Adiciona texto aos metadados para recuperação
-            metadata["text"] = chunk["text"]
+            # Texto e campos repetidos vão para o store local, não para o índice
+            if self.chunk_text_store is not None:
+                metadata, external = split_metadata(metadata)
+                external_fields.append((vector_id, external))
             
             vectors.append({
                 "id": vector_id,
@@ -222,8 +277,40 @@ class PineconeIngester:
                 "metadata": metadata,
             })
         
+        self.telemetry.add_time("metadata", time.perf_counter() - metadata_start)
+        
+        # Snapshot guarda metadados completos (independe do store de textos)
+        if self._snapshot_writer is not None:
+            with self.telemetry.stage("snapshot"):
+                self._snapshot_writer.append(
+                    [vector["id"] for vector in vectors], embeddings, full_metadatas
+                )
+        
+        # Grava os textos antes do upsert para que queries sempre os encontrem
+        if external_fields:
+            with self.telemetry.stage("text_store"):
+                self.chunk_text_store.put_many(external_fields)
+        
         return vectors
     
+    def _build_metadata(self, chunk: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Monta os metadados de um chunk como serão gravados no índice.
+        
+        Args:
+            chunk: Chunk com campos "text" e "metadata".
+            
+        Returns:
+            Metadados preparados, incluindo o texto do chunk.
+        """
+        # Prepara metadados (Pinecone requer valores primitivos)
+        metadata = self._prepare_metadata(chunk.get("metadata", {}))
+        
+        # Adiciona texto aos metadados para recuperação
+        metadata["text"] = chunk["text"]
+        
+        return metadata
+    
     def _prepare_metadata(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
         """
         Prepara metadados para formato compatível com Pinecone.
@@ -255,7 +342,8 @@ class PineconeIngester:
     
     @retry(
         stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10)
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        before_sleep=record_tenacity_retry("upsert")
     )
     def _upsert_batch(self, vectors: List[Dict[str, Any]]):
         """
@@ -265,48 +353,172 @@ class PineconeIngester:
             vectors: Lista de vetores para inserir.
         """
         try:
-            if self.namespace:
+            with self.telemetry.stage("upsert"):
                 self.index.upsert(vectors=vectors, namespace=self.namespace)
-            else:
-                self.index.upsert(vectors=vectors)
         except Exception as e:
+            self.telemetry.incr("upsert_failures")
             print(f"⚠️  Erro ao inserir lote: {e}")
             raise
     
     def _get_checkpoint_path(self) -> Path:
-        """Retorna o caminho do arquivo de checkpoint."""
-        checkpoint_name = f"ingestion_checkpoint_{self.index_name}_{self.namespace or 'default'}.json"
-        return self.checkpoint_dir / checkpoint_name
-    
-    def _save_checkpoint(self, processed_indices: List[int], total_chunks: int):
-        """Salva checkpoint do progresso."""
-        checkpoint_data = {
-            "processed_indices": processed_indices,
-            "total_chunks": total_chunks,
-            "index_name": self.index_name,
-            "namespace": self.namespace,
-            "timestamp": time.time()
-        }
-        checkpoint_path = self._get_checkpoint_path()
-        with open(checkpoint_path, 'w') as f:
-            json.dump(checkpoint_data, f, indent=2)
-    
-    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
-        """Carrega checkpoint do progresso."""
-        checkpoint_path = self._get_checkpoint_path()
-        if checkpoint_path.exists():
-            try:
-                with open(checkpoint_path, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"⚠️  Erro ao carregar checkpoint: {e}")
-        return None
+        """Retorna o caminho do snapshot de checkpoint."""
+        return self._get_checkpoint().snapshot_path
+    
+    def _store_identity(self) -> str:
+        """
+        Identifica o backend e o local do índice.
+        
+        Returns:
+            '<backend>:<caminho do store local>' ou '<backend>:<host ou nome do índice>'.
+        """
+        return store_identity(self.backend, self.index_name, self.index)
+    
+    def _store_key(self) -> str:
+        """Sufixo de arquivo do store: backend + hash curto da identidade."""
+        digest = hashlib.sha1(self._store_identity().encode("utf-8")).hexdigest()[:8]
+        return f"{self.backend}_{digest}"
+    
+    def _get_checkpoint(self) -> IngestionCheckpoint:
+        """Retorna o checkpoint (chaveado por ID de vetor) deste store/índice/namespace."""
+        checkpoint_name = (
+            f"ingestion_checkpoint_{self.index_name}_{self.namespace or 'default'}_{self._store_key()}"
+        )
+        if self.checkpoint_suffix:
+            checkpoint_name += f"_{self.checkpoint_suffix}"
+        return IngestionCheckpoint(
+            self.checkpoint_dir / checkpoint_name,
+            index_name=self.index_name,
+            namespace=self.namespace,
+            embedding_dimension=self.embeddings_manager.get_embedding_dimension(),
+            store=self._store_identity(),
+        )
     
     def _clear_checkpoint(self):
         """Remove checkpoint."""
-        checkpoint_path = self._get_checkpoint_path()
-        if checkpoint_path.exists():
-            checkpoint_path.unlink()
+        self._get_checkpoint().clear()
+    
+    def _get_ledger(self) -> IngestionLedger:
+        """Retorna o ledger de ingestão (vector_id → hash) deste store/índice."""
+        if getattr(self, "_ledger", None) is None:
+            self._ledger = IngestionLedger(
+                self.checkpoint_dir / f"ingestion_ledger_{self.index_name}_{self._store_key()}.sqlite"
+            )
+        return self._ledger
+    
+    def _train_index(self):
+        """
+        Treina o índice aproximado do store, se houver (backend ivfpq), ao fim
+        da ingestão: fora dos checkpoints e sem bloquear as queries.
+        """
+        if hasattr(self.index, "train_pending"):
+            with self.telemetry.stage("index_build"):
+                trained = self.index.train_pending(self.namespace)
+            if trained:
+                print(f"🧭 Índice IVF-PQ treinado: {', '.join(trained)}")
+    
+    def _embedding_signature(self) -> str:
+        """Identifica provider, modelo e dimensão dos embeddings."""
+        return embedding_signature(self.embeddings_manager)
+    
+    def _metadata_layout(self) -> str:
+        """Layout dos metadados gravados: 'inline' ou 'external:<store de textos>'."""
+        if self.chunk_text_store is None:
+            return "inline"
+        return f"external:{self.chunk_text_store.path.resolve()}"
+    
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        before_sleep=record_tenacity_retry("delete")
+    )
+    def _delete_batch(self, vector_ids: List[str]):
+        """
+        Deleta um lote de vetores por ID (com retry).
+        
+        Args:
+            vector_ids: IDs a deletar (máximo 1000 por chamada no Pinecone).
+        """
+        with self.telemetry.stage("delete"):
+            self.index.delete(ids=vector_ids, namespace=self.namespace)
+    
+    def _delete_ids(self, vector_ids: List[str], batch_size: int = 1000) -> int:
+        """
+        Deleta vetores do índice em lotes e os remove do ledger.
+        
+        Returns:
+            Número de vetores deletados.
+        """
+        deleted = 0
+        for start in range(0, len(vector_ids), batch_size):
+            batch = vector_ids[start:start + batch_size]
+            self._delete_batch(batch)
+            self._get_ledger().remove(self.namespace, batch)
+            if self.chunk_text_store is not None:
+                self.chunk_text_store.delete(batch)
+            deleted += len(batch)
+        return deleted
+    
+    def _list_index_ids(self, prefix: str = "article_", namespace: Optional[str] = None) -> List[str]:
+        """
+        Lista os IDs do namespace no índice (paginação em lotes do Pinecone).
+        
+        Args:
+            prefix: Prefixo dos IDs a listar.
+            namespace: Namespace. Se None, usa o namespace configurado.
+        """
+        ids: List[str] = []
+        for page in self.index.list(prefix=prefix, namespace=namespace or self.namespace):
+            ids.extend(page)
+        return ids
+    
+    def verify_ledger(self, delete_orphans: bool = False, prefix: str = "article_") -> Dict[str, Any]:
+        """
+        Reconcilia o ledger com o conteúdo real do índice.
+        
+        - IDs no ledger mas ausentes do índice são removidos do ledger, para
+          que a próxima ingestão incremental os reenvie.
+        - IDs no índice mas ausentes do ledger (órfãos) são reportados e,
+          com delete_orphans=True, deletados do índice.
+        
+        Args:
+            delete_orphans: Se True, deleta os vetores órfãos do índice.
+            prefix: Prefixo dos IDs a listar no índice.
+            
+        Returns:
+            Dicionário com contagens de reconciliação.
+        """
+        ledger = self._get_ledger()
+        
+        print(f"🔎 Verificando ledger do namespace '{self.namespace or '(padrão)'}'...")
+        index_ids = set(self._list_index_ids(prefix=prefix))
+        ledger_ids = {i for i in ledger.all_ids(self.namespace) if i.startswith(prefix)}
+        
+        missing_in_index = sorted(ledger_ids - index_ids)
+        orphans_in_index = sorted(index_ids - ledger_ids)
+        
+        if missing_in_index:
+            ledger.remove(self.namespace, missing_in_index)
+        
+        deleted_orphans = 0
+        if delete_orphans and orphans_in_index:
+            for start in range(0, len(orphans_in_index), 1000):
+                self._delete_batch(orphans_in_index[start:start + 1000])
+            deleted_orphans = len(orphans_in_index)
+            self._bump_epoch()
+        
+        print(f"   Vetores no índice: {len(index_ids)}")
+        print(f"   Vetores no ledger: {len(ledger_ids)}")
+        print(f"   Ausentes do índice (removidos do ledger): {len(missing_in_index)}")
+        print(f"   Órfãos no índice: {len(orphans_in_index)}"
+              + (f" (deletados: {deleted_orphans})" if delete_orphans else ""))
+        
+        return {
+            "index_vectors": len(index_ids),
+            "ledger_vectors": len(ledger_ids),
+            "missing_in_index": len(missing_in_index),
+            "orphans_in_index": len(orphans_in_index),
+            "deleted_orphans": deleted_orphans,
+        }
     
     def ingest_chunks(
         self,
@@ -314,17 +526,59 @@ class PineconeIngester:
         batch_size: Optional[int] = None,
         show_progress: bool = True,
         resume_from_checkpoint: bool = True,
-        checkpoint_interval: int = 10
+        checkpoint_interval: int = 10,
+        pipelined: bool = False,
+        max_workers: Optional[int] = None,
+        incremental: bool = False,
+        delete_stale: bool = True,
+        stale_scope: str = "articles",
+        quiet: bool = False,
+        metrics_path: Optional[str] = None,
+        metrics_format: Optional[str] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        snapshot_path: Optional[str] = None,
+        article_vectors: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Ingere chunks no Pinecone em lotes com suporte a checkpointing.
         
+        No modo pipelined, o embedding do lote N+1 é gerado enquanto os
+        upserts do lote N rodam em um pool limitado de threads, então o
+        throughput se aproxima do lado mais lento (embedding ou upsert)
+        em vez da soma dos dois.
+        
         Args:
             chunks: Lista de chunks para ingerir.
             batch_size: Tamanho do lote. Se None, usa das configurações.
             show_progress: Se True, exibe barra de progresso.
             resume_from_checkpoint: Se True, tenta retomar de checkpoint existente.
-            checkpoint_interval: Intervalo (em lotes) para salvar checkpoint.
+            checkpoint_interval: Intervalo (em lotes) para anexar o progresso
+                ao log de checkpoint.
+            pipelined: Se True, sobrepõe embeddings e upserts paralelos.
+            max_workers: Número de upserts simultâneos no modo pipelined.
+                Se None, usa UPSERT_WORKERS das configurações.
+            incremental: Se True, usa o ledger (vector_id → hash) para enviar
+                apenas vetores novos ou alterados.
+            delete_stale: No modo incremental, deleta do índice os vetores
+                registrados no ledger que não existem mais no corpus.
+            stale_scope: 'articles' considera obsoletos apenas IDs de artigos
+                presentes nesta execução; 'all' considera todo o namespace.
+            quiet: Se True, suprime as mensagens por lote (embedding e checkpoint).
+            metrics_path: Arquivo para exportar a telemetria a cada checkpoint e
+                no final. Se None, usa INGEST_METRICS_PATH (vazio = não exporta).
+            metrics_format: 'jsonl' (uma linha por snapshot) ou 'prometheus'
+                (textfile). Se None, usa INGEST_METRICS_FORMAT.
+            progress_callback: Função chamada com (chunks concluídos, total) no
+                início e após cada upsert confirmado (ex: progresso agregado
+                da ingestão multiprocesso).
+            snapshot_path: Diretório de um snapshot de embeddings gravado junto
+                com a ingestão (vetores + metadados), para reindexar depois
+                com load_snapshot() sem gerar embeddings de novo. No resume,
+                o snapshot existente é continuado.
+            article_vectors: Vetores por artigo gravados ao fim da ingestão
+                (ver build_article_vectors): 'mean', 'question' ou 'none'. Se
+                None, usa ARTICLE_VECTORS. No modo incremental, só os artigos
+                com chunks novos/alterados são recalculados.
             
         Returns:
             Dicionário com estatísticas da ingestão:
@@ -333,6 +587,18 @@ class PineconeIngester:
                 - batches: Número de lotes
                 - errors: Lista de erros (se houver)
                 - interrupted: Se True, processo foi interrompido
+                - pipelined: Se o modo pipelined foi usado
+                - elapsed_seconds: Duração da ingestão
+                - vectors_per_second: Throughput de vetores inseridos
+                - skipped_unchanged: Chunks pulados pelo ledger (modo incremental)
+                - deleted_stale: Vetores obsoletos deletados (modo incremental)
+                - upsert_requests: Número de requisições de upsert enviadas
+                - bytes_sent / avg_request_bytes / max_request_bytes: Tamanho
+                  (JSON serializado) das requisições de upsert
+                - telemetry: Tempo por etapa, contadores e retries por causa
+                  (ver IngestionTelemetry.snapshot)
+                - article_vectors: Estatísticas de build_article_vectors
+                  (None se desligado)
         """
         if not chunks:
             return {
@@ -344,124 +610,786 @@ class PineconeIngester:
             }
         
         batch_size = batch_size or self.settings.BATCH_SIZE
+        max_workers = max_workers or self.settings.UPSERT_WORKERS
+        metrics_path = metrics_path or self.settings.INGEST_METRICS_PATH
+        metrics_format = (metrics_format or self.settings.INGEST_METRICS_FORMAT).lower()
+        if metrics_format not in ("jsonl", "prometheus"):
+            raise ValueError(f"metrics_format inválido: {metrics_format}. Use 'jsonl' ou 'prometheus'.")
+        article_vectors = (article_vectors or self.settings.ARTICLE_VECTORS).lower()
+        if article_vectors != "none" and article_vectors not in ARTICLE_VECTOR_MODES:
+            raise ValueError(f"article_vectors inválido: {article_vectors}. Use 'mean', 'question' ou 'none'.")
+        self.telemetry = IngestionTelemetry()
         total_chunks = len(chunks)
-        total_vectors = 0
         errors = []
-        processed_indices = []
-        start_index = 0
         interrupted = False
+        deleted_stale = 0
         
-        # Tenta carregar checkpoint
+        # Checkpoint chaveado por ID de vetor: tolera chunks inseridos,
+        # removidos ou reordenados entre execuções
+        checkpoint = self._get_checkpoint()
         if resume_from_checkpoint:
-            checkpoint = self._load_checkpoint()
-            if checkpoint:
-                if (checkpoint.get("total_chunks") == total_chunks and
-                    checkpoint.get("index_name") == self.index_name and
-                    checkpoint.get("namespace") == self.namespace):
-                    processed_indices = checkpoint.get("processed_indices", [])
-                    start_index = max(processed_indices) + 1 if processed_indices else 0
-                    total_vectors = len(processed_indices)
-                    print(f"\n📋 Checkpoint encontrado! Retomando de índice {start_index}")
-                    print(f"   Já processados: {total_vectors}/{total_chunks} chunks")
+            if checkpoint.load():
+                print(f"\n📋 Checkpoint encontrado! Retomando ingestão")
+                print(f"   Já processados (checkpoint): {len(checkpoint)} vetores")
+        else:
+            checkpoint.clear()
+        checkpoint.start()
+        
+        vector_ids = [
+            self._create_vector_id(chunk["article_id"], chunk["chunk_index"])
+            for chunk in chunks
+        ]
+        pending_positions = [
+            i for i, vector_id in enumerate(vector_ids)
+            if not checkpoint.is_done(vector_id)
+        ]
+        
+        # Modo incremental: pula vetores cujo hash de conteúdo não mudou
+        content_hashes = None
+        stale_ids: List[str] = []
+        skipped_unchanged = 0
+        unchanged_positions = set()
+        if incremental:
+            if stale_scope not in ("articles", "all"):
+                raise ValueError(f"stale_scope inválido: {stale_scope}. Use 'articles' ou 'all'.")
+            
+            ledger = self._get_ledger()
+            # Inclui o layout dos metadados: ligar/desligar (ou trocar) o store
+            # de textos muda o que é gravado no índice, então força regravação
+            signature = f"{self._embedding_signature()}|{self._metadata_layout()}"
+            content_hashes = [
+                IngestionLedger.content_hash(chunk["text"], self._build_metadata(chunk), signature)
+                for chunk in chunks
+            ]
+            known_hashes = ledger.get_hashes(self.namespace, vector_ids)
+            
+            changed_positions = [
+                i for i in pending_positions
+                if known_hashes.get(vector_ids[i]) != content_hashes[i]
+            ]
+            skipped_unchanged = len(pending_positions) - len(changed_positions)
+            unchanged_positions = set(pending_positions) - set(changed_positions)
+            pending_positions = changed_positions
+            self.telemetry.incr("skipped_unchanged", skipped_unchanged)
+            
+            if delete_stale:
+                if stale_scope == "all":
+                    registered = ledger.all_ids(self.namespace)
                 else:
-                    print("⚠️  Checkpoint incompatível (diferentes chunks/índice). Ignorando...")
-                    self._clear_checkpoint()
+                    registered = ledger.ids_for_articles(
+                        self.namespace,
+                        sorted({str(chunk["article_id"]) for chunk in chunks})
+                    )
+                stale_ids = sorted(registered - set(vector_ids))
+            
+            print(f"\n📒 Ledger: {skipped_unchanged} chunks inalterados, "
+                  f"{len(pending_positions)} novos/alterados, {len(stale_ids)} obsoletos")
+        
+        batches = [
+            pending_positions[i:i + batch_size]
+            for i in range(0, len(pending_positions), batch_size)
+        ]
+        total_vectors = total_chunks - len(pending_positions)
         
         print(f"\n🚀 Iniciando ingestão de {total_chunks} chunks no Pinecone...")
         print(f"   Batch size: {batch_size}")
         print(f"   Índice: {self.index_name}")
         if self.namespace:
             print(f"   Namespace: {self.namespace}")
-        if start_index > 0:
-            print(f"   Retomando de: {start_index}/{total_chunks}")
+        if pipelined:
+            print(f"   Modo pipelined: {max_workers} upserts simultâneos")
+        if total_vectors:
+            print(f"   Restantes: {len(pending_positions)}/{total_chunks}")
         
-        # Processa em lotes
-        try:
-            from tqdm import tqdm
-            iterator = range(start_index, total_chunks, batch_size)
-            if show_progress:
-                iterator = tqdm(iterator, desc="Ingerindo chunks", initial=start_index, total=total_chunks)
-        except ImportError:
-            iterator = range(start_index, total_chunks, batch_size)
+        progress = None
+        if show_progress:
+            try:
+                from tqdm import tqdm
+                progress = tqdm(desc="Ingerindo chunks", initial=total_vectors, total=total_chunks)
+            except ImportError:
+                progress = None
+        
+        state = {
+            "checkpoint": checkpoint,
+            "vector_ids": vector_ids,
+            "content_hashes": content_hashes,
+            "chunks": chunks,
+            "request_bytes": [],
+            "total_vectors": total_vectors,
+            "errors": errors,
+            "completed_batches": 0,
+            "quiet": quiet,
+            "metrics_path": metrics_path,
+            "metrics_format": metrics_format,
+            "progress_callback": progress_callback,
+        }
+        if progress_callback is not None:
+            progress_callback(total_vectors, total_chunks)
+        start_time = time.time()
+        
+        if snapshot_path:
+            self._snapshot_writer = EmbeddingSnapshotWriter(
+                snapshot_path,
+                dimension=self.embeddings_manager.get_embedding_dimension(),
+                append=resume_from_checkpoint,
+                info={
+                    "source": "ingest",
+                    "index_name": self.index_name,
+                    "namespace": self.namespace or "",
+                    "embedding_signature": self._embedding_signature(),
+                }
+            )
         
         try:
-            batch_num = 0
-            for i in iterator:
-                batch_chunks = chunks[i:i + batch_size]
-                batch_num += 1
-                
-                try:
-                    # Prepara vetores do lote
-                    vectors = self._prepare_vectors(batch_chunks)
-                    
-                    # Insere no Pinecone
-                    self._upsert_batch(vectors)
-                    
-                    # Marca índices como processados
-                    batch_indices = list(range(i, min(i + batch_size, total_chunks)))
-                    processed_indices.extend(batch_indices)
-                    total_vectors += len(vectors)
-                    
-                    # Salva checkpoint periodicamente
-                    if batch_num % checkpoint_interval == 0:
-                        self._save_checkpoint(processed_indices, total_chunks)
-                        if show_progress:
-                            print(f"\n💾 Checkpoint salvo: {total_vectors}/{total_chunks} chunks processados")
-                    
-                    # Pequena pausa para evitar rate limiting
-                    if i + batch_size < total_chunks:
-                        time.sleep(0.1)
-                        
-                except KeyboardInterrupt:
-                    # Salva checkpoint antes de interromper
-                    print(f"\n\n⚠️  Interrupção detectada! Salvando checkpoint...")
-                    self._save_checkpoint(processed_indices, total_chunks)
-                    interrupted = True
-                    raise
-                except Exception as e:
-                    error_msg = f"Erro no lote {i//batch_size + 1}: {e}"
-                    errors.append(error_msg)
-                    print(f"⚠️  {error_msg}")
-                    # Continua com próximo lote mesmo em caso de erro
-                    continue
+            if pipelined:
+                self._ingest_batches_pipelined(
+                    chunks, batches, state, total_chunks, max_workers,
+                    checkpoint_interval, progress, show_progress
+                )
+            else:
+                self._ingest_batches_sequential(
+                    chunks, batches, state, total_chunks,
+                    checkpoint_interval, progress, show_progress
+                )
             
-            # Salva checkpoint final
-            self._save_checkpoint(processed_indices, total_chunks)
+            # Remove do índice vetores que não existem mais no corpus
+            if stale_ids:
+                deleted_stale = self._delete_ids(stale_ids)
+                self.telemetry.incr("deleted_stale", deleted_stale)
+                print(f"\n🧹 Vetores obsoletos deletados: {deleted_stale}")
             
-            # Remove checkpoint se concluído com sucesso
-            if not interrupted:
-                self._clear_checkpoint()
-                print(f"\n✅ Ingestão concluída!")
-            else:
-                print(f"\n⏸️  Ingestão interrompida!")
+            # Persiste o store (no-op no Pinecone) antes de fechar o checkpoint
+            with self.telemetry.stage("store_flush"):
+                self.index.flush()
+            self._train_index()
             
-            print(f"   Vetores inseridos: {total_vectors}/{total_chunks}")
+            with self.telemetry.stage("checkpoint"):
+                if errors:
+                    # Mantém checkpoint para que o resume reprocesse só os lotes com erro
+                    checkpoint.flush()
+                    checkpoint.compact()
+                else:
+                    # Remove checkpoint se concluído com sucesso
+                    checkpoint.clear()
+            print(f"\n✅ Ingestão concluída!")
+            print(f"   Vetores inseridos: {state['total_vectors']}/{total_chunks}")
             if errors:
                 print(f"   Erros: {len(errors)}")
             
         except KeyboardInterrupt:
-            # Salva checkpoint antes de sair
-            if not interrupted:  # Evita salvar duas vezes
-                print(f"\n\n⚠️  Interrupção detectada! Salvando checkpoint...")
-                self._save_checkpoint(processed_indices, total_chunks)
-                interrupted = True
+            # Salva checkpoint antes de sair (apenas lotes confirmados)
+            print(f"\n\n⚠️  Interrupção detectada! Salvando checkpoint...")
+            self.index.flush()
+            checkpoint.flush()
+            checkpoint.compact()
+            interrupted = True
             print(f"\n⏸️  Processo interrompido pelo usuário")
-            print(f"   Progresso salvo: {total_vectors}/{total_chunks} chunks")
+            print(f"   Progresso salvo: {state['total_vectors']}/{total_chunks} chunks")
             print(f"   Para retomar, execute novamente com resume_from_checkpoint=True")
+        finally:
+            if progress is not None:
+                progress.close()
+            if self._snapshot_writer is not None:
+                self._snapshot_writer.close(complete=not interrupted)
+                self._snapshot_writer = None
+        
+        # Vetores por artigo dos artigos tocados (chunks inalterados não mudam a média)
+        article_stats = None
+        if article_vectors != "none" and not interrupted and not errors:
+            stale_articles = {
+                vector_id[len("article_"):].rsplit("_chunk_", 1)[0] for vector_id in stale_ids
+            }
+            touched = stale_articles | {
+                str(chunks[i]["article_id"]) for i in range(total_chunks)
+                if i not in unchanged_positions
+            }
+            with self.telemetry.stage("article_vectors"):
+                article_stats = self.build_article_vectors(
+                    [chunk for chunk in chunks if str(chunk["article_id"]) in touched],
+                    mode=article_vectors,
+                    removed_article_ids=sorted(
+                        stale_articles - {str(chunk["article_id"]) for chunk in chunks}
+                    )
+                )
+        
+        # Vetores gravados ou removidos: invalida resultados cacheados das queries
+        if state["total_vectors"] > total_vectors or deleted_stale:
+            self._bump_epoch()
+        
+        elapsed = time.time() - start_time
+        self.telemetry.incr("errors", len(errors))
+        self._write_metrics(state, "interrupted" if interrupted else "completed")
         
         return {
             "total_chunks": total_chunks,
-            "total_vectors": total_vectors,
+            "total_vectors": state["total_vectors"],
             "batches": (total_chunks + batch_size - 1) // batch_size,
             "errors": errors,
             "interrupted": interrupted,
-            "checkpoint_path": str(self._get_checkpoint_path()) if interrupted else None,
+            "checkpoint_path": str(checkpoint.snapshot_path) if checkpoint.exists() else None,
+            "pipelined": pipelined,
+            "elapsed_seconds": elapsed,
+            "vectors_per_second": (
+                (state["total_vectors"] - total_vectors) / elapsed if elapsed > 0 else 0.0
+            ),
+            "skipped_unchanged": skipped_unchanged,
+            "deleted_stale": deleted_stale,
+            "upsert_requests": len(state["request_bytes"]),
+            "bytes_sent": sum(state["request_bytes"]),
+            "avg_request_bytes": (
+                sum(state["request_bytes"]) / len(state["request_bytes"])
+                if state["request_bytes"] else 0
+            ),
+            "max_request_bytes": max(state["request_bytes"], default=0),
+            "telemetry": self.telemetry.snapshot(),
+            "article_vectors": article_stats,
+        }
+    
+    def ingest_chunks_partitioned(
+        self,
+        chunks: List[Dict[str, Any]],
+        scheme: Optional[PartitionScheme] = None,
+        **ingest_kwargs
+    ) -> Dict[str, Any]:
+        """
+        Ingere chunks em namespaces particionados por um campo de metadados.
+        
+        Cada partição (ver PartitionScheme) é ingerida com ingest_chunks no
+        namespace <namespace>__<campo>__<partição>, com checkpoint e ledger
+        próprios. O RAGQueryEngine com o mesmo esquema roteia as queries
+        filtradas para as partições correspondentes.
+        
+        Args:
+            chunks: Lista de chunks para ingerir.
+            scheme: Esquema de particionamento. Se None, usa PARTITION_FIELD e
+                PARTITION_BUCKET_SIZE das configurações.
+            **ingest_kwargs: Argumentos repassados a ingest_chunks.
+            
+        Returns:
+            Dicionário com:
+                - partitions: Estatísticas de ingest_chunks por partição
+                - total_chunks / total_vectors: Somas de todas as partições
+                - errors: Erros de todas as partições
+                - interrupted: Se alguma partição foi interrompida
+        """
+        scheme = scheme or PartitionScheme.from_settings()
+        if scheme is None:
+            raise ValueError("Defina PARTITION_FIELD ou passe um PartitionScheme")
+        
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for chunk in chunks:
+            groups.setdefault(scheme.partition_for(chunk.get("metadata", {})), []).append(chunk)
+        
+        print(f"🗂️  Particionando por '{scheme.field}': {len(groups)} partições")
+        
+        # Vetores de artigo ficam no namespace base (um tier para todas as partições)
+        article_vectors = (ingest_kwargs.pop("article_vectors", None) or self.settings.ARTICLE_VECTORS).lower()
+        
+        base_namespace = self.namespace
+        results: Dict[str, Dict[str, Any]] = {}
+        # Caches de queries são chaveados pelo namespace base: cada checkpoint de
+        # partição avança também a época dele
+        self._epoch_namespaces = [base_namespace]
+        try:
+            for partition in sorted(groups):
+                self.namespace = scheme.namespace_for(base_namespace, partition)
+                print(f"\n📂 Partição {partition} ({len(groups[partition])} chunks) → {self.namespace}")
+                results[partition] = self.ingest_chunks(groups[partition], article_vectors="none", **ingest_kwargs)
+                if results[partition]["interrupted"]:
+                    break
+        finally:
+            self.namespace = base_namespace
+            self._epoch_namespaces = []
+        
+        interrupted = any(r["interrupted"] for r in results.values())
+        errors = [e for r in results.values() for e in r["errors"]]
+        article_stats = None
+        if article_vectors != "none" and not interrupted and not errors:
+            article_stats = self.build_article_vectors(chunks, mode=article_vectors, scheme=scheme)
+        
+        # Época final do namespace base (inclui os vetores de artigo)
+        self._bump_epoch()
+        
+        return {
+            "partitions": results,
+            "total_chunks": sum(r["total_chunks"] for r in results.values()),
+            "total_vectors": sum(r["total_vectors"] for r in results.values()),
+            "errors": errors,
+            "interrupted": interrupted,
+            "article_vectors": article_stats,
         }
     
+    def build_article_vectors(
+        self,
+        chunks: List[Dict[str, Any]],
+        mode: Optional[str] = None,
+        scheme: Optional[PartitionScheme] = None,
+        removed_article_ids: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Grava um vetor por artigo em <namespace>__articles (busca coarse-to-fine).
+        
+        No modo 'mean' o vetor é a média normalizada dos vetores dos chunks já
+        ingeridos (lidos do índice com fetch, sem chamadas de embedding); no
+        modo 'question' é o embedding da pergunta do artigo. Os metadados são
+        os campos filtráveis do artigo, então a busca de artigos aceita os
+        mesmos filtros da busca de chunks.
+        
+        Args:
+            chunks: Chunks já ingeridos (todos os chunks de cada artigo).
+            mode: 'mean' ou 'question'. Se None, usa ARTICLE_VECTORS ('none' = 'mean').
+            scheme: Esquema de particionamento, se os chunks estão em
+                namespaces particionados.
+            removed_article_ids: Artigos que ficaram sem chunks (têm o vetor
+                de artigo deletado).
+            
+        Returns:
+            Estatísticas (articles, vectors_upserted, missing_chunks, namespace,
+            mode, elapsed_seconds).
+        """
+        mode = (mode or self.settings.ARTICLE_VECTORS).lower()
+        if mode == "none":
+            mode = "mean"
+        
+        base_namespace = self.namespace
+        chunk_namespace_for = None
+        if scheme is not None:
+            def chunk_namespace_for(chunk):
+                return scheme.namespace_for(base_namespace, scheme.partition_for(chunk.get("metadata", {})))
+        
+        stats = build_article_vectors(
+            self.index,
+            chunks,
+            base_namespace,
+            mode=mode,
+            prepare_metadata=self._prepare_metadata,
+            embed_documents=self.embeddings_manager.embed_documents,
+            chunk_namespace_for=chunk_namespace_for,
+            batch_size=self.settings.UPSERT_MAX_VECTORS
+        )
+        
+        # Artigos sem nenhum chunk restante saem do tier de artigos
+        if removed_article_ids:
+            self.index.delete(
+                ids=[article_vector_id(article_id) for article_id in removed_article_ids],
+                namespace=stats["namespace"]
+            )
+            self.index.flush()
+        stats["deleted"] = len(removed_article_ids or [])
+        
+        print(f"🧭 Vetores de artigo ({mode}): {stats['vectors_upserted']} → {stats['namespace']}")
+        if stats["missing_chunks"]:
+            print(f"⚠️  {stats['missing_chunks']} chunks não encontrados no índice (ignorados na média)")
+        return stats
+    
+    def _record_batch(
+        self,
+        request: UpsertRequest,
+        state: Dict[str, Any],
+        total_chunks: int,
+        checkpoint_interval: int,
+        progress,
+        show_progress: bool
+    ):
+        """Marca uma requisição de upsert como concluída e salva checkpoint periodicamente."""
+        positions = request.positions
+        checkpoint = state["checkpoint"]
+        checkpoint.mark_done(state["vector_ids"][p] for p in positions)
+        
+        if state["content_hashes"] is not None:
+            with self.telemetry.stage("ledger"):
+                self._get_ledger().record(self.namespace, [
+                    (
+                        state["vector_ids"][p],
+                        state["content_hashes"][p],
+                        str(state["chunks"][p]["article_id"]),
+                    )
+                    for p in positions
+                ])
+        state["total_vectors"] += len(request.vectors)
+        state["completed_batches"] += 1
+        state["request_bytes"].append(request.num_bytes)
+        self.telemetry.incr("vectors_upserted", len(request.vectors))
+        self.telemetry.incr("upsert_requests")
+        self.telemetry.incr("bytes_sent", request.num_bytes)
+        
+        if progress is not None:
+            progress.update(len(positions))
+        if state["progress_callback"] is not None:
+            state["progress_callback"](state["total_vectors"], total_chunks)
+        
+        if state["completed_batches"] % checkpoint_interval == 0:
+            # Append-only: custo proporcional aos lotes desde o último flush.
+            # O store persiste antes, para o checkpoint nunca estar à frente dele
+            with self.telemetry.stage("checkpoint"):
+                self.index.flush()
+                checkpoint.flush()
+            self._bump_epoch()
+            self._write_metrics(state, "checkpoint")
+            if show_progress and not state["quiet"]:
+                print(f"\n💾 Checkpoint salvo: {state['total_vectors']}/{total_chunks} chunks processados")
+    
+    def _write_metrics(self, state: Dict[str, Any], event: str):
+        """Exporta o snapshot da telemetria (JSON lines ou textfile Prometheus)."""
+        if not state["metrics_path"]:
+            return
+        
+        labels = {"index": self.index_name, "namespace": self.namespace or ""}
+        try:
+            if state["metrics_format"] == "prometheus":
+                self.telemetry.write_prometheus(state["metrics_path"], labels=labels)
+            else:
+                self.telemetry.write_jsonl(state["metrics_path"], extra=dict(labels, event=event))
+        except OSError as e:
+            print(f"⚠️  Não foi possível exportar métricas: {e}")
+    
+    def _bump_epoch(self):
+        """Avança a época de ingestão do namespace (invalida caches de queries)."""
+        try:
+            epochs = IngestionEpochs(self.settings.INGESTION_EPOCH_PATH)
+            for namespace in dict.fromkeys([self.namespace] + self._epoch_namespaces):
+                epochs.bump(self.index_name, namespace, self._store_identity())
+        except OSError as e:
+            print(f"⚠️  Não foi possível atualizar a época de ingestão: {e}")
+    
+    def _new_batcher(self) -> UpsertBatcher:
+        """Cria o empacotador de upserts com os limites das configurações."""
+        return UpsertBatcher(
+            max_bytes=self.settings.UPSERT_MAX_BYTES,
+            max_vectors=self.settings.UPSERT_MAX_VECTORS
+        )
+    
+    def _ingest_batches_sequential(
+        self,
+        chunks: List[Dict[str, Any]],
+        batches: List[List[int]],
+        state: Dict[str, Any],
+        total_chunks: int,
+        checkpoint_interval: int,
+        progress,
+        show_progress: bool
+    ):
+        """Processa lotes um a um: embedding, upserts empacotados e pausa curta."""
+        batcher = self._new_batcher()
+        
+        def send(requests, label):
+            for request in requests:
+                try:
+                    self._upsert_batch(request.vectors)
+                    self._record_batch(
+                        request, state, total_chunks,
+                        checkpoint_interval, progress, show_progress
+                    )
+                except KeyboardInterrupt:
+                    raise
+                except Exception as e:
+                    error_msg = f"Erro no upsert ({label}, {len(request.vectors)} vetores): {e}"
+                    state["errors"].append(error_msg)
+                    print(f"⚠️  {error_msg}")
+        
+        for batch_num, positions in enumerate(batches, 1):
+            batch_chunks = [chunks[p] for p in positions]
+            
+            try:
+                # Prepara vetores do lote
+                vectors = self._prepare_vectors(batch_chunks, quiet=state["quiet"])
+            except KeyboardInterrupt:
+                raise
+            except Exception as e:
+                error_msg = f"Erro no lote {batch_num}: {e}"
+                state["errors"].append(error_msg)
+                self.telemetry.incr("embedding_failures")
+                print(f"⚠️  {error_msg}")
+                # Continua com próximo lote mesmo em caso de erro
+                continue
+            
+            # Insere no Pinecone as requisições que ficaram completas
+            send(batcher.add(vectors, positions), f"lote {batch_num}")
+            
+            # Pequena pausa para evitar rate limiting
+            if batch_num < len(batches):
+                with self.telemetry.stage("throttle_sleep"):
+                    time.sleep(0.1)
+        
+        send(batcher.flush(), "lote final")
+    
+    def _ingest_batches_pipelined(
+        self,
+        chunks: List[Dict[str, Any]],
+        batches: List[List[int]],
+        state: Dict[str, Any],
+        total_chunks: int,
+        max_workers: int,
+        checkpoint_interval: int,
+        progress,
+        show_progress: bool
+    ):
+        """
+        Gera embeddings na thread principal e envia upserts a um pool limitado.
+        
+        No máximo 2 * max_workers requisições ficam em voo; quando o limite é
+        atingido a thread principal espera o primeiro upsert terminar antes de
+        gerar o próximo embedding. Uma requisição só entra no checkpoint depois
+        que seu upsert é confirmado, independentemente da ordem de conclusão.
+        """
+        from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+        
+        max_in_flight = max(1, max_workers * 2)
+        in_flight = {}
+        batcher = self._new_batcher()
+        
+        def collect(done_futures):
+            for future in done_futures:
+                label, request = in_flight.pop(future)
+                try:
+                    future.result()
+                    self._record_batch(
+                        request, state, total_chunks,
+                        checkpoint_interval, progress, show_progress
+                    )
+                except Exception as e:
+                    error_msg = f"Erro no upsert ({label}, {len(request.vectors)} vetores): {e}"
+                    state["errors"].append(error_msg)
+                    print(f"⚠️  {error_msg}")
+        
+        def submit(requests, label):
+            for request in requests:
+                future = executor.submit(self._upsert_and_count, request.vectors)
+                in_flight[future] = (label, request)
+                
+                # Limita o número de requisições em voo (backpressure)
+                while len(in_flight) >= max_in_flight:
+                    with self.telemetry.stage("backpressure_wait"):
+                        done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                    collect(done)
+        
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pinecone-upsert")
+        try:
+            for batch_num, positions in enumerate(batches, 1):
+                batch_chunks = [chunks[p] for p in positions]
+                
+                try:
+                    # Embedding deste lote sobrepõe os upserts em voo
+                    vectors = self._prepare_vectors(batch_chunks, quiet=state["quiet"])
+                except KeyboardInterrupt:
+                    raise
+                except Exception as e:
+                    error_msg = f"Erro no lote {batch_num}: {e}"
+                    state["errors"].append(error_msg)
+                    self.telemetry.incr("embedding_failures")
+                    print(f"⚠️  {error_msg}")
+                    continue
+                
+                submit(batcher.add(vectors, positions), f"lote {batch_num}")
+                
+                # Coleta upserts já concluídos sem bloquear
+                collect([f for f in list(in_flight) if f.done()])
+            
+            submit(batcher.flush(), "lote final")
+            
+            # Aguarda os upserts restantes
+            while in_flight:
+                with self.telemetry.stage("drain_wait"):
+                    done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                collect(done)
+                
+        except KeyboardInterrupt:
+            # Cancela requisições ainda não iniciadas e registra as que já terminaram
+            for future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=True)
+            collect([f for f in list(in_flight) if f.done() and not f.cancelled()])
+            raise
+        finally:
+            executor.shutdown(wait=True)
+    
+    def _upsert_and_count(self, vectors: List[Dict[str, Any]]) -> int:
+        """Executa o upsert de um lote (usado pelo pool de threads)."""
+        self._upsert_batch(vectors)
+        return len(vectors)
+    
+    def export_for_bulk_import(
+        self,
+        chunks: List[Dict[str, Any]],
+        output_dir: Optional[str] = None,
+        shard_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        show_progress: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Gera embeddings e exporta os vetores em shards Parquet para bulk import.
+        
+        Usa o mesmo pipeline de ingest_chunks (IDs, metadados, store externo
+        de textos), mas grava {id, values, metadata} em arquivos Parquet no
+        layout do bulk import do Pinecone em vez de fazer upserts. Os shards
+        devem ser copiados para um bucket e carregados com start_bulk_import().
+        
+        Args:
+            chunks: Lista de chunks para exportar.
+            output_dir: Diretório da exportação. Se None, usa BULK_EXPORT_DIR.
+            shard_size: Vetores por arquivo Parquet. Se None, usa BULK_EXPORT_SHARD_SIZE.
+            batch_size: Tamanho do lote de embeddings. Se None, usa BATCH_SIZE.
+            show_progress: Se True, exibe barra de progresso.
+            
+        Returns:
+            Dicionário com estatísticas da exportação:
+                - total_chunks / total_vectors: Chunks recebidos e vetores exportados
+                - shards: Número de arquivos Parquet gravados
+                - manifest_path: Caminho do manifest.json
+                - errors: Lista de erros (lotes não exportados)
+                - elapsed_seconds / vectors_per_second
+        """
+        from .bulk_export import ParquetShardWriter, MANIFEST_NAME
+        
+        output_dir = output_dir or self.settings.BULK_EXPORT_DIR
+        shard_size = shard_size or self.settings.BULK_EXPORT_SHARD_SIZE
+        batch_size = batch_size or self.settings.BATCH_SIZE
+        
+        writer = ParquetShardWriter(
+            output_dir,
+            namespace=self.namespace,
+            shard_size=shard_size,
+            dimension=self.embeddings_manager.get_embedding_dimension()
+        )
+        
+        print(f"\n📦 Exportando {len(chunks)} chunks para bulk import (Parquet)...")
+        print(f"   Diretório: {writer.namespace_dir}")
+        print(f"   Shard size: {shard_size} vetores")
+        
+        progress = None
+        if show_progress:
+            try:
+                from tqdm import tqdm
+                progress = tqdm(desc="Exportando chunks", total=len(chunks))
+            except ImportError:
+                progress = None
+        
+        errors = []
+        total_vectors = 0
+        start_time = time.time()
+        
+        try:
+            for start in range(0, len(chunks), batch_size):
+                batch_chunks = chunks[start:start + batch_size]
+                batch_num = start // batch_size + 1
+                
+                try:
+                    vectors = self._prepare_vectors(batch_chunks)
+                except KeyboardInterrupt:
+                    raise
+                except Exception as e:
+                    error_msg = f"Erro no lote {batch_num}: {e}"
+                    errors.append(error_msg)
+                    print(f"⚠️  {error_msg}")
+                    continue
+                
+                writer.write(vectors)
+                total_vectors += len(vectors)
+                
+                if progress is not None:
+                    progress.update(len(batch_chunks))
+        except BaseException:
+            writer.abort()
+            raise
+        finally:
+            if progress is not None:
+                progress.close()
+        
+        entry = writer.close(extra={
+            "index_name": self.index_name,
+            "embedding_signature": self._embedding_signature(),
+            "errors": len(errors),
+        })
+        elapsed = time.time() - start_time
+        
+        print(f"\n✅ Exportação concluída!")
+        print(f"   Vetores exportados: {total_vectors}/{len(chunks)}")
+        print(f"   Shards: {len(entry['shards'])} ({entry['total_bytes'] / 1024 / 1024:.1f} MB)")
+        if errors:
+            print(f"   Erros: {len(errors)}")
+        
+        return {
+            "total_chunks": len(chunks),
+            "total_vectors": total_vectors,
+            "shards": len(entry["shards"]),
+            "total_bytes": entry["total_bytes"],
+            "manifest_path": str(writer.output_dir / MANIFEST_NAME),
+            "errors": errors,
+            "elapsed_seconds": elapsed,
+            "vectors_per_second": total_vectors / elapsed if elapsed > 0 else 0.0,
+        }
+    
+    def start_bulk_import(self, uri: str, error_mode: str = "continue") -> Any:
+        """
+        Inicia o bulk import no Pinecone a partir de shards já enviados ao bucket.
+        
+        Args:
+            uri: Prefixo do bucket com os diretórios de namespace
+                (ex: "s3://bucket/pubmedqa/"), correspondente ao output_dir
+                de export_for_bulk_import().
+            error_mode: 'continue' (ignora registros inválidos) ou 'abort'.
+            
+        Returns:
+            Resposta do Pinecone com o ID da operação de import.
+        """
+        if self.backend != 'pinecone':
+            raise ValueError("Bulk import só está disponível no backend 'pinecone'")
+        
+        response = self.index.index.start_import(uri=uri, error_mode=error_mode)
+        print(f"📥 Bulk import iniciado: {getattr(response, 'id', response)}")
+        return response
+    
+    def export_snapshot(self, path: str, max_workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Exporta os vetores do namespace para um snapshot (fetch em lote).
+        
+        Args:
+            path: Diretório do snapshot.
+            max_workers: Fetches simultâneos. Se None, usa UPSERT_WORKERS.
+            
+        Returns:
+            Estatísticas da exportação (ver export_snapshot_from_index).
+        """
+        return export_snapshot_from_index(
+            self.index,
+            path,
+            namespace=self.namespace,
+            prefix="article_",
+            max_workers=max_workers or self.settings.UPSERT_WORKERS
+        )
+    
+    def load_snapshot(self, path: str, max_workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Carrega um snapshot de embeddings neste índice/namespace (sem embeddings).
+        
+        Args:
+            path: Diretório do snapshot.
+            max_workers: Upserts simultâneos. Se None, usa UPSERT_WORKERS.
+            
+        Returns:
+            Estatísticas do carregamento (ver load_snapshot_into_store).
+        """
+        stats = load_snapshot_into_store(
+            path,
+            self.index,
+            namespace=self.namespace,
+            max_workers=max_workers or self.settings.UPSERT_WORKERS,
+            max_bytes=self.settings.UPSERT_MAX_BYTES,
+            max_vectors=self.settings.UPSERT_MAX_VECTORS,
+            chunk_text_store=self.chunk_text_store
+        )
+        self._train_index()
+        self._bump_epoch()
+        return stats
+    
     def delete_all(self, namespace: Optional[str] = None):
         """
         Deleta todos os vetores do namespace (use com cuidado!).
         
+        Também limpa o estado local do namespace (ledger, checkpoint e textos
+        no store externo), para que a próxima ingestão incremental regrave
+        tudo em vez de pular chunks "inalterados".
+        
         Args:
             namespace: Namespace a limpar. Se None, usa o namespace configurado.
         """
@@ -475,10 +1403,31 @@ class PineconeIngester:
             return
         
         try:
-            if namespace:
-                self.index.delete(delete_all=True, namespace=namespace)
-            else:
-                self.index.delete(delete_all=True)
+            # IDs do namespace, para remover os textos do store externo depois
+            ledger = self._get_ledger()
+            vector_ids = set()
+            if self.chunk_text_store is not None:
+                vector_ids = ledger.all_ids(namespace)
+                try:
+                    vector_ids.update(self._list_index_ids(prefix="", namespace=namespace))
+                except Exception as e:
+                    # Índices sem list(): fica só com os IDs do ledger
+                    print(f"⚠️  Não foi possível listar os IDs do namespace: {e}")
+            
+            self.index.delete(delete_all=True, namespace=namespace)
+            self.index.flush()
+            
+            ledger.clear(namespace)
+            base_namespace, self.namespace = self.namespace, namespace
+            try:
+                self._clear_checkpoint()
+            finally:
+                self.namespace = base_namespace
+            if vector_ids:
+                self.chunk_text_store.delete(sorted(vector_ids))
+            IngestionEpochs(self.settings.INGESTION_EPOCH_PATH).bump(
+                self.index_name, namespace, self._store_identity()
+            )
             
             print("✅ Todos os vetores foram deletados.")
         except Exception as e:
@@ -0,0 +1,404 @@
+"""
+Módulo de cache de resultados de queries RAG.
+
+Dois níveis:
+
+- exato: chave = query normalizada + filtros + top_k + modo + namespace
+  (LRU em memória)
+- semântico: reutiliza resultados quando o embedding de uma nova query tem
+  similaridade de cosseno acima de um limiar com o de uma query já cacheada
+  (mesmo contexto); a busca é um produto matriz-vetor sobre uma matriz
+  NumPy pequena em memória
+
+A invalidação é por época de ingestão: o PineconeIngester incrementa a
+época do (índice, namespace) em um arquivo compartilhado sempre que grava
+ou remove vetores, e entradas de épocas anteriores nunca são servidas.
+"""
+
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+import copy
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: msvcrt.locking no lugar de flock
+    fcntl = None
+    import msvcrt
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Lock exclusivo entre processos (arquivo <path>.lock ao lado do alvo)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(f"{path.name}.lock"), "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normaliza uma query para a chave do nível exato.
+    
+    Args:
+        query: Texto da query.
+    
+    Returns:
+        Query em minúsculas, espaços colapsados, sem pontuação final.
+    """
+    return _WHITESPACE.sub(" ", query.strip().lower()).rstrip(" ?!.")
+
+
+class IngestionEpochs:
+    """
+    Épocas de ingestão por (store, índice, namespace), em um arquivo JSON.
+    
+    O arquivo é compartilhado entre o processo de ingestão (que incrementa
+    a época) e os processos de query (que a leem). A leitura só recarrega o
+    arquivo quando o mtime muda (um stat por query). Incrementos são
+    serializados por um lock de arquivo, então processos que ingerem ao mesmo
+    tempo (ex: shards da ingestão) não perdem incrementos uns dos outros.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Caminho do arquivo de épocas.
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._epochs: Dict[str, int] = {}
+        self._mtime_ns: Optional[int] = None
+    
+    @staticmethod
+    def _key(index_name: str, namespace: Optional[str], store: Optional[str] = None) -> str:
+        key = f"{index_name}/{namespace or ''}"
+        return f"{store}|{key}" if store else key
+    
+    def _read(self) -> Dict[str, int]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return {key: int(value["epoch"]) for key, value in json.load(f).items()}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+    
+    def get(self, index_name: str, namespace: Optional[str], store: Optional[str] = None) -> int:
+        """
+        Retorna a época atual (0 se o namespace nunca foi ingerido).
+        
+        Args:
+            index_name: Nome do índice.
+            namespace: Namespace.
+            store: Identidade do store (ver vector_store.store_identity).
+        
+        Returns:
+            Época do (índice, namespace).
+        """
+        try:
+            mtime_ns = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+        
+        if mtime_ns != self._mtime_ns:
+            with self._lock:
+                self._epochs = self._read()
+                self._mtime_ns = mtime_ns
+        return self._epochs.get(self._key(index_name, namespace, store), 0)
+    
+    def bump(self, index_name: str, namespace: Optional[str], store: Optional[str] = None) -> int:
+        """
+        Avança a época do (índice, namespace), invalidando resultados cacheados.
+        
+        A nova época é max(época + 1, time_ns()), então processos que
+        incrementam ao mesmo tempo (ex: shards da ingestão) nunca gravam o
+        mesmo valor que um leitor já viu.
+        
+        Args:
+            index_name: Nome do índice.
+            namespace: Namespace.
+            store: Identidade do store (ver vector_store.store_identity).
+        
+        Returns:
+            Nova época.
+        """
+        key = self._key(index_name, namespace, store)
+        with self._lock, _file_lock(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                data = {}
+            
+            current = int(data.get(key, {}).get("epoch", 0))
+            epoch = max(current + 1, time.time_ns())
+            data[key] = {"epoch": epoch, "updated_at": time.time()}
+            
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+            
+            self._epochs = {k: int(v["epoch"]) for k, v in data.items()}
+            self._mtime_ns = self.path.stat().st_mtime_ns
+        return epoch
+
+
+class CacheKey(NamedTuple):
+    """Chave de uma query no cache (a época é lida ao criar a chave)."""
+    context: Tuple[Any, ...]
+    query: str
+    epoch: int
+
+
+class QueryResultCache:
+    """
+    Cache de resultados em dois níveis (exato e semântico), thread-safe.
+    
+    Uso típico (ver RAGQueryEngine):
+        key = cache.make_key(index, namespace, mode, top_k, filters, query, store, embedding)
+        results = cache.get(key)                     # nível exato
+        results = cache.get_similar(key, embedding)  # nível semântico
+        cache.put(key, results, embedding)
+    
+    A época gravada na entrada é a da chave (lida antes da busca), então um
+    resultado calculado durante uma ingestão fica inválido quando ela avança
+    a época.
+    """
+    
+    def __init__(
+        self,
+        epochs: Optional[IngestionEpochs] = None,
+        max_entries: int = 1024,
+        semantic_threshold: Optional[float] = 0.95,
+        semantic_max_entries: int = 1024
+    ):
+        """
+        Args:
+            epochs: Épocas de ingestão. Se None, entradas só expiram por LRU.
+            max_entries: Máximo de entradas do nível exato.
+            semantic_threshold: Similaridade de cosseno mínima para o nível
+                semântico. Se None, o nível semântico fica desligado.
+            semantic_max_entries: Linhas da matriz do nível semântico
+                (substituição circular).
+        """
+        if max_entries <= 0:
+            raise ValueError(f"max_entries deve ser positivo: {max_entries}")
+        if semantic_threshold is not None and not 0.0 < semantic_threshold <= 1.0:
+            raise ValueError(f"semantic_threshold deve estar em (0, 1]: {semantic_threshold}")
+        
+        self.epochs = epochs
+        self.max_entries = max_entries
+        self.semantic_threshold = semantic_threshold
+        self.semantic_max_entries = semantic_max_entries
+        
+        self._lock = threading.Lock()
+        self._exact: "OrderedDict[Tuple[Any, ...], Tuple[int, List[Dict[str, Any]]]]" = OrderedDict()
+        
+        # Nível semântico: matriz de embeddings normalizados + arrays paralelos
+        self._matrix: Optional[np.ndarray] = None
+        self._row_context = np.full(semantic_max_entries, -1, dtype=np.int64)
+        self._row_epoch = np.zeros(semantic_max_entries, dtype=np.int64)
+        self._row_results: List[Optional[List[Dict[str, Any]]]] = [None] * semantic_max_entries
+        self._context_ids: Dict[Tuple[Any, ...], int] = {}
+        self._next_row = 0
+        
+        self._stats = {"lookups": 0, "exact_hits": 0, "semantic_hits": 0, "stale_hits": 0}
+    
+    def make_key(
+        self,
+        index_name: str,
+        namespace: Optional[str],
+        mode: str,
+        top_k: int,
+        filters: Optional[Dict[str, Any]],
+        query: str,
+        store: str = "",
+        embedding: str = "",
+        text_store: str = ""
+    ) -> CacheKey:
+        """
+        Cria a chave da query, lendo a época atual do namespace.
+        
+        Motores com stores ou embeddings diferentes (mesmo index_name) têm
+        contextos diferentes e nunca servem os resultados uns dos outros.
+        
+        Args:
+            index_name: Nome do índice.
+            namespace: Namespace.
+            mode: Modo de busca.
+            top_k: Número de resultados.
+            filters: Filtros de metadados (None = sem filtro).
+            query: Texto da query.
+            store: Identidade do store (ver vector_store.store_identity).
+            embedding: Assinatura dos embeddings (provider:modelo:dimensão).
+            text_store: Caminho do store externo de textos ('' = nos metadados).
+        
+        Returns:
+            CacheKey.
+        """
+        filters_key = json.dumps(filters, sort_keys=True, default=str) if filters else ""
+        epoch = self.epochs.get(index_name, namespace, store or None) if self.epochs is not None else 0
+        return CacheKey(
+            context=(store, index_name, namespace or "", mode, top_k, filters_key, embedding, text_store),
+            query=normalize_query(query),
+            epoch=epoch
+        )
+    
+    def get(self, key: CacheKey, allow_stale: bool = False) -> Optional[List[Dict[str, Any]]]:
+        """
+        Busca no nível exato.
+        
+        Entradas de épocas anteriores ficam guardadas (até a LRU removê-las ou
+        um put da mesma query substituí-las) para servir de fallback quando a
+        query estoura o prazo.
+        
+        Args:
+            key: Chave da query.
+            allow_stale: Se True, aceita resultados de uma época anterior.
+        
+        Returns:
+            Cópia dos resultados cacheados, ou None.
+        """
+        exact_key = key.context + (key.query,)
+        with self._lock:
+            entry = self._exact.get(exact_key)
+            if allow_stale:
+                if entry is None:
+                    return None
+                self._stats["stale_hits"] += entry[0] != key.epoch
+                return copy.deepcopy(entry[1])
+            
+            self._stats["lookups"] += 1
+            if entry is None or entry[0] != key.epoch:
+                return None
+            self._exact.move_to_end(exact_key)
+            self._stats["exact_hits"] += 1
+            return copy.deepcopy(entry[1])
+    
+    def get_similar(self, key: CacheKey, embedding: Sequence[float]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Busca no nível semântico (mesmo contexto e época, cosseno >= limiar).
+        
+        Args:
+            key: Chave da query.
+            embedding: Embedding da query.
+        
+        Returns:
+            Cópia dos resultados da query cacheada mais similar, ou None.
+        """
+        with self._lock:
+            context_id = self._context_ids.get(key.context)
+            if self.semantic_threshold is None or self._matrix is None or context_id is None:
+                return None
+            
+            query = self._normalize(embedding)
+            if query.shape[0] != self._matrix.shape[1]:
+                return None
+            
+            valid = (self._row_context == context_id) & (self._row_epoch == key.epoch)
+            if not valid.any():
+                return None
+            
+            rows = np.flatnonzero(valid)
+            scores = self._matrix[rows] @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.semantic_threshold:
+                return None
+            
+            self._stats["semantic_hits"] += 1
+            return copy.deepcopy(self._row_results[rows[best]])
+    
+    def put(
+        self,
+        key: CacheKey,
+        results: List[Dict[str, Any]],
+        embedding: Optional[Sequence[float]] = None
+    ):
+        """
+        Armazena resultados no nível exato (e no semântico, se houver embedding).
+        
+        Args:
+            key: Chave da query (criada antes da busca).
+            results: Resultados da query.
+            embedding: Embedding da query (opcional).
+        """
+        stored = copy.deepcopy(results)
+        exact_key = key.context + (key.query,)
+        
+        with self._lock:
+            self._exact[exact_key] = (key.epoch, stored)
+            self._exact.move_to_end(exact_key)
+            while len(self._exact) > self.max_entries:
+                self._exact.popitem(last=False)
+            
+            if embedding is None or self.semantic_threshold is None:
+                return
+            
+            vector = self._normalize(embedding)
+            if self._matrix is None:
+                self._matrix = np.zeros((self.semantic_max_entries, vector.shape[0]), dtype=np.float32)
+            elif vector.shape[0] != self._matrix.shape[1]:
+                return
+            
+            context_id = self._context_ids.setdefault(key.context, len(self._context_ids))
+            row = self._next_row
+            self._matrix[row] = vector
+            self._row_context[row] = context_id
+            self._row_epoch[row] = key.epoch
+            self._row_results[row] = stored
+            self._next_row = (row + 1) % self.semantic_max_entries
+    
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else vector
+    
+    def clear(self):
+        """Remove todas as entradas."""
+        with self._lock:
+            self._exact.clear()
+            self._row_context.fill(-1)
+            self._row_results = [None] * self.semantic_max_entries
+            self._next_row = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna contadores do cache.
+        
+        Returns:
+            Dicionário com lookups, exact_hits, semantic_hits, misses,
+                hit_rate, entries e stale_hits (fallbacks de queries que
+                estouraram o prazo servidos por uma época anterior).
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._exact)
+        hits = stats["exact_hits"] + stats["semantic_hits"]
+        stats["misses"] = stats["lookups"] - hits
+        stats["hit_rate"] = hits / stats["lookups"] if stats["lookups"] else 0.0
+        return stats
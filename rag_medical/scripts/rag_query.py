@@ -2,14 +2,1136 @@
 Módulo para queries RAG no Pinecone.
 
 Este módulo fornece funções para buscar contexto relevante no Pinecone
-e formatar resultados para uso em geração de respostas com LLM.
+(ou no vector store local, conforme VECTOR_STORE_BACKEND) e formatar
+resultados para uso em geração de respostas com LLM.
+
+Modos de busca:
+- dense: embedding da query + busca vetorial
+- lexical: BM25 local em processo (sem chamar o provider de embeddings)
+- hybrid: dense + lexical combinados por reciprocal rank fusion
 """
 
 from typing import List, Dict, Any, Optional
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 
 from config.settings import Settings
-from .embeddings_manager import EmbeddingsManager
+from .embeddings_manager import EmbeddingsManager, embedding_signature
+from .chunk_store import ChunkTextStore, hydrate_matches, split_metadata
+from .vector_store import VectorStore, create_vector_store, store_identity, vector_id_for
+from .lexical_index import BM25Index, get_lexical_index, reciprocal_rank_fusion
+from .query_cache import CacheKey, IngestionEpochs, QueryResultCache
+from .context_packer import pack_context
+from .partitioning import PartitionRouter, PartitionScheme, merge_matches
+from .deadline import DeadlineExceeded, bounded_timeout, call_with_deadline, deadline_after
+from .article_vectors import article_ids_from_matches, article_namespace_for, narrow_filter
+from .tracing import trace
+
+
+# Stores de texto abertos, por caminho (reutilizados entre queries)
+_chunk_text_stores: Dict[str, ChunkTextStore] = {}
+
+RETRIEVAL_MODES = ("dense", "lexical", "hybrid")
+
+
+def _get_chunk_text_store(path: Optional[str]) -> Optional[ChunkTextStore]:
+    """Retorna o store de textos para o caminho (None = desabilitado)."""
+    if not path:
+        return None
+    if path not in _chunk_text_stores:
+        _chunk_text_stores[path] = ChunkTextStore(path)
+    return _chunk_text_stores[path]
+
+
+class QueryResults(list):
+    """
+    Lista de resultados de uma query, com a indicação de degradação.
+    
+    Quando a query estoura o prazo (deadline), o motor responde com o que tem
+    à mão em vez de esperar: degraded=True e fallback indica a origem
+    ('cache' = resultado cacheado, possivelmente de uma ingestão anterior;
+    'lexical' = BM25 local; 'empty' = sem resultados).
+    """
+    
+    def __init__(
+        self,
+        results=(),
+        degraded: bool = False,
+        fallback: Optional[str] = None,
+        reason: Optional[str] = None
+    ):
+        super().__init__(results)
+        self.degraded = degraded
+        self.fallback = fallback
+        self.reason = reason
+
+
+class RAGQueryEngine:
+    """
+    Motor de queries RAG de vida longa.
+    
+    Mantém aquecidos e reutiliza entre queries o gerenciador de embeddings,
+    o handle do índice (com pool de conexões), o store de textos e o índice
+    lexical, então o custo por query fica em uma chamada de embedding e uma
+    query no índice. Os clientes são criados sob demanda (uma única vez,
+    protegidos por lock) e podem ser usados por várias threads.
+    """
+    
+    def __init__(
+        self,
+        embeddings_manager: Optional[EmbeddingsManager] = None,
+        index_name: Optional[str] = None,
+        namespace: Optional[str] = None,
+        api_key: Optional[str] = None,
+        embedding_dimension: Optional[int] = None,
+        chunk_text_store_path: Optional[str] = None,
+        backend: Optional[str] = None,
+        vector_store: Optional[VectorStore] = None,
+        lexical_index: Optional[BM25Index] = None,
+        top_k: Optional[int] = None,
+        mode: Optional[str] = None,
+        cache: Optional[QueryResultCache] = None,
+        partition_scheme: Optional[PartitionScheme] = None,
+        coarse_articles: Optional[int] = None
+    ):
+        """
+        Inicializa o motor (sem conectar; use warmup() para conectar já).
+        
+        Args:
+            embeddings_manager: Gerenciador de embeddings. Se None, cria um na
+                primeira query densa.
+            index_name: Nome do índice Pinecone. Se None, usa das configurações.
+            namespace: Namespace padrão das queries. Se None, usa das configurações.
+            api_key: API key do Pinecone. Se None, usa das configurações.
+            embedding_dimension: Dimensão dos embeddings da query (deve ser a
+                mesma usada na ingestão). Se None, usa EMBEDDING_DIMENSION.
+            chunk_text_store_path: SQLite com os textos dos chunks. Se None,
+                usa CHUNK_TEXT_STORE_PATH.
+            backend: 'pinecone', 'local' ou 'ivfpq'. Se None, usa VECTOR_STORE_BACKEND.
+            vector_store: Vector store já inicializado (ignora backend/index_name/api_key).
+            lexical_index: Índice BM25 já carregado. Se None, carrega de
+                LEXICAL_INDEX_PATH na primeira query lexical/hybrid.
+            top_k: Número padrão de resultados. Se None, usa TOP_K_RESULTS.
+            mode: Modo padrão de busca. Se None, usa RETRIEVAL_MODE.
+            cache: Cache de resultados (exato + semântico). Se None, sem cache.
+            partition_scheme: Esquema da ingestão particionada (ver
+                PineconeIngester.ingest_chunks_partitioned). Se None, usa
+                PARTITION_FIELD (vazio = sem roteamento).
+            coarse_articles: Busca coarse-to-fine: seleciona os M artigos mais
+                próximos nos vetores de artigo (<namespace>__articles, ver
+                PineconeIngester.build_article_vectors) e busca só nos chunks
+                deles. Se None, usa COARSE_TOP_ARTICLES (0 = busca direta).
+        """
+        self.settings = Settings()
+        
+        self.index_name = index_name or self.settings.PINECONE_INDEX_NAME
+        self.namespace = namespace or self.settings.PINECONE_NAMESPACE
+        self.api_key = api_key or self.settings.PINECONE_API_KEY
+        self.backend = backend
+        self.embedding_dimension = embedding_dimension
+        self.chunk_text_store_path = chunk_text_store_path or self.settings.CHUNK_TEXT_STORE_PATH
+        self.top_k = top_k or self.settings.TOP_K_RESULTS
+        self.mode = (mode or self.settings.RETRIEVAL_MODE).lower()
+        
+        if self.mode not in RETRIEVAL_MODES:
+            raise ValueError(f"mode inválido: {self.mode}. Use 'dense', 'lexical' ou 'hybrid'.")
+        
+        self._embeddings_manager = embeddings_manager
+        self._embeddings_checked = False
+        self._vector_store = vector_store
+        self._store_identity: Optional[str] = None
+        self._embedding_signature: Optional[str] = None
+        self._lexical_index = lexical_index
+        self._chunk_text_store: Optional[ChunkTextStore] = None
+        self._chunk_text_store_loaded = False
+        self._init_lock = threading.Lock()
+        self._ready_modes = set()
+        self.cache = cache
+        self.partition_scheme = partition_scheme or PartitionScheme.from_settings()
+        self.coarse_articles = (
+            self.settings.COARSE_TOP_ARTICLES if coarse_articles is None else coarse_articles
+        )
+        if self.coarse_articles < 0:
+            raise ValueError(f"coarse_articles deve ser >= 0: {self.coarse_articles}")
+        self._partition_router: Optional[PartitionRouter] = None
+        self._fanout_executor: Optional[ThreadPoolExecutor] = None
+    
+    # ------------------------------------------------------------------
+    # Clientes (criados uma vez, sob lock)
+    # ------------------------------------------------------------------
+    
+    @property
+    def embeddings_manager(self) -> EmbeddingsManager:
+        """Gerenciador de embeddings (criado e validado na primeira chamada)."""
+        if not self._embeddings_checked:
+            with self._init_lock:
+                if self._embeddings_manager is None:
+                    self._embeddings_manager = EmbeddingsManager(
+                        output_dimension=self.embedding_dimension
+                    )
+                elif (self.embedding_dimension and
+                      self._embeddings_manager.get_embedding_dimension() != self.embedding_dimension):
+                    raise ValueError(
+                        f"embeddings_manager gera vetores de dimensão "
+                        f"{self._embeddings_manager.get_embedding_dimension()}, "
+                        f"mas embedding_dimension={self.embedding_dimension}"
+                    )
+                self._embeddings_checked = True
+        return self._embeddings_manager
+    
+    @property
+    def vector_store(self) -> VectorStore:
+        """Vector store (Pinecone ou local), conectado na primeira chamada."""
+        if self._vector_store is None:
+            with self._init_lock:
+                if self._vector_store is None:
+                    try:
+                        self._vector_store = create_vector_store(
+                            backend=self.backend,
+                            index_name=self.index_name,
+                            api_key=self.api_key,
+                            pool_threads=self.settings.QUERY_POOL_THREADS
+                        )
+                    except (ImportError, ValueError):
+                        raise
+                    except Exception as e:
+                        raise RuntimeError(f"Erro ao conectar com Pinecone: {e}")
+        return self._vector_store
+    
+    @property
+    def embedding_signature(self) -> str:
+        """Provider, modelo e dimensão dos embeddings (descobre a dimensão uma vez)."""
+        if self._embedding_signature is None:
+            self._embedding_signature = embedding_signature(self.embeddings_manager)
+        return self._embedding_signature
+    
+    @property
+    def store_identity(self) -> str:
+        """Identidade do store (backend + local), sem conectar ao índice."""
+        if self._store_identity is None:
+            self._store_identity = store_identity(
+                self.backend or self.settings.VECTOR_STORE_BACKEND, self.index_name, self._vector_store
+            )
+        return self._store_identity
+    
+    @property
+    def lexical_index(self) -> BM25Index:
+        """Índice BM25 passado ou o de LEXICAL_INDEX_PATH (recarregado se reconstruído)."""
+        if self._lexical_index is not None:
+            return self._lexical_index
+        return get_lexical_index(self.settings.LEXICAL_INDEX_PATH)
+    
+    @property
+    def chunk_text_store(self) -> Optional[ChunkTextStore]:
+        """Store externo de textos (None = textos nos metadados)."""
+        if not self._chunk_text_store_loaded:
+            with self._init_lock:
+                if not self._chunk_text_store_loaded:
+                    self._chunk_text_store = _get_chunk_text_store(self.chunk_text_store_path)
+                    self._chunk_text_store_loaded = True
+        return self._chunk_text_store
+    
+    @property
+    def partition_router(self) -> Optional[PartitionRouter]:
+        """Roteador de partições (None se o motor não usa particionamento)."""
+        if self.partition_scheme is not None and self._partition_router is None:
+            # vector_store usa o mesmo lock (não reentrante): resolve antes
+            vector_store = self.vector_store
+            with self._init_lock:
+                if self._partition_router is None:
+                    self._partition_router = PartitionRouter(self.partition_scheme, vector_store)
+        return self._partition_router
+    
+    @property
+    def fanout_executor(self) -> ThreadPoolExecutor:
+        """Pool das buscas paralelas em várias partições."""
+        if self._fanout_executor is None:
+            with self._init_lock:
+                if self._fanout_executor is None:
+                    self._fanout_executor = ThreadPoolExecutor(
+                        max_workers=self.settings.QUERY_POOL_THREADS,
+                        thread_name_prefix="rag-partition"
+                    )
+        return self._fanout_executor
+    
+    def warmup(self) -> "RAGQueryEngine":
+        """
+        Cria os clientes antecipadamente (fora do caminho crítico da 1ª query).
+        
+        Returns:
+            O próprio motor.
+        """
+        self._ensure_clients(self.mode)
+        return self
+    
+    def _ensure_clients(self, mode: str):
+        """Cria os clientes usados pelo modo de busca."""
+        if mode in ("dense", "hybrid"):
+            self.embedding_signature
+            self.vector_store
+            if self.partition_router is not None:
+                self.partition_router.partitions(self.namespace)
+        if mode in ("lexical", "hybrid"):
+            self.lexical_index
+        self.chunk_text_store
+        self._ready_modes.add(mode)
+    
+    # ------------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------------
+    
+    def query(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        namespace: Optional[str] = None,
+        mode: Optional[str] = None,
+        deadline: Optional[float] = None,
+        expand_neighbors: int = 0
+    ) -> QueryResults:
+        """
+        Busca contexto médico relevante (mesmo formato de query_medical_rag).
+        
+        Args:
+            query: Pergunta ou texto de busca.
+            top_k: Número de resultados. Se None, usa o padrão do motor.
+            filters: Filtros de metadados (ex: {"year": "2011"}).
+            namespace: Namespace. Se None, usa o padrão do motor.
+            mode: 'dense', 'lexical' ou 'hybrid'. Se None, usa o padrão do motor.
+            deadline: Orçamento de tempo da query, em segundos, compartilhado
+                pelo embedding (incluindo retries) e pela busca. Se None, usa
+                QUERY_DEADLINE_SECONDS (0 = sem prazo). Ao estourar, retorna
+                resultados degradados (ver QueryResults).
+            expand_neighbors: Inclui até k chunks vizinhos (antes e depois) de
+                cada resultado, obtidos pelos IDs determinísticos em uma busca
+                por ID (ver _expand_neighbors). 0 = sem expansão.
+        
+        Returns:
+            QueryResults ({"text", "score", "metadata", "article_id", "chunk_index"}).
+        """
+        top_k = top_k or self.top_k
+        namespace = namespace or self.namespace
+        mode = (mode or self.mode).lower()
+        
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"mode inválido: {mode}. Use 'dense', 'lexical' ou 'hybrid'.")
+        
+        deadline_at = deadline_after(self.settings.QUERY_DEADLINE_SECONDS if deadline is None else deadline)
+        with trace("query", mode=mode, top_k=top_k, chars=len(query)) as span:
+            try:
+                results = QueryResults(self._query(query, top_k, filters, namespace, mode, deadline_at))
+            except DeadlineExceeded as e:
+                results = self._degraded(query, top_k, filters, namespace, mode, e)
+            if expand_neighbors and results and not results.degraded:
+                results = QueryResults(self._expand_neighbors(results, expand_neighbors, namespace))
+            span.set(results=len(results), degraded=results.degraded)
+        return results
+    
+    def _query(
+        self,
+        query: str,
+        top_k: int,
+        filters: Optional[Dict[str, Any]],
+        namespace: Optional[str],
+        mode: str,
+        deadline_at: Optional[float]
+    ) -> List[Dict[str, Any]]:
+        """Executa query (argumentos já resolvidos); levanta DeadlineExceeded no prazo."""
+        # Cache, nível exato (antes de qualquer chamada externa)
+        cache_key = self._cache_key(query, top_k, filters, namespace, mode)
+        if cache_key is not None:
+            with trace("cache_lookup") as span:
+                cached = self.cache.get(cache_key)
+                span.set(hit=cached is not None)
+            if cached is not None:
+                return cached
+        
+        # Prepara filtros para Pinecone
+        pinecone_filter = None
+        if filters:
+            pinecone_filter = _prepare_pinecone_filter(filters)
+        
+        # Busca lexical (em processo, sem embedding da query)
+        lexical_matches: List[Dict[str, Any]] = []
+        candidate_k = top_k if mode != "hybrid" else max(top_k * 4, 20)
+        if mode in ("lexical", "hybrid"):
+            with trace("lexical_search", top_k=candidate_k) as span:
+                lexical_matches = self.lexical_index.search(query, top_k=candidate_k, filter=pinecone_filter)
+                span.set(matches=len(lexical_matches))
+            
+            if mode == "lexical":
+                return self._cache_put(cache_key, [_format_match(match) for match in lexical_matches])
+        
+        # Gera embedding da query
+        with trace("embedding", chars=len(query)) as span:
+            query_embedding = self.embeddings_manager.embed_text(query, deadline_at=deadline_at)
+            span.set(dimension=len(query_embedding))
+        
+        # Cache, nível semântico (query quase idêntica já respondida)
+        if cache_key is not None and mode == "dense":
+            with trace("cache_semantic") as span:
+                cached = self.cache.get_similar(cache_key, query_embedding)
+                span.set(hit=cached is not None)
+            if cached is not None:
+                return cached
+        
+        # Busca no vector store
+        with trace("vector_search", top_k=candidate_k) as span:
+            matches = self._dense_search(query_embedding, candidate_k, pinecone_filter, namespace, deadline_at)
+            span.set(matches=len(matches))
+        
+        # Modo hybrid: funde os rankings denso e lexical (RRF)
+        if mode == "hybrid":
+            matches = self._fuse(matches, lexical_matches, top_k)
+        
+        return self._cache_put(cache_key, self._finalize(matches), query_embedding, mode)
+    
+    def query_batch(
+        self,
+        queries: List[str],
+        top_k: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        namespace: Optional[str] = None,
+        mode: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        deadline: Optional[float] = None
+    ) -> List[QueryResults]:
+        """
+        Busca contexto para várias perguntas de uma vez.
+        
+        Os embeddings das queries são gerados em chamadas em lote
+        (QUERY_EMBED_BATCH_SIZE queries por requisição, quando o provider
+        suporta; senão um por query, dentro das threads) e as queries no índice
+        rodam em paralelo, limitadas a max_workers, reutilizando o pool de
+        conexões do motor. Cada pergunta passa pelos mesmos níveis de cache de
+        query (exato e, no modo dense, semântico) e, se o prazo estourar antes
+        de ser respondida, recebe a mesma resposta degradada de query.
+        
+        Args:
+            queries: Lista de perguntas.
+            top_k: Número de resultados por pergunta. Se None, usa o padrão do motor.
+            filters: Filtros de metadados aplicados a todas as perguntas.
+            namespace: Namespace. Se None, usa o padrão do motor.
+            mode: 'dense', 'lexical' ou 'hybrid'. Se None, usa o padrão do motor.
+            max_workers: Máximo de queries simultâneas no índice. Se None, usa
+                QUERY_POOL_THREADS.
+            deadline: Orçamento de tempo do lote inteiro, em segundos. Se None,
+                usa QUERY_DEADLINE_SECONDS (0 = sem prazo).
+        
+        Returns:
+            Um QueryResults por pergunta, na ordem de entrada.
+        """
+        top_k = top_k or self.top_k
+        namespace = namespace or self.namespace
+        mode = (mode or self.mode).lower()
+        max_workers = max_workers or self.settings.QUERY_POOL_THREADS
+        
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"mode inválido: {mode}. Use 'dense', 'lexical' ou 'hybrid'.")
+        if max_workers <= 0:
+            raise ValueError(f"max_workers deve ser positivo: {max_workers}")
+        for position, query in enumerate(queries):
+            if not query or not query.strip():
+                raise ValueError(f"Query vazia na posição {position}")
+        if not queries:
+            return []
+        
+        deadline_at = deadline_after(self.settings.QUERY_DEADLINE_SECONDS if deadline is None else deadline)
+        
+        # Cache, nível exato: só as perguntas sem resultado cacheado são buscadas
+        results: List[Optional[QueryResults]] = [None] * len(queries)
+        cache_keys = [self._cache_key(query, top_k, filters, namespace, mode) for query in queries]
+        for position, cache_key in enumerate(cache_keys):
+            if cache_key is not None:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    results[position] = QueryResults(cached)
+        pending = [position for position, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+        pending_queries = [queries[position] for position in pending]
+        
+        pinecone_filter = None
+        if filters:
+            pinecone_filter = _prepare_pinecone_filter(filters)
+        
+        # Busca lexical (em processo, rápida; não compensa paralelizar)
+        candidate_k = top_k if mode != "hybrid" else max(top_k * 4, 20)
+        lexical_matches: List[List[Dict[str, Any]]] = []
+        if mode in ("lexical", "hybrid"):
+            lexical_matches = [
+                self.lexical_index.search(query, top_k=candidate_k, filter=pinecone_filter)
+                for query in pending_queries
+            ]
+        
+        query_embeddings: List[Optional[List[float]]] = [None] * len(pending_queries)
+        semantic_hits: List[Optional[List[Dict[str, Any]]]] = [None] * len(pending_queries)
+        errors: List[Optional[DeadlineExceeded]] = [None] * len(pending_queries)
+        
+        if mode == "lexical":
+            matches_per_query = lexical_matches
+        else:
+            # Cria os clientes antes de abrir as threads
+            embeddings_manager = self.embeddings_manager
+            self.vector_store
+            
+            # Embeddings em lote: uma requisição ao provider por lote de queries.
+            # Lotes não gerados no prazo ficam None e caem na degradação abaixo.
+            if getattr(embeddings_manager, "supports_batch_queries", False):
+                batch_size = self.settings.QUERY_EMBED_BATCH_SIZE
+                try:
+                    for i in range(0, len(pending_queries), batch_size):
+                        batch = pending_queries[i:i + batch_size]
+                        with trace("embedding_batch", queries=len(batch)):
+                            if deadline_at is None:
+                                embeddings = embeddings_manager.embed_queries(batch)
+                            else:
+                                embeddings = call_with_deadline(
+                                    embeddings_manager.embed_queries, batch,
+                                    deadline_at=deadline_at, stage="embedding das queries"
+                                )
+                        query_embeddings[i:i + len(batch)] = embeddings
+                except DeadlineExceeded:
+                    pass
+            
+            def search(index: int) -> List[Dict[str, Any]]:
+                try:
+                    embedding = query_embeddings[index]
+                    if embedding is None:
+                        with trace("embedding", chars=len(pending_queries[index])):
+                            embedding = embeddings_manager.embed_text(pending_queries[index], deadline_at=deadline_at)
+                        query_embeddings[index] = embedding
+                    
+                    # Cache, nível semântico (query quase idêntica já respondida)
+                    cache_key = cache_keys[pending[index]]
+                    if cache_key is not None and mode == "dense":
+                        semantic_hits[index] = self.cache.get_similar(cache_key, embedding)
+                        if semantic_hits[index] is not None:
+                            return []
+                    
+                    with trace("vector_search", top_k=candidate_k) as span:
+                        matches = self._dense_search(embedding, candidate_k, pinecone_filter, namespace, deadline_at)
+                        span.set(matches=len(matches))
+                    return matches
+                except DeadlineExceeded as e:
+                    errors[index] = e
+                    return []
+            
+            # Queries no índice em paralelo (map preserva a ordem de entrada)
+            workers = min(max_workers, len(pending_queries))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag-query") as executor:
+                matches_per_query = list(executor.map(search, range(len(pending_queries))))
+            
+            if mode == "hybrid":
+                matches_per_query = [
+                    self._fuse(matches, lexical, top_k)
+                    for matches, lexical in zip(matches_per_query, lexical_matches)
+                ]
+            
+            # Hidrata todos os textos em uma única consulta ao store
+            all_matches = [match for matches in matches_per_query for match in matches]
+            with trace("hydration", matches=len(all_matches)):
+                hydrate_matches(all_matches, self.chunk_text_store)
+        
+        for index, (position, matches) in enumerate(zip(pending, matches_per_query)):
+            if errors[index] is not None:
+                results[position] = self._degraded(
+                    queries[position], top_k, filters, namespace, mode, errors[index]
+                )
+            elif semantic_hits[index] is not None:
+                results[position] = QueryResults(semantic_hits[index])
+            else:
+                results[position] = QueryResults(self._cache_put(
+                    cache_keys[position], [_format_match(match) for match in matches],
+                    query_embeddings[index], mode
+                ))
+        return results
+    
+    async def aquery(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        namespace: Optional[str] = None,
+        mode: Optional[str] = None,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+        expand_neighbors: int = 0
+    ) -> QueryResults:
+        """
+        Versão assíncrona de query, para servidores asyncio.
+        
+        O embedding e a busca usam clientes HTTP assíncronos, então um único
+        event loop conduz centenas de queries concorrentes sem ocupar uma
+        thread por query. Cancelar a task cancela a requisição em andamento.
+        
+        Args:
+            query: Pergunta ou texto de busca.
+            top_k: Número de resultados. Se None, usa o padrão do motor.
+            filters: Filtros de metadados (ex: {"year": "2011"}).
+            namespace: Namespace. Se None, usa o padrão do motor.
+            mode: 'dense', 'lexical' ou 'hybrid'. Se None, usa o padrão do motor.
+            timeout: Timeout por chamada (embedding e busca), em segundos. Se
+                None, usa QUERY_TIMEOUT_SECONDS.
+            deadline: Orçamento de tempo da query inteira, em segundos (ver
+                query). Se None, usa QUERY_DEADLINE_SECONDS.
+            expand_neighbors: Chunks vizinhos por resultado (ver query).
+        
+        Returns:
+            QueryResults (mesmo formato de query).
+        """
+        top_k = top_k or self.top_k
+        namespace = namespace or self.namespace
+        mode = (mode or self.mode).lower()
+        timeout = timeout or self.settings.QUERY_TIMEOUT_SECONDS
+        
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"mode inválido: {mode}. Use 'dense', 'lexical' ou 'hybrid'.")
+        
+        deadline_at = deadline_after(self.settings.QUERY_DEADLINE_SECONDS if deadline is None else deadline)
+        with trace("query", mode=mode, top_k=top_k, chars=len(query)) as span:
+            try:
+                results = QueryResults(
+                    await self._aquery(query, top_k, filters, namespace, mode, timeout, deadline_at)
+                )
+            except DeadlineExceeded as e:
+                results = self._degraded(query, top_k, filters, namespace, mode, e)
+            if expand_neighbors and results and not results.degraded:
+                results = QueryResults(
+                    await asyncio.to_thread(self._expand_neighbors, results, expand_neighbors, namespace)
+                )
+            span.set(results=len(results), degraded=results.degraded)
+        return results
+    
+    async def _aquery(
+        self,
+        query: str,
+        top_k: int,
+        filters: Optional[Dict[str, Any]],
+        namespace: Optional[str],
+        mode: str,
+        timeout: float,
+        deadline_at: Optional[float]
+    ) -> List[Dict[str, Any]]:
+        """Executa aquery (argumentos já resolvidos); levanta DeadlineExceeded no prazo."""
+        # Clientes ainda não criados: cria no executor (chamadas bloqueantes)
+        if mode not in self._ready_modes:
+            await asyncio.to_thread(self._ensure_clients, mode)
+        
+        cache_key = self._cache_key(query, top_k, filters, namespace, mode)
+        if cache_key is not None:
+            with trace("cache_lookup") as span:
+                cached = self.cache.get(cache_key)
+                span.set(hit=cached is not None)
+            if cached is not None:
+                return cached
+        
+        pinecone_filter = None
+        if filters:
+            pinecone_filter = _prepare_pinecone_filter(filters)
+        
+        # Busca lexical (em processo, sub-milissegundo)
+        lexical_matches: List[Dict[str, Any]] = []
+        candidate_k = top_k if mode != "hybrid" else max(top_k * 4, 20)
+        if mode in ("lexical", "hybrid"):
+            with trace("lexical_search", top_k=candidate_k) as span:
+                lexical_matches = self.lexical_index.search(query, top_k=candidate_k, filter=pinecone_filter)
+                span.set(matches=len(lexical_matches))
+            
+            if mode == "lexical":
+                return self._cache_put(cache_key, [_format_match(match) for match in lexical_matches])
+        
+        with trace("embedding", chars=len(query)) as span:
+            query_embedding = await self.embeddings_manager.aembed_text(
+                query, timeout=timeout, deadline_at=deadline_at
+            )
+            span.set(dimension=len(query_embedding))
+        
+        if cache_key is not None and mode == "dense":
+            with trace("cache_semantic") as span:
+                cached = self.cache.get_similar(cache_key, query_embedding)
+                span.set(hit=cached is not None)
+            if cached is not None:
+                return cached
+        
+        if self.coarse_articles:
+            pinecone_filter = await self._acoarse_filter(query_embedding, pinecone_filter, namespace, timeout, deadline_at)
+        
+        namespaces = self._route(namespace, pinecone_filter)
+        search_timeout, limited = bounded_timeout(timeout, deadline_at, "busca no índice")
+        with trace("vector_search", top_k=candidate_k, namespaces=len(namespaces)) as span:
+            try:
+                results = await asyncio.wait_for(
+                    asyncio.gather(*(
+                        self.vector_store.aquery(
+                            vector=query_embedding,
+                            top_k=candidate_k,
+                            include_metadata=True,
+                            namespace=partition_namespace,
+                            filter=pinecone_filter
+                        )
+                        for partition_namespace in namespaces
+                    )),
+                    search_timeout
+                )
+            except asyncio.TimeoutError:
+                if limited:
+                    raise DeadlineExceeded(f"busca no índice não terminou em {search_timeout:.2f}s")
+                raise RuntimeError(f"Erro ao buscar no Pinecone: timeout de {timeout}s")
+            except Exception as e:
+                raise RuntimeError(f"Erro ao buscar no Pinecone: {e}")
+            matches = merge_matches([result["matches"] for result in results], candidate_k)
+            span.set(matches=len(matches))
+        
+        if mode == "hybrid":
+            matches = self._fuse(matches, lexical_matches, top_k)
+        
+        # Hidratação lê do SQLite local: roda no executor
+        if self.chunk_text_store is not None:
+            with trace("hydration", matches=len(matches)):
+                await asyncio.to_thread(hydrate_matches, matches, self.chunk_text_store)
+        with trace("format", results=len(matches)):
+            formatted = [_format_match(match) for match in matches]
+        return self._cache_put(cache_key, formatted, query_embedding, mode)
+    
+    def _cache_key(
+        self,
+        query: str,
+        top_k: int,
+        filters: Optional[Dict[str, Any]],
+        namespace: Optional[str],
+        mode: str
+    ) -> Optional[CacheKey]:
+        """
+        Chave da query no cache (None se o motor não tem cache).
+        
+        O cache é compartilhado entre motores: a chave inclui a identidade do
+        store, o store de textos, a versão do índice lexical (modos lexical e
+        hybrid) e a assinatura dos embeddings (modos dense e hybrid).
+        """
+        if self.cache is None:
+            return None
+        key_mode = mode
+        embedding = ""
+        if mode in ("lexical", "hybrid"):
+            # Reconstruir o índice lexical gera um build_id novo
+            key_mode = f"{key_mode}@bm25:{self.lexical_index.build_id}"
+        if mode != "lexical":
+            embedding = self.embedding_signature
+            if self.coarse_articles:
+                # Resultados da busca em dois níveis podem diferir da busca direta
+                key_mode = f"{key_mode}@coarse{self.coarse_articles}"
+        return self.cache.make_key(
+            self.index_name, namespace, key_mode, top_k, filters, query,
+            store=self.store_identity, embedding=embedding, text_store=self.chunk_text_store_path or ""
+        )
+    
+    def _cache_put(
+        self,
+        cache_key: Optional[CacheKey],
+        results: List[Dict[str, Any]],
+        query_embedding: Optional[List[float]] = None,
+        mode: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Armazena os resultados no cache (o semântico só no modo dense) e os retorna."""
+        if cache_key is not None:
+            self.cache.put(cache_key, results, query_embedding if mode == "dense" else None)
+        return results
+    
+    def _expand_neighbors(
+        self,
+        results: List[Dict[str, Any]],
+        k: int,
+        namespace: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        Acrescenta aos resultados os k chunks vizinhos de cada um.
+        
+        Os IDs dos vizinhos são calculados (article_{id}_chunk_{i±1..k}) e
+        buscados de uma vez: no store local de textos, quando existe (ele tem
+        todos os chunks ingeridos com ele; os demais metadados são do artigo e
+        vêm do próprio resultado), ou senão em um fetch por ID no índice (um
+        por namespace/partição). IDs inexistentes (além do fim do artigo) são
+        ignorados.
+        
+        Os chunks de cada artigo ficam juntos e em ordem de chunk_index, na
+        ordem do melhor resultado do artigo; um vizinho herda o score do
+        resultado que o trouxe e é marcado com "neighbor": True.
+        
+        Args:
+            results: Resultados formatados da query.
+            k: Vizinhos de cada lado.
+            namespace: Namespace da query.
+        
+        Returns:
+            Nova lista de resultados, com os vizinhos.
+        """
+        if k < 0:
+            raise ValueError(f"expand_neighbors deve ser >= 0: {k}")
+        
+        def position(result: Dict[str, Any]):
+            try:
+                return str(result.get("article_id", "")), int(float(result.get("chunk_index", 0)))
+            except (TypeError, ValueError):
+                return None
+        
+        present = {position(result) for result in results}
+        wanted: Dict[str, tuple] = {}
+        for result in results:
+            pos = position(result)
+            if pos is None:
+                continue
+            article_id, index = pos
+            for neighbor in range(max(index - k, 0), index + k + 1):
+                vector_id = vector_id_for(article_id, neighbor)
+                if (article_id, neighbor) not in present and vector_id not in wanted:
+                    wanted[vector_id] = (result, neighbor)
+        
+        with trace("neighbor_expansion", requested=len(wanted)) as span:
+            found: Dict[str, Dict[str, Any]] = {}
+            store = self.chunk_text_store
+            if store is not None and wanted:
+                # Vizinhos no store local: sem chamada ao índice
+                for vector_id, fields in store.get_many(list(wanted)).items():
+                    origin, neighbor = wanted[vector_id]
+                    slim, _ = split_metadata(origin.get("metadata") or {})
+                    found[vector_id] = dict(slim, chunk_index=neighbor, **fields)
+            
+            by_namespace: Dict[Optional[str], List[str]] = {}
+            for vector_id in wanted if store is None else ():
+                origin_namespace = self._namespace_of(wanted[vector_id][0], namespace)
+                by_namespace.setdefault(origin_namespace, []).append(vector_id)
+            
+            for fetch_namespace, vector_ids in by_namespace.items():
+                try:
+                    vectors = self.vector_store.fetch(vector_ids, namespace=fetch_namespace)["vectors"]
+                except Exception as e:
+                    raise RuntimeError(f"Erro ao buscar chunks vizinhos: {e}")
+                matches = [
+                    {"id": vector_id, "score": 0.0, "metadata": vector["metadata"]}
+                    for vector_id, vector in vectors.items()
+                ]
+                hydrate_matches(matches, store)
+                found.update((match["id"], match["metadata"]) for match in matches)
+            span.set(found=len(found))
+        
+        # Agrupa por artigo (na ordem do melhor resultado) e ordena por chunk_index
+        articles: Dict[str, List[tuple]] = {}
+        for result in results:
+            pos = position(result)
+            key = pos[0] if pos is not None else id(result)
+            articles.setdefault(key, []).append(((pos or ("", 0))[1], dict(result, neighbor=False)))
+        for vector_id, metadata in found.items():
+            origin, neighbor = wanted[vector_id]
+            formatted = _format_match({"id": vector_id, "score": origin["score"], "metadata": metadata})
+            formatted["chunk_index"] = neighbor
+            formatted["neighbor"] = True
+            articles[position(origin)[0]].append((neighbor, formatted))
+        
+        return [
+            result
+            for chunks in articles.values()
+            for _, result in sorted(chunks, key=lambda item: item[0])
+        ]
+    
+    def _namespace_of(self, result: Dict[str, Any], namespace: Optional[str]) -> Optional[str]:
+        """Namespace onde o vetor do resultado está (a partição, se particionado)."""
+        if self.partition_router is None or not self.partition_router.partitions(namespace):
+            return namespace
+        scheme = self.partition_scheme
+        return scheme.namespace_for(namespace, scheme.partition_for(result.get("metadata") or {}))
+    
+    def _degraded(
+        self,
+        query: str,
+        top_k: int,
+        filters: Optional[Dict[str, Any]],
+        namespace: Optional[str],
+        mode: str,
+        error: DeadlineExceeded
+    ) -> QueryResults:
+        """
+        Resposta de uma query que estourou o prazo, sem chamadas externas:
+        cache (aceitando épocas anteriores), busca lexical ou vazia.
+        """
+        results = None
+        fallback = "empty"
+        
+        cache_key = self._cache_key(query, top_k, filters, namespace, mode)
+        if cache_key is not None:
+            results = self.cache.get(cache_key, allow_stale=True)
+            fallback = "cache"
+        
+        if results is None:
+            try:
+                pinecone_filter = _prepare_pinecone_filter(filters) if filters else None
+                matches = self.lexical_index.search(query, top_k=top_k, filter=pinecone_filter)
+                results = [_format_match(match) for match in matches]
+                fallback = "lexical"
+            except Exception:
+                # Sem índice lexical construído (LEXICAL_INDEX_PATH)
+                results = []
+                fallback = "empty"
+        
+        print(f"⚠️  Prazo da query esgotado ({error}); resposta degradada: {fallback}")
+        return QueryResults(results, degraded=True, fallback=fallback, reason=str(error))
+    
+    async def aclose(self):
+        """Fecha os clientes assíncronos criados no event loop atual."""
+        if self._embeddings_manager is not None and hasattr(self._embeddings_manager, "aclose"):
+            await self._embeddings_manager.aclose()
+        if self._vector_store is not None:
+            await self._vector_store.aclose()
+    
+    def _dense_search(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        pinecone_filter: Optional[Dict[str, Any]],
+        namespace: Optional[str],
+        deadline_at: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Executa a query no vector store (em todas as partições roteadas) e
+        retorna os matches. Com prazo, cada busca roda via call_with_deadline e
+        é abandonada quando ele vence (DeadlineExceeded). Com coarse_articles,
+        a busca fica restrita aos artigos selecionados (ver _coarse_filter).
+        """
+        if self.coarse_articles:
+            pinecone_filter = self._coarse_filter(query_embedding, pinecone_filter, namespace, deadline_at)
+        
+        def search(partition_namespace: Optional[str]) -> List[Dict[str, Any]]:
+            return self.vector_store.query(
+                vector=query_embedding,
+                top_k=top_k,
+                include_metadata=True,
+                namespace=partition_namespace,
+                filter=pinecone_filter
+            )["matches"]
+        
+        namespaces = self._route(namespace, pinecone_filter)
+        try:
+            if deadline_at is not None:
+                # Cada busca roda fora do pool (call_with_deadline): uma busca
+                # abandonada no prazo não prende um worker do fanout_executor
+                def bounded_search(partition_namespace: Optional[str]) -> List[Dict[str, Any]]:
+                    return call_with_deadline(
+                        search, partition_namespace, deadline_at=deadline_at, stage="busca no índice"
+                    )
+                
+                if len(namespaces) == 1:
+                    return bounded_search(namespaces[0])
+                match_lists = list(self.fanout_executor.map(bounded_search, namespaces))
+            elif len(namespaces) == 1:
+                return search(namespaces[0])
+            else:
+                match_lists = list(self.fanout_executor.map(search, namespaces))
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Erro ao buscar no Pinecone: {e}")
+        
+        return merge_matches(match_lists, top_k)
+    
+    def _coarse_filter(
+        self,
+        query_embedding: List[float],
+        pinecone_filter: Optional[Dict[str, Any]],
+        namespace: Optional[str],
+        deadline_at: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Etapa coarse: busca os top-M artigos nos vetores de artigo (com o mesmo
+        filtro) e restringe o filtro da busca nos chunks a eles. Sem vetores de
+        artigo no namespace, retorna o filtro original (busca direta).
+        """
+        search_kwargs = dict(
+            vector=query_embedding,
+            top_k=self.coarse_articles,
+            include_metadata=True,
+            namespace=article_namespace_for(namespace),
+            filter=pinecone_filter
+        )
+        with trace("coarse_search", articles=self.coarse_articles) as span:
+            try:
+                if deadline_at is not None:
+                    response = call_with_deadline(
+                        self.vector_store.query, deadline_at=deadline_at, stage="busca de artigos", **search_kwargs
+                    )
+                else:
+                    response = self.vector_store.query(**search_kwargs)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"Erro ao buscar artigos no Pinecone: {e}")
+            article_ids = article_ids_from_matches(response["matches"])
+            span.set(matches=len(article_ids))
+        
+        return narrow_filter(pinecone_filter, article_ids) if article_ids else pinecone_filter
+    
+    async def _acoarse_filter(
+        self,
+        query_embedding: List[float],
+        pinecone_filter: Optional[Dict[str, Any]],
+        namespace: Optional[str],
+        timeout: float,
+        deadline_at: Optional[float]
+    ) -> Optional[Dict[str, Any]]:
+        """Versão assíncrona de _coarse_filter."""
+        search_timeout, limited = bounded_timeout(timeout, deadline_at, "busca de artigos")
+        with trace("coarse_search", articles=self.coarse_articles) as span:
+            try:
+                response = await asyncio.wait_for(
+                    self.vector_store.aquery(
+                        vector=query_embedding,
+                        top_k=self.coarse_articles,
+                        include_metadata=True,
+                        namespace=article_namespace_for(namespace),
+                        filter=pinecone_filter
+                    ),
+                    search_timeout
+                )
+            except asyncio.TimeoutError:
+                if limited:
+                    raise DeadlineExceeded(f"busca de artigos não terminou em {search_timeout:.2f}s")
+                raise RuntimeError(f"Erro ao buscar artigos no Pinecone: timeout de {timeout}s")
+            except Exception as e:
+                raise RuntimeError(f"Erro ao buscar artigos no Pinecone: {e}")
+            article_ids = article_ids_from_matches(response["matches"])
+            span.set(matches=len(article_ids))
+        
+        return narrow_filter(pinecone_filter, article_ids) if article_ids else pinecone_filter
+    
+    def _route(
+        self,
+        namespace: Optional[str],
+        pinecone_filter: Optional[Dict[str, Any]]
+    ) -> List[Optional[str]]:
+        """
+        Namespaces a consultar: as partições que o filtro pode satisfazer
+        (todas, sem filtro no campo) ou o próprio namespace se não particionado.
+        """
+        if self.partition_router is None:
+            return [namespace]
+        namespaces = self.partition_router.route(namespace, pinecone_filter)
+        return [namespace] if namespaces is None else namespaces
+    
+    def _fuse(
+        self,
+        dense_matches: List[Dict[str, Any]],
+        lexical_matches: List[Dict[str, Any]],
+        top_k: int
+    ) -> List[Dict[str, Any]]:
+        """Funde rankings denso e lexical por reciprocal rank fusion."""
+        by_id = {match["id"]: match for match in lexical_matches}
+        by_id.update({match["id"]: match for match in dense_matches})
+        fused = reciprocal_rank_fusion(
+            [[match["id"] for match in dense_matches], [match["id"] for match in lexical_matches]],
+            k=self.settings.RRF_K
+        )
+        return [
+            dict(by_id[vector_id], score=score)
+            for vector_id, score in fused[:top_k]
+        ]
+    
+    def _finalize(self, matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Hidrata textos do store externo (uma consulta em lote) e formata."""
+        with trace("hydration", matches=len(matches)):
+            hydrate_matches(matches, self.chunk_text_store)
+        with trace("format", results=len(matches)):
+            return [_format_match(match) for match in matches]
+
+
+# Motores padrão usados por query_medical_rag, por configuração (e clientes passados)
+_default_engines: Dict[tuple, RAGQueryEngine] = {}
+_default_engines_lock = threading.Lock()
+
+# Motores de clientes passados explicitamente mantidos (descarta o mais antigo)
+_MAX_CLIENT_ENGINES = 16
+
+# Cache de resultados compartilhado pelos motores padrão
+_default_cache: Optional[QueryResultCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> Optional[QueryResultCache]:
+    """
+    Retorna o cache de resultados compartilhado (None se QUERY_CACHE_ENABLED=false).
+    
+    Returns:
+        QueryResultCache invalidado pelas épocas de INGESTION_EPOCH_PATH.
+    """
+    global _default_cache
+    settings = Settings()
+    if not settings.QUERY_CACHE_ENABLED:
+        return None
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = QueryResultCache(
+                    epochs=IngestionEpochs(settings.INGESTION_EPOCH_PATH),
+                    max_entries=settings.QUERY_CACHE_MAX_ENTRIES,
+                    semantic_threshold=settings.QUERY_CACHE_SEMANTIC_THRESHOLD or None
+                )
+    return _default_cache
+
+
+def get_query_engine(
+    index_name: Optional[str] = None,
+    api_key: Optional[str] = None,
+    embedding_dimension: Optional[int] = None,
+    chunk_text_store_path: Optional[str] = None,
+    backend: Optional[str] = None,
+    embeddings_manager: Optional[EmbeddingsManager] = None,
+    vector_store: Optional[VectorStore] = None,
+    lexical_index: Optional[BM25Index] = None
+) -> RAGQueryEngine:
+    """
+    Retorna o motor compartilhado (nível de módulo) para a configuração.
+    
+    Clientes passados explicitamente fazem parte da chave (por identidade):
+    chamadas com o mesmo embeddings_manager/vector_store/lexical_index
+    reutilizam o motor, com seu índice, cache e roteador de partições.
+    
+    Args:
+        index_name: Nome do índice Pinecone. Se None, usa das configurações.
+        api_key: API key do Pinecone. Se None, usa das configurações.
+        embedding_dimension: Dimensão dos embeddings. Se None, usa EMBEDDING_DIMENSION.
+        chunk_text_store_path: SQLite de textos. Se None, usa CHUNK_TEXT_STORE_PATH.
+        backend: 'pinecone', 'local' ou 'ivfpq'. Se None, usa VECTOR_STORE_BACKEND.
+        embeddings_manager: Gerenciador de embeddings. Se None, o motor cria um.
+        vector_store: Vector store já inicializado. Se None, o motor conecta.
+        lexical_index: Índice BM25 já carregado. Se None, o motor carrega.
+    
+    Returns:
+        RAGQueryEngine reutilizado entre chamadas com a mesma configuração.
+    """
+    clients = (embeddings_manager, vector_store, lexical_index)
+    key = (index_name, api_key, embedding_dimension, chunk_text_store_path, backend) + clients
+    engine = _default_engines.get(key)
+    if engine is None:
+        with _default_engines_lock:
+            engine = _default_engines.get(key)
+            if engine is None:
+                if any(client is not None for client in clients):
+                    client_keys = [k for k in _default_engines if any(c is not None for c in k[-3:])]
+                    for stale in client_keys[:max(0, len(client_keys) - _MAX_CLIENT_ENGINES + 1)]:
+                        del _default_engines[stale]
+                engine = _default_engines[key] = RAGQueryEngine(
+                    embeddings_manager=embeddings_manager,
+                    index_name=index_name,
+                    api_key=api_key,
+                    embedding_dimension=embedding_dimension,
+                    chunk_text_store_path=chunk_text_store_path,
+                    backend=backend,
+                    vector_store=vector_store,
+                    lexical_index=lexical_index,
+                    cache=get_query_cache()
+                )
+    return engine
 
 
 def query_medical_rag(
@@ -19,20 +1141,51 @@ def query_medical_rag(
     namespace: Optional[str] = None,
     api_key: Optional[str] = None,
     top_k: Optional[int] = None,
-    filters: Optional[Dict[str, Any]] = None
+    filters: Optional[Dict[str, Any]] = None,
+    embedding_dimension: Optional[int] = None,
+    chunk_text_store_path: Optional[str] = None,
+    backend: Optional[str] = None,
+    vector_store: Optional[VectorStore] = None,
+    mode: Optional[str] = None,
+    lexical_index: Optional[BM25Index] = None,
+    deadline: Optional[float] = None,
+    expand_neighbors: int = 0
 ) -> List[Dict[str, Any]]:
     """
     Busca contexto médico relevante no Pinecone usando RAG.
     
+    Delega a um RAGQueryEngine de nível de módulo, que reutiliza clientes de
+    embeddings e do índice entre chamadas. Objetos passados explicitamente
+    (embeddings_manager, vector_store, lexical_index) selecionam um motor
+    próprio, também reutilizado entre chamadas com os mesmos objetos.
+    
     Args:
         query: Pergunta ou texto de busca.
-        embeddings_manager: Gerenciador de embeddings. Se None, cria um novo.
+        embeddings_manager: Gerenciador de embeddings. Se None, usa o do motor
+            compartilhado (criado uma vez e reutilizado entre queries).
         index_name: Nome do índice Pinecone. Se None, usa das configurações.
         namespace: Namespace do Pinecone. Se None, usa das configurações.
         api_key: API key do Pinecone. Se None, usa das configurações.
         top_k: Número de resultados a retornar. Se None, usa das configurações.
         filters: Filtros de metadados (ex: {"year": "2011"}).
-        
+        embedding_dimension: Dimensão dos embeddings da query (deve ser a mesma
+            usada na ingestão). Se None, usa EMBEDDING_DIMENSION das configurações.
+        chunk_text_store_path: SQLite com os textos dos chunks (quando a
+            ingestão usou o store externo). Se None, usa CHUNK_TEXT_STORE_PATH.
+        backend: 'pinecone', 'local' ou 'ivfpq'. Se None, usa VECTOR_STORE_BACKEND.
+        vector_store: Vector store já inicializado (ignora backend/index_name/api_key).
+        mode: 'dense', 'lexical' (BM25 local, sem embeddings) ou 'hybrid'
+            (dense + lexical por reciprocal rank fusion; o score é o do RRF).
+            Se None, usa RETRIEVAL_MODE das configurações.
+        lexical_index: Índice BM25 já carregado. Se None, carrega de LEXICAL_INDEX_PATH.
+        deadline: Orçamento de tempo em segundos (embedding, retries e busca).
+            Se None, usa QUERY_DEADLINE_SECONDS (0 = sem prazo). Ao estourar,
+            retorna o resultado cacheado, a busca lexical ou uma lista vazia,
+            com results.degraded = True (ver QueryResults).
+        expand_neighbors: Inclui até k chunks vizinhos de cada resultado (mesmo
+            artigo, chunk_index ± k), buscados por ID em uma única chamada em
+            vez de novas buscas por similaridade. 0 = sem expansão.
+    
     Returns:
         Lista de dicionários com resultados:
             {
@@ -47,82 +1200,187 @@ def query_medical_rag(
         >>> print(f"Encontrados {len(results)} resultados")
         Encontrados 5 resultados
     """
-    settings = Settings()
+    engine = _resolve_engine(
+        embeddings_manager=embeddings_manager,
+        index_name=index_name,
+        api_key=api_key,
+        embedding_dimension=embedding_dimension,
+        chunk_text_store_path=chunk_text_store_path,
+        backend=backend,
+        vector_store=vector_store,
+        lexical_index=lexical_index
+    )
     
-    # Configurações padrão
-    index_name = index_name or settings.PINECONE_INDEX_NAME
-    namespace = namespace or settings.PINECONE_NAMESPACE
-    api_key = api_key or settings.PINECONE_API_KEY
-    top_k = top_k or settings.TOP_K_RESULTS
+    return engine.query(
+        query,
+        top_k=top_k,
+        filters=filters,
+        namespace=namespace,
+        mode=mode,
+        deadline=deadline,
+        expand_neighbors=expand_neighbors
+    )
+
+
+def query_medical_rag_batch(
+    queries: List[str],
+    embeddings_manager: Optional[EmbeddingsManager] = None,
+    index_name: Optional[str] = None,
+    namespace: Optional[str] = None,
+    api_key: Optional[str] = None,
+    top_k: Optional[int] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    embedding_dimension: Optional[int] = None,
+    chunk_text_store_path: Optional[str] = None,
+    backend: Optional[str] = None,
+    vector_store: Optional[VectorStore] = None,
+    mode: Optional[str] = None,
+    lexical_index: Optional[BM25Index] = None,
+    max_workers: Optional[int] = None,
+    deadline: Optional[float] = None
+) -> List[List[Dict[str, Any]]]:
+    """
+    Busca contexto médico para várias perguntas de uma vez.
     
-    if not api_key:
-        raise ValueError(
-            "PINECONE_API_KEY não configurada. "
-            "Configure no arquivo .env ou passe como parâmetro."
-        )
+    Equivale a chamar query_medical_rag para cada pergunta, mas gera os
+    embeddings em chamadas em lote e faz as queries no índice em paralelo.
+    Útil para avaliação offline e geração de datasets.
     
-    # Inicializa embeddings manager se necessário
-    if embeddings_manager is None:
-        embeddings_manager = EmbeddingsManager()
+    Args:
+        queries: Lista de perguntas.
+        max_workers: Máximo de queries simultâneas no índice. Se None, usa
+            QUERY_POOL_THREADS.
+        deadline: Orçamento de tempo do lote inteiro, em segundos. As perguntas
+            não respondidas no prazo recebem resultados degradados.
+        Demais argumentos: iguais aos de query_medical_rag.
     
-    # Inicializa Pinecone
-    try:
-        from pinecone import Pinecone
-        
-        pinecone_client = Pinecone(api_key=api_key)
-        index = pinecone_client.Index(index_name)
-        
-    except ImportError:
-        raise ImportError(
-            "pinecone não instalado. "
-            "Instale com: pip install pinecone"
-        )
-    except Exception as e:
-        raise RuntimeError(f"Erro ao conectar com Pinecone: {e}")
+    Returns:
+        Uma lista de resultados (formato de query_medical_rag) por pergunta,
+        na mesma ordem de queries.
+    
+    Examples:
+        >>> results = query_medical_rag_batch(["What is CRISPR?", "Do statins reduce LDL?"])
+        >>> print([len(r) for r in results])
+        [5, 5]
+    """
+    engine = _resolve_engine(
+        embeddings_manager=embeddings_manager,
+        index_name=index_name,
+        api_key=api_key,
+        embedding_dimension=embedding_dimension,
+        chunk_text_store_path=chunk_text_store_path,
+        backend=backend,
+        vector_store=vector_store,
+        lexical_index=lexical_index
+    )
     
-    # Gera embedding da query
-    query_embedding = embeddings_manager.embed_text(query)
+    return engine.query_batch(
+        queries,
+        top_k=top_k,
+        filters=filters,
+        namespace=namespace,
+        mode=mode,
+        max_workers=max_workers,
+        deadline=deadline
+    )
+
+
+async def aquery_medical_rag(
+    query: str,
+    embeddings_manager: Optional[EmbeddingsManager] = None,
+    index_name: Optional[str] = None,
+    namespace: Optional[str] = None,
+    api_key: Optional[str] = None,
+    top_k: Optional[int] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    embedding_dimension: Optional[int] = None,
+    chunk_text_store_path: Optional[str] = None,
+    backend: Optional[str] = None,
+    vector_store: Optional[VectorStore] = None,
+    mode: Optional[str] = None,
+    lexical_index: Optional[BM25Index] = None,
+    timeout: Optional[float] = None,
+    deadline: Optional[float] = None,
+    expand_neighbors: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Versão assíncrona de query_medical_rag (não bloqueia o event loop).
     
-    # Prepara filtros para Pinecone
-    pinecone_filter = None
-    if filters:
-        pinecone_filter = _prepare_pinecone_filter(filters)
+    Usa o mesmo motor compartilhado de query_medical_rag, com embeddings e
+    busca por HTTP assíncrono, timeout por chamada e backoff via asyncio.sleep.
     
-    # Busca no Pinecone
-    try:
-        if namespace:
-            results = index.query(
-                vector=query_embedding,
-                top_k=top_k,
-                include_metadata=True,
-                namespace=namespace,
-                filter=pinecone_filter
-            )
-        else:
-            results = index.query(
-                vector=query_embedding,
-                top_k=top_k,
-                include_metadata=True,
-                filter=pinecone_filter
-            )
-    except Exception as e:
-        raise RuntimeError(f"Erro ao buscar no Pinecone: {e}")
+    Args:
+        query: Pergunta ou texto de busca.
+        timeout: Timeout por chamada (embedding e busca), em segundos. Se
+            None, usa QUERY_TIMEOUT_SECONDS.
+        deadline: Orçamento de tempo da query inteira, em segundos. Se None,
+            usa QUERY_DEADLINE_SECONDS.
+        expand_neighbors: Chunks vizinhos por resultado (ver query_medical_rag).
+        Demais argumentos: iguais aos de query_medical_rag.
     
-    # Formata resultados
-    formatted_results = []
+    Returns:
+        Lista de resultados (formato de query_medical_rag).
     
-    for match in results.get("matches", []):
-        metadata = match.get("metadata", {})
-        
-        formatted_results.append({
-            "text": metadata.get("text", ""),
-            "score": match.get("score", 0.0),
-            "metadata": metadata,
-            "article_id": metadata.get("article_id", ""),
-            "chunk_index": metadata.get("chunk_index", 0),
-        })
+    Examples:
+        >>> results = await asyncio.gather(*(aquery_medical_rag(q) for q in questions))
+    """
+    engine = _resolve_engine(
+        embeddings_manager=embeddings_manager,
+        index_name=index_name,
+        api_key=api_key,
+        embedding_dimension=embedding_dimension,
+        chunk_text_store_path=chunk_text_store_path,
+        backend=backend,
+        vector_store=vector_store,
+        lexical_index=lexical_index
+    )
     
-    return formatted_results
+    return await engine.aquery(
+        query,
+        top_k=top_k,
+        filters=filters,
+        namespace=namespace,
+        mode=mode,
+        timeout=timeout,
+        deadline=deadline,
+        expand_neighbors=expand_neighbors
+    )
+
+
+def _resolve_engine(
+    embeddings_manager: Optional[EmbeddingsManager],
+    index_name: Optional[str],
+    api_key: Optional[str],
+    embedding_dimension: Optional[int],
+    chunk_text_store_path: Optional[str],
+    backend: Optional[str],
+    vector_store: Optional[VectorStore],
+    lexical_index: Optional[BM25Index]
+) -> RAGQueryEngine:
+    """Motor compartilhado da configuração e dos clientes passados."""
+    return get_query_engine(
+        index_name=index_name,
+        api_key=api_key,
+        embedding_dimension=embedding_dimension,
+        chunk_text_store_path=chunk_text_store_path,
+        backend=backend,
+        embeddings_manager=embeddings_manager,
+        vector_store=vector_store,
+        lexical_index=lexical_index
+    )
+
+
+def _format_match(match: Dict[str, Any]) -> Dict[str, Any]:
+    """Converte um match do vector store/índice lexical no formato de resultado."""
+    metadata = match["metadata"]
+    
+    return {
+        "text": metadata.get("text", ""),
+        "score": match["score"],
+        "metadata": metadata,
+        "article_id": metadata.get("article_id", ""),
+        "chunk_index": metadata.get("chunk_index", 0),
+    }
 
 
 def _prepare_pinecone_filter(filters: Dict[str, Any]) -> Dict[str, Any]:
@@ -142,7 +1400,7 @@ def _prepare_pinecone_filter(filters: Dict[str, Any]) -> Dict[str, Any]:
     
     Args:
         filters: Dicionário com filtros simples (ex: {"year": "2011"}).
-        
+    
     Returns:
         Dicionário com filtros no formato Pinecone.
     """
@@ -151,7 +1409,7 @@ def _prepare_pinecone_filter(filters: Dict[str, Any]) -> Dict[str, Any]:
     for key, value in filters.items():
         # Se o valor já está no formato Pinecone, usa diretamente
         if isinstance(value, dict) and any(
-            op in value for op in ["$eq", "$ne", "$in", "$gt", "$gte", "$lt", "$lte"]
+            op in value for op in ["$eq", "$ne", "$in", "$nin", "$gt", "$gte", "$lt", "$lte", "$exists"]
         ):
             pinecone_filter[key] = value
         else:
@@ -161,33 +1419,33 @@ def _prepare_pinecone_filter(filters: Dict[str, Any]) -> Dict[str, Any]:
     return pinecone_filter
 
 
-def format_context_for_llm(results: List[Dict[str, Any]]) -> str:
+def format_context_for_llm(
+    results: List[Dict[str, Any]],
+    max_tokens: Optional[int] = None
+) -> str:
     """
     Formata resultados de busca em contexto para LLM.
     
+    Junta chunks adjacentes do mesmo artigo (sem o texto sobreposto),
+    remove duplicados e limita o contexto a um orçamento de tokens,
+    priorizando os trechos de maior score (ver context_packer.pack_context,
+    que também devolve as referências das fontes).
+    
     Args:
         results: Lista de resultados de query_medical_rag.
-        
+        max_tokens: Orçamento de tokens. Se None, usa CONTEXT_MAX_TOKENS
+            (0 = sem limite).
+    
     Returns:
         String formatada com contexto para prompt do LLM.
     """
     if not results:
         return "Nenhum contexto relevante encontrado."
     
-    context_parts = []
-    
-    for i, result in enumerate(results, 1):
-        text = result.get("text", "")
-        article_id = result.get("article_id", "")
-        source = result.get("metadata", {}).get("source", "N/A")
-        score = result.get("score", 0.0)
-        
-        context_parts.append(
-            f"[Contexto {i}] (Fonte: {source}, Artigo: {article_id}, Score: {score:.3f})\n"
-            f"{text}\n"
-        )
-    
-    return "\n".join(context_parts)
+    with trace("format_context", results=len(results)) as span:
+        packed = pack_context(results, max_tokens=max_tokens)
+        span.set(tokens=packed["tokens"], sources=len(packed["sources"]), dropped=packed["dropped"])
+    return packed["context"] or "Nenhum contexto relevante encontrado."
 
 
 def get_unique_articles(results: List[Dict[str, Any]]) -> List[str]:
@@ -196,7 +1454,7 @@ def get_unique_articles(results: List[Dict[str, Any]]) -> List[str]:
     
     Args:
         results: Lista de resultados de query_medical_rag.
-        
+    
     Returns:
         Lista de IDs de artigos únicos.
     """
@@ -220,7 +1478,7 @@ def filter_by_score(
     Args:
         results: Lista de resultados de query_medical_rag.
         min_score: Score mínimo para incluir resultado (0.0 a 1.0).
-        
+    
     Returns:
         Lista filtrada de resultados.
     """
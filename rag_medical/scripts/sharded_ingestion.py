@@ -0,0 +1,289 @@
+"""
+Módulo de ingestão multiprocesso particionada por article_id.
+
+Um único PineconeIngester fica limitado a um interpretador Python (GIL no
+pré-processamento, um pipeline de embeddings) e a um arquivo de checkpoint.
+O coordenador aqui particiona os chunks por hash estável do article_id entre
+N processos; cada processo tem seu próprio EmbeddingsManager, pipeline de
+upsert e shard de checkpoint. O progresso dos shards é agregado em uma única
+barra e as estatísticas finais são combinadas.
+
+Como todos os chunks de um artigo caem no mesmo shard, a ingestão
+incremental (stale_scope='articles') continua correta por shard, e o resume
+retoma cada shard do seu próprio checkpoint (mesmo número de shards).
+O ledger, o store de textos (SQLite em WAL, com espera por lock) e o arquivo
+de épocas de ingestão (lock de arquivo) são compartilhados pelos workers.
+"""
+
+from typing import Any, Dict, List, Optional
+import hashlib
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from config.settings import Settings
+from .telemetry import merge_snapshots
+
+
+def shard_for_article(article_id: Any, num_shards: int) -> int:
+    """
+    Retorna o shard de um artigo (hash estável entre processos e execuções).
+    
+    Args:
+        article_id: ID do artigo.
+        num_shards: Número de shards.
+    
+    Returns:
+        Índice do shard em [0, num_shards).
+    """
+    digest = hashlib.blake2b(str(article_id).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % num_shards
+
+
+def partition_chunks(
+    chunks: List[Dict[str, Any]],
+    num_shards: int
+) -> List[List[Dict[str, Any]]]:
+    """
+    Particiona chunks por hash do article_id, preservando a ordem relativa.
+    
+    Args:
+        chunks: Lista de chunks.
+        num_shards: Número de shards.
+    
+    Returns:
+        Lista com os chunks de cada shard.
+    """
+    shards: List[List[Dict[str, Any]]] = [[] for _ in range(num_shards)]
+    for chunk in chunks:
+        shards[shard_for_article(chunk["article_id"], num_shards)].append(chunk)
+    return shards
+
+
+def _ingest_shard(
+    shard_id: int,
+    num_shards: int,
+    chunks: List[Dict[str, Any]],
+    config: Dict[str, Any],
+    progress_queue
+) -> Dict[str, Any]:
+    """Executa a ingestão de um shard (roda no processo worker)."""
+    from .embeddings_manager import EmbeddingsManager
+    from .pinecone_ingester import PineconeIngester
+    
+    def report(done: int, total: int):
+        progress_queue.put((shard_id, done, total))
+    
+    try:
+        embeddings_manager = EmbeddingsManager(
+            provider=config["embedding_provider"],
+            output_dimension=config["embedding_dimension"]
+        )
+        ingester = PineconeIngester(
+            embeddings_manager=embeddings_manager,
+            index_name=config["index_name"],
+            namespace=config["namespace"],
+            chunk_text_store_path=config["chunk_text_store_path"],
+            backend=config["backend"],
+            checkpoint_suffix=f"shard{shard_id}of{num_shards}",
+        )
+        stats = ingester.ingest_chunks(
+            chunks,
+            show_progress=False,
+            quiet=True,
+            progress_callback=report,
+            **config["ingest_kwargs"]
+        )
+    except KeyboardInterrupt:
+        return {"shard": shard_id, "total_chunks": len(chunks), "interrupted": True,
+                "errors": [f"[shard {shard_id}] interrompido antes de iniciar"]}
+    except Exception as e:
+        return {"shard": shard_id, "total_chunks": len(chunks), "interrupted": False,
+                "errors": [f"[shard {shard_id}] falha no worker: {e}"]}
+    
+    stats["shard"] = shard_id
+    stats["errors"] = [f"[shard {shard_id}] {error}" for error in stats.get("errors", [])]
+    return stats
+
+
+def _merge_stats(shard_stats: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """Combina as estatísticas dos shards em um relatório único."""
+    def total(key: str) -> int:
+        return sum(stats.get(key, 0) or 0 for stats in shard_stats)
+    
+    upsert_requests = total("upsert_requests")
+    bytes_sent = total("bytes_sent")
+    new_vectors = sum(
+        stats.get("telemetry", {}).get("counters", {}).get("vectors_upserted", 0)
+        for stats in shard_stats
+    )
+    
+    return {
+        "total_chunks": total("total_chunks"),
+        "total_vectors": total("total_vectors"),
+        "batches": total("batches"),
+        "errors": [error for stats in shard_stats for error in stats.get("errors", [])],
+        "interrupted": any(stats.get("interrupted") for stats in shard_stats),
+        "checkpoint_paths": [
+            stats["checkpoint_path"] for stats in shard_stats if stats.get("checkpoint_path")
+        ],
+        "num_shards": len(shard_stats),
+        "elapsed_seconds": elapsed,
+        "vectors_per_second": new_vectors / elapsed if elapsed > 0 else 0.0,
+        "skipped_unchanged": total("skipped_unchanged"),
+        "deleted_stale": total("deleted_stale"),
+        "upsert_requests": upsert_requests,
+        "bytes_sent": bytes_sent,
+        "avg_request_bytes": bytes_sent / upsert_requests if upsert_requests else 0,
+        "max_request_bytes": max((stats.get("max_request_bytes", 0) for stats in shard_stats), default=0),
+        "telemetry": merge_snapshots(
+            [stats["telemetry"] for stats in shard_stats if "telemetry" in stats],
+            elapsed_seconds=elapsed
+        ),
+        "shards": shard_stats,
+    }
+
+
+def ingest_chunks_sharded(
+    chunks: List[Dict[str, Any]],
+    num_workers: Optional[int] = None,
+    index_name: Optional[str] = None,
+    namespace: Optional[str] = None,
+    backend: Optional[str] = None,
+    embedding_provider: Optional[str] = None,
+    embedding_dimension: Optional[int] = None,
+    chunk_text_store_path: Optional[str] = None,
+    show_progress: bool = True,
+    **ingest_kwargs
+) -> Dict[str, Any]:
+    """
+    Ingere chunks em N processos, particionados por hash do article_id.
+    
+    Cada worker cria seu próprio EmbeddingsManager e PineconeIngester (com
+    checkpoint próprio: ..._shard{i}of{N}) e chama ingest_chunks na sua
+    partição. O throughput escala com o número de workers até o rate limit
+    do provider de embeddings ou do Pinecone.
+    
+    Args:
+        chunks: Lista de chunks para ingerir.
+        num_workers: Número de processos. Se None, usa INGEST_PROCESSES.
+        index_name: Nome do índice. Se None, usa das configurações.
+        namespace: Namespace. Se None, usa das configurações.
+        backend: Deve ser 'pinecone' (o store local não aceita escritores
+            concorrentes). Se None, usa VECTOR_STORE_BACKEND.
+        embedding_provider: 'gemini' ou 'ollama'. Se None, detecta automaticamente.
+        embedding_dimension: Dimensão dos embeddings. Se None, usa EMBEDDING_DIMENSION.
+        chunk_text_store_path: SQLite de textos. Se None, usa CHUNK_TEXT_STORE_PATH.
+        show_progress: Se True, exibe uma barra de progresso agregada.
+        **ingest_kwargs: Repassados a PineconeIngester.ingest_chunks em cada
+            worker (batch_size, resume_from_checkpoint, pipelined, incremental...).
+    
+    Returns:
+        Estatísticas combinadas (mesmas chaves de ingest_chunks, somadas),
+        mais num_shards, checkpoint_paths e shards (estatísticas por shard).
+    """
+    settings = Settings()
+    num_workers = num_workers or settings.INGEST_PROCESSES
+    backend = (backend or settings.VECTOR_STORE_BACKEND).lower()
+    
+    if num_workers <= 0:
+        raise ValueError(f"num_workers deve ser positivo: {num_workers}")
+    if backend != "pinecone":
+        raise ValueError(
+            f"Ingestão multiprocesso requer o backend 'pinecone' (recebeu '{backend}'): "
+            f"o vector store local não aceita escritores concorrentes."
+        )
+    if ingest_kwargs.get("incremental") and ingest_kwargs.get("stale_scope") == "all":
+        raise ValueError(
+            "stale_scope='all' não é suportado na ingestão multiprocesso: "
+            "cada shard deletaria os vetores dos outros shards."
+        )
+    for key in ("show_progress", "quiet", "progress_callback"):
+        ingest_kwargs.pop(key, None)
+    
+    shards = partition_chunks(chunks, num_workers)
+    config = {
+        "index_name": index_name or settings.PINECONE_INDEX_NAME,
+        "namespace": namespace or settings.PINECONE_NAMESPACE,
+        "backend": backend,
+        "embedding_provider": embedding_provider,
+        "embedding_dimension": embedding_dimension,
+        "chunk_text_store_path": chunk_text_store_path,
+        "ingest_kwargs": ingest_kwargs,
+    }
+    
+    print(f"\n🚀 Ingestão multiprocesso: {len(chunks)} chunks em {num_workers} shards")
+    print(f"   Chunks por shard: {[len(shard) for shard in shards]}")
+    
+    # spawn: workers não herdam clientes HTTP/gRPC nem threads do processo pai
+    context = multiprocessing.get_context("spawn")
+    manager = context.Manager()
+    progress_queue = manager.Queue()
+    
+    progress = None
+    if show_progress:
+        try:
+            from tqdm import tqdm
+            progress = tqdm(desc="Ingerindo chunks (shards)", total=len(chunks))
+        except ImportError:
+            progress = None
+    
+    # Progresso agregado: último (concluídos) reportado por cada shard
+    shard_done = [0] * num_workers
+    stop_event = threading.Event()
+    
+    def drain_progress():
+        while not stop_event.is_set() or not progress_queue.empty():
+            try:
+                shard_id, done, _ = progress_queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            delta = done - shard_done[shard_id]
+            shard_done[shard_id] = done
+            if progress is not None and delta:
+                progress.update(delta)
+    
+    progress_thread = threading.Thread(target=drain_progress, name="shard-progress", daemon=True)
+    progress_thread.start()
+    
+    start_time = time.time()
+    shard_stats: List[Optional[Dict[str, Any]]] = [None] * num_workers
+    
+    try:
+        with ProcessPoolExecutor(max_workers=num_workers, mp_context=context) as executor:
+            futures = {
+                executor.submit(_ingest_shard, shard_id, num_workers, shard, config, progress_queue): shard_id
+                for shard_id, shard in enumerate(shards)
+            }
+            pending = set(futures)
+            while pending:
+                try:
+                    done, pending = wait(pending, timeout=0.5)
+                    for future in done:
+                        shard_stats[futures[future]] = future.result()
+                except KeyboardInterrupt:
+                    # Workers recebem o SIGINT e salvam seus checkpoints; aguarda o retorno
+                    print(f"\n\n⚠️  Interrupção detectada! Aguardando shards salvarem checkpoint...")
+    finally:
+        stop_event.set()
+        progress_thread.join(timeout=5)
+        if progress is not None:
+            progress.close()
+        manager.shutdown()
+    
+    elapsed = time.time() - start_time
+    stats = _merge_stats([s for s in shard_stats if s is not None], elapsed)
+    
+    print(f"\n✅ Ingestão multiprocesso concluída!")
+    print(f"   Vetores inseridos: {stats['total_vectors']}/{stats['total_chunks']}")
+    print(f"   Throughput: {stats['vectors_per_second']:.1f} vetores/s")
+    if stats["errors"]:
+        print(f"   Erros: {len(stats['errors'])}")
+    if stats["interrupted"]:
+        print(f"   Para retomar, execute novamente com o mesmo num_workers")
+    
+    return stats
@@ -0,0 +1,438 @@
+"""
+Servidores locais de stand-in para benchmarks offline.
+
+- Pinecone: implementa o subconjunto da API data-plane usado pelo pipeline
+  (upsert, query com filter/namespace/includeMetadata, fetch, list, delete
+  e describe_index_stats), com armazenamento em um LocalVectorStore.
+- Embeddings: stub das APIs do Ollama (/api/embeddings, /api/embed) e do
+  Gemini REST (:embedContent, :batchEmbedContents) com embeddings
+  determinísticos (feature hashing de tokens, normalizado).
+
+Ambos aceitam latência injetada, taxa de erros 500 e taxa de 429, para medir
+e testar regressões de throughput de ingestão e query sem serviços reais.
+
+Uso (a partir de rag_medical/):
+    python -m scripts.standin_servers pinecone --port 5080 --latency-ms 20
+    python -m scripts.standin_servers embeddings --port 11435 --dimension 768
+
+E então:
+    PINECONE_HOST=http://localhost:5080 PINECONE_API_KEY=standin
+    OLLAMA_BASE_URL=http://localhost:11435 GEMINI_API_KEY=
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import hashlib
+import json
+import random
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from .vector_store import LocalVectorStore
+
+
+# ============================================================================
+# INJEÇÃO DE FALHAS
+# ============================================================================
+
+class FaultInjector:
+    """
+    Injeta latência e erros nas respostas dos stand-ins.
+    
+    Attributes:
+        latency_ms: Latência fixa por requisição.
+        jitter_ms: Variação uniforme adicional (0..jitter_ms).
+        error_rate: Fração de requisições que falham com 500.
+        rate_limit_rate: Fração de requisições que falham com 429.
+    """
+    
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def apply(self) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """
+        Aplica latência e sorteia uma falha.
+        
+        Returns:
+            (status, corpo) da falha injetada ou None para seguir normalmente.
+        """
+        with self._lock:
+            jitter = self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+            roll = self._random.random()
+        
+        delay = (self.latency_ms + jitter) / 1000.0
+        if delay > 0:
+            time.sleep(delay)
+        
+        if roll < self.rate_limit_rate:
+            return 429, {"error": {"code": 429, "message": "Too Many Requests (standin)"}}
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500, {"error": {"code": 500, "message": "Internal error (standin)"}}
+        return None
+
+
+class _StandinServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer com estado compartilhado e contadores por rota."""
+    
+    daemon_threads = True
+    # Backlog de conexões alto para clientes assíncronos com muitas conexões simultâneas
+    request_queue_size = 1024
+    
+    def __init__(self, address, handler, faults: FaultInjector):
+        super().__init__(address, handler)
+        self.faults = faults
+        self.counters: Dict[str, int] = {}
+        self.counters_lock = threading.Lock()
+    
+    def count(self, route: str, amount: int = 1):
+        with self.counters_lock:
+            self.counters[route] = self.counters.get(route, 0) + amount
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    """Handler base: leitura/escrita JSON, falhas injetadas e contadores."""
+    
+    server: _StandinServer
+    
+    def log_message(self, format, *args):
+        # Silencioso: o volume de requisições em benchmarks é alto
+        pass
+    
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode("utf-8"))
+    
+    def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def _handle(self, method: str):
+        parsed = urlparse(self.path)
+        
+        if parsed.path == "/_standin/stats":
+            with self.server.counters_lock:
+                self._send(200, {"requests": dict(self.server.counters)})
+            return
+        
+        fault = self.server.faults.apply()
+        if fault is not None:
+            status, body = fault
+            self.server.count(f"fault_{status}")
+            self._send(status, body, {"Retry-After": "1"} if status == 429 else None)
+            return
+        
+        try:
+            body = self._read_json() if method == "POST" else {}
+            query = parse_qs(parsed.query)
+            result = self.route(method, parsed.path, body, query)
+        except KeyError as e:
+            self._send(400, {"error": {"code": 400, "message": f"Campo ausente: {e}"}})
+            return
+        except ValueError as e:
+            self._send(400, {"error": {"code": 400, "message": str(e)}})
+            return
+        
+        if result is None:
+            self._send(404, {"error": {"code": 404, "message": f"Rota não encontrada: {parsed.path}"}})
+        else:
+            self._send(200, result)
+    
+    def do_GET(self):
+        self._handle("GET")
+    
+    def do_POST(self):
+        self._handle("POST")
+    
+    def route(self, method, path, body, query) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+
+# ============================================================================
+# PINECONE (data plane)
+# ============================================================================
+
+class _PineconeHandler(_JSONHandler):
+    """Subconjunto da API data-plane do Pinecone sobre um LocalVectorStore."""
+    
+    def route(self, method, path, body, query):
+        store: LocalVectorStore = self.server.store
+        
+        if path == "/vectors/upsert" and method == "POST":
+            vectors = [
+                {"id": v["id"], "values": v["values"], "metadata": v.get("metadata") or {}}
+                for v in body["vectors"]
+            ]
+            store.upsert(vectors, namespace=body.get("namespace") or None)
+            self.server.count("upsert")
+            self.server.count("upserted_vectors", len(vectors))
+            return {"upsertedCount": len(vectors)}
+        
+        if path == "/query" and method == "POST":
+            namespace = body.get("namespace") or None
+            vector = body.get("vector")
+            if vector is None and body.get("id"):
+                fetched = store.fetch([body["id"]], namespace=namespace)["vectors"]
+                vector = fetched[body["id"]]["values"] if fetched else None
+            if vector is None:
+                raise ValueError("Informe 'vector' ou 'id'")
+            
+            include_metadata = bool(body.get("includeMetadata", False))
+            include_values = bool(body.get("includeValues", False))
+            results = store.query(
+                vector=vector,
+                top_k=int(body.get("topK", 10)),
+                filter=body.get("filter") or None,
+                namespace=namespace,
+                include_metadata=include_metadata,
+            )
+            matches = []
+            values = (
+                store.fetch([m["id"] for m in results["matches"]], namespace=namespace)["vectors"]
+                if include_values else {}
+            )
+            for match in results["matches"]:
+                item = {"id": match["id"], "score": match["score"], "values": []}
+                if include_metadata:
+                    item["metadata"] = match["metadata"]
+                if include_values and match["id"] in values:
+                    item["values"] = values[match["id"]]["values"]
+                matches.append(item)
+            self.server.count("query")
+            return {"matches": matches, "namespace": body.get("namespace") or ""}
+        
+        if path == "/vectors/fetch" and method == "GET":
+            namespace = (query.get("namespace") or [""])[0] or None
+            vectors = store.fetch(query.get("ids", []), namespace=namespace)["vectors"]
+            self.server.count("fetch")
+            return {"vectors": vectors, "namespace": namespace or ""}
+        
+        if path == "/vectors/list" and method == "GET":
+            namespace = (query.get("namespace") or [""])[0] or None
+            prefix = (query.get("prefix") or [""])[0]
+            limit = int((query.get("limit") or ["100"])[0])
+            start = int((query.get("paginationToken") or ["0"])[0])
+            ids = [i for page in store.list(prefix=prefix, namespace=namespace) for i in page]
+            page_ids = ids[start:start + limit]
+            result = {"vectors": [{"id": i} for i in page_ids], "namespace": namespace or ""}
+            if start + limit < len(ids):
+                result["pagination"] = {"next": str(start + limit)}
+            self.server.count("list")
+            return result
+        
+        if path == "/vectors/delete" and method == "POST":
+            store.delete(
+                ids=body.get("ids") or [],
+                namespace=body.get("namespace") or None,
+                delete_all=bool(body.get("deleteAll", False)),
+            )
+            self.server.count("delete")
+            return {}
+        
+        if path == "/describe_index_stats":
+            stats = store.describe_index_stats()
+            self.server.count("describe_index_stats")
+            return {
+                "namespaces": {
+                    name: {"vectorCount": ns["vector_count"]}
+                    for name, ns in stats["namespaces"].items()
+                },
+                "dimension": stats["dimension"] or 0,
+                "indexFullness": 0.0,
+                "totalVectorCount": stats["total_vector_count"],
+            }
+        
+        return None
+
+
+def start_pinecone_standin(
+    port: int = 5080,
+    host: str = "127.0.0.1",
+    data_dir: Optional[str] = None,
+    dimension: Optional[int] = None,
+    faults: Optional[FaultInjector] = None
+) -> _StandinServer:
+    """
+    Inicia o stand-in do Pinecone em uma thread daemon.
+    
+    Args:
+        port: Porta HTTP (0 = porta livre aleatória).
+        host: Endereço de escuta.
+        data_dir: Diretório do LocalVectorStore. Se None, usa um diretório temporário.
+        dimension: Dimensão dos vetores (se None, definida no primeiro upsert).
+        faults: Injeção de latência/erros.
+        
+    Returns:
+        Servidor em execução (use server.server_address e server.shutdown()).
+    """
+    server = _StandinServer((host, port), _PineconeHandler, faults or FaultInjector())
+    server.store = LocalVectorStore(data_dir or tempfile.mkdtemp(prefix="pinecone_standin_"), dimension=dimension)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ============================================================================
+# EMBEDDINGS (Ollama / Gemini)
+# ============================================================================
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def hashed_embedding(text: str, dimension: int) -> List[float]:
+    """
+    Embedding determinístico por feature hashing de tokens (normalizado L2).
+    
+    Textos que compartilham termos ficam próximos, então recall e latência
+    medidos com o stub se comportam de forma plausível.
+    """
+    vector = np.zeros(dimension, dtype=np.float32)
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dimension
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[bucket] += sign
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector.tolist()
+
+
+class _EmbeddingHandler(_JSONHandler):
+    """Stub das APIs de embedding do Ollama e do Gemini (REST)."""
+    
+    _GEMINI_ROUTE = re.compile(r"^/v1(?:beta)?/models/([^:]+):(embedContent|batchEmbedContents)$")
+    
+    def _embed(self, text: str, dimension: Optional[int] = None) -> List[float]:
+        self.server.count("embedded_texts")
+        return hashed_embedding(text, dimension or self.server.dimension)
+    
+    def route(self, method, path, body, query):
+        if method != "POST":
+            return None
+        
+        # Ollama (langchain_community.OllamaEmbeddings)
+        if path == "/api/embeddings":
+            self.server.count("ollama_embeddings")
+            return {"embedding": self._embed(body.get("prompt", ""))}
+        
+        # Ollama (API nova, em lote)
+        if path == "/api/embed":
+            inputs = body.get("input", "")
+            inputs = inputs if isinstance(inputs, list) else [inputs]
+            self.server.count("ollama_embed")
+            return {"model": body.get("model", ""), "embeddings": [self._embed(t) for t in inputs]}
+        
+        match = self._GEMINI_ROUTE.match(path)
+        if match:
+            def text_of(content):
+                return " ".join(part.get("text", "") for part in content.get("parts", []))
+            
+            if match.group(2) == "embedContent":
+                self.server.count("gemini_embed_content")
+                return {"embedding": {"values": self._embed(
+                    text_of(body["content"]), body.get("outputDimensionality")
+                )}}
+            
+            self.server.count("gemini_batch_embed_contents")
+            return {"embeddings": [
+                {"values": self._embed(text_of(request["content"]), request.get("outputDimensionality"))}
+                for request in body.get("requests", [])
+            ]}
+        
+        return None
+
+
+def start_embedding_standin(
+    port: int = 11435,
+    host: str = "127.0.0.1",
+    dimension: int = 768,
+    faults: Optional[FaultInjector] = None
+) -> _StandinServer:
+    """
+    Inicia o stub de embeddings (Ollama/Gemini) em uma thread daemon.
+    
+    Args:
+        port: Porta HTTP (0 = porta livre aleatória).
+        host: Endereço de escuta.
+        dimension: Dimensão padrão dos embeddings.
+        faults: Injeção de latência/erros.
+        
+    Returns:
+        Servidor em execução.
+    """
+    server = _StandinServer((host, port), _EmbeddingHandler, faults or FaultInjector())
+    server.dimension = dimension
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-ins locais do Pinecone e de embeddings")
+    parser.add_argument("service", choices=["pinecone", "embeddings"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--dimension", type=int, default=None)
+    parser.add_argument("--data-dir", default=None, help="Diretório do store (pinecone)")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    
+    faults = FaultInjector(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed,
+    )
+    
+    if args.service == "pinecone":
+        server = start_pinecone_standin(
+            port=args.port or 5080, host=args.host, data_dir=args.data_dir,
+            dimension=args.dimension, faults=faults
+        )
+    else:
+        server = start_embedding_standin(
+            port=args.port or 11435, host=args.host,
+            dimension=args.dimension or 768, faults=faults
+        )
+    
+    host, port = server.server_address[:2]
+    print(f"✅ Stand-in '{args.service}' em http://{host}:{port}")
+    print("   Ctrl+C para encerrar")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Módulo de telemetria da ingestão.
+
+Coleta, por execução de ingest_chunks, o tempo gasto em cada etapa
+(embedding, metadados, upsert, esperas de retry, pausas, checkpoint),
+contadores (vetores, requisições, bytes enviados), retries por causa e
+vazão. O snapshot é devolvido nas estatísticas da ingestão e pode ser
+exportado como JSON lines ou como textfile do Prometheus
+(node_exporter textfile collector).
+"""
+
+from typing import Any, Dict, Iterator, List, Optional
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+import json
+import os
+import threading
+import time
+
+
+def classify_error(error: Optional[BaseException]) -> str:
+    """
+    Classifica a causa de uma falha para a contagem de retries.
+    
+    Args:
+        error: Exceção que provocou o retry.
+    
+    Returns:
+        'rate_limit', 'timeout', 'server_error', 'connection' ou 'other'.
+    """
+    if error is None:
+        return "other"
+    
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    message = str(error).lower()
+    
+    if status == 429 or "429" in message or "rate limit" in message or "quota" in message:
+        return "rate_limit"
+    if isinstance(error, TimeoutError) or "timeout" in message or "timed out" in message:
+        return "timeout"
+    if (isinstance(status, int) and status >= 500) or any(
+        code in message for code in ("500", "502", "503", "504")
+    ):
+        return "server_error"
+    if isinstance(error, ConnectionError) or "connection" in message:
+        return "connection"
+    return "other"
+
+
+def _escape_label(value: Any) -> str:
+    """Escapa o valor de um label no formato de exposição do Prometheus."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class IngestionTelemetry:
+    """
+    Timers por etapa, contadores e retries por causa (thread-safe).
+    
+    Etapas são medidas com stage("nome") ou add_time(); o tempo acumulado de
+    cada etapa soma todas as threads, então no modo pipelined a soma das
+    etapas pode exceder o tempo total da ingestão.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._stages: Dict[str, Dict[str, float]] = {}
+        self._counters: Counter = Counter()
+        self._retries: Counter = Counter()
+    
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Mede o tempo de um bloco e o acumula na etapa `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+    
+    def add_time(self, name: str, seconds: float):
+        """Acumula `seconds` na etapa `name`."""
+        with self._lock:
+            stage = self._stages.setdefault(name, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+            stage["count"] += 1
+            stage["seconds"] += seconds
+            stage["max_seconds"] = max(stage["max_seconds"], seconds)
+    
+    def incr(self, name: str, value: int = 1):
+        """Incrementa o contador `name`."""
+        with self._lock:
+            self._counters[name] += value
+    
+    def record_retry(self, operation: str, error: Optional[BaseException], sleep_seconds: float = 0.0):
+        """
+        Registra um retry e o tempo de espera antes da próxima tentativa.
+        
+        Args:
+            operation: Operação que falhou (ex: 'upsert', 'delete').
+            error: Exceção da tentativa que falhou.
+            sleep_seconds: Espera (backoff) até a próxima tentativa.
+        """
+        with self._lock:
+            self._retries[f"{operation}:{classify_error(error)}"] += 1
+        if sleep_seconds:
+            self.add_time("retry_sleep", sleep_seconds)
+    
+    def elapsed(self) -> float:
+        """Segundos desde a criação da telemetria."""
+        return time.perf_counter() - self._start
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Retorna o estado atual das métricas.
+        
+        Returns:
+            Dicionário com:
+                - elapsed_seconds: Duração desde o início
+                - stages: {etapa: {count, seconds, max_seconds, avg_seconds}}
+                - counters: Contadores (vectors_upserted, bytes_sent, ...)
+                - retries: {"operação:causa": quantidade}
+                - vectors_per_second: vectors_upserted / elapsed_seconds
+                - bytes_per_second: bytes_sent / elapsed_seconds
+        """
+        elapsed = self.elapsed()
+        with self._lock:
+            stages = {
+                name: dict(values, avg_seconds=values["seconds"] / values["count"] if values["count"] else 0.0)
+                for name, values in self._stages.items()
+            }
+            counters = dict(self._counters)
+            retries = dict(self._retries)
+        
+        return {
+            "elapsed_seconds": elapsed,
+            "stages": stages,
+            "counters": counters,
+            "retries": retries,
+            "vectors_per_second": counters.get("vectors_upserted", 0) / elapsed if elapsed > 0 else 0.0,
+            "bytes_per_second": counters.get("bytes_sent", 0) / elapsed if elapsed > 0 else 0.0,
+        }
+    
+    def write_jsonl(self, path: str, extra: Optional[Dict[str, Any]] = None):
+        """
+        Anexa o snapshot atual como uma linha JSON.
+        
+        Args:
+            path: Arquivo .jsonl de destino.
+            extra: Campos adicionais (ex: índice, namespace, evento).
+        """
+        record = {"timestamp": time.time()}
+        record.update(extra or {})
+        record.update(self.snapshot())
+        
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    
+    def write_prometheus(self, path: str, labels: Optional[Dict[str, str]] = None, prefix: str = "rag_ingest"):
+        """
+        Grava o snapshot no formato textfile do Prometheus (substituição atômica).
+        
+        Args:
+            path: Arquivo .prom de destino.
+            labels: Labels comuns a todas as séries (ex: index, namespace).
+            prefix: Prefixo dos nomes das métricas.
+        """
+        snapshot = self.snapshot()
+        base_labels = dict(labels or {})
+        
+        def fmt(extra_labels: Optional[Dict[str, str]] = None) -> str:
+            all_labels = dict(base_labels, **(extra_labels or {}))
+            if not all_labels:
+                return ""
+            parts = [f'{key}="{_escape_label(value)}"' for key, value in sorted(all_labels.items())]
+            return "{" + ",".join(parts) + "}"
+        
+        lines = [
+            f"# TYPE {prefix}_elapsed_seconds gauge",
+            f"{prefix}_elapsed_seconds{fmt()} {snapshot['elapsed_seconds']:.6f}",
+            f"# TYPE {prefix}_vectors_per_second gauge",
+            f"{prefix}_vectors_per_second{fmt()} {snapshot['vectors_per_second']:.6f}",
+            f"# TYPE {prefix}_stage_seconds_total counter",
+        ]
+        for name, values in sorted(snapshot["stages"].items()):
+            lines.append(f"{prefix}_stage_seconds_total{fmt({'stage': name})} {values['seconds']:.6f}")
+        lines.append(f"# TYPE {prefix}_stage_calls_total counter")
+        for name, values in sorted(snapshot["stages"].items()):
+            lines.append(f"{prefix}_stage_calls_total{fmt({'stage': name})} {values['count']}")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total{fmt()} {value}")
+        lines.append(f"# TYPE {prefix}_retries_total counter")
+        for key, value in sorted(snapshot["retries"].items()):
+            operation, cause = key.split(":", 1)
+            lines.append(f"{prefix}_retries_total{fmt({'operation': operation, 'cause': cause})} {value}")
+        
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_name(target.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, target)
+
+
+def record_tenacity_retry(operation: str):
+    """
+    Cria um callback before_sleep do tenacity que registra o retry na
+    telemetria do objeto (primeiro argumento do método decorado).
+    
+    Args:
+        operation: Nome da operação (ex: 'upsert').
+    """
+    def before_sleep(retry_state):
+        owner = retry_state.args[0] if retry_state.args else None
+        telemetry = getattr(owner, "telemetry", None)
+        if telemetry is None:
+            return
+        error = retry_state.outcome.exception() if retry_state.outcome else None
+        sleep_seconds = retry_state.next_action.sleep if retry_state.next_action else 0.0
+        telemetry.record_retry(operation, error, sleep_seconds)
+    
+    return before_sleep
+
+
+def merge_snapshots(snapshots: List[Dict[str, Any]], elapsed_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Soma snapshots de telemetria de vários processos (ex: shards da ingestão).
+    
+    Args:
+        snapshots: Snapshots retornados por IngestionTelemetry.snapshot().
+        elapsed_seconds: Duração total (relógio de parede). Se None, usa o
+            maior elapsed_seconds entre os snapshots.
+        
+    Returns:
+        Snapshot combinado no mesmo formato de IngestionTelemetry.snapshot().
+    """
+    stages: Dict[str, Dict[str, float]] = {}
+    counters: Counter = Counter()
+    retries: Counter = Counter()
+    
+    for snapshot in snapshots:
+        for name, values in snapshot.get("stages", {}).items():
+            stage = stages.setdefault(name, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+            stage["count"] += values["count"]
+            stage["seconds"] += values["seconds"]
+            stage["max_seconds"] = max(stage["max_seconds"], values["max_seconds"])
+        counters.update(snapshot.get("counters", {}))
+        retries.update(snapshot.get("retries", {}))
+    
+    for stage in stages.values():
+        stage["avg_seconds"] = stage["seconds"] / stage["count"] if stage["count"] else 0.0
+    
+    if elapsed_seconds is None:
+        elapsed_seconds = max((s.get("elapsed_seconds", 0.0) for s in snapshots), default=0.0)
+    
+    return {
+        "elapsed_seconds": elapsed_seconds,
+        "stages": stages,
+        "counters": dict(counters),
+        "retries": dict(retries),
+        "vectors_per_second": (
+            counters.get("vectors_upserted", 0) / elapsed_seconds if elapsed_seconds > 0 else 0.0
+        ),
+        "bytes_per_second": (
+            counters.get("bytes_sent", 0) / elapsed_seconds if elapsed_seconds > 0 else 0.0
+        ),
+    }
@@ -0,0 +1,387 @@
+"""
+Módulo de tracing do caminho de query.
+
+Cada etapa da query (cache, embedding, busca no índice, hidratação,
+formatação, empacotamento do contexto) é medida como um span com início,
+duração e tamanhos (caracteres, matches, tokens). Os spans vão para um sink
+plugável:
+
+- nenhum (padrão): trace() devolve um span nulo compartilhado, sem ler o
+  relógio nem alocar
+- histogram: histogramas log-lineares no estilo HDR por etapa, em memória,
+  com percentis consultáveis no processo em execução
+- jsonl: uma linha JSON por span (para análise offline)
+
+O sink é escolhido por QUERY_TRACE_SINK (ex: 'histogram,jsonl') ou por
+set_trace_sink().
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+from contextvars import ContextVar
+from pathlib import Path
+import itertools
+import json
+import threading
+import time
+
+from config.settings import Settings
+
+
+# Histograma: 2**_SUB_BITS sub-buckets por potência de 2 (erro relativo < 1,6%)
+_SUB_BITS = 7
+_SUB_COUNT = 1 << _SUB_BITS
+_HALF_COUNT = _SUB_COUNT // 2
+_MAX_SHIFT = 40
+_BUCKETS = _SUB_COUNT + _MAX_SHIFT * _HALF_COUNT
+
+_trace_ids = itertools.count(1)
+_current_trace: ContextVar[Optional[int]] = ContextVar("rag_trace_id", default=None)
+
+
+class TraceSink:
+    """Destino dos spans (a base descarta tudo)."""
+    
+    def record(self, name: str, start: float, duration: float, trace_id: Optional[int], attrs: Dict[str, Any]):
+        """
+        Registra um span finalizado.
+        
+        Args:
+            name: Etapa (ex: 'embedding').
+            start: Início (epoch, em segundos).
+            duration: Duração, em segundos.
+            trace_id: Query à qual o span pertence.
+            attrs: Tamanhos e atributos da etapa.
+        """
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Estatísticas acumuladas pelo sink (vazio se não agrega)."""
+        return {}
+
+
+class LatencyHistogram:
+    """
+    Histograma de latências log-linear (estilo HDR), em microssegundos.
+    
+    Valores abaixo de 128 µs têm bucket próprio; acima, cada potência de 2 é
+    dividida em 64 buckets, então qualquer percentil tem erro relativo menor
+    que 1,6% com memória fixa (~2.700 contadores), independente do volume.
+    """
+    
+    def __init__(self):
+        self._counts = [0] * _BUCKETS
+        self.count = 0
+        self.total_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us = 0
+    
+    @staticmethod
+    def _index(value_us: int) -> int:
+        if value_us < _SUB_COUNT:
+            return value_us
+        shift = min(value_us.bit_length() - _SUB_BITS, _MAX_SHIFT)
+        mantissa = min(value_us >> shift, _SUB_COUNT - 1)
+        return _SUB_COUNT + (shift - 1) * _HALF_COUNT + (mantissa - _HALF_COUNT)
+    
+    @staticmethod
+    def _value(index: int) -> float:
+        """Ponto médio do bucket, em microssegundos."""
+        if index < _SUB_COUNT:
+            return float(index)
+        shift = (index - _SUB_COUNT) // _HALF_COUNT + 1
+        mantissa = (index - _SUB_COUNT) % _HALF_COUNT + _HALF_COUNT
+        return (mantissa << shift) + (1 << shift) / 2
+    
+    def add(self, seconds: float):
+        """Registra uma latência."""
+        value_us = max(int(seconds * 1_000_000), 0)
+        self._counts[self._index(value_us)] += 1
+        self.count += 1
+        self.total_us += value_us
+        self.max_us = max(self.max_us, value_us)
+        self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+    
+    def percentiles(self, percentiles: Iterable[float]) -> Dict[float, float]:
+        """
+        Calcula percentis.
+        
+        Args:
+            percentiles: Percentis desejados (ex: [50, 95, 99]).
+        
+        Returns:
+            {percentil: latência em milissegundos}.
+        """
+        wanted = sorted(percentiles)
+        result: Dict[float, float] = {}
+        if not self.count:
+            return {p: 0.0 for p in wanted}
+        
+        targets = [(p, max(1, -(-self.count * p // 100))) for p in wanted]
+        cumulative = 0
+        position = 0
+        for index, count in enumerate(self._counts):
+            if not count:
+                continue
+            cumulative += count
+            while position < len(targets) and cumulative >= targets[position][1]:
+                value_us = min(self._value(index), self.max_us)
+                result[targets[position][0]] = value_us / 1000.0
+                position += 1
+            if position == len(targets):
+                break
+        return result
+    
+    def summary(self) -> Dict[str, float]:
+        """count, mean_ms, min_ms, max_ms, p50_ms, p95_ms, p99_ms."""
+        p50, p95, p99 = (self.percentiles([50, 95, 99])[p] for p in (50, 95, 99))
+        return {
+            "count": self.count,
+            "mean_ms": self.total_us / self.count / 1000.0 if self.count else 0.0,
+            "min_ms": (self.min_us or 0) / 1000.0,
+            "max_ms": self.max_us / 1000.0,
+            "p50_ms": p50,
+            "p95_ms": p95,
+            "p99_ms": p99,
+        }
+
+
+class HistogramSink(TraceSink):
+    """Histogramas de latência por etapa, em memória (thread-safe)."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._sizes: Dict[str, Dict[str, List[int]]] = {}
+    
+    def record(self, name, start, duration, trace_id, attrs):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+                self._sizes[name] = {}
+            histogram.add(duration)
+            sizes = self._sizes[name]
+            for key, value in attrs.items():
+                if isinstance(value, int) and not isinstance(value, bool):
+                    total = sizes.setdefault(key, [0, 0])
+                    total[0] += value
+                    total[1] += 1
+    
+    def percentiles(self, stage: str, percentiles: Iterable[float] = (50, 95, 99)) -> Dict[float, float]:
+        """
+        Percentis de latência de uma etapa, em milissegundos.
+        
+        Args:
+            stage: Etapa (ex: 'embedding').
+            percentiles: Percentis desejados.
+        
+        Returns:
+            {percentil: ms} (vazio se a etapa não tem spans).
+        """
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            return histogram.percentiles(percentiles) if histogram is not None else {}
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Resumo por etapa.
+        
+        Returns:
+            {etapa: {count, mean_ms, min_ms, max_ms, p50_ms, p95_ms, p99_ms,
+            sizes: {atributo: média nos spans que o registraram}}}.
+        """
+        with self._lock:
+            return {
+                name: dict(
+                    histogram.summary(),
+                    sizes={key: total / count for key, (total, count) in self._sizes[name].items()}
+                )
+                for name, histogram in self._histograms.items()
+            }
+    
+    def reset(self):
+        """Zera os histogramas."""
+        with self._lock:
+            self._histograms.clear()
+            self._sizes.clear()
+
+
+class JsonlSink(TraceSink):
+    """Anexa cada span como uma linha JSON (arquivo aberto uma vez, thread-safe)."""
+    
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Arquivo .jsonl de destino.
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+    
+    def record(self, name, start, duration, trace_id, attrs):
+        line = json.dumps({
+            "trace_id": trace_id,
+            "span": name,
+            "start": start,
+            "duration_ms": duration * 1000.0,
+            **attrs,
+        }, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+    
+    def close(self):
+        """Fecha o arquivo."""
+        with self._lock:
+            self._file.close()
+
+
+class MultiSink(TraceSink):
+    """Repassa os spans a vários sinks."""
+    
+    def __init__(self, sinks: List[TraceSink]):
+        self.sinks = sinks
+    
+    def record(self, name, start, duration, trace_id, attrs):
+        for sink in self.sinks:
+            sink.record(name, start, duration, trace_id, attrs)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        for sink in self.sinks:
+            snapshot = sink.snapshot()
+            if snapshot:
+                return snapshot
+        return {}
+
+
+class Span:
+    """Span em andamento; use set() para anexar tamanhos conhecidos só no fim."""
+    
+    __slots__ = ("name", "attrs", "trace_id", "_token", "_start", "_wall_start")
+    
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.attrs = attrs
+        self.trace_id: Optional[int] = None
+        self._token = None
+    
+    def set(self, **attrs):
+        """Adiciona atributos ao span."""
+        self.attrs.update(attrs)
+    
+    def __enter__(self) -> "Span":
+        self.trace_id = _current_trace.get()
+        if self.trace_id is None:
+            # Span raiz: abre um trace para os spans aninhados
+            self.trace_id = next(_trace_ids)
+            self._token = _current_trace.set(self.trace_id)
+        self._wall_start = time.time()
+        self._start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        if self._token is not None:
+            _current_trace.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        sink = _sink
+        if sink is not None:
+            sink.record(self.name, self._wall_start, duration, self.trace_id, self.attrs)
+        return False
+
+
+class _NullSpan:
+    """Span usado com o tracing desligado (não faz nada)."""
+    
+    __slots__ = ()
+    
+    def set(self, **attrs):
+        pass
+    
+    def __enter__(self) -> "_NullSpan":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+_UNSET = object()
+_sink: Any = _UNSET
+_sink_lock = threading.Lock()
+
+
+def _sink_from_settings() -> Optional[TraceSink]:
+    """Cria o sink de QUERY_TRACE_SINK ('none', 'histogram', 'jsonl' ou combinação)."""
+    settings = Settings()
+    names = [name.strip() for name in settings.QUERY_TRACE_SINK.lower().split(",") if name.strip()]
+    sinks: List[TraceSink] = []
+    for name in names:
+        if name == "histogram":
+            sinks.append(HistogramSink())
+        elif name == "jsonl":
+            sinks.append(JsonlSink(settings.QUERY_TRACE_PATH))
+        elif name not in ("none", "noop"):
+            raise ValueError(f"QUERY_TRACE_SINK inválido: {name}. Use 'none', 'histogram' ou 'jsonl'.")
+    if not sinks:
+        return None
+    return sinks[0] if len(sinks) == 1 else MultiSink(sinks)
+
+
+def get_trace_sink() -> Optional[TraceSink]:
+    """Sink atual (criado de QUERY_TRACE_SINK na primeira chamada; None = desligado)."""
+    global _sink
+    if _sink is _UNSET:
+        with _sink_lock:
+            if _sink is _UNSET:
+                _sink = _sink_from_settings()
+    return _sink
+
+
+def set_trace_sink(sink: Optional[TraceSink]) -> Optional[TraceSink]:
+    """
+    Troca o sink do processo.
+    
+    Args:
+        sink: Novo sink (None desliga o tracing).
+    
+    Returns:
+        O sink instalado.
+    """
+    global _sink
+    with _sink_lock:
+        _sink = sink
+    return sink
+
+
+def trace(name: str, **attrs):
+    """
+    Mede um bloco como um span da etapa `name`.
+    
+    Uso:
+        with trace("embedding", chars=len(query)) as span:
+            vector = embed(query)
+            span.set(dimension=len(vector))
+    
+    Args:
+        name: Etapa.
+        **attrs: Tamanhos/atributos conhecidos no início.
+    
+    Returns:
+        Context manager do span (nulo se o tracing está desligado).
+    """
+    sink = _sink if _sink is not _UNSET else get_trace_sink()
+    if sink is None:
+        return _NULL_SPAN
+    return Span(name, attrs)
+
+
+def trace_stats() -> Dict[str, Any]:
+    """
+    Latências por etapa do processo em execução (requer o sink 'histogram').
+    
+    Returns:
+        {etapa: {count, mean_ms, p50_ms, p95_ms, p99_ms, ...}}.
+    """
+    sink = get_trace_sink()
+    return sink.snapshot() if sink is not None else {}
@@ -0,0 +1,118 @@
+"""
+Módulo de empacotamento de upserts por tamanho de payload.
+
+Agrupar vetores apenas por contagem (BATCH_SIZE) faz com que lotes com
+chunks grandes estourem o limite de tamanho da requisição do Pinecone,
+enquanto chunks pequenos desperdiçam round trips. O UpsertBatcher empacota
+vetores em requisições limitadas simultaneamente por bytes serializados e
+por número de vetores, mantendo cada requisição o maior possível.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+import json
+
+
+# Overhead do envelope da requisição ({"vectors": [...], "namespace": ...})
+_REQUEST_OVERHEAD_BYTES = 64
+
+
+def estimate_vector_bytes(vector: Dict[str, Any]) -> int:
+    """
+    Estima o tamanho serializado (JSON) de um vetor na requisição de upsert.
+    
+    Args:
+        vector: Vetor no formato {"id", "values", "metadata"}.
+        
+    Returns:
+        Tamanho aproximado em bytes (inclui a vírgula separadora).
+    """
+    return len(json.dumps(vector, ensure_ascii=False, separators=(",", ":")).encode("utf-8")) + 1
+
+
+class UpsertRequest:
+    """Uma requisição de upsert pronta: vetores, posições dos chunks e tamanho."""
+    
+    __slots__ = ("vectors", "positions", "num_bytes")
+    
+    def __init__(self, vectors: List[Dict[str, Any]], positions: List[int], num_bytes: int):
+        self.vectors = vectors
+        self.positions = positions
+        self.num_bytes = num_bytes
+
+
+class UpsertBatcher:
+    """
+    Acumula vetores e emite requisições limitadas por bytes e por contagem.
+    
+    Vetores podem atravessar lotes de embedding: uma requisição só é emitida
+    quando o próximo vetor a faria exceder um dos limites (ou no flush final).
+    """
+    
+    def __init__(self, max_bytes: int, max_vectors: int):
+        """
+        Args:
+            max_bytes: Tamanho máximo de uma requisição (bytes serializados).
+            max_vectors: Número máximo de vetores por requisição.
+        """
+        if max_bytes <= _REQUEST_OVERHEAD_BYTES:
+            raise ValueError(f"max_bytes muito pequeno: {max_bytes}")
+        if max_vectors <= 0:
+            raise ValueError(f"max_vectors deve ser positivo: {max_vectors}")
+        
+        self.max_bytes = max_bytes
+        self.max_vectors = max_vectors
+        self._vectors: List[Dict[str, Any]] = []
+        self._positions: List[int] = []
+        self._bytes = _REQUEST_OVERHEAD_BYTES
+    
+    def add(
+        self,
+        vectors: Sequence[Dict[str, Any]],
+        positions: Sequence[int]
+    ) -> List[UpsertRequest]:
+        """
+        Adiciona vetores e retorna as requisições que ficaram completas.
+        
+        Args:
+            vectors: Vetores preparados.
+            positions: Posição do chunk de origem de cada vetor.
+            
+        Returns:
+            Lista de requisições prontas para envio.
+        """
+        ready: List[UpsertRequest] = []
+        
+        for vector, position in zip(vectors, positions):
+            size = estimate_vector_bytes(vector)
+            
+            if self._vectors and (
+                self._bytes + size > self.max_bytes
+                or len(self._vectors) >= self.max_vectors
+            ):
+                ready.append(self._emit())
+            
+            if size + _REQUEST_OVERHEAD_BYTES > self.max_bytes:
+                # Vetor sozinho excede o limite: vai em requisição própria
+                # para que a falha fique restrita a ele
+                print(f"⚠️  Vetor {vector.get('id')} excede o limite de payload "
+                      f"({size} > {self.max_bytes} bytes)")
+            
+            self._vectors.append(vector)
+            self._positions.append(position)
+            self._bytes += size
+        
+        return ready
+    
+    def flush(self) -> List[UpsertRequest]:
+        """Retorna a requisição parcial pendente (se houver)."""
+        return [self._emit()] if self._vectors else []
+    
+    def _emit(self) -> UpsertRequest:
+        request = UpsertRequest(self._vectors, self._positions, self._bytes)
+        self._vectors = []
+        self._positions = []
+        self._bytes = _REQUEST_OVERHEAD_BYTES
+        return request
+    
+    def __len__(self) -> int:
+        return len(self._vectors)
@@ -0,0 +1,1334 @@
+"""
+Módulo de abstração do vector store.
+
+Define a interface VectorStore (subconjunto da API de Index do Pinecone usado
+pelo pipeline) e duas implementações:
+
+- PineconeVectorStore: encapsula um Index do Pinecone
+- LocalVectorStore: store em processo com matriz NumPy float32 contígua,
+  busca exata por cosseno (um produto matriz-vetor + argpartition) e
+  persistência em disco carregada via memory mapping
+- IVFPQVectorStore: LocalVectorStore com índice aproximado IVF-PQ (ver
+  scripts/ivfpq.py), para corpora grandes
+
+O backend é escolhido por VECTOR_STORE_BACKEND nas configurações.
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from config.settings import Settings
+from .ivfpq import IVFPQIndex
+
+
+def vector_id_for(article_id: Any, chunk_index: Any) -> str:
+    """
+    ID determinístico do vetor de um chunk: article_{article_id}_chunk_{chunk_index}.
+    
+    Args:
+        article_id: ID do artigo.
+        chunk_index: Índice do chunk no artigo.
+        
+    Returns:
+        ID do vetor (o mesmo usado na ingestão).
+    """
+    return f"article_{article_id}_chunk_{chunk_index}"
+
+
+# ============================================================================
+# FILTROS DE METADADOS (semântica do Pinecone)
+# ============================================================================
+
+def _as_list(value: Any) -> List[Any]:
+    return value if isinstance(value, list) else [value]
+
+
+def _match_condition(value: Any, condition: Any) -> bool:
+    """Avalia a condição de um campo (ex: {"$in": [...]}) contra o valor."""
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+    
+    for operator, expected in condition.items():
+        if operator == "$exists":
+            if (value is not None) != bool(expected):
+                return False
+            continue
+        
+        if value is None:
+            # Campo ausente só satisfaz $ne / $nin
+            if operator in ("$ne", "$nin"):
+                continue
+            return False
+        
+        values = _as_list(value)
+        
+        if operator == "$eq":
+            ok = expected in values
+        elif operator == "$ne":
+            ok = expected not in values
+        elif operator == "$in":
+            ok = any(v in expected for v in values)
+        elif operator == "$nin":
+            ok = all(v not in expected for v in values)
+        elif operator in ("$gt", "$gte", "$lt", "$lte"):
+            try:
+                if operator == "$gt":
+                    ok = any(v > expected for v in values)
+                elif operator == "$gte":
+                    ok = any(v >= expected for v in values)
+                elif operator == "$lt":
+                    ok = any(v < expected for v in values)
+                else:
+                    ok = any(v <= expected for v in values)
+            except TypeError:
+                ok = False
+        else:
+            raise ValueError(f"Operador de filtro não suportado: {operator}")
+        
+        if not ok:
+            return False
+    
+    return True
+
+
+def matches_filter(metadata: Dict[str, Any], filter: Optional[Dict[str, Any]]) -> bool:
+    """
+    Verifica se metadados satisfazem um filtro no formato do Pinecone.
+    
+    Suporta $eq, $ne, $in, $nin, $gt, $gte, $lt, $lte, $exists, $and e $or.
+    Para campos com lista de valores, $eq/$in casam com qualquer elemento.
+    
+    Args:
+        metadata: Metadados do vetor.
+        filter: Filtro (None = aceita tudo).
+        
+    Returns:
+        True se o vetor satisfaz o filtro.
+    """
+    if not filter:
+        return True
+    
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, sub) for sub in condition):
+                return False
+        elif not _match_condition(metadata.get(key), condition):
+            return False
+    
+    return True
+
+
+# ============================================================================
+# INTERFACE
+# ============================================================================
+
+class VectorStore:
+    """
+    Interface comum dos vector stores.
+    
+    Os métodos espelham o Index do Pinecone (upsert, query, fetch, delete,
+    list, describe_index_stats) e retornam dicionários simples.
+    """
+    
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: Optional[str] = None):
+        """Insere/atualiza vetores {"id", "values", "metadata"}."""
+        raise NotImplementedError
+    
+    def query(
+        self,
+        vector: Sequence[float],
+        top_k: int,
+        filter: Optional[Dict[str, Any]] = None,
+        namespace: Optional[str] = None,
+        include_metadata: bool = True
+    ) -> Dict[str, Any]:
+        """Busca os top_k vetores mais similares: {"matches": [{"id", "score", "metadata"}]}."""
+        raise NotImplementedError
+    
+    def fetch(self, ids: Sequence[str], namespace: Optional[str] = None) -> Dict[str, Any]:
+        """Busca vetores por ID: {"vectors": {id: {"id", "values", "metadata"}}}."""
+        raise NotImplementedError
+    
+    def delete(
+        self,
+        ids: Optional[Sequence[str]] = None,
+        namespace: Optional[str] = None,
+        delete_all: bool = False
+    ):
+        """Deleta vetores por ID (ou todos do namespace)."""
+        raise NotImplementedError
+    
+    def list(self, prefix: str = "", namespace: Optional[str] = None) -> Iterator[List[str]]:
+        """Lista IDs com o prefixo, em páginas."""
+        raise NotImplementedError
+    
+    def describe_index_stats(self) -> Dict[str, Any]:
+        """Retorna {"dimension", "total_vector_count", "namespaces": {ns: {"vector_count"}}}."""
+        raise NotImplementedError
+    
+    def flush(self):
+        """Persiste alterações pendentes (no-op para stores remotos)."""
+    
+    async def aquery(
+        self,
+        vector: Sequence[float],
+        top_k: int,
+        filter: Optional[Dict[str, Any]] = None,
+        namespace: Optional[str] = None,
+        include_metadata: bool = True
+    ) -> Dict[str, Any]:
+        """Versão assíncrona de query (padrão: query em uma thread do executor)."""
+        return await asyncio.to_thread(
+            self.query, vector, top_k, filter=filter, namespace=namespace,
+            include_metadata=include_metadata
+        )
+    
+    async def aclose(self):
+        """Fecha clientes assíncronos (no-op por padrão)."""
+
+
+# ============================================================================
+# PINECONE
+# ============================================================================
+
+def _to_plain(value: Any) -> Any:
+    """Converte objetos de resposta do cliente Pinecone em tipos simples."""
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    return value
+
+
+class PineconeVectorStore(VectorStore):
+    """VectorStore sobre um Index do Pinecone."""
+    
+    def __init__(self, index, async_index_factory: Optional[Callable[[], Any]] = None):
+        """
+        Args:
+            index: Handle de Index do cliente Pinecone.
+            async_index_factory: Cria um handle IndexAsyncio (cliente aiohttp)
+                para aquery. Se None, aquery usa o handle síncrono em uma thread.
+        """
+        self.index = index
+        self._async_index_factory = async_index_factory
+        self._async_index = None
+        self._async_index_loop = None
+    
+    @staticmethod
+    def _ns_kwargs(namespace: Optional[str]) -> Dict[str, Any]:
+        return {"namespace": namespace} if namespace else {}
+    
+    def upsert(self, vectors, namespace=None):
+        self.index.upsert(vectors=vectors, **self._ns_kwargs(namespace))
+    
+    def query(self, vector, top_k, filter=None, namespace=None, include_metadata=True):
+        results = self.index.query(
+            vector=list(vector),
+            top_k=top_k,
+            include_metadata=include_metadata,
+            filter=filter,
+            **self._ns_kwargs(namespace)
+        )
+        return {
+            "matches": [
+                {
+                    "id": match.get("id"),
+                    "score": match.get("score", 0.0),
+                    "metadata": dict(match.get("metadata") or {}),
+                }
+                for match in results.get("matches", [])
+            ]
+        }
+    
+    def fetch(self, ids, namespace=None):
+        response = self.index.fetch(ids=list(ids), **self._ns_kwargs(namespace))
+        raw_vectors = getattr(response, "vectors", None)
+        if raw_vectors is None:
+            raw_vectors = _to_plain(response).get("vectors", {})
+        
+        vectors = {}
+        for vector_id, vector in raw_vectors.items():
+            vector = _to_plain(vector)
+            vectors[vector_id] = {
+                "id": vector_id,
+                "values": list(vector.get("values") or []),
+                "metadata": dict(vector.get("metadata") or {}),
+            }
+        return {"vectors": vectors}
+    
+    def delete(self, ids=None, namespace=None, delete_all=False):
+        if delete_all:
+            self.index.delete(delete_all=True, **self._ns_kwargs(namespace))
+        else:
+            self.index.delete(ids=list(ids or []), **self._ns_kwargs(namespace))
+    
+    def list(self, prefix="", namespace=None):
+        kwargs = {"prefix": prefix} if prefix else {}
+        kwargs.update(self._ns_kwargs(namespace))
+        for page in self.index.list(**kwargs):
+            # Versões do cliente retornam str ou ListItem(id=...)
+            yield [getattr(item, "id", item) for item in page]
+    
+    def describe_index_stats(self):
+        return _to_plain(self.index.describe_index_stats())
+    
+    async def _get_async_index(self):
+        """Handle IndexAsyncio do event loop atual (a sessão HTTP é presa ao loop)."""
+        loop = asyncio.get_running_loop()
+        if self._async_index is None or self._async_index_loop is not loop:
+            # A criação pode resolver o host do índice (chamada síncrona, uma vez)
+            self._async_index = await asyncio.to_thread(self._async_index_factory)
+            self._async_index_loop = loop
+        return self._async_index
+    
+    async def aquery(self, vector, top_k, filter=None, namespace=None, include_metadata=True):
+        if self._async_index_factory is None:
+            return await super().aquery(
+                vector, top_k, filter=filter, namespace=namespace, include_metadata=include_metadata
+            )
+        
+        index = await self._get_async_index()
+        results = _to_plain(await index.query(
+            vector=list(vector),
+            top_k=top_k,
+            include_metadata=include_metadata,
+            filter=filter,
+            **self._ns_kwargs(namespace)
+        ))
+        return {
+            "matches": [
+                {
+                    "id": match.get("id"),
+                    "score": match.get("score", 0.0),
+                    "metadata": dict(match.get("metadata") or {}),
+                }
+                for match in map(_to_plain, results.get("matches", []))
+            ]
+        }
+    
+    async def aclose(self):
+        if self._async_index is not None and self._async_index_loop is asyncio.get_running_loop():
+            await self._async_index.close()
+        self._async_index = None
+        self._async_index_loop = None
+
+
+# ============================================================================
+# LOCAL (NumPy)
+# ============================================================================
+
+_DEFAULT_NAMESPACE_DIR = "__default__"
+
+# Segmentos anexados acima deste número forçam a reescrita do namespace
+_MAX_SEGMENTS = 1024
+
+
+class _LocalNamespace:
+    """Vetores de um namespace: matriz normalizada + IDs + metadados."""
+    
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.matrix = np.zeros((0, dimension), dtype=np.float32)
+        self.count = 0
+        self.ids: List[str] = []
+        self.metadata: List[Dict[str, Any]] = []
+        self.id_to_row: Dict[str, int] = {}
+        # Linhas [0, persisted) estão gravadas em disco, na mesma ordem
+        self.persisted = 0
+        # Uma linha já gravada mudou (ou saiu): o próximo flush reescreve tudo
+        self.rewrite = False
+        # Incrementado a cada mudança que exige reescrita (ver LocalVectorStore.flush)
+        self.generation = 0
+        # Layout em disco: linhas da base (vectors.npy) e segmentos anexados
+        self.base_rows = 0
+        self.segments: List[Dict[str, Any]] = []
+        # article_id → linhas, construído sob demanda para filtros por artigo
+        self._article_rows: Optional[Dict[str, List[int]]] = None
+    
+    @property
+    def dirty(self) -> bool:
+        """True se há linhas ou alterações não gravadas."""
+        return self.rewrite or self.count > self.persisted
+    
+    def _mark_rewrite(self):
+        self.rewrite = True
+        self.generation += 1
+    
+    def _ensure_capacity(self, needed: int):
+        """Garante matriz gravável com capacidade para `needed` linhas."""
+        writable = isinstance(self.matrix, np.ndarray) and not isinstance(self.matrix, np.memmap)
+        if writable and self.matrix.shape[0] >= needed:
+            return
+        capacity = max(needed, 2 * self.matrix.shape[0], 1024)
+        grown = np.zeros((capacity, self.dimension), dtype=np.float32)
+        grown[:self.count] = self.matrix[:self.count]
+        self.matrix = grown
+    
+    def upsert(self, vectors: List[Dict[str, Any]]):
+        values = np.asarray([v["values"] for v in vectors], dtype=np.float32)
+        if values.ndim != 2 or values.shape[1] != self.dimension:
+            raise ValueError(
+                f"Dimensão do vetor ({values.shape[-1]}) diferente da "
+                f"dimensão do store ({self.dimension})"
+            )
+        norms = np.linalg.norm(values, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        values = values / norms
+        
+        self._ensure_capacity(self.count + len(vectors))
+        for vector, row_values in zip(vectors, values):
+            row = self.id_to_row.get(vector["id"])
+            if row is None:
+                row = self.count
+                self.count += 1
+                self.ids.append(vector["id"])
+                self.metadata.append({})
+                self.id_to_row[vector["id"]] = row
+            elif row < self.persisted:
+                self._mark_rewrite()
+            self.matrix[row] = row_values
+            self.metadata[row] = dict(vector.get("metadata") or {})
+        self._article_rows = None
+    
+    def delete(self, ids: Sequence[str]):
+        rows = [self.id_to_row[i] for i in ids if i in self.id_to_row]
+        if not rows:
+            return
+        self._ensure_capacity(self.count)
+        for row in sorted(rows, reverse=True):
+            last = self.count - 1
+            removed_id = self.ids[row]
+            if row != last:
+                # Move a última linha para o buraco (swap-remove)
+                self._move_row(last, row)
+            self.ids.pop()
+            self.metadata.pop()
+            del self.id_to_row[removed_id]
+            self.count -= 1
+        self._mark_rewrite()
+        self._article_rows = None
+    
+    def _move_row(self, source: int, target: int):
+        """Copia a linha `source` para `target` (vetor, ID e metadados)."""
+        self.matrix[target] = self.matrix[source]
+        self.ids[target] = self.ids[source]
+        self.metadata[target] = self.metadata[source]
+        self.id_to_row[self.ids[target]] = target
+    
+    def snapshot_extras(self, start: int, full: bool) -> Dict[str, Any]:
+        """
+        Cópia dos dados adicionais do namespace (ex: índice ANN) a gravar
+        junto com as linhas [start, count).
+        
+        Args:
+            start: Primeira linha do segmento (0 na reescrita completa).
+            full: True na reescrita completa do namespace.
+        
+        Returns:
+            Dicionário {nome: array NumPy (gravado como .npy) ou dict (.json)}.
+        """
+        return {}
+    
+    def load_extras(self, ns_dir: Path):
+        """Carrega os dados adicionais gravados na reescrita completa."""
+    
+    def load_segment_extras(self, ns_dir: Path, segments: List[str]):
+        """Anexa os dados adicionais dos segmentos (após load_extras)."""
+    
+    def _rows_for_articles(self, condition: Any) -> Optional[np.ndarray]:
+        """
+        Linhas dos artigos de uma condição article_id $eq/$in (None se a
+        condição não é desse tipo), sem varrer os metadados de todas as linhas.
+        """
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        if len(condition) != 1:
+            return None
+        operator, expected = next(iter(condition.items()))
+        if operator not in ("$eq", "$in"):
+            return None
+        
+        if self._article_rows is None:
+            article_rows: Dict[str, List[int]] = {}
+            for row, metadata in enumerate(self.metadata):
+                article_rows.setdefault(str(metadata.get("article_id")), []).append(row)
+            self._article_rows = article_rows
+        
+        rows = [
+            row
+            for article_id in dict.fromkeys(str(value) for value in _as_list(expected))
+            for row in self._article_rows.get(article_id, ())
+        ]
+        return np.asarray(rows, dtype=np.int64)
+    
+    def query(self, vector, top_k, filter, include_metadata):
+        if self.count == 0 or top_k <= 0:
+            return []
+        
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        
+        subset = None
+        if filter and "article_id" in filter:
+            # Busca restrita a artigos (ex: coarse-to-fine): pontua só as linhas deles
+            subset = self._rows_for_articles(filter["article_id"])
+        
+        if subset is not None:
+            rest = {key: value for key, value in filter.items() if key != "article_id"}
+            if rest:
+                subset = subset[np.fromiter(
+                    (matches_filter(self.metadata[row], rest) for row in subset),
+                    dtype=bool, count=subset.size
+                )]
+            if subset.size == 0:
+                return []
+            candidates = subset
+            candidate_scores = self.matrix[subset] @ query
+        elif filter:
+            scores = self.matrix[:self.count] @ query
+            mask = np.fromiter(
+                (matches_filter(m, filter) for m in self.metadata),
+                dtype=bool, count=self.count
+            )
+            candidates = np.flatnonzero(mask)
+            if candidates.size == 0:
+                return []
+            candidate_scores = scores[candidates]
+        else:
+            candidates = None
+            candidate_scores = self.matrix[:self.count] @ query
+        
+        k = min(top_k, candidate_scores.shape[0])
+        top = np.argpartition(-candidate_scores, k - 1)[:k]
+        top = top[np.argsort(-candidate_scores[top])]
+        rows = candidates[top] if candidates is not None else top
+        
+        return [
+            {
+                "id": self.ids[row],
+                "score": float(candidate_scores[position]),
+                "metadata": dict(self.metadata[row]) if include_metadata else {},
+            }
+            for row, position in zip(rows, top)
+        ]
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Vector store local em processo.
+    
+    Cada namespace fica em um subdiretório de `path` com:
+    - vectors.npy: matriz float32 (n, d) de vetores normalizados (mmap)
+    - ids.json: IDs na ordem das linhas
+    - metadata.jsonl: metadados, uma linha por vetor
+    - segments.json + seg_NNNNNN.*: linhas anexadas depois da base
+    """
+    
+    def __init__(self, path: str, dimension: Optional[int] = None):
+        """
+        Abre (ou cria) o store local.
+        
+        Args:
+            path: Diretório do store.
+            dimension: Dimensão dos vetores (obrigatória na criação; ao abrir
+                um store existente é lida do disco).
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        # Serializa flushes (a gravação em disco acontece fora de _lock)
+        self._flush_lock = threading.Lock()
+        self._namespaces: Dict[str, _LocalNamespace] = {}
+        
+        manifest_path = self.path / "store.json"
+        if manifest_path.exists():
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                self.dimension = json.load(f).get("dimension")
+        else:
+            self.dimension = dimension
+        
+        self._load()
+    
+    # ------------------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def _ns_dir_name(namespace: Optional[str]) -> str:
+        return namespace or _DEFAULT_NAMESPACE_DIR
+    
+    def _new_namespace(self, dimension: int) -> _LocalNamespace:
+        return _LocalNamespace(dimension)
+    
+    def _recover(self):
+        """
+        Conclui reescritas interrompidas: restaura .<ns>.old se o namespace
+        sumiu entre as duas trocas de diretório e remove sobras de flush.
+        """
+        for hidden in sorted(p for p in self.path.iterdir() if p.is_dir() and p.name.startswith(".")):
+            if hidden.name.endswith(".old"):
+                ns_dir = self.path / hidden.name[1:-len(".old")]
+                if not ns_dir.exists():
+                    os.replace(hidden, ns_dir)
+                    print(f"⚠️  Namespace restaurado de {hidden.name} (flush interrompido)")
+                    continue
+            shutil.rmtree(hidden, ignore_errors=True)
+    
+    def _load(self):
+        self._recover()
+        for ns_dir in sorted(p for p in self.path.iterdir() if p.is_dir() and not p.name.startswith(".")):
+            vectors_path = ns_dir / "vectors.npy"
+            if not vectors_path.exists():
+                continue
+            matrix = np.load(vectors_path, mmap_mode="r")
+            with open(ns_dir / "ids.json", "r", encoding="utf-8") as f:
+                ids = json.load(f)
+            with open(ns_dir / "metadata.jsonl", "r", encoding="utf-8") as f:
+                metadata = [json.loads(line) for line in f if line.strip()]
+            
+            ns = self._new_namespace(matrix.shape[1])
+            ns.matrix = matrix
+            ns.count = ns.base_rows = len(ids)
+            ns.ids = ids
+            ns.metadata = metadata
+            ns.load_extras(ns_dir)
+            
+            # Segmentos listados no manifesto (arquivos fora dele são sobras de flush interrompido)
+            segments_path = ns_dir / "segments.json"
+            if segments_path.exists():
+                with open(segments_path, "r", encoding="utf-8") as f:
+                    ns.segments = json.load(f)["segments"]
+            if ns.segments:
+                parts = [matrix]
+                for segment in ns.segments:
+                    parts.append(np.load(ns_dir / f"{segment['name']}.vectors.npy"))
+                    with open(ns_dir / f"{segment['name']}.ids.json", "r", encoding="utf-8") as f:
+                        ids.extend(json.load(f))
+                    with open(ns_dir / f"{segment['name']}.metadata.jsonl", "r", encoding="utf-8") as f:
+                        metadata.extend(json.loads(line) for line in f if line.strip())
+                ns.matrix = np.concatenate(parts)
+                ns.count = len(ids)
+                ns.load_segment_extras(ns_dir, [segment["name"] for segment in ns.segments])
+            
+            ns.id_to_row = {vector_id: row for row, vector_id in enumerate(ids)}
+            ns.persisted = ns.count
+            
+            name = None if ns_dir.name == _DEFAULT_NAMESPACE_DIR else ns_dir.name
+            self._namespaces[self._ns_dir_name(name)] = ns
+            if self.dimension is None:
+                self.dimension = matrix.shape[1]
+    
+    def flush(self):
+        """
+        Grava os namespaces alterados.
+        
+        Linhas novas vão para um segmento anexado (seg_NNNNNN.*, listado em
+        segments.json), então checkpoints frequentes gravam só o que mudou.
+        Mudanças em linhas já gravadas (update, delete) ou segmentos somando
+        mais linhas que a base reescrevem o namespace (escrita atômica via
+        troca de diretórios). As linhas são copiadas sob o lock e gravadas
+        fora dele, sem bloquear as queries.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if self.dimension is not None:
+                    self._write_json(self.path / "store.json", {"dimension": self.dimension})
+                plans = [
+                    (name, ns, self._snapshot_namespace(ns))
+                    for name, ns in self._namespaces.items() if ns.dirty
+                ]
+            
+            for name, ns, snapshot in plans:
+                try:
+                    if snapshot["full"]:
+                        self._write_full(name, snapshot)
+                    else:
+                        self._write_segment(name, snapshot)
+                except BaseException:
+                    # O disco pode não ter as linhas: o próximo flush reescreve tudo
+                    with self._lock:
+                        ns._mark_rewrite()
+                    raise
+                
+                with self._lock:
+                    if snapshot["full"]:
+                        ns.base_rows, ns.segments = snapshot["end"], []
+                        # Só limpa se nada exigiu nova reescrita durante a gravação
+                        if ns.generation == snapshot["generation"]:
+                            ns.rewrite = False
+                    else:
+                        ns.segments = snapshot["segments"]
+    
+    @staticmethod
+    def _snapshot_namespace(ns: _LocalNamespace) -> Dict[str, Any]:
+        """Copia (sob o lock) o que o flush de um namespace vai gravar."""
+        appended = ns.count - ns.persisted
+        full = (
+            ns.rewrite
+            or ns.persisted == 0
+            or appended + sum(segment["rows"] for segment in ns.segments) > ns.base_rows
+            or len(ns.segments) >= _MAX_SEGMENTS
+        )
+        start = 0 if full else ns.persisted
+        snapshot = {
+            "full": full,
+            "start": start,
+            "end": ns.count,
+            "generation": ns.generation,
+            "vectors": np.array(ns.matrix[start:ns.count], dtype=np.float32),
+            "ids": ns.ids[start:ns.count],
+            "metadata": ns.metadata[start:ns.count],
+            "extras": ns.snapshot_extras(start, full),
+        }
+        if not full:
+            number = int(ns.segments[-1]["name"][len("seg_"):]) + 1 if ns.segments else 1
+            snapshot["segments"] = ns.segments + [{"name": f"seg_{number:06d}", "rows": appended}]
+        # Linhas em gravação contam como gravadas: se mudarem antes do fim do
+        # flush, _mark_rewrite() agenda a reescrita
+        ns.persisted = ns.count
+        return snapshot
+    
+    @staticmethod
+    def _write_rows(target: Path, prefix: str, snapshot: Dict[str, Any]):
+        """Grava vetores, IDs, metadados e extras de um snapshot com o prefixo dado."""
+        np.save(target / f"{prefix}vectors.npy", snapshot["vectors"])
+        with open(target / f"{prefix}ids.json", "w", encoding="utf-8") as f:
+            json.dump(snapshot["ids"], f)
+        with open(target / f"{prefix}metadata.jsonl", "w", encoding="utf-8") as f:
+            for metadata in snapshot["metadata"]:
+                f.write(json.dumps(metadata, ensure_ascii=False) + "\n")
+        for extra_name, value in snapshot["extras"].items():
+            if isinstance(value, np.ndarray):
+                np.save(target / f"{prefix}{extra_name}.npy", value)
+            else:
+                with open(target / f"{prefix}{extra_name}.json", "w", encoding="utf-8") as f:
+                    json.dump(value, f)
+    
+    def _write_full(self, name: str, snapshot: Dict[str, Any]):
+        """Reescreve o namespace inteiro em um diretório novo e troca os diretórios."""
+        ns_dir = self.path / name
+        tmp_dir = Path(tempfile.mkdtemp(prefix=f".{name}.", dir=str(self.path)))
+        try:
+            self._write_rows(tmp_dir, "", snapshot)
+            
+            # Entre as duas trocas só existe .<ns>.old; _recover() o restaura
+            old_dir = None
+            if ns_dir.exists():
+                old_dir = self.path / f".{name}.old"
+                if old_dir.exists():
+                    shutil.rmtree(old_dir)
+                os.replace(ns_dir, old_dir)
+            os.replace(tmp_dir, ns_dir)
+            if old_dir is not None:
+                shutil.rmtree(old_dir)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+    
+    def _write_segment(self, name: str, snapshot: Dict[str, Any]):
+        """Anexa as linhas novas como um segmento e o registra no manifesto."""
+        ns_dir = self.path / name
+        # Arquivos seg_NNNNNN.*: só ficam visíveis quando o manifesto os lista
+        self._write_rows(ns_dir, f"{snapshot['segments'][-1]['name']}.", snapshot)
+        self._write_json(ns_dir / "segments.json", {"segments": snapshot["segments"]})
+    
+    @staticmethod
+    def _write_json(path: Path, data: Dict[str, Any]):
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+    
+    def _namespace(self, namespace: Optional[str], create: bool = False) -> Optional[_LocalNamespace]:
+        name = self._ns_dir_name(namespace)
+        ns = self._namespaces.get(name)
+        if ns is None and create:
+            if self.dimension is None:
+                raise ValueError("Dimensão do LocalVectorStore não definida")
+            ns = self._new_namespace(self.dimension)
+            self._namespaces[name] = ns
+        return ns
+    
+    def upsert(self, vectors, namespace=None):
+        if not vectors:
+            return
+        with self._lock:
+            if self.dimension is None:
+                self.dimension = len(vectors[0]["values"])
+            self._namespace(namespace, create=True).upsert(vectors)
+    
+    def query(self, vector, top_k, filter=None, namespace=None, include_metadata=True):
+        with self._lock:
+            ns = self._namespace(namespace)
+            matches = ns.query(vector, top_k, filter, include_metadata) if ns else []
+        return {"matches": matches}
+    
+    def fetch(self, ids, namespace=None):
+        with self._lock:
+            ns = self._namespace(namespace)
+            vectors = {}
+            if ns is not None:
+                for vector_id in ids:
+                    row = ns.id_to_row.get(vector_id)
+                    if row is not None:
+                        vectors[vector_id] = {
+                            "id": vector_id,
+                            "values": ns.matrix[row].tolist(),
+                            "metadata": dict(ns.metadata[row]),
+                        }
+        return {"vectors": vectors}
+    
+    def delete(self, ids=None, namespace=None, delete_all=False):
+        if delete_all:
+            # Espera um flush em andamento (mesma ordem de locks do flush)
+            with self._flush_lock, self._lock:
+                ns = self._namespaces.pop(self._ns_dir_name(namespace), None)
+                if ns is not None:
+                    shutil.rmtree(self.path / self._ns_dir_name(namespace), ignore_errors=True)
+            return
+        with self._lock:
+            ns = self._namespace(namespace)
+            if ns is not None:
+                ns.delete(list(ids or []))
+    
+    def list(self, prefix="", namespace=None, page_size: int = 100):
+        with self._lock:
+            ns = self._namespace(namespace)
+            ids = sorted(i for i in ns.ids if i.startswith(prefix)) if ns else []
+        for start in range(0, len(ids), page_size):
+            yield ids[start:start + page_size]
+    
+    def describe_index_stats(self):
+        with self._lock:
+            namespaces = {
+                ("" if name == _DEFAULT_NAMESPACE_DIR else name): {"vector_count": ns.count}
+                for name, ns in self._namespaces.items()
+            }
+        return {
+            "dimension": self.dimension,
+            "total_vector_count": sum(ns["vector_count"] for ns in namespaces.values()),
+            "namespaces": namespaces,
+        }
+
+
+# ============================================================================
+# IVF-PQ (busca aproximada no store local)
+# ============================================================================
+
+# Vetores codificados por lote (limita a memória do encode)
+_ENCODE_BATCH = 65536
+
+
+class _IVFPQNamespace(_LocalNamespace):
+    """
+    Namespace local com índice IVF-PQ.
+    
+    Os códigos PQ (uint8, m bytes por vetor) e a lista IVF de cada vetor ficam
+    em arrays alinhados às linhas da matriz; os vetores float32 continuam em
+    vectors.npy (mmap) para re-ranking exato, fetch e re-treino.
+    """
+    
+    def __init__(self, dimension: int, store: "IVFPQVectorStore"):
+        super().__init__(dimension)
+        self.store = store
+        self.quantizer: Optional[IVFPQIndex] = None
+        self.trained_count = 0
+        self.codes = np.zeros((0, 1), dtype=np.uint8)
+        self.lists = np.zeros(0, dtype=np.int32)
+        self._inverted = None
+        # Linhas alteradas durante um treino em andamento (None fora do treino)
+        self._touched: Optional[set] = None
+    
+    def _ensure_code_capacity(self, needed: int):
+        """Garante arrays de códigos graváveis com capacidade para `needed` linhas."""
+        writable = not isinstance(self.codes, np.memmap) and not isinstance(self.lists, np.memmap)
+        if writable and self.codes.shape[0] >= needed and self.codes.shape[1] == self.quantizer.m:
+            return
+        capacity = max(needed, 2 * self.codes.shape[0], 1024)
+        codes = np.zeros((capacity, self.quantizer.m), dtype=np.uint8)
+        lists = np.zeros(capacity, dtype=np.int32)
+        kept = min(self.count, self.codes.shape[0])
+        if self.codes.shape[1] == self.quantizer.m:
+            codes[:kept] = self.codes[:kept]
+            lists[:kept] = self.lists[:kept]
+        self.codes, self.lists = codes, lists
+    
+    def _encode_rows(self, rows: np.ndarray):
+        """Codifica as linhas indicadas (vetores já gravados na matriz)."""
+        self._ensure_code_capacity(self.count)
+        for start in range(0, len(rows), _ENCODE_BATCH):
+            batch = rows[start:start + _ENCODE_BATCH]
+            self.lists[batch], self.codes[batch] = self.quantizer.encode(self.matrix[batch])
+        self._inverted = None
+    
+    def needs_training(self) -> bool:
+        """True se o namespace atingiu min_vectors (sem índice) ou cresceu 4x desde o treino."""
+        return self.count >= max(self.store.min_vectors, 1) and (
+            self.quantizer is None or self.count >= 4 * self.trained_count
+        )
+    
+    def prepare_training(self) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Início do treino (sob o lock): amostra copiada e linhas a codificar.
+        
+        A partir daqui, linhas alteradas são registradas para serem
+        re-codificadas em install_training.
+        
+        Returns:
+            Tuple (amostra de treino, matriz atual, número de linhas).
+        """
+        rng = np.random.default_rng(self.store.seed)
+        sample_size = min(self.count, self.store.train_sample)
+        sample_rows = np.sort(rng.choice(self.count, sample_size, replace=False))
+        self._touched = set()
+        return np.array(self.matrix[sample_rows], dtype=np.float32), self.matrix, self.count
+    
+    def fit_training(
+        self,
+        sample: np.ndarray,
+        matrix: np.ndarray,
+        count: int
+    ) -> Tuple[IVFPQIndex, np.ndarray, np.ndarray]:
+        """
+        Treina IVF e PQ e codifica as linhas [0, count) (sem o lock).
+        
+        Returns:
+            Tuple (quantizadores, listas, códigos).
+        """
+        nlist = self.store.nlist or max(1, min(int(4 * np.sqrt(count)), len(sample) // 39))
+        m = max(divisor for divisor in range(1, min(self.store.m, self.dimension) + 1) if self.dimension % divisor == 0)
+        quantizer = IVFPQIndex.train(sample, nlist, m, seed=self.store.seed)
+        
+        lists = np.empty(count, dtype=np.int32)
+        codes = np.empty((count, quantizer.m), dtype=np.uint8)
+        for start in range(0, count, _ENCODE_BATCH):
+            end = min(start + _ENCODE_BATCH, count)
+            lists[start:end], codes[start:end] = quantizer.encode(matrix[start:end])
+        return quantizer, lists, codes
+    
+    def install_training(self, quantizer: IVFPQIndex, lists: np.ndarray, codes: np.ndarray):
+        """
+        Fim do treino (sob o lock): instala o índice e re-codifica as linhas
+        alteradas ou inseridas durante o treino.
+        """
+        touched, self._touched = self._touched or set(), None
+        self.quantizer = quantizer
+        self.trained_count = self.count
+        self.codes = np.zeros((0, quantizer.m), dtype=np.uint8)
+        self.lists = np.zeros(0, dtype=np.int32)
+        self._ensure_code_capacity(self.count)
+        
+        kept = min(len(lists), self.count)
+        self.codes[:kept] = codes[:kept]
+        self.lists[:kept] = lists[:kept]
+        stale = sorted({row for row in touched if row < self.count} | set(range(kept, self.count)))
+        self._encode_rows(np.asarray(stale, dtype=np.int64))
+        self._mark_rewrite()
+    
+    def abort_training(self):
+        """Descarta o registro de linhas de um treino que falhou."""
+        self._touched = None
+    
+    def upsert(self, vectors):
+        super().upsert(vectors)
+        rows = np.asarray(sorted({self.id_to_row[v["id"]] for v in vectors}), dtype=np.int64)
+        if self._touched is not None:
+            self._touched.update(rows.tolist())
+        if self.quantizer is not None:
+            self._encode_rows(rows)
+    
+    def _move_row(self, source, target):
+        super()._move_row(source, target)
+        if self._touched is not None:
+            self._touched.add(target)
+        if self.quantizer is not None:
+            self.codes[target] = self.codes[source]
+            self.lists[target] = self.lists[source]
+    
+    def delete(self, ids):
+        if self.quantizer is not None:
+            self._ensure_code_capacity(self.count)
+        super().delete(ids)
+        self._inverted = None
+    
+    def query(self, vector, top_k, filter, include_metadata):
+        if self.quantizer is None or self.count == 0 or top_k <= 0:
+            return super().query(vector, top_k, filter, include_metadata)
+        if filter and "article_id" in filter and self._rows_for_articles(filter["article_id"]) is not None:
+            # Subconjunto de artigos (ex: coarse-to-fine): pequeno, busca exata
+            return super().query(vector, top_k, filter, include_metadata)
+        
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        
+        if self._inverted is None:
+            self._inverted = IVFPQIndex.inverted_lists(self.lists[:self.count], self.quantizer.nlist)
+        order, offsets = self._inverted
+        
+        # Visita as nprobe listas mais próximas; com filtro, dobra nprobe até
+        # encontrar top_k candidatos (ou visitar todas as listas)
+        nprobe = self.store.nprobe
+        while True:
+            probe, coarse = self.quantizer.probe(query, nprobe)
+            rows = np.concatenate([order[offsets[l]:offsets[l + 1]] for l in probe])
+            if filter and rows.size:
+                rows = rows[np.fromiter(
+                    (matches_filter(self.metadata[row], filter) for row in rows),
+                    dtype=bool, count=rows.size
+                )]
+            if rows.size >= top_k or len(probe) >= self.quantizer.nlist:
+                break
+            nprobe *= 2
+        if rows.size == 0:
+            return []
+        
+        scores = self.quantizer.score(query, coarse, self.lists[rows], self.codes[rows])
+        
+        # Re-ranking: os melhores candidatos do PQ são re-pontuados com os vetores exatos
+        candidates = min(top_k * self.store.rerank if self.store.rerank else top_k, rows.size)
+        top = np.argpartition(-scores, candidates - 1)[:candidates]
+        rows, scores = rows[top], scores[top]
+        if self.store.rerank:
+            order_rows = np.argsort(rows)
+            rows = rows[order_rows]
+            scores = np.asarray(self.matrix[rows] @ query, dtype=np.float32)
+        
+        k = min(top_k, rows.size)
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        
+        return [
+            {
+                "id": self.ids[rows[position]],
+                "score": float(scores[position]),
+                "metadata": dict(self.metadata[rows[position]]) if include_metadata else {},
+            }
+            for position in best
+        ]
+    
+    def snapshot_extras(self, start, full):
+        if self.quantizer is None:
+            return {}
+        extras = {
+            "pq_codes": np.array(self.codes[start:self.count]),
+            "ivf_lists": np.array(self.lists[start:self.count]),
+        }
+        if full:
+            if self._inverted is None:
+                self._inverted = IVFPQIndex.inverted_lists(self.lists[:self.count], self.quantizer.nlist)
+            extras.update({
+                "ivf_centroids": self.quantizer.centroids,
+                "pq_codebooks": self.quantizer.codebooks,
+                "ivf_order": self._inverted[0],
+                "ivf_offsets": self._inverted[1],
+                "ivfpq": {"trained_count": self.trained_count},
+            })
+        return extras
+    
+    def load_extras(self, ns_dir: Path):
+        info_path = ns_dir / "ivfpq.json"
+        if not info_path.exists():
+            return
+        with open(info_path, "r", encoding="utf-8") as f:
+            self.trained_count = json.load(f).get("trained_count", 0)
+        self.quantizer = IVFPQIndex(
+            np.load(ns_dir / "ivf_centroids.npy"),
+            np.load(ns_dir / "pq_codebooks.npy")
+        )
+        # Códigos e listas invertidas via mmap (copiados só se houver escrita)
+        self.codes = np.load(ns_dir / "pq_codes.npy", mmap_mode="r")
+        self.lists = np.load(ns_dir / "ivf_lists.npy", mmap_mode="r")
+        self._inverted = (
+            np.load(ns_dir / "ivf_order.npy", mmap_mode="r"),
+            np.load(ns_dir / "ivf_offsets.npy", mmap_mode="r"),
+        )
+    
+    def load_segment_extras(self, ns_dir, segments):
+        if self.quantizer is None:
+            return
+        codes, lists = [self.codes[:self.base_rows]], [self.lists[:self.base_rows]]
+        for segment in segments:
+            codes.append(np.load(ns_dir / f"{segment}.pq_codes.npy"))
+            lists.append(np.load(ns_dir / f"{segment}.ivf_lists.npy"))
+        self.codes, self.lists = np.concatenate(codes), np.concatenate(lists)
+        self._inverted = None
+
+
+class IVFPQVectorStore(LocalVectorStore):
+    """
+    Store local com busca aproximada IVF-PQ (corpora grandes em CPU).
+    
+    Mesmo formato em disco do LocalVectorStore, mais o índice de cada
+    namespace (centroides, codebooks, códigos uint8 e listas invertidas, todos
+    carregados via mmap). Namespaces com menos de min_vectors vetores usam a
+    busca exata; train_pending() (chamado pelo ingester ao fim da ingestão)
+    treina o índice ao atingir esse tamanho e re-treina quando o namespace
+    cresce 4x desde o último treino (vetores inseridos entre treinos são
+    codificados com os quantizadores atuais). O treino roda fora do lock das
+    queries e nunca dentro do flush() dos checkpoints.
+    """
+    
+    def __init__(
+        self,
+        path: str,
+        dimension: Optional[int] = None,
+        nlist: Optional[int] = None,
+        m: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        rerank: Optional[int] = None,
+        min_vectors: Optional[int] = None,
+        train_sample: Optional[int] = None,
+        seed: int = 0
+    ):
+        """
+        Abre (ou cria) o store.
+        
+        Args:
+            path: Diretório do store.
+            dimension: Dimensão dos vetores (obrigatória na criação).
+            nlist: Listas do IVF. Se None, usa IVFPQ_NLIST (0 = 4 * sqrt(n)).
+            m: Subquantizadores do PQ (bytes por vetor; ajustado para dividir
+                a dimensão). Se None, usa IVFPQ_M.
+            nprobe: Listas visitadas por query. Se None, usa IVFPQ_NPROBE.
+            rerank: Re-pontua top_k * rerank candidatos com os vetores exatos
+                (0 = scores do PQ). Se None, usa IVFPQ_RERANK.
+            min_vectors: Tamanho mínimo do namespace para usar o índice. Se
+                None, usa IVFPQ_MIN_VECTORS.
+            train_sample: Vetores amostrados no treino. Se None, usa
+                IVFPQ_TRAIN_SAMPLE.
+            seed: Semente do treino.
+        """
+        settings = Settings()
+        self.nlist = settings.IVFPQ_NLIST if nlist is None else nlist
+        self.m = m or settings.IVFPQ_M
+        self.nprobe = nprobe or settings.IVFPQ_NPROBE
+        self.rerank = settings.IVFPQ_RERANK if rerank is None else rerank
+        self.min_vectors = settings.IVFPQ_MIN_VECTORS if min_vectors is None else min_vectors
+        self.train_sample = train_sample or settings.IVFPQ_TRAIN_SAMPLE
+        self.seed = seed
+        # Serializa treinos (o treino em si roda fora do lock das queries)
+        self._train_lock = threading.Lock()
+        super().__init__(path, dimension=dimension)
+    
+    def _new_namespace(self, dimension: int) -> _LocalNamespace:
+        return _IVFPQNamespace(dimension, self)
+    
+    def _train_namespace(self, ns: _IVFPQNamespace):
+        """
+        Treina o índice de um namespace sem bloquear as queries: só a cópia
+        da amostra e a instalação do índice acontecem sob o lock.
+        """
+        with self._train_lock:
+            with self._lock:
+                sample, matrix, count = ns.prepare_training()
+            try:
+                trained = ns.fit_training(sample, matrix, count)
+            except BaseException:
+                with self._lock:
+                    ns.abort_training()
+                raise
+            with self._lock:
+                ns.install_training(*trained)
+    
+    def train_pending(self, namespace: Optional[str] = None) -> List[str]:
+        """
+        Treina os índices que atingiram min_vectors ou cresceram 4x desde o
+        último treino e grava o store. O flush() dos checkpoints não treina;
+        o ingester chama este método ao fim da ingestão.
+        
+        Args:
+            namespace: Namespace a verificar. Se None, verifica todos.
+        
+        Returns:
+            Namespaces treinados.
+        """
+        with self._lock:
+            if namespace is None:
+                candidates = list(self._namespaces.items())
+            else:
+                ns = self._namespace(namespace)
+                candidates = [(self._ns_dir_name(namespace), ns)] if ns is not None else []
+            pending = [(name, ns) for name, ns in candidates if ns.needs_training()]
+        
+        for _, ns in pending:
+            self._train_namespace(ns)
+        if pending:
+            self.flush()
+        return [name for name, _ in pending]
+    
+    def build_index(self, namespace: Optional[str] = None) -> Dict[str, Any]:
+        """
+        (Re)treina o índice de um namespace agora, independente do tamanho.
+        
+        Args:
+            namespace: Namespace.
+            
+        Returns:
+            Estatísticas do índice (ver index_stats).
+        """
+        with self._lock:
+            ns = self._namespace(namespace)
+            if ns is None or ns.count == 0:
+                raise ValueError(f"Namespace vazio: {namespace or '(padrão)'}")
+        self._train_namespace(ns)
+        self.flush()
+        return self.index_stats(namespace)
+    
+    def index_stats(self, namespace: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Tamanho e parâmetros do índice de um namespace.
+        
+        Returns:
+            Dicionário com trained, vectors, nlist, m, nprobe, rerank,
+            code_bytes, quantizer_bytes e vector_bytes (float32).
+        """
+        with self._lock:
+            ns = self._namespace(namespace)
+            count = ns.count if ns is not None else 0
+            quantizer = ns.quantizer if ns is not None else None
+            return {
+                "trained": quantizer is not None,
+                "vectors": count,
+                "nlist": quantizer.nlist if quantizer else 0,
+                "m": quantizer.m if quantizer else 0,
+                "nprobe": self.nprobe,
+                "rerank": self.rerank,
+                "code_bytes": count * (quantizer.m + 4) if quantizer else 0,
+                "quantizer_bytes": quantizer.nbytes() if quantizer else 0,
+                "vector_bytes": count * (self.dimension or 0) * 4,
+            }
+
+
+# ============================================================================
+# FÁBRICA
+# ============================================================================
+
+# Stores locais abertos, por caminho (ingester e queries compartilham a instância)
+def store_identity(backend: str, index_name: str, store: Optional[VectorStore] = None) -> str:
+    """
+    Identifica o backend e o local do índice.
+    
+    Checkpoints, ledger, épocas de ingestão e o cache de queries são
+    chaveados por ela, então stores diferentes com o mesmo index_name não
+    compartilham estado.
+    
+    Args:
+        backend: 'pinecone', 'local' ou 'ivfpq'.
+        index_name: Nome do índice Pinecone.
+        store: Vector store já criado (define backend e caminho, se local).
+        
+    Returns:
+        '<backend>:<caminho do store local>' ou '<backend>:<host ou nome do índice>'.
+    """
+    if isinstance(store, LocalVectorStore):
+        backend = "ivfpq" if isinstance(store, IVFPQVectorStore) else "local"
+    backend = backend.lower()
+    if backend in ("local", "ivfpq"):
+        location = str(Path(getattr(store, "path", None) or Settings().LOCAL_VECTOR_STORE_PATH).resolve())
+    else:
+        location = Settings().PINECONE_HOST or index_name
+    return f"{backend}:{location}"
+
+
+_local_stores: Dict[str, LocalVectorStore] = {}
+_local_stores_lock = threading.Lock()
+
+
+def create_vector_store(
+    backend: Optional[str] = None,
+    index_name: Optional[str] = None,
+    api_key: Optional[str] = None,
+    path: Optional[str] = None,
+    dimension: Optional[int] = None,
+    pool_threads: Optional[int] = None
+) -> VectorStore:
+    """
+    Cria o vector store do backend configurado.
+    
+    Args:
+        backend: 'pinecone', 'local' ou 'ivfpq'. Se None, usa VECTOR_STORE_BACKEND.
+        index_name: Nome do índice Pinecone. Se None, usa das configurações.
+        api_key: API key do Pinecone. Se None, usa das configurações.
+        path: Diretório do store local. Se None, usa LOCAL_VECTOR_STORE_PATH.
+        dimension: Dimensão dos vetores (store local novo).
+        pool_threads: Threads do pool de conexões do Pinecone.
+        
+    Returns:
+        Instância de VectorStore.
+    """
+    settings = Settings()
+    backend = (backend or settings.VECTOR_STORE_BACKEND).lower()
+    
+    if backend in ("local", "ivfpq"):
+        store_path = os.path.abspath(path or settings.LOCAL_VECTOR_STORE_PATH)
+        store_class = IVFPQVectorStore if backend == "ivfpq" else LocalVectorStore
+        with _local_stores_lock:
+            store = _local_stores.get(store_path)
+            if store is not None and type(store) is not store_class:
+                raise ValueError(f"Store local em {store_path} já aberto com outro backend")
+            if store is None:
+                store = _local_stores[store_path] = store_class(store_path, dimension=dimension)
+            return store
+    
+    if backend == "pinecone":
+        api_key = api_key or settings.PINECONE_API_KEY
+        if not api_key:
+            raise ValueError(
+                "PINECONE_API_KEY não configurada. "
+                "Configure no arquivo .env ou passe como parâmetro."
+            )
+        try:
+            from pinecone import Pinecone
+        except ImportError:
+            raise ImportError(
+                "pinecone não instalado. "
+                "Instale com: pip install pinecone"
+            )
+        
+        client = Pinecone(api_key=api_key)
+        index_name = index_name or settings.PINECONE_INDEX_NAME
+        index_kwargs = {"pool_threads": pool_threads} if pool_threads else {}
+        if settings.PINECONE_HOST:
+            # Host explícito (ex: stand-in local em http://localhost:5080)
+            index = client.Index(host=settings.PINECONE_HOST, **index_kwargs)
+        else:
+            index = client.Index(index_name, **index_kwargs)
+        
+        async_index_factory = None
+        if hasattr(client, "IndexAsyncio"):
+            def async_index_factory():
+                try:
+                    # Pool de conexões dimensionado para muitas queries concorrentes
+                    async_client = Pinecone(
+                        api_key=api_key,
+                        connection_pool_maxsize=settings.ASYNC_MAX_CONNECTIONS
+                    )
+                except TypeError:
+                    async_client = client
+                host = settings.PINECONE_HOST or client.describe_index(index_name).host
+                return async_client.IndexAsyncio(host=host)
+        
+        return PineconeVectorStore(index, async_index_factory=async_index_factory)
+    
+    raise ValueError(
+        f"Backend de vector store não suportado: {backend}. "
+        "Use 'pinecone', 'local' ou 'ivfpq'."
+    )
@@ -0,0 +1,71 @@
+"""
+Fixtures dos testes: stand-in de embeddings em processo e configurações
+apontadas para um diretório temporário (sem credenciais nem rede externa).
+"""
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from config.settings import Settings
+from scripts.standin_servers import FaultInjector, start_embedding_standin
+
+
+STANDIN_DIMENSION = 64
+
+
+@pytest.fixture(scope="session")
+def embedding_server():
+    server = start_embedding_standin(port=0, dimension=STANDIN_DIMENSION, faults=FaultInjector(seed=0))
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def standin_settings(tmp_path: Path, monkeypatch, embedding_server) -> Path:
+    """Aponta Settings para o stand-in e para tmp_path; retorna tmp_path."""
+    overrides = {
+        "GEMINI_API_KEY": "",
+        "OLLAMA_BASE_URL": "http://%s:%d" % embedding_server.server_address[:2],
+        "EMBEDDING_MODEL": "standin",
+        "VECTOR_STORE_BACKEND": "local",
+        "PINECONE_INDEX_NAME": "tests",
+        "PINECONE_NAMESPACE": "tests",
+        "MEDICAL_DATA_PATH": str(tmp_path / "data" / "ori_pqal.json"),
+        "CHUNK_TEXT_STORE_PATH": None,
+        "INGESTION_EPOCH_PATH": str(tmp_path / "ingestion_epochs.json"),
+        "LOCAL_VECTOR_STORE_PATH": str(tmp_path / "vector_store"),
+        "LEXICAL_INDEX_PATH": str(tmp_path / "lexical_index"),
+        "QUERY_CACHE_ENABLED": False,
+    }
+    for name, value in overrides.items():
+        monkeypatch.setattr(Settings, name, value)
+    (tmp_path / "data").mkdir()
+    return tmp_path
+
+
+@pytest.fixture
+def embeddings(standin_settings):
+    from scripts.embeddings_manager import EmbeddingsManager
+    return EmbeddingsManager(provider="ollama")
+
+
+def make_chunks(
+    count: int,
+    text: str = "Aspirin reduces the risk of myocardial infarction in patient {i}.",
+    year: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Chunks sintéticos no formato do data_loader (um por artigo)."""
+    chunks = []
+    for i in range(count):
+        article_id = str(10000 + i)
+        metadata = {"article_id": article_id, "source": "pubmedqa", "chunk_index": 0,
+                    "year": year or str(2000 + i % 20)}
+        chunks.append({
+            "text": text.format(i=i),
+            "article_id": article_id,
+            "chunk_index": 0,
+            "metadata": metadata,
+        })
+    return chunks
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from scripts.article_vectors import article_ids_from_matches, article_namespace_for, mean_pool, narrow_filter
+from scripts.pinecone_ingester import PineconeIngester
+from scripts.rag_query import RAGQueryEngine
+
+
+_TOPICS = {
+    "30000": "Aspirin reduces the risk of myocardial infarction",
+    "30001": "Statins lower LDL cholesterol in adults",
+    "30002": "Metformin improves glycemic control in type 2 diabetes",
+    "30003": "Vitamin D supplementation and bone density",
+}
+
+
+def _chunks():
+    return [
+        {"text": f"{topic}, part {i}.", "article_id": article_id, "chunk_index": i,
+         "metadata": {"article_id": article_id, "source": "pubmedqa", "chunk_index": i, "year": "2011"}}
+        for article_id, topic in _TOPICS.items()
+        for i in range(3)
+    ]
+
+
+def test_helpers():
+    pooled = mean_pool([[1.0, 0.0], [0.0, 1.0]])
+    assert np.linalg.norm(pooled) == pytest.approx(1.0, abs=1e-6)
+    assert pooled[0] == pooled[1]
+    
+    assert narrow_filter({"year": "2011", "article_id": "9"}, ["1", "2"]) == {
+        "year": "2011", "article_id": {"$in": ["1", "2"]}
+    }
+    assert narrow_filter(None, ["1"]) == {"article_id": {"$in": ["1"]}}
+    assert article_ids_from_matches([{"id": "article_7", "metadata": {}}, {"id": "x", "metadata": {"article_id": 8}}]) == ["7", "8"]
+    assert article_namespace_for(None) == "default__articles"
+
+
+def test_coarse_to_fine_restricts_chunk_search_to_top_articles(standin_settings, embeddings):
+    ingester = PineconeIngester(embeddings_manager=embeddings, backend="local")
+    stats = ingester.ingest_chunks(_chunks(), show_progress=False, quiet=True, article_vectors="mean")
+    assert stats["article_vectors"]["articles"] == 4
+    namespaces = ingester.index.describe_index_stats()["namespaces"]
+    assert namespaces[article_namespace_for(ingester.namespace)]["vector_count"] == 4
+    
+    query = "Metformin improves glycemic control in type 2 diabetes"
+    direct = RAGQueryEngine(embeddings_manager=embeddings, backend="local").query(query, top_k=12)
+    coarse = RAGQueryEngine(embeddings_manager=embeddings, backend="local", coarse_articles=1).query(query, top_k=12)
+    
+    assert len(direct) == 12
+    assert {result["article_id"] for result in coarse} == {"30002"}
+    assert len(coarse) == 3
+    assert coarse[0]["text"] == direct[0]["text"]
@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+from scripts.pinecone_ingester import PineconeIngester
+from scripts.rag_query import RAGQueryEngine
+from scripts.vector_store import LocalVectorStore
+
+from .conftest import make_chunks
+
+
+class _SlowAsyncStore(LocalVectorStore):
+    """Store local cujas buscas assíncronas demoram (sem ocupar threads)."""
+    
+    async def aquery(self, *args, **kwargs):
+        await asyncio.sleep(5)
+        return await super().aquery(*args, **kwargs)
+
+
+def test_aquery_matches_sync_query(standin_settings, embeddings):
+    PineconeIngester(embeddings_manager=embeddings, backend="local").ingest_chunks(
+        make_chunks(10), show_progress=False, quiet=True
+    )
+    engine = RAGQueryEngine(embeddings_manager=embeddings, backend="local")
+    queries = [f"Aspirin reduces the risk of myocardial infarction in patient {i}." for i in range(5)]
+    
+    async def run():
+        try:
+            return await asyncio.gather(*(engine.aquery(query, top_k=3) for query in queries))
+        finally:
+            await engine.aclose()
+    
+    results = asyncio.run(run())
+    for query, async_results in zip(queries, results):
+        assert not async_results.degraded
+        assert async_results == engine.query(query, top_k=3)
+
+
+def test_aquery_degrades_on_deadline(standin_settings, embeddings):
+    engine = RAGQueryEngine(
+        embeddings_manager=embeddings,
+        vector_store=_SlowAsyncStore(str(standin_settings / "slow"), dimension=64),
+        backend="local"
+    )
+    
+    async def run():
+        try:
+            return await engine.aquery("aspirin", top_k=3, deadline=0.2)
+        finally:
+            await engine.aclose()
+    
+    started = time.perf_counter()
+    results = asyncio.run(run())
+    assert time.perf_counter() - started < 2
+    assert results.degraded and results.fallback == "empty" and results == []
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from scripts.bulk_export import ParquetShardWriter, load_manifest
+from scripts.pinecone_ingester import PineconeIngester
+
+from .conftest import STANDIN_DIMENSION, make_chunks
+
+
+def _vectors(start, count, dimension=4):
+    return [
+        {"id": f"v{i}", "values": [float(i)] * dimension, "metadata": {"n": i, "text": "ação"}}
+        for i in range(start, start + count)
+    ]
+
+
+def _read(output_dir, shards):
+    rows = []
+    for shard in shards:
+        rows.extend(pq.read_table(output_dir / shard["path"]).to_pylist())
+    return rows
+
+
+def test_shards_are_bounded_and_listed_in_manifest(tmp_path):
+    writer = ParquetShardWriter(str(tmp_path), namespace="ns", shard_size=4, dimension=4)
+    writer.write(_vectors(0, 3))
+    writer.write(_vectors(3, 6))
+    entry = writer.close(extra={"index_name": "idx"})
+    
+    assert [shard["num_vectors"] for shard in entry["shards"]] == [4, 4, 1]
+    assert entry["total_vectors"] == 9 and entry["index_name"] == "idx"
+    assert not list((tmp_path / "ns").glob("*.tmp"))
+    
+    rows = _read(tmp_path, entry["shards"])
+    assert [row["id"] for row in rows] == [f"v{i}" for i in range(9)]
+    assert rows[5]["values"] == [5.0] * 4
+    assert json.loads(rows[5]["metadata"]) == {"n": 5, "text": "ação"}
+    
+    # Segundo namespace entra no mesmo manifest
+    other = ParquetShardWriter(str(tmp_path), shard_size=10, dimension=4)
+    other.write(_vectors(0, 2))
+    other.close()
+    assert set(load_manifest(str(tmp_path))["namespaces"]) == {"ns", "__default__"}
+
+
+def test_dimension_mismatch_and_abort(tmp_path):
+    writer = ParquetShardWriter(str(tmp_path), shard_size=10, dimension=4)
+    writer.write(_vectors(0, 2))
+    with pytest.raises(ValueError):
+        writer.write(_vectors(2, 1, dimension=3))
+    writer.abort()
+    assert not list((tmp_path / "__default__").iterdir())
+
+
+def test_export_for_bulk_import_writes_embedded_chunks(standin_settings, embeddings, tmp_path):
+    ingester = PineconeIngester(embeddings_manager=embeddings, backend="local")
+    stats = ingester.export_for_bulk_import(make_chunks(5), output_dir=str(tmp_path / "bulk"), shard_size=2, show_progress=False)
+    
+    assert stats["total_vectors"] == 5 and stats["shards"] == 3 and not stats["errors"]
+    entry = load_manifest(str(tmp_path / "bulk"))["namespaces"][ingester.namespace]
+    rows = _read(tmp_path / "bulk", entry["shards"])
+    assert sorted(row["id"] for row in rows) == [f"article_{10000 + i}_chunk_0" for i in range(5)]
+    assert all(len(row["values"]) == STANDIN_DIMENSION for row in rows)
+    # Nada foi enviado ao índice
+    assert ingester.index.describe_index_stats()["total_vector_count"] == 0
@@ -0,0 +1,54 @@
+from scripts.context_packer import count_tokens, pack_context, strip_overlap
+from scripts.rag_query import format_context_for_llm
+
+
+def _result(article_id, chunk_index, text, score):
+    return {"article_id": article_id, "chunk_index": chunk_index, "text": text, "score": score,
+            "metadata": {"source": "pubmedqa"}}
+
+
+def test_strip_overlap_removes_repeated_prefix_only():
+    previous = "Aspirin reduces the risk of myocardial infarction"
+    assert strip_overlap(previous, "of myocardial infarction in older adults.", 100) == "in older adults."
+    assert strip_overlap(previous, "Statins lower LDL.", 100) == "Statins lower LDL."
+    # Coincidências menores que o mínimo não contam
+    assert strip_overlap("ends with is", "is a verb", 100) == "is a verb"
+
+
+def test_pack_merges_adjacent_chunks_and_removes_duplicates():
+    results = [
+        _result("1", 0, "Aspirin reduces the risk of myocardial infarction", 0.9),
+        _result("1", 1, "of myocardial infarction in older adults.", 0.7),
+        _result("1", 1, "of myocardial infarction in older adults.", 0.6),
+        _result("2", 0, "  Aspirin reduces the RISK of myocardial infarction ", 0.5),
+        _result("3", 4, "Statins lower LDL cholesterol.", 0.8),
+    ]
+    packed = pack_context(results, max_tokens=0)
+    
+    assert packed["input_chunks"] == 5
+    assert packed["duplicates_removed"] == 2
+    assert [(s["article_id"], s["chunk_indexes"]) for s in packed["sources"]] == [("1", [0, 1]), ("3", [4])]
+    assert "Aspirin reduces the risk of myocardial infarction in older adults." in packed["context"]
+    assert packed["context"].count("of myocardial infarction") == 1
+    assert packed["context"].startswith("[Contexto 1] (Fonte: pubmedqa, Artigo: 1, Chunks: 0-1, Score: 0.900)")
+
+
+def test_pack_fills_budget_by_score():
+    results = [
+        _result("1", 0, "short high score text", 0.9),
+        _result("2", 0, "a much longer middle score text " * 20, 0.8),
+        _result("3", 0, "short low score text", 0.1),
+    ]
+    first = pack_context(results[:1], max_tokens=0)["tokens"]
+    third = pack_context(results[2:], max_tokens=0)["tokens"]
+    
+    packed = pack_context(results, max_tokens=first + third)
+    assert [s["article_id"] for s in packed["sources"]] == ["1", "3"]
+    assert packed["dropped"] == 1
+    assert packed["tokens"] == sum(s["tokens"] for s in packed["sources"]) <= first + third
+
+
+def test_format_context_for_llm_handles_empty_results():
+    assert format_context_for_llm([]) == "Nenhum contexto relevante encontrado."
+    assert format_context_for_llm([_result("1", 0, "   ", 0.9)]) == "Nenhum contexto relevante encontrado."
+    assert "Artigo: 1" in format_context_for_llm([_result("1", 0, "Aspirin.", 0.9)], max_tokens=1000)
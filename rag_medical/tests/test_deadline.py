@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+from config.settings import Settings
+from scripts import deadline
+from scripts.deadline import DeadlineExceeded, bounded_timeout, call_with_deadline, deadline_after
+from scripts.rag_query import RAGQueryEngine
+from scripts.vector_store import LocalVectorStore
+
+
+@pytest.fixture
+def release():
+    """Evento que libera as chamadas travadas ao final do teste."""
+    event = threading.Event()
+    yield event
+    event.set()
+    for _ in range(100):
+        if deadline.abandoned_calls() == 0:
+            break
+        time.sleep(0.01)
+
+
+def test_deadline_after_and_bounded_timeout():
+    assert deadline_after(None) is None
+    assert deadline_after(0) is None
+    assert bounded_timeout(5.0, None, "x") == (5.0, False)
+    
+    timeout, limited = bounded_timeout(5.0, deadline_after(0.5), "x")
+    assert limited and 0 < timeout <= 0.5
+    assert bounded_timeout(0.1, deadline_after(10), "x") == (0.1, False)
+    
+    with pytest.raises(DeadlineExceeded):
+        bounded_timeout(1.0, time.monotonic() - 1, "x")
+
+
+def test_call_with_deadline_returns_and_propagates_errors():
+    assert call_with_deadline(lambda a, b=0: a + b, 1, b=2, deadline_at=deadline_after(1), stage="x") == 3
+    
+    def boom():
+        raise ValueError("boom")
+    
+    with pytest.raises(ValueError):
+        call_with_deadline(boom, deadline_at=deadline_after(1), stage="x")
+
+
+def test_abandoned_calls_are_capped_and_released(monkeypatch, release):
+    monkeypatch.setattr(Settings, "QUERY_MAX_ABANDONED_CALLS", 3)
+    
+    for _ in range(3):
+        with pytest.raises(DeadlineExceeded):
+            call_with_deadline(release.wait, deadline_at=deadline_after(0.02), stage="x")
+    assert deadline.abandoned_calls() == 3
+    
+    # Limite atingido: falha na hora, sem iniciar a chamada
+    started = time.perf_counter()
+    with pytest.raises(DeadlineExceeded, match="abandonadas"):
+        call_with_deadline(lambda: 1, deadline_at=deadline_after(5), stage="x")
+    assert time.perf_counter() - started < 0.5
+    
+    release.set()
+    for _ in range(100):
+        if deadline.abandoned_calls() == 0:
+            break
+        time.sleep(0.01)
+    assert deadline.abandoned_calls() == 0
+    assert call_with_deadline(lambda: 1, deadline_at=deadline_after(1), stage="x") == 1
+
+
+class _HangingStore(LocalVectorStore):
+    """Store local cujas buscas travam até o evento ser liberado."""
+    
+    def __init__(self, path, event):
+        super().__init__(path, dimension=4)
+        self.event = event
+    
+    def query(self, *args, **kwargs):
+        self.event.wait()
+        return super().query(*args, **kwargs)
+
+
+def test_dense_search_abandons_fanout_without_holding_pool(tmp_path, monkeypatch, release):
+    monkeypatch.setattr(Settings, "QUERY_POOL_THREADS", 2)
+    engine = RAGQueryEngine(vector_store=_HangingStore(str(tmp_path), release), backend="local")
+    monkeypatch.setattr(engine, "_route", lambda namespace, pinecone_filter: ["a", "b"])
+    
+    for _ in range(3):
+        with pytest.raises(DeadlineExceeded):
+            engine._dense_search([1.0, 0.0, 0.0, 0.0], 5, None, None, deadline_at=deadline_after(0.05))
+    assert deadline.abandoned_calls() == 6
+    
+    # As buscas abandonadas não ocupam os workers do fanout
+    future = engine.fanout_executor.submit(lambda: "free")
+    assert future.result(timeout=1) == "free"
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from scripts.embedding_snapshot import (
+    RECORDS_FILE,
+    VECTORS_FILE,
+    EmbeddingSnapshot,
+    EmbeddingSnapshotWriter,
+    export_snapshot_from_index,
+    load_snapshot_into_store,
+)
+from scripts.pinecone_ingester import PineconeIngester
+from scripts.vector_store import LocalVectorStore
+
+from .conftest import make_chunks
+
+
+def _rows(n, dimension=4, offset=0):
+    ids = [f"v{offset + i}" for i in range(n)]
+    embeddings = np.eye(dimension, dtype=np.float32)[[i % dimension for i in range(n)]]
+    return ids, embeddings.tolist(), [{"n": offset + i} for i in range(n)]
+
+
+def test_writer_repairs_torn_append_and_keeps_last_duplicate(tmp_path):
+    writer = EmbeddingSnapshotWriter(str(tmp_path), dimension=4)
+    writer.append(*_rows(3))
+    writer.close(complete=False)
+    
+    # Execução interrompida: vetor gravado sem o registro correspondente
+    with open(tmp_path / VECTORS_FILE, "ab") as f:
+        f.write(np.ones(4, dtype=np.float32).tobytes())
+    with open(tmp_path / RECORDS_FILE, "ab") as f:
+        f.write(b'{"id": "torn"')
+    
+    writer = EmbeddingSnapshotWriter(str(tmp_path), dimension=4)
+    assert writer.count == 3
+    writer.append(["v1"], [[0.0, 0.0, 0.0, 9.0]], [{"n": "updated"}])
+    writer.close()
+    
+    snapshot = EmbeddingSnapshot(str(tmp_path))
+    assert snapshot.info["complete"] and len(snapshot) == 4
+    vectors = {vector["id"]: vector for vector in snapshot.iter_vectors()}
+    assert set(vectors) == {"v0", "v1", "v2"}
+    assert vectors["v1"]["values"] == [0.0, 0.0, 0.0, 9.0]
+    assert vectors["v1"]["metadata"] == {"n": "updated"}
+    
+    with pytest.raises(ValueError):
+        EmbeddingSnapshotWriter(str(tmp_path), dimension=8)
+
+
+def test_export_and_load_round_trip_without_embedding(tmp_path, standin_settings, embeddings, monkeypatch):
+    ingester = PineconeIngester(embeddings_manager=embeddings, backend="local")
+    ingester.ingest_chunks(make_chunks(7), show_progress=False, quiet=True)
+    source = ingester.index
+    
+    stats = export_snapshot_from_index(source, str(tmp_path / "snapshot"), namespace=ingester.namespace, fetch_batch_size=3)
+    assert stats["count"] == 7
+    
+    # Carregar o snapshot não gera embeddings
+    monkeypatch.setattr(embeddings, "embed_documents", None)
+    target = LocalVectorStore(str(tmp_path / "target"))
+    loaded = load_snapshot_into_store(str(tmp_path / "snapshot"), target, namespace="copy", max_vectors=2, show_progress=False)
+    assert loaded["total_vectors"] == 7 and not loaded["errors"]
+    
+    query = embeddings.embed_text("Aspirin reduces the risk of myocardial infarction in patient 3.")
+    original = source.query(query, top_k=3, namespace=ingester.namespace)["matches"]
+    copied = target.query(query, top_k=3, namespace="copy")["matches"]
+    assert [m["id"] for m in copied] == [m["id"] for m in original]
+    assert [m["metadata"] for m in copied] == [m["metadata"] for m in original]
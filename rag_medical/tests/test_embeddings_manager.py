@@ -0,0 +1,36 @@
+import numpy as np
+
+from scripts.embeddings_manager import EmbeddingsManager, embedding_signature, truncate_and_normalize
+
+from .conftest import STANDIN_DIMENSION
+
+
+def test_truncate_and_normalize():
+    reduced = truncate_and_normalize([3.0, 4.0, 12.0], 2)
+    assert np.allclose(reduced, [0.6, 0.8])
+
+
+def test_dimension_follows_output_dimension_changes(embeddings):
+    assert embeddings.get_embedding_dimension() == STANDIN_DIMENSION
+    
+    embeddings.output_dimension = 16
+    assert embeddings.get_embedding_dimension() == 16
+    assert len(embeddings.embed_text("aspirin")) == 16
+    assert embedding_signature(embeddings).endswith(":16")
+    
+    embeddings.output_dimension = None
+    assert embeddings.get_embedding_dimension() == STANDIN_DIMENSION
+
+
+def test_dimension_cache_is_keyed_by_model(embeddings):
+    embeddings.get_embedding_dimension()
+    embeddings.model_name = "other-model"
+    embeddings.get_embedding_dimension()
+    assert {key[1] for key in embeddings._dimension_cache} == {"standin", "other-model"}
+
+
+def test_probe_before_setting_output_dimension(standin_settings):
+    manager = EmbeddingsManager(provider="ollama")
+    assert manager.get_embedding_dimension() == STANDIN_DIMENSION
+    manager.output_dimension = 8
+    assert manager.get_embedding_dimension() == 8
@@ -0,0 +1,71 @@
+import builtins
+
+from config.settings import Settings
+from scripts.pinecone_ingester import PineconeIngester
+from scripts.rag_query import RAGQueryEngine
+from scripts.vector_store import vector_id_for
+
+from .conftest import make_chunks
+
+
+def _ingester(embeddings, **kwargs):
+    return PineconeIngester(embeddings_manager=embeddings, backend="local", **kwargs)
+
+
+def _count(ingester, namespace=None):
+    stats = ingester.index.describe_index_stats()["namespaces"]
+    return stats.get(namespace or ingester.namespace, {}).get("vector_count", 0)
+
+
+def test_incremental_ingest_skips_unchanged(standin_settings, embeddings):
+    chunks = make_chunks(6)
+    ingester = _ingester(embeddings)
+    first = ingester.ingest_chunks(chunks, show_progress=False, quiet=True, incremental=True)
+    second = ingester.ingest_chunks(chunks, show_progress=False, quiet=True, incremental=True)
+    assert first["total_vectors"] == 6
+    assert second["skipped_unchanged"] == 6
+    assert second["upsert_requests"] == 0
+    assert _count(ingester) == 6
+
+
+def test_delete_all_resets_incremental_state(standin_settings, embeddings, monkeypatch):
+    monkeypatch.setattr(Settings, "CHUNK_TEXT_STORE_PATH", str(standin_settings / "chunk_texts.sqlite"))
+    monkeypatch.setattr(builtins, "input", lambda prompt="": "SIM")
+    chunks = make_chunks(4)
+    
+    ingester = _ingester(embeddings)
+    ingester.ingest_chunks(chunks, show_progress=False, quiet=True, incremental=True)
+    vector_ids = [vector_id_for(chunk["article_id"], chunk["chunk_index"]) for chunk in chunks]
+    assert len(ingester.chunk_text_store.get_many(vector_ids)) == 4
+    
+    ingester.delete_all()
+    assert _count(ingester) == 0
+    assert ingester._get_ledger().count(ingester.namespace) == 0
+    assert not ingester._get_checkpoint().exists()
+    assert ingester.chunk_text_store.get_many(vector_ids) == {}
+    
+    # A ingestão incremental seguinte regrava tudo
+    stats = ingester.ingest_chunks(chunks, show_progress=False, quiet=True, incremental=True)
+    assert stats["skipped_unchanged"] == 0
+    assert _count(ingester) == 4
+    
+    engine = RAGQueryEngine(embeddings_manager=embeddings, backend="local")
+    assert "Aspirin" in engine.query("aspirin myocardial infarction", top_k=1)[0]["text"]
+
+
+def test_toggling_text_store_forces_reupsert(standin_settings, embeddings, monkeypatch):
+    chunks = make_chunks(3)
+    _ingester(embeddings).ingest_chunks(chunks, show_progress=False, quiet=True, incremental=True)
+    
+    # Liga o store externo: o índice passa a ter metadados enxutos
+    monkeypatch.setattr(Settings, "CHUNK_TEXT_STORE_PATH", str(standin_settings / "chunk_texts.sqlite"))
+    stats = _ingester(embeddings).ingest_chunks(chunks, show_progress=False, quiet=True, incremental=True)
+    assert stats["skipped_unchanged"] == 0
+    
+    # Desliga de novo: os textos precisam voltar aos metadados do índice
+    monkeypatch.setattr(Settings, "CHUNK_TEXT_STORE_PATH", None)
+    stats = _ingester(embeddings).ingest_chunks(chunks, show_progress=False, quiet=True, incremental=True)
+    assert stats["skipped_unchanged"] == 0
+    
+    engine = RAGQueryEngine(embeddings_manager=embeddings, backend="local")
+    assert "Aspirin" in engine.query("aspirin myocardial infarction", top_k=1)[0]["text"]
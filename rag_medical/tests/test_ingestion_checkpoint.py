@@ -0,0 +1,89 @@
+from scripts.ingestion_checkpoint import IngestionCheckpoint, _from_ranges, _to_ranges
+
+
+def _checkpoint(tmp_path, **overrides):
+    header = {"index_name": "idx", "namespace": "ns", "embedding_dimension": 64, "store": "local:/a"}
+    header.update(overrides)
+    return IngestionCheckpoint(tmp_path / "checkpoint", **header)
+
+
+def test_ranges_round_trip():
+    assert _to_ranges([]) == []
+    assert _to_ranges([5, 0, 1, 2, 7, 8, 2]) == [[0, 2], [5, 5], [7, 8]]
+    assert _from_ranges(_to_ranges([9, 3, 4, 10, 0])) == {0, 3, 4, 9, 10}
+
+
+def test_resume_from_log_and_snapshot(tmp_path):
+    checkpoint = _checkpoint(tmp_path)
+    checkpoint.start()
+    checkpoint.mark_done(["article_1_chunk_0", "article_1_chunk_1", "custom-id"])
+    checkpoint.flush()
+    checkpoint.mark_done(["article_2_chunk_3"])
+    checkpoint.flush()
+    
+    # Só o log (com cabeçalho) no disco
+    resumed = _checkpoint(tmp_path)
+    assert resumed.load()
+    assert len(resumed) == 4
+    assert resumed.is_done("article_1_chunk_1")
+    assert resumed.is_done("custom-id")
+    assert not resumed.is_done("article_1_chunk_2")
+    
+    # Compactação: snapshot atômico, log removido, mesmo estado
+    resumed.mark_done(["article_1_chunk_2"])
+    resumed.compact()
+    assert not resumed.log_path.exists()
+    again = _checkpoint(tmp_path)
+    assert again.load()
+    assert len(again) == 5
+    assert again.is_done("article_1_chunk_2")
+
+
+def test_pending_ids_are_not_persisted_until_flush(tmp_path):
+    checkpoint = _checkpoint(tmp_path)
+    checkpoint.start()
+    checkpoint.mark_done(["article_1_chunk_0"])
+    assert not _checkpoint(tmp_path).load()
+    checkpoint.flush()
+    assert _checkpoint(tmp_path).load()
+
+
+def test_truncated_last_log_line_is_ignored(tmp_path):
+    checkpoint = _checkpoint(tmp_path)
+    checkpoint.start()
+    checkpoint.mark_done(["article_1_chunk_0"])
+    checkpoint.flush()
+    with open(checkpoint.log_path, "a", encoding="utf-8") as f:
+        f.write('{"articles":{"1":[[1,')
+    
+    resumed = _checkpoint(tmp_path)
+    assert resumed.load()
+    assert resumed.is_done("article_1_chunk_0")
+    assert not resumed.is_done("article_1_chunk_1")
+
+
+def test_incompatible_checkpoint_is_discarded(tmp_path):
+    checkpoint = _checkpoint(tmp_path)
+    checkpoint.start()
+    checkpoint.mark_done(["article_1_chunk_0"])
+    checkpoint.compact()
+    
+    for overrides in ({"store": "local:/b"}, {"embedding_dimension": 32}, {"namespace": "other"}):
+        other = _checkpoint(tmp_path, **overrides)
+        assert not other.load()
+    assert not checkpoint.exists()
+
+
+def test_compacts_after_threshold(tmp_path, monkeypatch):
+    monkeypatch.setattr(IngestionCheckpoint, "COMPACT_AFTER_LINES", 3)
+    checkpoint = _checkpoint(tmp_path)
+    checkpoint.start()
+    for i in range(3):
+        checkpoint.mark_done([f"article_1_chunk_{i}"])
+        checkpoint.flush()
+    assert checkpoint.snapshot_path.exists()
+    assert not checkpoint.log_path.exists()
+    
+    resumed = _checkpoint(tmp_path)
+    assert resumed.load()
+    assert len(resumed) == 3
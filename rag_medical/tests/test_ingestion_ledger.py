@@ -0,0 +1,53 @@
+from scripts.ingestion_ledger import IngestionLedger
+from scripts.pinecone_ingester import PineconeIngester
+
+from .conftest import make_chunks
+
+
+def test_content_hash_tracks_text_metadata_and_embedding():
+    base = IngestionLedger.content_hash("text", {"a": 1, "b": "x"}, "ollama:m:64")
+    assert base == IngestionLedger.content_hash("text", {"b": "x", "a": 1}, "ollama:m:64")
+    assert base != IngestionLedger.content_hash("text!", {"a": 1, "b": "x"}, "ollama:m:64")
+    assert base != IngestionLedger.content_hash("text", {"a": 2, "b": "x"}, "ollama:m:64")
+    assert base != IngestionLedger.content_hash("text", {"a": 1, "b": "x"}, "ollama:m:32")
+
+
+def test_ledger_is_scoped_by_namespace(tmp_path):
+    ledger = IngestionLedger(tmp_path / "ledger.sqlite")
+    ledger.record("ns", [("article_1_chunk_0", "h0", "1"), ("article_1_chunk_1", "h1", "1"), ("article_2_chunk_0", "h2", "2")])
+    ledger.record(None, [("article_1_chunk_0", "other", "1")])
+    
+    assert ledger.get_hashes("ns", ["article_1_chunk_0", "missing"]) == {"article_1_chunk_0": "h0"}
+    assert ledger.get_hashes("", ["article_1_chunk_0"]) == {"article_1_chunk_0": "other"}
+    assert ledger.ids_for_articles("ns", ["1"]) == {"article_1_chunk_0", "article_1_chunk_1"}
+    
+    ledger.remove("ns", ["article_1_chunk_1"])
+    assert ledger.all_ids("ns") == {"article_1_chunk_0", "article_2_chunk_0"}
+    assert ledger.clear("ns") == 2
+    assert ledger.count("ns") == 0
+    assert ledger.count(None) == 1
+    ledger.close()
+    
+    # Persistido no disco
+    reopened = IngestionLedger(tmp_path / "ledger.sqlite")
+    assert reopened.get_hashes(None, ["article_1_chunk_0"]) == {"article_1_chunk_0": "other"}
+    reopened.close()
+
+
+def test_incremental_ingest_reembeds_changes_and_deletes_stale(standin_settings, embeddings):
+    ingester = PineconeIngester(embeddings_manager=embeddings, backend="local")
+    chunks = make_chunks(4)
+    ingester.ingest_chunks(chunks, show_progress=False, quiet=True, incremental=True)
+    
+    # Artigo 10001 passa a ter texto novo; 10003 some do lote
+    changed = [dict(chunk) for chunk in chunks[:3]]
+    changed[1]["text"] = "Statins lower LDL cholesterol."
+    stats = ingester.ingest_chunks(changed, show_progress=False, quiet=True, incremental=True, stale_scope="all")
+    assert stats["skipped_unchanged"] == 2
+    assert stats["deleted_stale"] == 1
+    assert ingester._get_ledger().all_ids(ingester.namespace) == {
+        "article_10000_chunk_0", "article_10001_chunk_0", "article_10002_chunk_0"
+    }
+    
+    namespaces = ingester.index.describe_index_stats()["namespaces"]
+    assert namespaces[ingester.namespace]["vector_count"] == 3
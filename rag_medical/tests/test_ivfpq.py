@@ -0,0 +1,93 @@
+import numpy as np
+
+from scripts.ivfpq import IVFPQIndex, assign, kmeans
+from scripts.vector_store import IVFPQVectorStore, LocalVectorStore
+
+
+def _normalized(n, d, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, d)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _records(vectors, offset=0):
+    return [{"id": f"v{offset + i}", "values": row.tolist(), "metadata": {"n": offset + i}} for i, row in enumerate(vectors)]
+
+
+def _store(path, **kwargs):
+    params = {"dimension": 16, "nlist": 8, "m": 4, "nprobe": 8, "rerank": 10, "min_vectors": 100}
+    params.update(kwargs)
+    return IVFPQVectorStore(str(path), **params)
+
+
+def test_kmeans_recovers_separated_clusters():
+    rng = np.random.default_rng(1)
+    centers = np.array([[10.0, 0.0], [0.0, 10.0], [-10.0, -10.0]], dtype=np.float32)
+    data = np.concatenate([center + rng.normal(scale=0.1, size=(50, 2)) for center in centers]).astype(np.float32)
+    
+    centroids = kmeans(data, 3, seed=0)
+    labels, distances = assign(centers, centroids)
+    assert sorted(labels.tolist()) == [0, 1, 2]
+    assert distances.max() < 0.1
+
+
+def test_encode_and_adc_score_approximate_inner_product():
+    vectors = _normalized(400, 16)
+    index = IVFPQIndex.train(vectors, nlist=8, m=4)
+    lists, codes = index.encode(vectors)
+    assert lists.shape == (400,) and codes.shape == (400, 4) and codes.dtype == np.uint8
+    
+    query = vectors[7]
+    probe, coarse = index.probe(query, nprobe=8)
+    assert sorted(probe.tolist()) == list(range(8))
+    approx = index.score(query, coarse, lists, codes)
+    exact = vectors @ query
+    assert np.abs(approx - exact).mean() < 0.15
+    assert np.argmax(approx) == 7
+    
+    order, offsets = IVFPQIndex.inverted_lists(lists, index.nlist)
+    assert offsets[-1] == 400
+    for list_id in range(index.nlist):
+        assert np.all(lists[order[offsets[list_id]:offsets[list_id + 1]]] == list_id)
+
+
+def test_store_trains_only_when_asked_and_matches_exact_search(tmp_path):
+    vectors = _normalized(300, 16)
+    store = _store(tmp_path / "ivfpq")
+    exact = LocalVectorStore(str(tmp_path / "exact"), dimension=16)
+    store.upsert(_records(vectors))
+    exact.upsert(_records(vectors))
+    
+    # flush() dos checkpoints não treina
+    store.flush()
+    assert not store.index_stats()["trained"]
+    assert store.train_pending() == ["__default__"]
+    stats = store.index_stats()
+    assert stats["trained"] and stats["vectors"] == 300
+    assert stats["code_bytes"] < stats["vector_bytes"]
+    assert store.train_pending() == []
+    
+    for query in vectors[:20]:
+        approx_ids = [m["id"] for m in store.query(query.tolist(), top_k=5)["matches"]]
+        exact_ids = [m["id"] for m in exact.query(query.tolist(), top_k=5)["matches"]]
+        assert approx_ids[0] == exact_ids[0]
+        assert len(set(approx_ids) & set(exact_ids)) >= 4
+
+
+def test_vectors_added_after_training_are_encoded_and_persisted(tmp_path):
+    store = _store(tmp_path)
+    store.upsert(_records(_normalized(200, 16)))
+    store.train_pending()
+    
+    extra = _normalized(10, 16, seed=5)
+    store.upsert(_records(extra, offset=200))
+    store.flush()
+    store.delete(["v3"])
+    assert store.query(extra[4].tolist(), top_k=1)["matches"][0]["id"] == "v204"
+    store.flush()
+    
+    reopened = _store(tmp_path)
+    assert reopened.index_stats()["trained"]
+    assert reopened.describe_index_stats()["total_vector_count"] == 209
+    match = reopened.query(extra[4].tolist(), top_k=1, filter={"n": {"$gte": 200}})["matches"][0]
+    assert match["id"] == "v204" and match["metadata"] == {"n": 204}
+    assert "v3" not in {m["id"] for m in reopened.query(_normalized(200, 16)[3].tolist(), top_k=5)["matches"]}
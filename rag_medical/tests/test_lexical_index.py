@@ -0,0 +1,72 @@
+from scripts.lexical_index import BM25Index, build_lexical_index, get_lexical_index, reciprocal_rank_fusion, tokenize
+from scripts.query_cache import QueryResultCache
+from scripts.rag_query import RAGQueryEngine
+
+from .conftest import make_chunks
+
+
+def test_tokenize_keeps_compound_terms_and_drops_stopwords():
+    tokens = tokenize("The IL-6 and COVID-19 levels")
+    assert {"il-6", "covid-19", "levels"} <= set(tokens)
+    assert "the" not in tokens and "and" not in tokens
+
+
+def test_search_ranks_and_filters(tmp_path):
+    chunks = make_chunks(3, text="Statins lower cholesterol {i}.") + make_chunks(2, text="Aspirin prevents stroke {i}.")
+    for i, chunk in enumerate(chunks):
+        chunk["article_id"] = chunk["metadata"]["article_id"] = str(i)
+    index = build_lexical_index(chunks, str(tmp_path / "bm25"))
+    
+    matches = index.search("aspirin stroke", top_k=5)
+    assert {m["metadata"]["article_id"] for m in matches} == {"3", "4"}
+    assert index.search("aspirin", top_k=5, filter={"article_id": {"$eq": "4"}})[0]["id"].startswith("article_4")
+    assert index.search("unknownterm") == []
+
+
+def test_loaded_index_survives_rebuild_at_same_path(tmp_path):
+    path = str(tmp_path / "bm25")
+    build_lexical_index(make_chunks(20, text="Aspirin dose {i} in elderly patients."), path)
+    old = BM25Index.load(path)
+    
+    rebuilt_chunks = make_chunks(3, text="Completely different content about insulin and metformin number {i}.")
+    build_lexical_index(rebuilt_chunks, path)
+    
+    # O índice antigo continua lendo a própria versão (offsets e docs.jsonl)
+    matches = old.search("aspirin", top_k=5)
+    assert len(matches) == 5
+    assert all("Aspirin" in m["metadata"]["text"] for m in matches)
+    
+    # O registro do processo passa a devolver a nova versão
+    current = get_lexical_index(path)
+    assert current.build_id != old.build_id
+    assert current.search("aspirin") == []
+    assert len(current.search("insulin", top_k=5)) == 3
+
+
+def test_registry_reloads_after_external_rebuild(tmp_path):
+    path = str(tmp_path / "bm25")
+    build_lexical_index(make_chunks(2, text="Aspirin {i}."), path)
+    first = get_lexical_index(path)
+    
+    # Reconstrução sem passar por build_lexical_index (ex: outro processo)
+    BM25Index.build(make_chunks(2, text="Insulin {i}.")).save(path)
+    assert get_lexical_index(path) is not first
+    assert get_lexical_index(path).search("insulin")
+
+
+def test_rebuild_invalidates_cached_lexical_results(standin_settings):
+    path = str(standin_settings / "lexical_index")
+    build_lexical_index(make_chunks(3, text="Aspirin {i}."), path)
+    cache = QueryResultCache(semantic_threshold=None)
+    engine = RAGQueryEngine(backend="local", mode="lexical", cache=cache)
+    
+    assert len(engine.query("aspirin", top_k=5)) == 3
+    build_lexical_index(make_chunks(1, text="Aspirin only once {i}."), path)
+    results = engine.query("aspirin", top_k=5)
+    assert len(results) == 1
+    assert cache.stats()["exact_hits"] == 0
+
+
+def test_reciprocal_rank_fusion_prefers_items_in_both_lists():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+    assert fused[0][0] == "b"
@@ -0,0 +1,47 @@
+import pytest
+
+from config.settings import Settings
+from scripts.pinecone_ingester import PineconeIngester
+from scripts.rag_query import RAGQueryEngine
+
+
+_TEXTS = [
+    "Background on hospital admissions in the cohort.",
+    "Methods describe the randomized enrollment of patients.",
+    "Aspirin reduces the risk of myocardial infarction.",
+    "Results were consistent across age groups.",
+    "Limitations include the short follow-up period.",
+]
+
+
+def _article_chunks(article_id="20000"):
+    return [
+        {"text": text, "article_id": article_id, "chunk_index": i,
+         "metadata": {"article_id": article_id, "source": "pubmedqa", "chunk_index": i, "year": "2011"}}
+        for i, text in enumerate(_TEXTS)
+    ]
+
+
+@pytest.mark.parametrize("text_store", [False, True])
+def test_expand_neighbors_adds_adjacent_chunks_in_order(standin_settings, embeddings, monkeypatch, text_store):
+    if text_store:
+        monkeypatch.setattr(Settings, "CHUNK_TEXT_STORE_PATH", str(standin_settings / "chunk_texts.sqlite"))
+    ingester = PineconeIngester(embeddings_manager=embeddings, backend="local")
+    ingester.ingest_chunks(_article_chunks(), show_progress=False, quiet=True)
+    
+    engine = RAGQueryEngine(embeddings_manager=embeddings, backend="local")
+    plain = engine.query("Aspirin reduces the risk of myocardial infarction.", top_k=1)
+    assert [r["chunk_index"] for r in plain] == [2]
+    
+    expanded = engine.query("Aspirin reduces the risk of myocardial infarction.", top_k=1, expand_neighbors=1)
+    assert [int(r["chunk_index"]) for r in expanded] == [1, 2, 3]
+    assert [r["text"] for r in expanded] == _TEXTS[1:4]
+    assert [bool(r.get("neighbor")) for r in expanded] == [True, False, True]
+    assert all(r["article_id"] == "20000" and r["score"] == expanded[1]["score"] for r in expanded)
+    
+    # Vizinhos além do início/fim do artigo são ignorados
+    edge = engine.query("Limitations include the short follow-up period.", top_k=1, expand_neighbors=3)
+    assert [int(r["chunk_index"]) for r in edge] == [1, 2, 3, 4]
+    
+    with pytest.raises(ValueError):
+        engine.query("aspirin", top_k=1, expand_neighbors=-1)
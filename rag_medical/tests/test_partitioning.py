@@ -0,0 +1,72 @@
+from scripts.partitioning import UNKNOWN_PARTITION, PartitionRouter, PartitionScheme, merge_matches
+from scripts.pinecone_ingester import PineconeIngester
+from scripts.rag_query import RAGQueryEngine
+from scripts.vector_store import LocalVectorStore
+
+from .conftest import make_chunks
+
+
+def test_partition_for_buckets_and_exact_values():
+    years = PartitionScheme("year", bucket_size=5)
+    assert years.partition_for({"year": "2011"}) == "2010-2014"
+    assert years.partition_for({"year": 2015}) == "2015-2019"
+    assert years.partition_for({"year": "n/a"}) == UNKNOWN_PARTITION
+    assert years.partition_for({}) == UNKNOWN_PARTITION
+    
+    decisions = PartitionScheme("final_decision")
+    assert decisions.partition_for({"final_decision": "maybe yes"}) == "maybe_yes"
+    assert decisions.namespace_for("pubmed", "yes") == "pubmed__final_decision__yes"
+
+
+def test_select_prunes_bucket_partitions():
+    scheme = PartitionScheme("year", bucket_size=5)
+    partitions = ["2000-2004", "2005-2009", "2010-2014", UNKNOWN_PARTITION]
+    
+    assert scheme.select(partitions, None) == partitions
+    assert scheme.select(partitions, {"source": "pubmedqa"}) == partitions
+    assert scheme.select(partitions, {"year": "2011"}) == ["2010-2014"]
+    assert scheme.select(partitions, {"year": {"$in": ["2001", "2012"]}}) == ["2000-2004", "2010-2014"]
+    assert scheme.select(partitions, {"year": {"$gte": "2006", "$lt": "2010"}}) == ["2005-2009"]
+    assert scheme.select(partitions, {"year": {"$gte": "2015"}}) == []
+    assert scheme.select(partitions, {"year": {"$ne": "2011"}}) == partitions
+
+
+def test_select_prunes_exact_partitions():
+    scheme = PartitionScheme("final_decision")
+    partitions = ["maybe", "no", "yes", UNKNOWN_PARTITION]
+    assert scheme.select(partitions, {"final_decision": "yes"}) == ["yes"]
+    assert scheme.select(partitions, {"final_decision": {"$nin": ["no", "maybe"]}}) == ["yes", UNKNOWN_PARTITION]
+
+
+def test_router_discovers_non_empty_partitions(tmp_path):
+    scheme = PartitionScheme("year", bucket_size=10)
+    store = LocalVectorStore(str(tmp_path), dimension=2)
+    for partition in ("2000-2009", "2010-2019"):
+        store.upsert([{"id": partition, "values": [1.0, 0.0]}], namespace=scheme.namespace_for("base", partition))
+    store.upsert([{"id": "other", "values": [1.0, 0.0]}], namespace="unrelated")
+    
+    router = PartitionRouter(scheme, store)
+    assert router.partitions("base") == ["2000-2009", "2010-2019"]
+    assert router.route("base", {"year": "2015"}) == ["base__year__2010-2019"]
+    assert router.route("base", {"year": "1990"}) == []
+    assert router.route("other", None) is None
+
+
+def test_merge_matches_keeps_global_top_k():
+    merged = merge_matches([[{"id": "a", "score": 0.9}, {"id": "b", "score": 0.2}], [{"id": "c", "score": 0.5}]], 2)
+    assert [match["id"] for match in merged] == ["a", "c"]
+
+
+def test_partitioned_ingest_routes_filtered_queries(standin_settings, embeddings):
+    scheme = PartitionScheme("year", bucket_size=10)
+    ingester = PineconeIngester(embeddings_manager=embeddings, backend="local")
+    stats = ingester.ingest_chunks_partitioned(make_chunks(20), scheme=scheme, show_progress=False, quiet=True)
+    assert set(stats["partitions"]) == {"2000-2009", "2010-2019"}
+    
+    engine = RAGQueryEngine(embeddings_manager=embeddings, backend="local", partition_scheme=scheme)
+    results = engine.query("aspirin myocardial infarction", top_k=20, filters={"year": "2013"})
+    assert [result["metadata"]["year"] for result in results] == ["2013"]
+    
+    unfiltered = engine.query("aspirin myocardial infarction", top_k=20)
+    assert len(unfiltered) == 20
+    assert {result["metadata"]["year"] for result in unfiltered} == {str(year) for year in range(2000, 2020)}
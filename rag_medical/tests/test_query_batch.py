@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+from config.settings import Settings
+from scripts import deadline
+from scripts.pinecone_ingester import PineconeIngester
+from scripts.query_cache import IngestionEpochs, QueryResultCache
+from scripts.rag_query import RAGQueryEngine
+from scripts.vector_store import LocalVectorStore
+
+from .conftest import make_chunks
+
+
+class _HangingStore(LocalVectorStore):
+    """Store local cujas buscas travam até o evento ser liberado."""
+    
+    def __init__(self, path, event):
+        super().__init__(path)
+        self.event = event
+    
+    def query(self, *args, **kwargs):
+        self.event.wait()
+        return super().query(*args, **kwargs)
+
+
+@pytest.fixture
+def ingested(standin_settings, embeddings):
+    ingester = PineconeIngester(embeddings_manager=embeddings, backend="local")
+    ingester.ingest_chunks(make_chunks(5), show_progress=False, quiet=True, incremental=True)
+    return ingester
+
+
+def _cache():
+    return QueryResultCache(epochs=IngestionEpochs(Settings.INGESTION_EPOCH_PATH), semantic_threshold=0.9)
+
+
+def test_batch_matches_single_queries_and_fills_cache(ingested, embeddings):
+    cache = _cache()
+    engine = RAGQueryEngine(embeddings_manager=embeddings, backend="local", cache=cache)
+    queries = ["aspirin myocardial infarction", "patient 3 aspirin"]
+    
+    batch = engine.query_batch(queries, top_k=3)
+    assert all(not results.degraded for results in batch)
+    assert [len(results) for results in batch] == [3, 3]
+    
+    # As queries seguintes saem do cache preenchido pelo lote
+    assert engine.query(queries[0], top_k=3) == batch[0]
+    assert cache.stats()["exact_hits"] == 1
+    assert engine.query_batch(queries, top_k=3) == batch
+    assert cache.stats()["exact_hits"] == 3
+
+
+def test_batch_uses_semantic_cache_tier(ingested, embeddings):
+    cache = _cache()
+    engine = RAGQueryEngine(embeddings_manager=embeddings, backend="local", cache=cache)
+    
+    single = engine.query("aspirin myocardial infarction", top_k=3, mode="dense")
+    batch = engine.query_batch(["Aspirin, myocardial infarction?"], top_k=3, mode="dense")
+    assert batch[0] == single
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_batch_degrades_when_deadline_expires(standin_settings, embeddings):
+    release = threading.Event()
+    engine = RAGQueryEngine(
+        embeddings_manager=embeddings,
+        vector_store=_HangingStore(str(standin_settings / "hanging"), release),
+        backend="local"
+    )
+    try:
+        started = time.perf_counter()
+        batch = engine.query_batch(["aspirin", "statins"], top_k=3, mode="dense", deadline=0.2)
+        assert time.perf_counter() - started < 2
+        assert [results.degraded for results in batch] == [True, True]
+        assert all(results.fallback == "empty" for results in batch)
+    finally:
+        release.set()
+        for _ in range(100):
+            if deadline.abandoned_calls() == 0:
+                break
+            time.sleep(0.01)
@@ -0,0 +1,75 @@
+from config.settings import Settings
+from scripts.pinecone_ingester import PineconeIngester
+from scripts.query_cache import IngestionEpochs, QueryResultCache
+from scripts.rag_query import RAGQueryEngine
+from scripts.vector_store import LocalVectorStore, store_identity
+
+from .conftest import make_chunks
+
+
+def _ingest(embeddings, chunks, store=None):
+    ingester = PineconeIngester(embeddings_manager=embeddings, backend="local")
+    if store is not None:
+        ingester.index = store
+    ingester.ingest_chunks(chunks, show_progress=False, quiet=True, incremental=True)
+    return ingester
+
+
+def test_make_key_separates_store_and_embedding_contexts():
+    cache = QueryResultCache(semantic_threshold=0.5)
+    key_a = cache.make_key("idx", "ns", "dense", 5, None, "aspirin", store="local:/a", embedding="ollama:m:64")
+    key_b = cache.make_key("idx", "ns", "dense", 5, None, "aspirin", store="local:/b", embedding="ollama:m:64")
+    key_c = cache.make_key("idx", "ns", "dense", 5, None, "aspirin", store="local:/a", embedding="ollama:m:32")
+    
+    cache.put(key_a, [{"article_id": "a"}], [1.0, 0.0])
+    assert cache.get(key_a) == [{"article_id": "a"}]
+    assert cache.get(key_b) is None
+    assert cache.get(key_c) is None
+    assert cache.get_similar(key_b, [1.0, 0.0]) is None
+    assert cache.get_similar(key_c, [1.0, 0.0, 0.0]) is None
+
+
+def test_epochs_are_keyed_by_store(tmp_path):
+    epochs = IngestionEpochs(str(tmp_path / "epochs.json"))
+    epoch = epochs.bump("idx", "ns", "local:/a")
+    assert epochs.get("idx", "ns", "local:/a") == epoch
+    assert epochs.get("idx", "ns", "local:/b") == 0
+    assert epochs.get("idx", "ns") == 0
+
+
+def test_shared_cache_does_not_leak_between_stores(standin_settings, embeddings):
+    cache = QueryResultCache(
+        epochs=IngestionEpochs(Settings.INGESTION_EPOCH_PATH), semantic_threshold=0.95
+    )
+    store_a = LocalVectorStore(str(standin_settings / "store_a"))
+    store_b = LocalVectorStore(str(standin_settings / "store_b"))
+    _ingest(embeddings, make_chunks(5), store=store_a)
+    _ingest(embeddings, make_chunks(5, text="Statins and cholesterol {i}."), store=store_b)
+    
+    engine_a = RAGQueryEngine(embeddings_manager=embeddings, vector_store=store_a, backend="local", cache=cache)
+    engine_b = RAGQueryEngine(embeddings_manager=embeddings, vector_store=store_b, backend="local", cache=cache)
+    assert engine_a.store_identity != engine_b.store_identity
+    
+    results_a = engine_a.query("aspirin myocardial infarction", top_k=3)
+    results_b = engine_b.query("aspirin myocardial infarction", top_k=3)
+    assert "Aspirin" in results_a[0]["text"]
+    assert "Statins" in results_b[0]["text"]
+    assert cache.stats()["exact_hits"] == 0
+
+
+def test_reingest_invalidates_cached_results(standin_settings, embeddings):
+    cache = QueryResultCache(epochs=IngestionEpochs(Settings.INGESTION_EPOCH_PATH), semantic_threshold=None)
+    _ingest(embeddings, make_chunks(5))
+    engine = RAGQueryEngine(embeddings_manager=embeddings, backend="local", cache=cache)
+    
+    first = engine.query("aspirin myocardial infarction", top_k=3)
+    assert engine.query("aspirin myocardial infarction", top_k=3) == first
+    assert cache.stats()["exact_hits"] == 1
+    
+    ingester = _ingest(embeddings, make_chunks(5, text="Aspirin and myocardial infarction, revised {i}."))
+    assert IngestionEpochs(Settings.INGESTION_EPOCH_PATH).get(
+        ingester.index_name, ingester.namespace, store_identity("local", ingester.index_name, ingester.index)
+    ) > 0
+    second = engine.query("aspirin myocardial infarction", top_k=3)
+    assert cache.stats()["exact_hits"] == 1
+    assert "revised" in second[0]["text"]
@@ -0,0 +1,55 @@
+import pytest
+
+from scripts import rag_query
+from scripts.pinecone_ingester import PineconeIngester
+from scripts.rag_query import get_query_engine, query_medical_rag
+from scripts.vector_store import LocalVectorStore
+
+from .conftest import make_chunks
+
+
+@pytest.fixture(autouse=True)
+def fresh_engines(monkeypatch):
+    """Registro de motores vazio em cada teste."""
+    monkeypatch.setattr(rag_query, "_default_engines", {})
+
+
+def test_engine_is_reused_per_configuration_and_clients(standin_settings, embeddings):
+    store = LocalVectorStore(str(standin_settings / "store"), dimension=64)
+    
+    default = get_query_engine(backend="local")
+    assert get_query_engine(backend="local") is default
+    
+    with_clients = get_query_engine(backend="local", embeddings_manager=embeddings, vector_store=store)
+    assert with_clients is not default
+    assert get_query_engine(backend="local", embeddings_manager=embeddings, vector_store=store) is with_clients
+    assert with_clients.vector_store is store and with_clients.embeddings_manager is embeddings
+    
+    other_store = LocalVectorStore(str(standin_settings / "other"), dimension=64)
+    assert get_query_engine(backend="local", embeddings_manager=embeddings, vector_store=other_store) is not with_clients
+
+
+def test_client_engines_are_bounded(standin_settings, embeddings, monkeypatch):
+    monkeypatch.setattr(rag_query, "_MAX_CLIENT_ENGINES", 3)
+    default = get_query_engine(backend="local")
+    stores = [LocalVectorStore(str(standin_settings / f"store_{i}"), dimension=64) for i in range(5)]
+    for store in stores:
+        get_query_engine(backend="local", vector_store=store)
+    
+    keys = list(rag_query._default_engines)
+    assert len(keys) == 4
+    assert rag_query._default_engines[keys[0]] is default
+    assert [key[-2] for key in keys[1:]] == stores[2:]
+
+
+def test_query_medical_rag_reuses_engine_for_passed_clients(standin_settings, embeddings):
+    ingester = PineconeIngester(embeddings_manager=embeddings, backend="local")
+    ingester.ingest_chunks(make_chunks(4), show_progress=False, quiet=True)
+    
+    for _ in range(3):
+        results = query_medical_rag(
+            "aspirin myocardial infarction", embeddings_manager=embeddings,
+            vector_store=ingester.index, backend="local", top_k=2
+        )
+        assert len(results) == 2
+    assert len(rag_query._default_engines) == 1
@@ -0,0 +1,48 @@
+import json
+
+from config.settings import Settings
+from benchmarks.retrieval_harness import _STANDIN_INDEX_NAME, run_retrieval_harness
+
+
+_ARTICLES = {
+    "21645374": ("Does aspirin reduce myocardial infarction risk?", "Aspirin therapy lowered myocardial infarction rates in adults."),
+    "21645375": ("Do statins lower LDL cholesterol?", "Statin treatment reduced LDL cholesterol in the cohort."),
+    "21645376": ("Does metformin improve glycemic control?", "Metformin improved HbA1c in type 2 diabetes."),
+    "21645377": ("Is vitamin D linked to bone density?", "Vitamin D supplementation increased bone mineral density."),
+}
+
+
+def test_standin_harness_reports_recall_and_leaves_real_state_alone(standin_settings, monkeypatch, tmp_path):
+    dataset = {
+        article_id: {"QUESTION": question, "CONTEXTS": [context], "LABELS": ["RESULTS"],
+                     "MESHES": ["Humans"], "YEAR": "2011", "final_decision": "yes", "LONG_ANSWER": context}
+        for article_id, (question, context) in _ARTICLES.items()
+    }
+    with open(Settings.MEDICAL_DATA_PATH, "w", encoding="utf-8") as f:
+        json.dump(dataset, f)
+    
+    # O modo --standin reconfigura Settings; o monkeypatch desfaz ao final
+    for name in ("PINECONE_HOST", "PINECONE_API_KEY"):
+        monkeypatch.setattr(Settings, name, getattr(Settings, name))
+    report = run_retrieval_harness(
+        top_ks=[3], cache_modes=["none", "warm"], concurrency_levels=[1, 2],
+        backend="local", standin=True, dimension=32
+    )
+    
+    assert report["num_questions"] == 4 and report["ingestion"]["errors"] == 0
+    assert [(run["cache"], run["concurrency"]) for run in report["runs"]] == [
+        ("none", 1), ("none", 2), ("warm", 1), ("warm", 2)
+    ]
+    for run in report["runs"]:
+        assert 0.0 <= run["recall@3"] <= 1.0
+        assert run["latency_p50_ms"] <= run["latency_p99_ms"]
+    assert report["runs"][0]["embedding_calls_per_query"] == 1.0
+    assert report["runs"][2]["embedding_calls_per_query"] == 0.0
+    assert report["runs"][2]["cache_hits"]["exact_hits"] == 4
+    
+    # Estado isolado: índice/namespace próprios e nada no vector store dos testes
+    assert Settings.PINECONE_INDEX_NAME == _STANDIN_INDEX_NAME
+    assert report["namespace"] == "retrieval_harness"
+    assert not (tmp_path / "vector_store").exists()
+    checkpoints = standin_settings / "data" / "checkpoints"
+    assert not checkpoints.exists() or not list(checkpoints.iterdir())
@@ -0,0 +1,48 @@
+"""Estado compartilhado entre processos (workers da ingestão multiprocesso)."""
+
+import multiprocessing
+
+from scripts.chunk_store import ChunkTextStore
+from scripts.ingestion_ledger import IngestionLedger
+from scripts.query_cache import IngestionEpochs
+
+
+_WORKERS = 4
+_ROUNDS = 25
+
+
+def _worker(worker_id: int, base: str):
+    epochs = IngestionEpochs(f"{base}/epochs.json")
+    ledger = IngestionLedger(f"{base}/ledger.sqlite")
+    store = ChunkTextStore(f"{base}/texts.sqlite")
+    for round_id in range(_ROUNDS):
+        epochs.bump("idx", f"ns{worker_id}_{round_id}")
+        epochs.bump("idx", "shared")
+        ids = [f"w{worker_id}_r{round_id}_{i}" for i in range(20)]
+        ledger.record("ns", [(vector_id, "hash", "1") for vector_id in ids])
+        store.put_many([(vector_id, {"text": vector_id}) for vector_id in ids])
+
+
+def test_concurrent_processes_share_epochs_ledger_and_text_store(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_worker, args=(i, str(tmp_path))) for i in range(_WORKERS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=120)
+    assert [process.exitcode for process in processes] == [0] * _WORKERS
+    
+    epochs = IngestionEpochs(str(tmp_path / "epochs.json"))
+    assert all(
+        epochs.get("idx", f"ns{worker}_{round_id}") > 0
+        for worker in range(_WORKERS) for round_id in range(_ROUNDS)
+    )
+    assert IngestionLedger(tmp_path / "ledger.sqlite").count("ns") == _WORKERS * _ROUNDS * 20
+    assert len(ChunkTextStore(str(tmp_path / "texts.sqlite")).get_many(["w0_r0_0", "w3_r24_19"])) == 2
+
+
+def test_bump_is_monotonic(tmp_path):
+    epochs = IngestionEpochs(str(tmp_path / "epochs.json"))
+    first = epochs.bump("idx", "ns")
+    assert epochs.bump("idx", "ns") > first
+    assert epochs.get("idx", "ns") > first
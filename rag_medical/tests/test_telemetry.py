@@ -0,0 +1,80 @@
+import json
+import re
+
+import pytest
+
+from scripts.pinecone_ingester import PineconeIngester
+from scripts.telemetry import IngestionTelemetry, classify_error, merge_snapshots
+
+from .conftest import make_chunks
+
+
+class _HttpError(Exception):
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+@pytest.mark.parametrize("error, cause", [
+    (_HttpError("Too many requests", 429), "rate_limit"),
+    (RuntimeError("quota exceeded"), "rate_limit"),
+    (TimeoutError(), "timeout"),
+    (_HttpError("unavailable", 503), "server_error"),
+    (ConnectionError("reset"), "connection"),
+    (ValueError("bad vector"), "other"),
+    (None, "other"),
+])
+def test_classify_error(error, cause):
+    assert classify_error(error) == cause
+
+
+def test_snapshot_and_merge():
+    telemetry = IngestionTelemetry()
+    with telemetry.stage("embedding"):
+        pass
+    telemetry.add_time("embedding", 0.5)
+    telemetry.incr("vectors_upserted", 10)
+    telemetry.record_retry("upsert", _HttpError("slow down", 429), sleep_seconds=2.0)
+    
+    snapshot = telemetry.snapshot()
+    assert snapshot["stages"]["embedding"]["count"] == 2
+    assert snapshot["stages"]["embedding"]["max_seconds"] == 0.5
+    assert snapshot["stages"]["retry_sleep"]["seconds"] == 2.0
+    assert snapshot["retries"] == {"upsert:rate_limit": 1}
+    
+    merged = merge_snapshots([snapshot, snapshot], elapsed_seconds=4.0)
+    assert merged["counters"] == {"vectors_upserted": 20}
+    assert merged["retries"] == {"upsert:rate_limit": 2}
+    assert merged["stages"]["embedding"]["count"] == 4
+    assert merged["vectors_per_second"] == 5.0
+
+
+def test_prometheus_and_jsonl_exports(tmp_path):
+    telemetry = IngestionTelemetry()
+    telemetry.add_time("upsert", 1.25)
+    telemetry.incr("bytes_sent", 2048)
+    telemetry.record_retry("upsert", TimeoutError())
+    
+    telemetry.write_prometheus(str(tmp_path / "ingest.prom"), labels={"index": 'med"ical'})
+    text = (tmp_path / "ingest.prom").read_text(encoding="utf-8")
+    assert 'rag_ingest_stage_seconds_total{index="med\\"ical",stage="upsert"} 1.250000' in text
+    assert 'rag_ingest_bytes_sent_total{index="med\\"ical"} 2048' in text
+    assert 'rag_ingest_retries_total{cause="timeout",index="med\\"ical",operation="upsert"} 1' in text
+    assert all(re.match(r"^(# TYPE \S+ (gauge|counter)|\S+ [0-9.]+)$", line) for line in text.splitlines())
+    
+    telemetry.write_jsonl(str(tmp_path / "ingest.jsonl"), extra={"event": "checkpoint"})
+    telemetry.write_jsonl(str(tmp_path / "ingest.jsonl"), extra={"event": "done"})
+    with open(tmp_path / "ingest.jsonl", "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [record["event"] for record in records] == ["checkpoint", "done"]
+    assert records[-1]["counters"] == {"bytes_sent": 2048}
+
+
+def test_ingestion_reports_stage_telemetry(standin_settings, embeddings):
+    ingester = PineconeIngester(embeddings_manager=embeddings, backend="local")
+    stats = ingester.ingest_chunks(make_chunks(6), show_progress=False, quiet=True)
+    
+    telemetry = stats["telemetry"]
+    assert telemetry["counters"]["vectors_upserted"] == 6
+    assert telemetry["counters"]["bytes_sent"] > 0
+    assert {"embedding", "upsert"} <= set(telemetry["stages"])
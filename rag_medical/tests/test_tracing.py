@@ -0,0 +1,84 @@
+import json
+import random
+
+import pytest
+
+from scripts import tracing
+from scripts.pinecone_ingester import PineconeIngester
+from scripts.rag_query import RAGQueryEngine
+from scripts.tracing import HistogramSink, JsonlSink, LatencyHistogram, MultiSink, set_trace_sink, trace
+
+from .conftest import make_chunks
+
+
+@pytest.fixture(autouse=True)
+def restore_sink(monkeypatch):
+    """Restaura o sink do processo ao final de cada teste."""
+    monkeypatch.setattr(tracing, "_sink", tracing._sink)
+
+
+def test_histogram_percentiles_within_relative_error():
+    rng = random.Random(0)
+    values = [rng.lognormvariate(-6, 1.5) for _ in range(20000)]
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.add(value)
+    
+    ordered = sorted(values)
+    for percentile, measured_ms in histogram.percentiles([50, 90, 99, 100]).items():
+        exact_ms = ordered[max(0, -(-len(ordered) * percentile // 100) - 1)] * 1000
+        assert measured_ms == pytest.approx(exact_ms, rel=0.02, abs=0.002)
+    
+    summary = histogram.summary()
+    assert summary["count"] == 20000
+    assert summary["min_ms"] <= summary["p50_ms"] <= summary["p99_ms"] <= summary["max_ms"]
+    assert LatencyHistogram().percentiles([50]) == {50: 0.0}
+
+
+def test_disabled_tracing_returns_shared_null_span():
+    set_trace_sink(None)
+    with trace("embedding", chars=3) as span:
+        span.set(dimension=64)
+    assert trace("a") is trace("b")
+    assert tracing.trace_stats() == {}
+
+
+def test_nested_spans_share_trace_id_and_record_errors(tmp_path):
+    histogram = HistogramSink()
+    jsonl = JsonlSink(str(tmp_path / "spans.jsonl"))
+    set_trace_sink(MultiSink([histogram, jsonl]))
+    
+    with trace("query", chars=10):
+        with trace("embedding") as span:
+            span.set(dimension=64)
+        with pytest.raises(RuntimeError):
+            with trace("vector_search"):
+                raise RuntimeError("boom")
+    with trace("query", chars=20):
+        pass
+    jsonl.close()
+    
+    with open(tmp_path / "spans.jsonl", "r", encoding="utf-8") as f:
+        spans = [json.loads(line) for line in f]
+    assert [span["span"] for span in spans] == ["embedding", "vector_search", "query", "query"]
+    assert len({span["trace_id"] for span in spans[:3]}) == 1
+    assert spans[3]["trace_id"] != spans[0]["trace_id"]
+    assert spans[1]["error"] == "RuntimeError"
+    
+    stats = tracing.trace_stats()
+    assert stats["query"]["count"] == 2
+    assert stats["query"]["sizes"] == {"chars": 15}
+    assert stats["embedding"]["sizes"] == {"dimension": 64}
+
+
+def test_query_pipeline_emits_stage_spans(standin_settings, embeddings):
+    PineconeIngester(embeddings_manager=embeddings, backend="local").ingest_chunks(
+        make_chunks(3), show_progress=False, quiet=True
+    )
+    sink = set_trace_sink(HistogramSink())
+    engine = RAGQueryEngine(embeddings_manager=embeddings, backend="local")
+    engine.query("aspirin myocardial infarction", top_k=2)
+    
+    stages = set(sink.snapshot())
+    assert {"query", "embedding", "vector_search", "hydration", "format"} <= stages
+    assert sink.snapshot()["vector_search"]["sizes"]["matches"] == 2
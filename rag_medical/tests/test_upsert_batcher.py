@@ -0,0 +1,46 @@
+import pytest
+
+from scripts.upsert_batcher import UpsertBatcher, estimate_vector_bytes
+
+
+def _vector(i, text_size=10):
+    return {"id": f"v{i}", "values": [0.5] * 4, "metadata": {"text": "x" * text_size}}
+
+
+def test_requests_respect_vector_and_byte_limits():
+    vectors = [_vector(i, text_size=10 if i % 3 else 300) for i in range(20)]
+    max_bytes = 1000
+    batcher = UpsertBatcher(max_bytes=max_bytes, max_vectors=5)
+    
+    requests = batcher.add(vectors[:12], list(range(12)))
+    requests += batcher.add(vectors[12:], list(range(12, 20)))
+    assert len(batcher) > 0
+    requests += batcher.flush()
+    assert len(batcher) == 0 and batcher.flush() == []
+    
+    assert [p for request in requests for p in request.positions] == list(range(20))
+    for request in requests:
+        assert len(request.vectors) <= 5
+        assert request.num_bytes <= max_bytes
+        assert request.num_bytes > sum(estimate_vector_bytes(v) for v in request.vectors)
+
+
+def test_requests_are_filled_across_add_calls():
+    batcher = UpsertBatcher(max_bytes=10_000_000, max_vectors=4)
+    assert batcher.add([_vector(0), _vector(1)], [0, 1]) == []
+    ready = batcher.add([_vector(2), _vector(3), _vector(4)], [2, 3, 4])
+    assert [request.positions for request in ready] == [[0, 1, 2, 3]]
+    assert [request.positions for request in batcher.flush()] == [[4]]
+
+
+def test_oversized_vector_goes_alone():
+    batcher = UpsertBatcher(max_bytes=500, max_vectors=10)
+    requests = batcher.add([_vector(0), _vector(1, text_size=2000), _vector(2)], [0, 1, 2]) + batcher.flush()
+    assert [request.positions for request in requests] == [[0], [1], [2]]
+
+
+def test_invalid_limits_are_rejected():
+    with pytest.raises(ValueError):
+        UpsertBatcher(max_bytes=10, max_vectors=1)
+    with pytest.raises(ValueError):
+        UpsertBatcher(max_bytes=1000, max_vectors=0)
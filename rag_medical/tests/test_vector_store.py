@@ -0,0 +1,126 @@
+import json
+
+import pytest
+
+from scripts.vector_store import LocalVectorStore, matches_filter
+
+
+def _vector(i, article_id, year="2011", dimension=4):
+    values = [0.0] * dimension
+    values[i % dimension] = 1.0
+    values[(i + 1) % dimension] = 0.1 * (i + 1)
+    return {"id": f"article_{article_id}_chunk_{i}", "values": values, "metadata": {"article_id": article_id, "year": year}}
+
+
+def _segments(ns_dir):
+    path = ns_dir / "segments.json"
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["segments"]
+
+
+def _ids(store, namespace=None):
+    return {vector_id for page in store.list(namespace=namespace) for vector_id in page}
+
+
+@pytest.mark.parametrize("metadata, filter, expected", [
+    ({"year": "2011"}, None, True),
+    ({"year": "2011"}, {"year": "2011"}, True),
+    ({"year": "2011"}, {"year": {"$ne": "2011"}}, False),
+    ({"year": "2011"}, {"year": {"$in": ["2010", "2011"]}}, True),
+    ({"year": "2011"}, {"year": {"$nin": ["2010", "2011"]}}, False),
+    ({"mesh": ["Aspirin", "Stroke"]}, {"mesh": "Stroke"}, True),
+    ({"mesh": ["Aspirin", "Stroke"]}, {"mesh": {"$in": ["Statins"]}}, False),
+    ({"score": 5}, {"score": {"$gt": 4, "$lte": 5}}, True),
+    ({"score": 5}, {"score": {"$lt": 5}}, False),
+    ({"score": "5"}, {"score": {"$gt": 4}}, False),
+    ({}, {"year": {"$ne": "2011"}}, True),
+    ({}, {"year": "2011"}, False),
+    ({}, {"year": {"$exists": False}}, True),
+    ({"year": "2011"}, {"$or": [{"year": "2010"}, {"year": "2011"}]}, True),
+    ({"year": "2011", "a": 1}, {"$and": [{"year": "2011"}, {"a": 2}]}, False),
+])
+def test_matches_filter(metadata, filter, expected):
+    assert matches_filter(metadata, filter) is expected
+
+
+def test_matches_filter_rejects_unknown_operator():
+    with pytest.raises(ValueError):
+        matches_filter({"year": "2011"}, {"year": {"$regex": "20"}})
+
+
+def test_query_ranks_filters_and_restricts_by_article(tmp_path):
+    store = LocalVectorStore(str(tmp_path), dimension=4)
+    store.upsert([_vector(i, str(i % 2), year=str(2010 + i)) for i in range(6)], namespace="ns")
+    
+    matches = store.query([1.0, 0.0, 0.0, 0.0], top_k=2, namespace="ns")["matches"]
+    assert matches[0]["id"] == "article_0_chunk_0"
+    assert matches[0]["score"] >= matches[1]["score"]
+    
+    filtered = store.query([1.0, 0.0, 0.0, 0.0], top_k=10, filter={"year": {"$gte": "2013"}}, namespace="ns")
+    assert {m["id"] for m in filtered["matches"]} == {"article_1_chunk_3", "article_0_chunk_4", "article_1_chunk_5"}
+    
+    by_article = store.query([1.0, 0.0, 0.0, 0.0], top_k=10, filter={"article_id": {"$in": ["1"]}, "year": {"$ne": "2011"}}, namespace="ns")
+    assert {m["id"] for m in by_article["matches"]} == {"article_1_chunk_3", "article_1_chunk_5"}
+    assert store.query([1.0, 0.0, 0.0, 0.0], top_k=3)["matches"] == []
+
+
+def test_flush_appends_segments_and_reloads(tmp_path):
+    store = LocalVectorStore(str(tmp_path), dimension=4)
+    store.upsert([_vector(i, "1") for i in range(4)], namespace="ns")
+    store.flush()
+    store.upsert([_vector(i, "2") for i in range(4, 6)], namespace="ns")
+    store.flush()
+    
+    assert [segment["rows"] for segment in _segments(tmp_path / "ns")] == [2]
+    
+    reopened = LocalVectorStore(str(tmp_path))
+    assert reopened.dimension == 4
+    assert _ids(reopened, "ns") == _ids(store, "ns")
+    assert reopened.fetch(["article_2_chunk_5"], namespace="ns")["vectors"]["article_2_chunk_5"]["metadata"]["article_id"] == "2"
+    assert reopened.query([1.0, 0.0, 0.0, 0.0], top_k=1, namespace="ns")["matches"] == store.query([1.0, 0.0, 0.0, 0.0], top_k=1, namespace="ns")["matches"]
+
+
+def test_updates_and_deletes_rewrite_the_namespace(tmp_path):
+    store = LocalVectorStore(str(tmp_path), dimension=4)
+    store.upsert([_vector(i, "1") for i in range(4)], namespace="ns")
+    store.flush()
+    store.upsert([_vector(4, "2")], namespace="ns")
+    store.flush()
+    
+    updated = _vector(1, "1", year="1999")
+    store.upsert([updated], namespace="ns")
+    store.delete(["article_1_chunk_0"], namespace="ns")
+    store.flush()
+    assert _segments(tmp_path / "ns") == []
+    
+    reopened = LocalVectorStore(str(tmp_path))
+    assert _ids(reopened, "ns") == {"article_1_chunk_1", "article_1_chunk_2", "article_1_chunk_3", "article_2_chunk_4"}
+    assert reopened.fetch(["article_1_chunk_1"], namespace="ns")["vectors"]["article_1_chunk_1"]["metadata"]["year"] == "1999"
+    assert reopened.describe_index_stats()["namespaces"]["ns"]["vector_count"] == 4
+
+
+def test_interrupted_rewrite_is_recovered(tmp_path):
+    store = LocalVectorStore(str(tmp_path), dimension=4)
+    store.upsert([_vector(i, "1") for i in range(3)])
+    store.flush()
+    
+    # Queda entre as duas trocas de diretório: só resta .<ns>.old
+    (tmp_path / "__default__").rename(tmp_path / ".__default__.old")
+    (tmp_path / ".__default__.abc123").mkdir()
+    
+    reopened = LocalVectorStore(str(tmp_path))
+    assert _ids(reopened) == {"article_1_chunk_0", "article_1_chunk_1", "article_1_chunk_2"}
+    assert not (tmp_path / ".__default__.abc123").exists()
+
+
+def test_delete_all_removes_namespace_from_disk(tmp_path):
+    store = LocalVectorStore(str(tmp_path), dimension=4)
+    store.upsert([_vector(0, "1")], namespace="a")
+    store.upsert([_vector(1, "1")], namespace="b")
+    store.flush()
+    store.delete(delete_all=True, namespace="a")
+    
+    reopened = LocalVectorStore(str(tmp_path))
+    assert set(reopened.describe_index_stats()["namespaces"]) == {"b"}